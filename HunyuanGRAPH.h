@@ -5,32 +5,47 @@
 #include<stdint.h>
 #include<stdarg.h>
 #include<time.h>
-#include<cuda_runtime.h>
 #include<sys/time.h>
 #include <sys/types.h>
+#ifndef NO_CUDA
+#include<cuda_runtime.h>
 #include<thrust/scan.h>
 #include <thrust/reduce.h>
 #include<thrust/sort.h>
 #include<thrust/execution_policy.h>
 #include<thrust/device_ptr.h>
 #include "bb_segsort.h"
+#endif
 #include "hunyuangraph_io.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_bb_segsort.h"
+#endif
 #include "hunyuangraph_define.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_memory.h"
 #include "hunyuangraph_GPU_prefixsum.h"
+#endif
 #include "hunyuangraph_timer.h"
 #include "hunyuangraph_struct.h"
 #include "hunyuangraph_graph.h"
 #include "hunyuangraph_admin.h"
 #include "hunyuangraph_common.h"
+#include "hunyuangraph_tune.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_common.h"
+#endif
 #include "hunyuangraph_partitiongraph.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_coarsen.h"
 #include "hunyuangraph_GPU_match.h"
 #include "hunyuangraph_GPU_contraction.h"
+#endif
 #include "hunyuangraph_CPU_initialpartition.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_initialpartition.h"
+#endif
+#include "hunyuangraph_CPU_partition.h"
+#include "hunyuangraph_CPU_krefine.h"
 #include "hunyuangraph_CPU_coarsen.h"
 #include "hunyuangraph_CPU_match.h"
 #include "hunyuangraph_CPU_contraction.h"
@@ -38,8 +53,11 @@
 #include "hunyuangraph_CPU_2wayrefine.h"
 #include "hunyuangraph_balance.h"
 #include "hunyuangraph_CPU_splitgraph.h"
+#include "hunyuangraph_CPU_multistart.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_uncoarsen.h"
 #include "hunyuangraph_GPU_krefine.h"
+#endif
 // #include "reduce_hem.h"
 // #include "struct.h"
 // #include "define.h"
@@ -0,0 +1,186 @@
+"""Autotuning of Coarsen_threshold, nIparts and nstarts per graph class.
+
+hunyuangraph_PartitionGraph reads tuned parameters from the file named by
+HUNYUANGRAPH_TUNE_FILE (see hunyuangraph_tune.h), per feature class of the
+graph (size, average degree and degree skew) and nparts. This script searches
+them: for every class and nparts it runs the graphs of the class with the
+default parameters, then tunes one parameter at a time over its candidate
+values, keeping the others at the best values so far, until a pass changes
+nothing. A configuration is kept if it lowers the geomean of the partition
+time over the graphs of the class, while the geomean edgecut stays within
+--max-cut-loss of the default and no graph loses more than --max-graph-cut-loss.
+
+Every run is one record of a bench.py results file, so an interrupted search
+resumes with the runs it already made.
+
+    python3 autotune.py --graphs graph_9.csv --nparts 8 32 --out hunyuangraph.tune
+    HUNYUANGRAPH_TUNE_FILE=hunyuangraph.tune ./hunyuangraph graphs/wb-edu.graph 8 1
+"""
+import argparse
+import math
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+from bench import ROOT, TOOLS, Results, cpu_model, cpu_slices, git_commit, parse_output, read_graphs, run
+from build_dataset import sha256
+
+DEFAULT = ('-', '-', '-')
+PARAMETERS = ('Coarsen_threshold', 'nIparts', 'nstarts')
+CLASS_PATTERN = re.compile(r'hunyuangraph_tune_class=(\S+)')
+
+
+def geomean(values):
+    return math.exp(sum(math.log(max(value, 1e-3)) for value in values) / len(values))
+
+
+def median(values):
+    values = sorted(values)
+    return (values[(len(values) - 1) // 2] + values[len(values) // 2]) / 2.0
+
+
+class Tuner:
+    """Runs of (graph, nparts, configuration), made on demand and cached in the results file."""
+
+    def __init__(self, args, tune_dir):
+        self.args = args
+        self.tune_dir = tune_dir
+        self.cpus = cpu_slices(1)[0]
+        self.context = {'tool': 'hunyuangraph', 'binary': os.path.abspath(args.binary), 'binary_sha256': sha256(args.binary),
+                        'commit': git_commit(), 'host': platform.node(), 'cpu': cpu_model()}
+        self.results = Results(args.results)
+        self.classes = {}
+
+    def tune_file(self, config):
+        """A tune file with the configuration for every graph and nparts."""
+        filename = os.path.join(self.tune_dir, '_'.join(config) + '.tune')
+        if not os.path.exists(filename):
+            with open(filename, 'w', encoding='utf-8') as file:
+                file.write('* 0 %s\n' % ' '.join(config))
+        return filename
+
+    def measure(self, graph, nparts, config):
+        """Median part_all and smallest edgecut of the repetitions, None if a run failed."""
+        context = dict(self.context, extra=['tune:%s' % ','.join(config)])
+        path = os.path.abspath(os.path.join(self.args.graph_dir, graph + self.args.suffix))
+        command = [self.args.binary] + TOOLS['hunyuangraph'][1](path, nparts)
+        env = {'HUNYUANGRAPH_TUNE_FILE': self.tune_file(config)}
+
+        times, cuts = [], []
+        for rep in range(self.args.reps):
+            record = self.results.done.get(Results.key(dict(context, graph=graph, nparts=nparts, rep=rep)))
+            if record is None:
+                status, returncode, seconds, rss, text = run(command, self.cpus, self.args.timeout, env)
+                runs, best = parse_output(text)
+                match = CLASS_PATTERN.search(text)
+                record = dict(context, graph=graph, nparts=nparts, rep=rep, status=status, returncode=returncode,
+                              wall_s=round(seconds, 4), peak_rss_mb=round(rss, 1), cpus=self.cpus, threads=len(self.cpus),
+                              warmup=0, runs=runs, best=best, tune_class=match.group(1) if match else None,
+                              time=time.strftime('%Y-%m-%dT%H:%M:%S'), stdout=text)
+                self.results.append(record)
+            if record['status'] != 'ok' or 'part_all' not in record['best'] or 'edgecut' not in record['best']:
+                return None
+            if record.get('tune_class'):
+                self.classes[graph] = record['tune_class']
+            times.append(record['best']['part_all'])
+            cuts.append(record['best']['edgecut'])
+        return median(times), min(cuts)
+
+    def score(self, graphs, nparts, config, baseline):
+        """(time ratio, cut ratio) geomeans against the baseline, None if infeasible."""
+        measured = [self.measure(graph, nparts, config) for graph in graphs]
+        if any(value is None for value in measured):
+            return None
+        time_ratios = [value[0] / base[0] for value, base in zip(measured, baseline)]
+        cut_ratios = [max(value[1], 1) / max(base[1], 1) for value, base in zip(measured, baseline)]
+        if geomean(cut_ratios) > 1 + self.args.max_cut_loss or max(cut_ratios) > 1 + self.args.max_graph_cut_loss:
+            return None
+        return geomean(time_ratios), geomean(cut_ratios)
+
+
+def candidates(args, nparts):
+    """Candidate values of the parameters, '-' being the default."""
+    return (['-'] + [str(int(factor * nparts)) for factor in args.threshold_factors],
+            ['-'] + [str(value) for value in args.iparts],
+            ['-'] + [str(value) for value in args.starts])
+
+
+def tune_class(tuner, graphs, nparts):
+    """Coordinate descent over the parameters, returns (config, time ratio, cut ratio)."""
+    baseline = [tuner.measure(graph, nparts, DEFAULT) for graph in graphs]
+    values = candidates(tuner.args, nparts)
+    best, best_score = DEFAULT, (1.0, 1.0)
+
+    for _ in range(tuner.args.passes):
+        changed = False
+        for i, name in enumerate(PARAMETERS):
+            for value in values[i]:
+                config = best[:i] + (value,) + best[i + 1:]
+                if config == best:
+                    continue
+                score = tuner.score(graphs, nparts, config, baseline)
+                print('  k=%d %s=%-6s time x%.3lf cut x%s' % (nparts, name, value, 1.0 / score[0] if score else 0,
+                                                               '%.4lf' % score[1] if score else 'infeasible'))
+                if score is not None and score[0] < best_score[0] * (1 - tuner.args.min_gain):
+                    best, best_score, changed = config, score, True
+        if not changed:
+            break
+    return best, best_score
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune the partitioning parameters per graph class and write a tune file')
+    parser.add_argument('--binary', default=TOOLS['hunyuangraph'][0], help='hunyuangraph binary (default: the one built in the repository)')
+    parser.add_argument('--graphs', required=True, help='graph list, graph_9.csv or graph_all.csv')
+    parser.add_argument('--graph-dir', default=os.path.join(ROOT, 'graphs'), help='directory of the graphs (default: graphs)')
+    parser.add_argument('--suffix', default='.graph', help='file name suffix of the graphs (default: .graph)')
+    parser.add_argument('--nparts', type=int, nargs='+', default=[8])
+    parser.add_argument('--threshold-factors', type=float, nargs='+', default=[2, 4, 16, 32, 64],
+                        help='Coarsen_threshold candidates as multiples of nparts (default: 2 4 16 32 64)')
+    parser.add_argument('--iparts', type=int, nargs='+', default=[2, 4, 8], help='nIparts candidates (default: 2 4 8)')
+    parser.add_argument('--starts', type=int, nargs='+', default=[1, 2, 8], help='nstarts candidates (default: 1 2 8)')
+    parser.add_argument('--reps', type=int, default=3, help='repetitions per run (default: 3)')
+    parser.add_argument('--passes', type=int, default=2, help='passes over the parameters (default: 2)')
+    parser.add_argument('--max-cut-loss', type=float, default=0.01, help='geomean edgecut increase allowed (default: 0.01)')
+    parser.add_argument('--max-graph-cut-loss', type=float, default=0.05, help='edgecut increase allowed on one graph (default: 0.05)')
+    parser.add_argument('--min-gain', type=float, default=0.02, help='smallest speedup worth a change (default: 0.02)')
+    parser.add_argument('--timeout', type=float, default=0, help='seconds before a run is killed (default: none)')
+    parser.add_argument('--results', default=os.path.join(ROOT, 'bench', 'autotune.jsonl'), help='runs file (default: bench/autotune.jsonl)')
+    parser.add_argument('--out', default=os.path.join(ROOT, 'hunyuangraph.tune'), help='tune file (default: hunyuangraph.tune)')
+    args = parser.parse_args()
+
+    if not os.access(args.binary, os.X_OK):
+        print('%s is not built' % args.binary)
+        sys.exit(1)
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+
+    entries = []
+    with tempfile.TemporaryDirectory() as tune_dir:
+        tuner = Tuner(args, tune_dir)
+        for nparts in args.nparts:
+            # the default runs print the class of every graph
+            graphs = [graph for graph in read_graphs(args.graphs) if tuner.measure(graph, nparts, DEFAULT) is not None]
+            classes = {}
+            for graph in graphs:
+                classes.setdefault(tuner.classes.get(graph), []).append(graph)
+            classes.pop(None, None)
+            for name, members in sorted(classes.items()):
+                print('class %s k=%d: %s' % (name, nparts, ' '.join(members)))
+                config, score = tune_class(tuner, members, nparts)
+                if config != DEFAULT:
+                    entries.append((name, nparts, config, score, len(members)))
+
+    with open(args.out, 'w', encoding='utf-8') as file:
+        file.write('# <class> <nparts> <Coarsen_threshold> <nIparts> <nstarts>, written by autotune.py\n')
+        file.write('# binary %s, graphs %s, max cut loss %g\n' % (tuner.context['binary_sha256'][:12], args.graphs, args.max_cut_loss))
+        for name, nparts, config, score, count in entries:
+            file.write('%-12s %5d %s    # %.3lfx faster, edgecut x%.4lf over %d graphs\n'
+                       % (name, nparts, ' '.join('%6s' % value for value in config), 1.0 / score[0], score[1], count))
+    print('%d tuned classes written to %s' % (len(entries), args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""Reproducible partitioning benchmarks.
+
+Runs a partitioner over graphs x nparts x repetitions and appends one JSON
+record per run to a results file (JSON lines), with the phase times
+(part_all, part_coarsen, part_init, part_uncoarsen), the edgecut and the
+imbalance parsed from its output, the wall time, the peak RSS and the binary,
+commit and host the run was made with.
+
+Every (graph, nparts) cell runs its warmups and repetitions back to back on
+the same cpus. A rerun skips the repetitions of the same binary already in
+the results file, except the failed ones, so an interrupted sweep resumes
+where it stopped.
+GPU partitioners run one job at a time; CPU-only partitioners run --jobs
+cells concurrently, each job pinned to its own slice of the cpus.
+The cells are dispatched longest first, by the time predicted by the cost
+model of costmodel.py fitted on the past results, and a cell only starts when
+its predicted peak memory fits in --mem-budget next to the running ones.
+
+    python3 bench.py --tool hunyuangraph --graphs graph_9.csv --nparts 8 32 128 512 --reps 5 --warmup 1
+    python3 bench.py --tool mygpmetis --graphs graph_9.csv --graph-dir init_graphs --suffix _gpu_1024.graph --nparts 2 --jobs 4
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from build_dataset import cpu_count, sha256
+from costmodel import HISTORY, CostModel, graph_features, lpt_makespan, read_history
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# binary, arguments for (graph, nparts), whether it needs the GPU
+TOOLS = {
+    'hunyuangraph': (os.path.join(ROOT, 'hunyuangraph'), lambda graph, nparts: [graph, str(nparts), '1'], True),
+    'mygpmetis': (os.path.join(ROOT, 'mygp_0.9.9_test_initpartition', 'mygpmetis'), lambda graph, nparts: [graph, str(nparts)], False),
+}
+
+# metrics printed once per partitioning by print_time_all and the mygp logs
+RUN_PATTERNS = {
+    'part_all': re.compile(r'Hunyuangraph_Partition_time=\s*([\d.]+)\s*ms'),
+    'part_coarsen': re.compile(r'------Coarsen_time=\s*([\d.]+)\s*ms'),
+    'part_init': re.compile(r'------Init_time=\s*([\d.]+)\s*ms'),
+    'part_uncoarsen': re.compile(r'------Uncoarsen_time=\s*([\d.]+)\s*ms'),
+    'edgecut': re.compile(r'(?:^|\s)edge-?cut=\s*(\d+)'),
+    'imbalance': re.compile(r'(?:^|\s)imbalance=\s*([\d.]+)'),
+}
+# the best of the partitionings of one process
+BEST_PATTERNS = {
+    'part_all': re.compile(r'best_alltime=\s*([\d.]+)'),
+    'part_coarsen': re.compile(r'best_coarsentime=\s*([\d.]+)'),
+    'part_init': re.compile(r'best_inittime=\s*([\d.]+)'),
+    'part_uncoarsen': re.compile(r'best_uncoarsentime=\s*([\d.]+)'),
+    'edgecut': re.compile(r'best_edgecut=\s*(\d+)'),
+}
+
+
+def number(text):
+    return float(text) if '.' in text else int(text)
+
+
+def parse_output(text):
+    """Per-partitioning metrics and the best of them from the stdout of a run."""
+    runs, printed = [], {}
+    for line in text.splitlines():
+        best_line = False
+        for key, pattern in BEST_PATTERNS.items():
+            match = pattern.search(line)
+            if match:
+                printed[key] = number(match.group(1))
+                best_line = True
+        if best_line:
+            continue
+        for key, pattern in RUN_PATTERNS.items():
+            match = pattern.search(line)
+            if match:
+                # a metric seen again starts the next partitioning
+                if not runs or key in runs[-1]:
+                    runs.append({})
+                runs[-1][key] = number(match.group(1))
+
+    # the fastest phases, and the imbalance of the smallest edgecut, as main() does
+    best = {}
+    for key in RUN_PATTERNS:
+        values = [run[key] for run in runs if key in run]
+        if values and key != 'imbalance':
+            best[key] = min(values)
+    cuts = [run for run in runs if 'edgecut' in run and 'imbalance' in run]
+    if cuts:
+        best['imbalance'] = min(cuts, key=lambda run: run['edgecut'])['imbalance']
+    best.update(printed)
+    return runs, best
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cpu_model():
+    try:
+        with open('/proc/cpuinfo', 'r') as file:
+            for line in file:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def run(command, cpus, timeout, env=None):
+    """Run one partitioning, returns (status, returncode, seconds, peak RSS in MB, stdout)."""
+    env = dict(os.environ, **(env or {}))
+    env.update(OMP_NUM_THREADS=str(len(cpus)), OMP_PROC_BIND='close', OMP_PLACES='threads')
+    if shutil.which('taskset'):
+        command = ['taskset', '-c', ','.join(map(str, cpus))] + command
+
+    begin = time.time()
+    with tempfile.TemporaryFile() as output:
+        process = subprocess.Popen(command, env=env, stdout=output, stderr=subprocess.STDOUT, start_new_session=True)
+        status = 'ok'
+        while True:
+            # the rusage of this child only, not of the other jobs
+            pid, wstatus, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid != 0:
+                break
+            if timeout and time.time() - begin > timeout:
+                os.killpg(process.pid, signal.SIGKILL)
+                _, wstatus, rusage = os.wait4(process.pid, 0)
+                status = 'timeout'
+                break
+            time.sleep(0.01)
+        seconds = time.time() - begin
+        returncode = os.waitstatus_to_exitcode(wstatus)
+        process.returncode = returncode
+        output.seek(0)
+        text = output.read().decode('utf-8', 'replace')
+
+    if status == 'ok' and returncode != 0:
+        status = 'failed'
+    return status, returncode, seconds, rusage.ru_maxrss / 1024.0, text
+
+
+class Results:
+    """Append-only JSON lines file of the runs, flushed after every record."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.done = {}
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a record cut short by an interruption
+                        continue
+                    if record.get('status') != 'failed':
+                        self.done[self.key(record)] = record
+        self.file = open(filename, 'a', encoding='utf-8')
+        if self.file.tell() > 0:
+            with open(filename, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    self.file.write('\n')
+
+    @staticmethod
+    def key(record):
+        # a rebuilt binary is measured again
+        return (record['tool'], record['binary_sha256'], tuple(record['extra']), record['graph'], record['nparts'], record['rep'])
+
+    def append(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record, sort_keys=True) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            if record['status'] != 'failed':
+                self.done[self.key(record)] = record
+
+
+def bench_cell(args, graph, nparts, reps, cpus, results, context):
+    """Warmups and the pending repetitions of one (graph, nparts) cell."""
+    binary, arguments, _ = TOOLS[args.tool]
+    path = os.path.abspath(os.path.join(args.graph_dir, graph + args.suffix))
+    command = [args.binary or binary] + arguments(path, nparts) + args.extra
+
+    for _ in range(args.warmup):
+        status, _, _, _, _ = run(command, cpus, args.timeout)
+        if status == 'timeout':
+            # the repetitions would time out as well
+            break
+
+    records = []
+    for rep in reps:
+        status, returncode, seconds, rss, text = run(command, cpus, args.timeout)
+        runs, best = parse_output(text)
+        record = dict(context, graph=graph, nparts=nparts, rep=rep, status=status, returncode=returncode,
+                      wall_s=round(seconds, 4), peak_rss_mb=round(rss, 1), cpus=cpus, threads=len(cpus),
+                      warmup=args.warmup, runs=runs, best=best, features=graph_features(path),
+                      time=time.strftime('%Y-%m-%dT%H:%M:%S'), stdout=text)
+        results.append(record)
+        records.append(record)
+        if status == 'timeout':
+            break
+    return records
+
+
+def write_log(filename, args, results, context):
+    """The stdout of every repetition of the sweep, including the resumed ones, in the
+    order of the shell loops, which is what the data/ scripts parse."""
+    with open(filename, 'w', encoding='utf-8') as file:
+        for nparts in args.nparts:
+            for graph in read_graphs(args.graphs):
+                for rep in range(args.reps):
+                    record = results.done.get(Results.key(dict(context, graph=graph, nparts=nparts, rep=rep)))
+                    if record is not None:
+                        file.write(record.get('stdout', ''))
+
+
+def read_graphs(filename):
+    """Graph names of a graph_9.csv or graph_all.csv list."""
+    names = []
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            name = line.strip().split(',')[0].strip()
+            if name and not name.startswith('#'):
+                names.append(name[:-len('.graph')] if name.endswith('.graph') else name)
+    return names
+
+
+def available_memory_mb():
+    """MemAvailable of /proc/meminfo in MB, None if unknown."""
+    try:
+        with open('/proc/meminfo', 'r') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def schedule(args, cells, threads):
+    """Order the cells longest first and predict their (seconds, peak RSS in MB)."""
+    model = CostModel(args.tool).fit(read_history(args.history + [args.out]),
+                                     lambda graph: os.path.join(args.graph_dir, graph + args.suffix))
+    costs = []
+    for graph, nparts, reps in cells:
+        features = graph_features(os.path.abspath(os.path.join(args.graph_dir, graph + args.suffix)))
+        if features is None:
+            costs.append((0.0, 0.0))
+            continue
+        seconds, rss = model.predict(features, nparts, threads)
+        costs.append((seconds * (len(reps) + args.warmup), rss))
+    order = list(range(len(cells)))
+    if args.schedule == 'lpt':
+        order.sort(key=lambda i: -costs[i][0])
+    return [cells[i] for i in order], [costs[i] for i in order], model
+
+
+def cpu_slices(jobs):
+    """Split the cpus of this process into jobs contiguous slices."""
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = list(range(cpu_count()))
+    jobs = max(1, min(jobs, len(cpus)))
+    size = len(cpus) // jobs
+    return [cpus[i * size:(i + 1) * size] for i in range(jobs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a partitioner over graphs x nparts x repetitions')
+    parser.add_argument('--tool', choices=sorted(TOOLS), default='hunyuangraph')
+    parser.add_argument('--binary', default=None, help='partitioner binary (default: the one built in the repository)')
+    parser.add_argument('--graphs', required=True, help='graph list, graph_9.csv or graph_all.csv')
+    parser.add_argument('--graph-dir', default=os.path.join(ROOT, 'graphs'), help='directory of the graphs (default: graphs)')
+    parser.add_argument('--suffix', default='.graph', help='file name suffix of the graphs (default: .graph)')
+    parser.add_argument('--nparts', type=int, nargs='+', default=[8])
+    parser.add_argument('--reps', type=int, default=1, help='repetitions per graph and nparts')
+    parser.add_argument('--warmup', type=int, default=0, help='untimed runs before the repetitions')
+    parser.add_argument('--timeout', type=float, default=0, help='seconds before a run is killed (default: none)')
+    parser.add_argument('--jobs', type=int, default=1, help='concurrent cells of a CPU-only partitioner')
+    parser.add_argument('--out', default=None, help='results file (default: bench/<tool>.jsonl)')
+    parser.add_argument('--log', default=None, help='also write the raw output of the sweep, as the shell loops did')
+    parser.add_argument('--extra-args', default='', help='arguments passed after the graph and nparts, e.g. "1 0"')
+    parser.add_argument('--schedule', choices=['lpt', 'order'], default='lpt',
+                        help='lpt: longest predicted cell first (default), order: the order of the loops')
+    parser.add_argument('--mem-budget', type=float, default=None,
+                        help='MB of predicted peak memory of the concurrent cells (default: 80%% of MemAvailable)')
+    parser.add_argument('--history', nargs='*', default=[HISTORY], help='results files the cost model is fitted on (default: bench/*.jsonl)')
+    args = parser.parse_args()
+    args.extra = shlex.split(args.extra_args)
+
+    binary, _, gpu = TOOLS[args.tool]
+    binary = args.binary or binary
+    if not os.access(binary, os.X_OK):
+        print('%s is not built' % binary)
+        sys.exit(1)
+    args.out = args.out or os.path.join(ROOT, 'bench', args.tool + '.jsonl')
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+
+    jobs = 1 if gpu else max(1, args.jobs)
+    slices = cpu_slices(jobs)
+    context = {'tool': args.tool, 'binary': os.path.abspath(binary), 'binary_sha256': sha256(binary),
+               'commit': git_commit(), 'host': platform.node(), 'cpu': cpu_model(), 'extra': args.extra}
+
+    results = Results(args.out)
+    cells, skipped = [], 0
+    for nparts in args.nparts:
+        for graph in read_graphs(args.graphs):
+            reps = [rep for rep in range(args.reps) if Results.key(dict(context, graph=graph, nparts=nparts, rep=rep)) not in results.done]
+            skipped += args.reps - len(reps)
+            if reps:
+                cells.append((graph, nparts, reps))
+    print('benchmarking %d cells, %d jobs x %d cpus, %d runs done' % (len(cells), len(slices), len(slices[0]), skipped))
+
+    cells, costs, model = schedule(args, cells, len(slices[0]))
+    budget = args.mem_budget or (available_memory_mb() or float('inf')) * 0.8
+    print('cost model fitted on %d records, predicted %.1lf s on %d jobs, %.1lf s serial'
+          % (model.records, lpt_makespan([cost[0] for cost in costs], len(slices)), len(slices), sum(cost[0] for cost in costs)))
+
+    # every job owns one slice of the cpus for all of its cells
+    free = list(range(len(slices)))
+    free_lock = threading.Lock()
+
+    def job(graph, nparts, reps):
+        with free_lock:
+            slot = free.pop()
+        try:
+            return bench_cell(args, graph, nparts, reps, slices[slot], results, context)
+        finally:
+            with free_lock:
+                free.append(slot)
+
+    failed = 0
+    begin = time.time()
+    pending = list(range(len(cells)))
+    running, memory = {}, 0.0
+    with ThreadPoolExecutor(max_workers=len(slices)) as pool:
+        while pending or running:
+            # the longest pending cell that fits in the memory left, any cell when nothing runs
+            while pending and len(running) < len(slices):
+                fits = [i for i in pending if memory + costs[i][1] <= budget]
+                if not fits and running:
+                    break
+                i = fits[0] if fits else pending[0]
+                pending.remove(i)
+                running[pool.submit(job, *cells[i])] = costs[i][1]
+                memory += costs[i][1]
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                memory -= running.pop(future)
+                for record in future.result():
+                    best = record['best']
+                    if record['status'] != 'ok':
+                        failed += 1
+                    print('%-8s %s k=%d rep=%d wall=%.3lf s part=%s ms edgecut=%s imbalance=%s'
+                          % (record['status'], record['graph'], record['nparts'], record['rep'], record['wall_s'],
+                             best.get('part_all'), best.get('edgecut'), best.get('imbalance')))
+
+    if args.log:
+        write_log(args.log, args, results, context)
+    print('finished in %.3lf s, %d runs not ok, results in %s' % (time.time() - begin, failed, args.out))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""Parallel, resumable build of the graph dataset from a local mirror.
+
+Reads the matrix list (matrix.csv with /MM/<group>/<name>.tar.gz entries or
+graph_all.csv with plain names), finds every archive in the mirror directory
+and converts it with matrix_to_graph into <out>/<name>.graph, <name>.grf and
+<name>.graph.bcsr32. Nothing is downloaded, the mirror is filled beforehand
+(install_matrix.sh does that).
+
+The graphs are built in a pool of workers sized to the cores and the
+available memory; a matrix whose estimated footprint exceeds the memory share
+of a worker is converted out of core with --mem-limit. Every finished graph is
+recorded in <out>/manifest.json with the sha256 of its archive and outputs and
+the duration and peak RSS of every stage, so that a rerun skips the graphs
+that are done and retries the ones that failed.
+
+    python3 build_dataset.py --mirror matrices --out graphs [--list matrix.csv] [--jobs N]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONVERTER = os.path.join(ROOT, 'matrix_to_graph', 'matrix_to_graph')
+MANIFEST = 'manifest.json'
+OUTPUTS = ('.graph', '.grf', '.graph.bcsr32')
+
+# peak RSS of matrix_to_graph per byte of mtx text, measured on the LAW/SNAP
+# matrices, and the expansion of a gzip-compressed mtx
+RSS_PER_MTX_BYTE = 1.6
+MTX_PER_GZ_BYTE = 3.5
+
+
+def read_list(filename):
+    """Names and mirror paths of the matrices in a matrix.csv or graph_all.csv list."""
+    entries = []
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip().split(',')[0].strip()
+            if not line or line.startswith('#'):
+                continue
+            name = os.path.basename(line)
+            for suffix in ('.tar.gz', '.mtx.gz', '.mtx'):
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+                    break
+            entries.append((name, line.lstrip('/') if '/' in line else None))
+    return entries
+
+
+def index_mirror(mirror):
+    """Map the archive and matrix file names of the mirror to their paths."""
+    index = {}
+    for dirpath, _, filenames in os.walk(mirror):
+        for filename in filenames:
+            if filename.endswith(('.tar.gz', '.mtx.gz', '.mtx')):
+                index.setdefault(filename, os.path.join(dirpath, filename))
+    return index
+
+
+def find_source(mirror, index, name, path):
+    """Archive or mtx file of a matrix in the mirror, None if it is missing."""
+    if path is not None and os.path.isfile(os.path.join(mirror, path)):
+        return os.path.join(mirror, path)
+    for filename in (name + '.tar.gz', name + '.mtx.gz', name + '.mtx'):
+        if filename in index:
+            return index[filename]
+    return None
+
+
+def sha256(filename, blocksize=1 << 24):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory():
+    """MemAvailable in bytes, None if it is unknown."""
+    try:
+        with open('/proc/meminfo', 'r') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def estimate_rss(source):
+    """Peak RSS of an in-memory conversion of source, in bytes."""
+    size = os.path.getsize(source)
+    if source.endswith('.gz'):
+        size *= MTX_PER_GZ_BYTE
+    return int(size * RSS_PER_MTX_BYTE)
+
+
+def run_stage(args, env=None, cwd=None):
+    """Run a command, returns (seconds, peak RSS in MB) and raises on failure.
+
+    The peak RSS is that of the child process, which starts as a fork of this
+    interpreter, so small stages report at least the RSS of the interpreter.
+    """
+    begin = time.time()
+    with tempfile.TemporaryFile() as log:
+        process = subprocess.Popen(args, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=log)
+        # the rusage of this child only, not of all children of the pool
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        log.seek(0)
+        stderr = log.read().decode('utf-8', 'replace')
+    if process.returncode != 0:
+        raise RuntimeError('%s failed (%d): %s' % (os.path.basename(args[0]), process.returncode, stderr.strip()[-400:]))
+    return time.time() - begin, rusage.ru_maxrss / 1024.0
+
+
+class Manifest:
+    """manifest.json of the output directory, saved atomically after every update."""
+
+    def __init__(self, out):
+        self.filename = os.path.join(out, MANIFEST)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.filename):
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file).get('graphs', {})
+
+    def get(self, name):
+        with self.lock:
+            return self.entries.get(name)
+
+    def set(self, name, entry):
+        with self.lock:
+            self.entries[name] = entry
+            tmp = '%s.tmp.%d' % (self.filename, os.getpid())
+            with open(tmp, 'w', encoding='utf-8') as file:
+                json.dump({'version': 1, 'graphs': self.entries}, file, indent=1, sort_keys=True)
+            os.replace(tmp, self.filename)
+
+
+def is_done(entry, source, out, name, verify):
+    """The graph was built from this source and its outputs are intact."""
+    if entry is None or entry.get('status') != 'done':
+        return False
+    status = os.stat(source)
+    recorded = entry['source']
+    if (recorded['size'], recorded['mtime']) != (status.st_size, status.st_mtime):
+        # touched or replaced, compare the content
+        if recorded['size'] != status.st_size or recorded['sha256'] != sha256(source):
+            return False
+    for suffix, output in entry['outputs'].items():
+        filename = os.path.join(out, name + suffix)
+        if not os.path.isfile(filename) or os.path.getsize(filename) != output['size']:
+            return False
+        if verify and sha256(filename) != output['sha256']:
+            return False
+    return True
+
+
+def extract(source, work, name):
+    """The mtx file of source in work, extracted from the archive if needed."""
+    if not source.endswith('.tar.gz'):
+        # matrix_to_graph reads .mtx and .mtx.gz directly
+        target = os.path.join(work, os.path.basename(source))
+        if not os.path.exists(target):
+            os.symlink(os.path.abspath(source), target)
+        return target, 0.0, 0.0
+
+    # only <name>.mtx, the archives also hold right-hand sides and coordinates
+    seconds, rss = run_stage(['tar', '-xzf', os.path.abspath(source), '-C', work,
+                              '--wildcards', '--no-anchored', name + '.mtx'])
+    for dirpath, _, filenames in os.walk(work):
+        if name + '.mtx' in filenames:
+            return os.path.join(dirpath, name + '.mtx'), seconds, rss
+    raise RuntimeError('%s.mtx not found in %s' % (name, source))
+
+
+def build(name, source, args, memory_share, manifest):
+    """Build one graph, returns its manifest entry."""
+    stages = {}
+    work = os.path.join(args.work, name)
+    shutil.rmtree(work, ignore_errors=True)
+    os.makedirs(work)
+
+    try:
+        begin = time.time()
+        digest = sha256(source)
+        stages['hash_source'] = {'seconds': round(time.time() - begin, 3)}
+
+        mtx, seconds, rss = extract(source, work, name)
+        stages['extract'] = {'seconds': round(seconds, 3), 'peak_rss_mb': round(rss, 1)}
+
+        command = [args.converter, '-g', '-r', '-b']
+        if memory_share is not None and estimate_rss(mtx) > memory_share:
+            command += ['--mem-limit', '%d' % max(64, memory_share * 3 // 4 >> 20)]
+        env = dict(os.environ, OMP_NUM_THREADS=str(args.threads))
+        seconds, rss = run_stage(command + [os.path.abspath(mtx)], env=env)
+        stages['convert'] = {'seconds': round(seconds, 3), 'peak_rss_mb': round(rss, 1),
+                             'out_of_core': '--mem-limit' in command}
+
+        begin = time.time()
+        base = os.path.splitext(mtx[:-3] if mtx.endswith('.gz') else mtx)[0]
+        outputs = {}
+        for suffix in OUTPUTS:
+            target = os.path.join(args.out, name + suffix)
+            # a move keeps the mtime, the bcsr32 cache stays valid for the .graph
+            shutil.move(base + suffix, target)
+            outputs[suffix] = {'size': os.path.getsize(target), 'sha256': sha256(target)}
+        stages['store'] = {'seconds': round(time.time() - begin, 3)}
+
+        status = os.stat(source)
+        entry = {'status': 'done', 'source': {'path': source, 'size': status.st_size, 'mtime': status.st_mtime,
+                                              'sha256': digest},
+                 'outputs': outputs, 'stages': stages}
+    except Exception as error:
+        entry = {'status': 'failed', 'source': {'path': source}, 'error': str(error), 'stages': stages}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    manifest.set(name, entry)
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the graph dataset from a local mirror of the matrices')
+    parser.add_argument('--list', default=os.path.join(ROOT, 'matrix.csv'), help='matrix.csv or graph_all.csv')
+    parser.add_argument('--mirror', required=True, help='directory with the pre-fetched .tar.gz (or .mtx[.gz]) files')
+    parser.add_argument('--out', default='graphs', help='output directory (default: graphs)')
+    parser.add_argument('--work', default=None, help='scratch directory (default: <out>/.work)')
+    parser.add_argument('--jobs', type=int, default=0, help='concurrent conversions (default: from cores and memory)')
+    parser.add_argument('--memory', type=float, default=0, help='memory for the pool in MB (default: MemAvailable)')
+    parser.add_argument('--converter', default=CONVERTER, help='matrix_to_graph binary')
+    parser.add_argument('--verify', action='store_true', help='rehash the outputs of finished graphs')
+    args = parser.parse_args()
+
+    if not os.access(args.converter, os.X_OK):
+        print('%s is not built, run: gcc matrix_to_graph.c -o matrix_to_graph -O3 -fopenmp -lz -lpthread' % args.converter)
+        sys.exit(1)
+    args.work = args.work or os.path.join(args.out, '.work')
+    os.makedirs(args.out, exist_ok=True)
+    os.makedirs(args.work, exist_ok=True)
+
+    manifest = Manifest(args.out)
+    index = index_mirror(args.mirror)
+    todo, missing, skipped = [], [], 0
+    for name, path in read_list(args.list):
+        source = find_source(args.mirror, index, name, path)
+        if source is None:
+            missing.append(name)
+        elif is_done(manifest.get(name), source, args.out, name, args.verify):
+            print('skip     %s' % name)
+            skipped += 1
+        else:
+            todo.append((name, source))
+    for name in missing:
+        print('missing  %s (not in %s)' % (name, args.mirror))
+
+    # size the pool to the cores and to the memory of the largest conversions
+    memory = int(args.memory * (1 << 20)) if args.memory > 0 else available_memory()
+    cores = cpu_count()
+    jobs = args.jobs if args.jobs > 0 else cores
+    if args.jobs <= 0 and memory is not None and todo:
+        footprints = sorted((estimate_rss(source) for _, source in todo), reverse=True)
+        while jobs > 1 and sum(footprints[:jobs]) > memory:
+            jobs -= 1
+    jobs = max(1, min(jobs, len(todo))) if todo else 1
+    args.threads = max(1, cores // jobs)
+    memory_share = memory // jobs if memory is not None else None
+    print('building %d graphs, %d jobs x %d threads, %d done, %d missing'
+          % (len(todo), jobs, args.threads, skipped, len(missing)))
+
+    # largest first so that the long conversions do not end up last
+    todo.sort(key=lambda item: os.path.getsize(item[1]), reverse=True)
+    failed = 0
+    begin = time.time()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(build, name, source, args, memory_share, manifest): name for name, source in todo}
+        for future in as_completed(futures):
+            name, entry = futures[future], future.result()
+            if entry['status'] == 'done':
+                convert = entry['stages']['convert']
+                print('done     %s convert=%.3lf s peak_rss=%.1lf MB%s'
+                      % (name, convert['seconds'], convert['peak_rss_mb'], ' (out of core)' if convert['out_of_core'] else ''))
+            else:
+                failed += 1
+                print('failed   %s: %s' % (name, entry['error']))
+
+    print('built %d graphs in %.3lf s, %d failed' % (len(todo) - failed, time.time() - begin, failed))
+    sys.exit(1 if failed or missing else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""Statistical comparison of two partitioning result sets.
+
+Compares a baseline and a candidate result set per graph, nparts and metric:
+the phase times part_all, part_coarsen, part_init, part_uncoarsen, and the
+edgecut. For each group it reports the ratio of the geometric means
+(candidate / baseline) with a bootstrap confidence interval. The runs of each
+side are resampled. The geometric means of the graph classes of Figures 13 and
+14, and over all graphs, average the per-graph log ratios of every replicate
+over a resample of the graphs of the class.
+
+A change is significant when its whole interval lies beyond --min-effect.
+Regressions are slower times or larger edgecuts. The exit status is 1 if a
+class or the overall geomean regressed, and with --strict also if a single
+graph regressed.
+
+The result sets can be:
+- bench.py results (.jsonl);
+- the raw logs of hunyuangraph (the *_time.txt files of data/hunyuan);
+- the csv tables made from those logs (Graph Name, Partition Time, ...,
+  Edgecut).
+
+A csv has no nparts column, so compare csv tables with csv tables.
+
+    python3 compare_results.py data/hunyuan/5090_hunyuan_1_8_graph9_time.txt bench/hunyuangraph.jsonl
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from bench import parse_output
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CLASSES = os.path.join(ROOT, 'Figure', 'Figure13', 'edge_time')
+
+METRICS = ('part_all', 'part_coarsen', 'part_init', 'part_uncoarsen', 'edgecut')
+TIME_METRICS = METRICS[:4]
+CSV_COLUMNS = {'Partition Time': 'part_all', 'Coarsen Time': 'part_coarsen', 'Init Time': 'part_init',
+               'Uncoarsen Time': 'part_uncoarsen', 'Edgecut': 'edgecut'}
+OVERALL = 'Geomean'
+# smallest value of a metric, so that an edgecut of 0 still has a logarithm
+FLOOR = 1e-3
+
+
+def graph_name(path):
+    name = os.path.basename(path)
+    return name[:-len('.graph')] if name.endswith('.graph') else name
+
+
+def load_jsonl(filename, samples):
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status') != 'ok':
+                continue
+            # every partitioning of the process is a sample
+            for run in record.get('runs') or [record.get('best', {})]:
+                for metric, value in run.items():
+                    if metric in METRICS:
+                        samples.setdefault((record['graph'], record['nparts'], metric), []).append(value)
+
+
+def load_log(filename, samples):
+    """The 'graph:<file> nvtxs nedges nparts ...' line of hunyuangraph starts the output of a process."""
+    with open(filename, 'r', encoding='utf-8', errors='replace') as file:
+        text = file.read()
+    for section in re.split(r'^(?=graph:)', text, flags=re.M):
+        header = re.match(r'graph:(\S+)\s+\d+\s+\d+\s+(\d+)', section)
+        if header is None:
+            continue
+        runs, _ = parse_output(section)
+        for run in runs:
+            for metric, value in run.items():
+                if metric in METRICS:
+                    samples.setdefault((graph_name(header.group(1)), int(header.group(2)), metric), []).append(value)
+
+
+def load_csv(filename, samples):
+    with open(filename, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            for column, metric in CSV_COLUMNS.items():
+                if row.get(column) not in (None, ''):
+                    samples.setdefault((row['Graph Name'], None, metric), []).append(float(row[column]))
+
+
+def load(filename):
+    """{(graph, nparts, metric): [values]} of a result set, from one or more files."""
+    samples = {}
+    for path in filename.split(','):
+        if path.endswith('.jsonl'):
+            load_jsonl(path, samples)
+        elif path.endswith('.csv'):
+            load_csv(path, samples)
+        else:
+            load_log(path, samples)
+    return samples
+
+
+def load_classes(directory):
+    """{graph: class} from the per-class tables of Figure 13, <class>_<nparts>.csv."""
+    classes = {}
+    for filename in sorted(glob.glob(os.path.join(directory, '*.csv'))):
+        name = re.sub(r'_\d+$', '', os.path.splitext(os.path.basename(filename))[0])
+        with open(filename, 'r', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                classes.setdefault(row['Graph Name'], name)
+    return classes
+
+
+def padded(groups):
+    """Logarithms of the samples of the groups as a zero-padded matrix, and the sample counts."""
+    counts = np.array([len(values) for values in groups], dtype=np.int64)
+    matrix = np.zeros((len(groups), max(1, counts.max(initial=1))))
+    for i, values in enumerate(groups):
+        matrix[i, :len(values)] = np.log(np.maximum(values, FLOOR))
+    return matrix, counts
+
+
+def bootstrap_means(matrix, counts, replicates, rng, chunk_elements=1 << 24):
+    """Means of the logarithms resampled with replacement, (replicates, groups)."""
+    ngroups, width = matrix.shape
+    means = np.empty((replicates, ngroups))
+    columns = np.arange(width)
+    # chunks of groups bound the memory of the index arrays
+    step = max(1, chunk_elements // (replicates * width))
+    for begin in range(0, ngroups, step):
+        end = min(ngroups, begin + step)
+        n = counts[begin:end]
+        draws = (rng.random((replicates, end - begin, width)) * n[None, :, None]).astype(np.int64)
+        values = np.take_along_axis(np.broadcast_to(matrix[begin:end], (replicates, end - begin, width)), draws, axis=2)
+        # only the first n draws of a group with n samples
+        mask = columns[None, None, :] < n[None, :, None]
+        means[:, begin:end] = (values * mask).sum(axis=2) / n[None, :]
+    return means
+
+
+def compare(baseline, candidate, classes, replicates, confidence, min_effect, seed):
+    keys = sorted(set(baseline) & set(candidate), key=lambda key: (key[2], key[0], -1 if key[1] is None else key[1]))
+    if not keys:
+        return None
+
+    rng = np.random.default_rng(seed)
+    base, base_counts = padded([baseline[key] for key in keys])
+    cand, cand_counts = padded([candidate[key] for key in keys])
+
+    point = cand.sum(axis=1) / cand_counts - base.sum(axis=1) / base_counts
+    replicas = (bootstrap_means(cand, cand_counts, replicates, rng)
+                - bootstrap_means(base, base_counts, replicates, rng))
+    tail = (1.0 - confidence) / 2 * 100
+    low, high = np.percentile(replicas, [tail, 100 - tail], axis=0)
+    threshold = np.log1p(min_effect)
+
+    def verdict(lo, hi, testable=True):
+        if not testable:
+            return 'n/a'
+        if lo > threshold:
+            return 'REGRESSION'
+        if hi < -threshold:
+            return 'improved'
+        return 'ok'
+
+    graphs = []
+    for i, (graph, nparts, metric) in enumerate(keys):
+        testable = base_counts[i] > 1 and cand_counts[i] > 1
+        graphs.append({'graph': graph, 'nparts': nparts, 'metric': metric, 'class': classes.get(graph, 'Other'),
+                       'n_baseline': int(base_counts[i]), 'n_candidate': int(cand_counts[i]),
+                       'ratio': float(np.exp(point[i])), 'low': float(np.exp(low[i])), 'high': float(np.exp(high[i])),
+                       'verdict': verdict(low[i], high[i], testable)})
+
+    # geometric means of the classes, from the same replicates
+    groups = {}
+    for i, entry in enumerate(graphs):
+        for name in (entry['class'], OVERALL):
+            groups.setdefault((name, entry['metric']), []).append(i)
+    aggregates = []
+    for (name, metric), members in sorted(groups.items(), key=lambda item: (item[0][0] == OVERALL, item[0])):
+        members = np.array(members)
+        mean = point[members].mean()
+        # the graphs are resampled too, so a class of single runs still has an interval
+        picks = members[rng.integers(0, len(members), (replicates, len(members)))]
+        lo, hi = np.percentile(replicas[np.arange(replicates)[:, None], picks].mean(axis=1), [tail, 100 - tail])
+        aggregates.append({'class': name, 'metric': metric, 'graphs': len(members), 'ratio': float(np.exp(mean)),
+                           'low': float(np.exp(lo)), 'high': float(np.exp(hi)), 'verdict': verdict(lo, hi)})
+    return graphs, aggregates
+
+
+def shown(entry):
+    """Speedup (baseline / candidate) for the times, candidate / baseline for the edgecut."""
+    if entry['metric'] in TIME_METRICS:
+        return 'speedup', 1.0 / entry['ratio'], 1.0 / entry['high'], 1.0 / entry['low']
+    return 'cut_ratio', entry['ratio'], entry['low'], entry['high']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two partitioning result sets with bootstrap confidence intervals')
+    parser.add_argument('baseline', help='baseline result set, .jsonl, raw log or .csv (comma-separated for several files)')
+    parser.add_argument('candidate', help='candidate result set, same formats')
+    parser.add_argument('--classes', default=CLASSES, help='directory of <class>_<nparts>.csv graph lists (default: Figure 13)')
+    parser.add_argument('--replicates', type=int, default=2000, help='bootstrap replicates (default: 2000)')
+    parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the intervals (default: 0.95)')
+    parser.add_argument('--min-effect', type=float, default=0.02, help='smallest relative change reported (default: 0.02)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--metrics', nargs='+', choices=METRICS, default=list(METRICS))
+    parser.add_argument('--json', default=None, help='also write the comparison to this file')
+    parser.add_argument('--strict', action='store_true', help='also fail on a regression of a single graph')
+    parser.add_argument('--all', action='store_true', help='list every graph, not only the significant changes')
+    args = parser.parse_args()
+
+    begin = time.time()
+    baseline = {key: values for key, values in load(args.baseline).items() if key[2] in args.metrics}
+    candidate = {key: values for key, values in load(args.candidate).items() if key[2] in args.metrics}
+    result = compare(baseline, candidate, load_classes(args.classes), args.replicates, args.confidence,
+                     args.min_effect, args.seed)
+    if result is None:
+        print('no graph, nparts and metric in common')
+        sys.exit(2)
+    graphs, aggregates = result
+
+    print('%-20s %-15s %6s %10s %23s  %s' % ('class', 'metric', 'graphs', 'geomean', '%d%% interval' % (args.confidence * 100), 'verdict'))
+    for entry in aggregates:
+        kind, value, low, high = shown(entry)
+        print('%-20s %-15s %6d %10.4lf [%10.4lf, %10.4lf]  %s %s'
+              % (entry['class'], entry['metric'], entry['graphs'], value, low, high, kind, entry['verdict']))
+
+    print()
+    listed = [entry for entry in graphs if args.all or entry['verdict'] in ('REGRESSION', 'improved')]
+    for entry in listed:
+        kind, value, low, high = shown(entry)
+        print('%-24s k=%-5s %-15s n=%3d/%-3d %10.4lf [%10.4lf, %10.4lf]  %s %s'
+              % (entry['graph'], entry['nparts'], entry['metric'], entry['n_baseline'], entry['n_candidate'],
+                 value, low, high, kind, entry['verdict']))
+
+    regressions = [entry for entry in aggregates if entry['verdict'] == 'REGRESSION']
+    graph_regressions = [entry for entry in graphs if entry['verdict'] == 'REGRESSION']
+    print('%d groups compared in %.3lf s, %d class and %d graph regressions'
+          % (len(graphs), time.time() - begin, len(regressions), len(graph_regressions)))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'baseline': args.baseline, 'candidate': args.candidate, 'confidence': args.confidence,
+                       'min_effect': args.min_effect, 'classes': aggregates, 'graphs': graphs}, file, indent=1)
+
+    sys.exit(1 if regressions or (args.strict and graph_regressions) else 0)
+
+
+if __name__ == '__main__':
+    main()
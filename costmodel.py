@@ -0,0 +1,168 @@
+"""Cost model of partitioning runs, for scheduling benchmark batches.
+
+Predicts the wall time and the peak RSS of a run of a tool from cheap
+features of the graph: nvtxs and nedges from the csr cache or the header of
+the .graph file, and the degree skew (max / average degree) from the xadj of
+the csr cache when there is one. The model is a least-squares fit of
+log(time) and log(RSS) on the logarithms of the features, nparts and the
+threads, per tool, over the ok records of bench.py results files. Without
+enough records it falls back to a size-proportional estimate, which still
+orders the jobs by size.
+
+    python3 costmodel.py --tool hunyuangraph --graphs graph_all.csv --nparts 8
+"""
+import argparse
+import functools
+import glob
+import gzip
+import json
+import math
+import os
+
+import numpy as np
+
+from hunyuangraph_io import read_csrcache
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HISTORY = os.path.join(ROOT, 'bench', '*.jsonl')
+# ridge regularization of the fit, keeps it stable with few graphs
+RIDGE = 1e-3
+# twice the weights of design(), fewer records would overfit
+MIN_RECORDS = 12
+
+
+@functools.lru_cache(maxsize=None)
+def graph_features(filename):
+    """{nvtxs, nedges, skew, bytes} of a graph file, None if it cannot be read.
+    nedges counts every edge twice like graph->nedges."""
+    try:
+        size = os.path.getsize(filename)
+    except OSError:
+        return None
+
+    graph = read_csrcache(filename)
+    if graph is not None and graph.nvtxs > 0:
+        degrees = np.diff(graph.xadj)
+        average = max(graph.nedges / graph.nvtxs, 1e-9)
+        return {'nvtxs': graph.nvtxs, 'nedges': graph.nedges, 'skew': float(degrees.max()) / average, 'bytes': size}
+
+    with open(filename, 'rb') as file:
+        gzipped = file.read(2) == b'\x1f\x8b'
+    with (gzip.open(filename, 'rb') if gzipped else open(filename, 'rb')) as file:
+        for line in file:
+            fields = line.split()
+            if fields and not line.startswith(b'%'):
+                try:
+                    return {'nvtxs': int(fields[0]), 'nedges': 2 * int(fields[1]), 'skew': 1.0, 'bytes': size}
+                except (ValueError, IndexError):
+                    return None
+    return None
+
+
+def design(features, nparts, threads):
+    return [1.0, math.log(features['nvtxs'] + 1), math.log(features['nedges'] + 1), math.log(features['skew'] + 1),
+            math.log(nparts), math.log(threads)]
+
+
+class CostModel:
+    """Predicted seconds and peak RSS in MB of a run of a tool."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.time_weights = None
+        self.memory_weights = None
+        self.records = 0
+
+    def fit(self, records, graph_path):
+        """Fit on the ok records of the tool, graph_path maps a graph name to its file."""
+        rows, times, memory = [], [], []
+        for record in records:
+            if record.get('tool') != self.tool or record.get('status') != 'ok':
+                continue
+            features = record.get('features') or graph_features(graph_path(record['graph']))
+            if features is None or record.get('wall_s', 0) <= 0:
+                continue
+            rows.append(design(features, record['nparts'], record.get('threads', 1)))
+            times.append(math.log(record['wall_s']))
+            memory.append(math.log(max(record.get('peak_rss_mb', 1.0), 1.0)))
+
+        self.records = len(rows)
+        if self.records < MIN_RECORDS:
+            return self
+        x = np.array(rows)
+        regularized = x.T @ x + RIDGE * np.eye(x.shape[1])
+        self.time_weights = np.linalg.solve(regularized, x.T @ np.array(times))
+        self.memory_weights = np.linalg.solve(regularized, x.T @ np.array(memory))
+        return self
+
+    def predict(self, features, nparts, threads):
+        """(seconds, peak RSS in MB) of one run."""
+        if self.time_weights is None:
+            # size-proportional, about 50M edges per second and the csr in memory three times
+            size = features['nvtxs'] + features['nedges']
+            return 0.1 + size / 5e7, 16.0 + 3 * (4 * features['nvtxs'] + 8 * features['nedges']) / 2**20
+        x = np.array(design(features, nparts, threads))
+        return float(np.exp(x @ self.time_weights)), float(np.exp(x @ self.memory_weights))
+
+
+def read_history(patterns):
+    """The records of the results files matching the patterns."""
+    records = []
+    for filename in sorted({name for pattern in patterns for name in glob.glob(pattern)}):
+        with open(filename, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def lpt_makespan(durations, machines):
+    """Makespan of the durations dispatched in the given order on the machines."""
+    finish = [0.0] * max(1, machines)
+    for duration in durations:
+        i = finish.index(min(finish))
+        finish[i] += duration
+    return max(finish)
+
+
+def main():
+    from bench import read_graphs
+
+    parser = argparse.ArgumentParser(description='Fit the cost model on past runs and print its predictions')
+    parser.add_argument('--tool', default='hunyuangraph')
+    parser.add_argument('--history', nargs='+', default=[HISTORY], help='results files (default: bench/*.jsonl)')
+    parser.add_argument('--graphs', required=True, help='graph list, graph_9.csv or graph_all.csv')
+    parser.add_argument('--graph-dir', default=os.path.join(ROOT, 'graphs'), help='directory of the graphs (default: graphs)')
+    parser.add_argument('--suffix', default='.graph', help='file name suffix of the graphs (default: .graph)')
+    parser.add_argument('--nparts', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    def graph_path(graph):
+        return os.path.join(args.graph_dir, graph + args.suffix)
+
+    records = read_history(args.history)
+    model = CostModel(args.tool).fit(records, graph_path)
+    print('%s: fitted on %d records%s' % (args.tool, model.records, '' if model.time_weights is not None else ', size-proportional fallback'))
+
+    # the error of the fit on the graphs that were measured
+    measured = {}
+    for record in records:
+        if record.get('tool') == args.tool and record.get('status') == 'ok' and record['nparts'] == args.nparts:
+            measured.setdefault(record['graph'], []).append(record['wall_s'])
+
+    for graph in read_graphs(args.graphs):
+        features = graph_features(graph_path(graph))
+        if features is None:
+            print('%-32s missing' % graph)
+            continue
+        seconds, rss = model.predict(features, args.nparts, args.threads)
+        actual = ('%10.3lf s' % (sum(measured[graph]) / len(measured[graph]))) if graph in measured else ''
+        print('%-32s %12d %12d skew %8.1lf  predicted %10.3lf s %10.1lf MB %s'
+              % (graph, features['nvtxs'], features['nedges'], features['skew'], seconds, rss, actual))
+
+
+if __name__ == '__main__':
+    main()
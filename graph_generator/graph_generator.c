@@ -0,0 +1,502 @@
+#include<stdio.h>
+#include<stdlib.h>
+#include<string.h>
+#include<math.h>
+#include<stdint.h>
+#include<limits.h>
+#include<sys/time.h>
+#ifdef _OPENMP
+#include<omp.h>
+#endif
+#include "../matrix_to_graph/graph_writer.h"
+#include "../hunyuangraph_csrcache.h"
+
+// Seeded synthetic graphs for offline benchmarking, one family per class of
+// the Figure 13/14 data sets:
+//   rmat      R-MAT/Kronecker (Graph500 a=0.57 b=c=0.19), like kron_g500-logn21
+//   mesh2d    triangulated 2D grid, like hugebubbles
+//   mesh3d    3D grid with the 7-point stencil, like Bump_2911
+//   road      planar grid keeping every lattice edge with probability d/4, like road networks
+//   powerlaw  Chung-Lu graph with a degree exponent gamma, like web crawls and social networks
+//
+// Every edge is a pure function of (seed, edge index), so the edges are
+// generated twice in parallel, to count the degrees and to fill the lists,
+// without storing an edge list. The lists are sorted and deduplicated, which
+// makes the graph independent of the number of threads.
+//
+// gcc graph_generator.c -o graph_generator -O3 -fopenmp -lm
+// graph_generator -t rmat -n 2097152 -d 32 -s 1 -o kron21 -g -b
+
+#define GENERATOR_RMAT     0
+#define GENERATOR_MESH2D   1
+#define GENERATOR_MESH3D   2
+#define GENERATOR_ROAD     3
+#define GENERATOR_POWERLAW 4
+
+const char *generator_names[] = {"rmat", "mesh2d", "mesh3d", "road", "powerlaw"};
+const double generator_degree[] = {32.0, 6.0, 6.0, 2.6, 16.0};    // default average degree
+
+typedef struct
+{
+    int type;
+    int n;                  // vertices
+    int nx, ny, nz;         // mesh and road dimensions
+    int scale;              // rmat: n = 2^scale
+    int permbits;           // vertex ids are permuted within 2^permbits
+    int64_t nsamples;       // edge indices
+    double degree;
+    double gamma;           // powerlaw degree exponent
+    double keep;            // road: probability of a lattice edge
+    uint64_t seed;
+} generator_t;
+
+static inline uint64_t generator_hash(uint64_t x)
+{
+    x += 0x9E3779B97F4A7C15ULL;
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+    return x ^ (x >> 31);
+}
+
+// uniform in [0, 1) from the seed, the edge index and a draw number
+static inline double generator_uniform(const generator_t *g, int64_t e, int draw)
+{
+    uint64_t h = generator_hash(g->seed ^ generator_hash((uint64_t)e * 64 + draw));
+    return (h >> 11) * (1.0 / 9007199254740992.0);
+}
+
+// seeded bijection of [0, n), by cycle walking a bijection of [0, 2^permbits)
+static inline int generator_permute(const generator_t *g, int v)
+{
+    uint64_t mask = (g->permbits >= 64 ? ~0ULL : (1ULL << g->permbits) - 1), x = v;
+    int half = g->permbits / 2 > 0 ? g->permbits / 2 : 1;
+
+    do
+    {
+        x = (x * 0x9E3779B97F4A7C15ULL + (g->seed | 1)) & mask;
+        x ^= x >> half;
+        x = (x * 0xD6E8FEB86659FD93ULL) & mask;
+        x ^= x >> half;
+    } while (x >= (uint64_t)g->n);
+
+    return (int)x;
+}
+
+// endpoints of edge e, returns 0 if e gives no edge
+static inline int generator_edge(const generator_t *g, int64_t e, int *r_u, int *r_v)
+{
+    int u, v, x, y, z;
+
+    switch (g->type)
+    {
+    case GENERATOR_RMAT:
+        u = v = 0;
+        for (int level = 0; level < g->scale; level++)
+        {
+            double r = generator_uniform(g, e, level);
+            int bu = (r >= 0.57 + 0.19), bv = (r >= 0.57 && r < 0.57 + 0.19) || r >= 0.57 + 0.19 + 0.19;
+            u = (u << 1) | bu;
+            v = (v << 1) | bv;
+        }
+        u = generator_permute(g, u);
+        v = generator_permute(g, v);
+        break;
+
+    case GENERATOR_MESH2D:
+        // right, down and down-right neighbors of vertex e / 3
+        u = e / 3;
+        x = u % g->nx;
+        y = u / g->nx;
+        switch (e % 3)
+        {
+        case 0: if (x + 1 >= g->nx) return 0; v = u + 1; break;
+        case 1: if (y + 1 >= g->ny) return 0; v = u + g->nx; break;
+        default: if (x + 1 >= g->nx || y + 1 >= g->ny) return 0; v = u + g->nx + 1; break;
+        }
+        break;
+
+    case GENERATOR_MESH3D:
+        u = e / 3;
+        x = u % g->nx;
+        y = (u / g->nx) % g->ny;
+        z = u / g->nx / g->ny;
+        switch (e % 3)
+        {
+        case 0: if (x + 1 >= g->nx) return 0; v = u + 1; break;
+        case 1: if (y + 1 >= g->ny) return 0; v = u + g->nx; break;
+        default: if (z + 1 >= g->nz) return 0; v = u + g->nx * g->ny; break;
+        }
+        break;
+
+    case GENERATOR_ROAD:
+        u = e / 2;
+        x = u % g->nx;
+        y = u / g->nx;
+        if (generator_uniform(g, e, 0) >= g->keep)
+            return 0;
+        if (e % 2 == 0)
+        {
+            if (x + 1 >= g->nx) return 0;
+            v = u + 1;
+        }
+        else
+        {
+            if (y + 1 >= g->ny) return 0;
+            v = u + g->nx;
+        }
+        u = generator_permute(g, u);
+        v = generator_permute(g, v);
+        break;
+
+    default:
+    {
+        // inverse cdf of the weights x^-a on [1, n + 1), a = 1 / (gamma - 1)
+        double a = 1.0 / (g->gamma - 1.0), b = pow(g->n + 1.0, 1.0 - a) - 1.0;
+        double xu = pow(1.0 + generator_uniform(g, e, 0) * b, 1.0 / (1.0 - a));
+        double xv = pow(1.0 + generator_uniform(g, e, 1) * b, 1.0 / (1.0 - a));
+        u = (int)xu - 1;
+        v = (int)xv - 1;
+        if (u >= g->n) u = g->n - 1;
+        if (v >= g->n) v = g->n - 1;
+        u = generator_permute(g, u);
+        v = generator_permute(g, v);
+        break;
+    }
+    }
+
+    if (u == v)
+        return 0;
+    *r_u = u;
+    *r_v = v;
+    return 1;
+}
+
+void generator_sort(int *a, int64_t n)
+{
+    while (n > 16)
+    {
+        int pivot = a[n / 2], t;
+        int64_t i = 0, j = n - 1;
+
+        for (;;)
+        {
+            while (a[i] < pivot)
+                i++;
+            while (a[j] > pivot)
+                j--;
+            if (i >= j)
+                break;
+            t = a[i];
+            a[i++] = a[j];
+            a[j--] = t;
+        }
+
+        if (j + 1 < n - j - 1)
+        {
+            generator_sort(a, j + 1);
+            a += j + 1;
+            n -= j + 1;
+        }
+        else
+        {
+            generator_sort(a + j + 1, n - j - 1);
+            n = j + 1;
+        }
+    }
+
+    for (int64_t i = 1; i < n; i++)
+    {
+        int key = a[i];
+        int64_t j = i;
+        while (j > 0 && a[j-1] > key)
+        {
+            a[j] = a[j-1];
+            j--;
+        }
+        a[j] = key;
+    }
+}
+
+// generate the symmetric csr of g, without self-loops and duplicates
+void generator_build(const generator_t *g, int64_t **r_xadj, int **r_adjncy)
+{
+    int n = g->n;
+    int64_t *xadj = (int64_t *)calloc(n + 1, sizeof(int64_t));
+    int64_t *pos = (int64_t *)malloc(sizeof(int64_t) * (n + 1));
+    int64_t nnz;
+    int *adjncy;
+
+    // degrees
+    #pragma omp parallel for schedule(static, 65536)
+    for (int64_t e = 0; e < g->nsamples; e++)
+    {
+        int u, v;
+        if (generator_edge(g, e, &u, &v))
+        {
+            #pragma omp atomic
+            xadj[u + 1]++;
+            #pragma omp atomic
+            xadj[v + 1]++;
+        }
+    }
+    for (int i = 0; i < n; i++)
+        xadj[i + 1] += xadj[i];
+    nnz = xadj[n];
+
+    // lists
+    adjncy = (int *)malloc(sizeof(int) * (nnz + 1));
+    memcpy(pos, xadj, sizeof(int64_t) * (n + 1));
+    #pragma omp parallel for schedule(static, 65536)
+    for (int64_t e = 0; e < g->nsamples; e++)
+    {
+        int u, v;
+        int64_t p;
+        if (generator_edge(g, e, &u, &v))
+        {
+            #pragma omp atomic capture
+            p = pos[u]++;
+            adjncy[p] = v;
+            #pragma omp atomic capture
+            p = pos[v]++;
+            adjncy[p] = u;
+        }
+    }
+
+    // sort and deduplicate every list, pos[i] becomes the new degree
+    #pragma omp parallel for schedule(dynamic, 1024)
+    for (int i = 0; i < n; i++)
+    {
+        int64_t begin = xadj[i], end = xadj[i + 1], k = begin;
+
+        generator_sort(adjncy + begin, end - begin);
+        for (int64_t j = begin; j < end; j++)
+        {
+            if (j == begin || adjncy[j] != adjncy[k - 1])
+                adjncy[k++] = adjncy[j];
+        }
+        pos[i] = k - begin;
+    }
+
+    // compact the lists, forward so that no list is overwritten before it is moved
+    nnz = 0;
+    for (int i = 0; i < n; i++)
+    {
+        int64_t begin = xadj[i];
+        xadj[i] = nnz;
+        if (nnz != begin)
+            memmove(adjncy + nnz, adjncy + begin, sizeof(int) * pos[i]);
+        nnz += pos[i];
+    }
+    xadj[n] = nnz;
+
+    free(pos);
+    *r_xadj = xadj;
+    *r_adjncy = adjncy;
+}
+
+// write the csr cache of graphfile with idxwidth byte indices, section by section
+int generator_write_bcsr(const char *graphfile, int idxwidth, int n, const int64_t *xadj, const int *adjncy)
+{
+    FILE *fp;
+    int ok;
+    char cachefile[4096], tmpfile[4200];
+    size_t chunk = 1 << 20;
+    char *buf;
+    hunyuangraph_csrcache_header_t header;
+
+    memset(&header, 0, sizeof(hunyuangraph_csrcache_header_t));
+    memcpy(header.magic, hunyuangraph_csrcache_magic, 8);
+    header.version = hunyuangraph_csrcache_version;
+    header.idxwidth = idxwidth;
+    header.nvtxs = n;
+    header.nedges = xadj[n];
+    if (!hunyuangraph_csrcache_source(graphfile, &header))
+        return 0;
+    hunyuangraph_csrcache_layout(&header);
+
+    hunyuangraph_csrcache_name(graphfile, idxwidth, cachefile, sizeof(cachefile));
+    snprintf(tmpfile, sizeof(tmpfile), "%s.tmp.%d", cachefile, (int)getpid());
+    fp = fopen(tmpfile, "wb");
+    if (fp == NULL)
+        return 0;
+
+    buf = (char *)malloc(chunk * idxwidth);
+    ok = fwrite(&header, sizeof(header), 1, fp) == 1;
+
+    // xadj, adjncy, vwgt and adjwgt converted to idxwidth in chunks
+    for (int section = 0; section < 4 && ok; section++)
+    {
+        uint64_t offsets[4] = {header.xadj_offset, header.adjncy_offset, header.vwgt_offset, header.adjwgt_offset};
+        int64_t lengths[4] = {(int64_t)n + 1, xadj[n], n, xadj[n]};
+
+        ok = hunyuangraph_csrcache_put(fp, offsets[section], NULL, 0);
+        for (int64_t begin = 0; begin < lengths[section] && ok; begin += chunk)
+        {
+            int64_t len = lengths[section] - begin < (int64_t)chunk ? lengths[section] - begin : (int64_t)chunk;
+
+            #pragma omp parallel for
+            for (int64_t i = 0; i < len; i++)
+            {
+                int64_t val = (section == 0 ? xadj[begin + i] : section == 1 ? adjncy[begin + i] : 1);
+                if (idxwidth == 8)
+                    ((int64_t *)buf)[i] = val;
+                else
+                    ((int32_t *)buf)[i] = (int32_t)val;
+            }
+            ok = fwrite(buf, idxwidth, len, fp) == (size_t)len;
+        }
+    }
+
+    free(buf);
+    ok = (fclose(fp) == 0) && ok;
+    if (!ok || rename(tmpfile, cachefile) != 0)
+    {
+        unlink(tmpfile);
+        return 0;
+    }
+
+    return 1;
+}
+
+double generator_time(struct timeval *begin)
+{
+    struct timeval end;
+    gettimeofday(&end, NULL);
+    return (end.tv_sec - begin->tv_sec) * 1000.0 + (end.tv_usec - begin->tv_usec) / 1000.0;
+}
+
+void generator_usage(char *name)
+{
+    fprintf(stderr, "Usage: %s -t rmat|mesh2d|mesh3d|road|powerlaw (-n vertices | -m edges) [-d degree] [-a gamma] [-s seed]\n"
+                    "          [-o prefix] [-g] [-r] [-b] [-B]\n"
+                    "  -g  prefix.graph, the default when no output is given\n"
+                    "  -r  prefix.grf for Jet\n"
+                    "  -b  prefix.graph.bcsr32, the csr cache read by hunyuangraph (implies -g)\n"
+                    "  -B  prefix.graph.bcsr64, the csr cache read by mygpmetis (implies -g)\n", name);
+    exit(1);
+}
+
+int main(int argc, char **argv)
+{
+    generator_t g;
+    double nvtxs = 0, nedges = 0;
+    int write_graph = 0, write_grf = 0, write_bcsr32 = 0, write_bcsr64 = 0;
+    char *prefix = NULL, *file1, *file2;
+    int64_t *xadj;
+    int *adjncy;
+    struct timeval begin;
+
+    memset(&g, 0, sizeof(generator_t));
+    g.type = -1;
+    g.seed = 1;
+    g.gamma = 2.1;
+
+    for (int i = 1; i < argc; i++)
+    {
+        if (strcmp(argv[i], "-g") == 0) write_graph = 1;
+        else if (strcmp(argv[i], "-r") == 0) write_grf = 1;
+        else if (strcmp(argv[i], "-b") == 0) write_bcsr32 = write_graph = 1;
+        else if (strcmp(argv[i], "-B") == 0) write_bcsr64 = write_graph = 1;
+        else if (i + 1 < argc && strcmp(argv[i], "-t") == 0)
+        {
+            i++;
+            for (int t = 0; t < 5; t++)
+                if (strcmp(argv[i], generator_names[t]) == 0)
+                    g.type = t;
+        }
+        else if (i + 1 < argc && strcmp(argv[i], "-n") == 0) nvtxs = atof(argv[++i]);
+        else if (i + 1 < argc && strcmp(argv[i], "-m") == 0) nedges = atof(argv[++i]);
+        else if (i + 1 < argc && strcmp(argv[i], "-d") == 0) g.degree = atof(argv[++i]);
+        else if (i + 1 < argc && strcmp(argv[i], "-a") == 0) g.gamma = atof(argv[++i]);
+        else if (i + 1 < argc && strcmp(argv[i], "-s") == 0) g.seed = strtoull(argv[++i], NULL, 10);
+        else if (i + 1 < argc && strcmp(argv[i], "-o") == 0) prefix = argv[++i];
+        else generator_usage(argv[0]);
+    }
+    if (g.type < 0 || (nvtxs <= 0 && nedges <= 0) || g.gamma <= 2.0)
+        generator_usage(argv[0]);
+    if (!write_graph && !write_grf)
+        write_graph = 1;
+    if (g.degree <= 0)
+        g.degree = generator_degree[g.type];
+    if (nvtxs <= 0)
+        nvtxs = 2.0 * nedges / g.degree;
+    if (nvtxs < 2 || nvtxs > INT_MAX)
+    {
+        fprintf(stderr, "The number of vertices must be between 2 and %d.\n", INT_MAX);
+        return 1;
+    }
+
+    // shape of the family
+    switch (g.type)
+    {
+    case GENERATOR_RMAT:
+        g.scale = (int)ceil(log2(nvtxs));
+        if (g.scale > 30)
+            g.scale = 30;
+        g.n = 1 << g.scale;
+        g.nsamples = (int64_t)(g.n * g.degree / 2);
+        break;
+    case GENERATOR_MESH2D:
+    case GENERATOR_ROAD:
+        g.nx = (int)ceil(sqrt(nvtxs));
+        g.ny = (int)ceil(nvtxs / g.nx);
+        g.n = g.nx * g.ny;
+        g.nsamples = (int64_t)g.n * (g.type == GENERATOR_MESH2D ? 3 : 2);
+        g.keep = g.degree / 4.0;
+        break;
+    case GENERATOR_MESH3D:
+        g.nx = g.ny = (int)ceil(cbrt(nvtxs));
+        g.nz = (int)ceil(nvtxs / ((double)g.nx * g.ny));
+        g.n = g.nx * g.ny * g.nz;
+        g.nsamples = (int64_t)g.n * 3;
+        break;
+    default:
+        g.n = (int)nvtxs;
+        g.nsamples = (int64_t)(g.n * g.degree / 2);
+        break;
+    }
+    while (g.permbits < 63 && (1ULL << g.permbits) < (uint64_t)g.n)
+        g.permbits++;
+
+    if (prefix == NULL)
+    {
+        prefix = (char *)malloc(64);
+        sprintf(prefix, "%s_%d_s%llu", generator_names[g.type], g.n, (unsigned long long)g.seed);
+    }
+    file1 = (char *)malloc(strlen(prefix) + 8);
+    file2 = (char *)malloc(strlen(prefix) + 8);
+    sprintf(file1, "%s.graph", prefix);
+    sprintf(file2, "%s.grf", prefix);
+
+    gettimeofday(&begin, NULL);
+    generator_build(&g, &xadj, &adjncy);
+    printf("graph:%s type=%s nvtxs=%d nedges=%lld seed=%llu\n", prefix, generator_names[g.type], g.n,
+           (long long)(xadj[g.n] / 2), (unsigned long long)g.seed);
+    printf("Generate_time=        %10.3lf ms\n", generator_time(&begin));
+
+    gettimeofday(&begin, NULL);
+    if (write_graph && !graph_writer_write_csr(file1, g.n, NULL, xadj, adjncy, GRAPH_WRITER_GRAPH))
+    {
+        fprintf(stderr, "Failed to write %s\n", file1);
+        return 1;
+    }
+    if (write_grf && !graph_writer_write_csr(file2, g.n, NULL, xadj, adjncy, GRAPH_WRITER_GRF))
+    {
+        fprintf(stderr, "Failed to write %s\n", file2);
+        return 1;
+    }
+    if (write_bcsr32 && xadj[g.n] > INT_MAX)
+        fprintf(stderr, "%lld adjacency entries do not fit the 32-bit csr cache, use -B\n", (long long)xadj[g.n]);
+    else if (write_bcsr32 && !generator_write_bcsr(file1, 4, g.n, xadj, adjncy))
+        fprintf(stderr, "Failed to write the csr cache of %s\n", file1);
+    if (write_bcsr64 && !generator_write_bcsr(file1, 8, g.n, xadj, adjncy))
+        fprintf(stderr, "Failed to write the csr cache of %s\n", file1);
+    printf("Write_graph_time=     %10.3lf ms\n", generator_time(&begin));
+
+    free(xadj);
+    free(adjncy);
+    free(file1);
+    free(file2);
+
+    return 0;
+}
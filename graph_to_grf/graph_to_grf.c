@@ -7,6 +7,7 @@
 #include<stdarg.h>
 #include<time.h>
 #include<sys/time.h>
+#include "../hunyuangraph_csrcache.h"
 
 /*Graph data structure*/
 typedef struct hunyuangraph_graph_t {
@@ -138,8 +139,21 @@ hunyuangraph_graph_t *hunyuangraph_readgraph(char *filename)
   FILE *fpin;
 
   hunyuangraph_graph_t *graph;
+  hunyuangraph_csrcache_t cache;
   graph = hunyuangraph_create_cpu_graph();
 
+#ifndef NO_CSR_CACHE
+  if(hunyuangraph_csrcache_open(filename,sizeof(int),&cache)&&cache.header->nvtxs<=INT32_MAX&&cache.header->nedges<=INT32_MAX){
+    graph->nvtxs=cache.header->nvtxs;
+    graph->nedges=cache.header->nedges;
+    graph->xadj=(int*)cache.xadj;
+    graph->adjncy=(int*)cache.adjncy;
+    graph->vwgt=(int*)cache.vwgt;
+    graph->adjwgt=(int*)cache.adjwgt;
+    return graph;
+  }
+#endif
+
   fpin = hunyuangraph_fopen(filename,"r","Readgraph: Graph");
 
   do{
@@ -267,6 +281,13 @@ hunyuangraph_graph_t *hunyuangraph_readgraph(char *filename)
     exit(0);
   }
   free(line);
+
+#ifndef NO_CSR_CACHE
+  if(!hunyuangraph_csrcache_write(filename,sizeof(int),graph->nvtxs,graph->nedges,fmt,xadj,adjncy,vwgt,adjwgt)){
+    fprintf(stderr,"Failed to write the csr cache of %s\n",filename);
+  }
+#endif
+
   return graph;
 }
 
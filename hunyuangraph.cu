@@ -4,15 +4,20 @@
 /*Main function*/
 int main(int argc, char **argv)
 {
-	cudaSetDevice(0);
-
 	char *filename = (argv[1]);
 	int nparts = atoi(argv[2]);
-	GPU_Memory_Pool = atoi(argv[3]);
+	int memory_pool = atoi(argv[3]);					// ignored by the CPU backend
+#ifndef NO_CUDA
+	if (hunyuangraph_backend_mode() == hunyuangraph_backend_gpu)
+		cudaSetDevice(0);
+	GPU_Memory_Pool = memory_pool;
+#endif
+	int write_mode = (argc > 4 ? atoi(argv[4]) : 0);	// 0: none, 1: <graph>.part.<k>, 2: <graph>.part.<k>.bin
+	Graph_Check = (argc > 5 ? atoi(argv[5]) : 0);		// 0: none, 1: validate, 2: validate and repair
 
 	hunyuangraph_graph_t *graph = hunyuangraph_readgraph(filename);
 
-	printf("graph:%s %d %d %d %d\n", filename, graph->nvtxs, graph->nedges, nparts, GPU_Memory_Pool);
+	printf("graph:%s %d %lld %d %d\n", filename, graph->nvtxs, (long long)graph->nedges, nparts, memory_pool);
 	// for(int i = 0;i <= graph->nvtxs; i++)
 	// 	printf("%d ", graph->xadj[i]);
 	// printf("\n");
@@ -36,7 +41,7 @@ int main(int argc, char **argv)
 		tpwgts[i] = 1.0 / nparts;
 	float ubvec = 1.03;
 
-	int best_edgecut = graph->nedges;
+	long long best_edgecut = LLONG_MAX;
 	int *best_partition = (int *)malloc(sizeof(int) * graph->nvtxs);
 
 	double best_alltime, best_coarsentime, best_inittime, best_uncoarsentime;
@@ -50,7 +55,7 @@ int main(int argc, char **argv)
 
 		hunyuangraph_PartitionGraph(&graph->nvtxs, graph->xadj, graph->adjncy, graph->vwgt, graph->adjwgt, &nparts, tpwgts, &ubvec, part);
 
-		int edgecut = hunyuangraph_computecut_cpu(graph, part);
+		long long edgecut = hunyuangraph_computecut_cpu(graph, part);
 		float imbalance = hunyuangraph_compute_imbalance_cpu(graph, part, nparts);
 
 		print_time_all(graph, part, edgecut, imbalance);
@@ -92,10 +97,20 @@ int main(int argc, char **argv)
 	printf("best_uncoarsentime=   %10.3lf\n", best_uncoarsentime);
 	
 #ifdef FIGURE14_EDGECUT
-	printf("best_edgecut=         %10d\n", best_edgecut);
+	printf("best_edgecut=         %10lld\n", best_edgecut);
 #endif
 
-	// hunyuangraph_writetofile(filename, part, graph->nvtxs, nparts);
+	if (write_mode != 0)
+	{
+		struct timeval begin_write, end_write;
+		gettimeofday(&begin_write, NULL);
+		if (write_mode == 2)
+			hunyuangraph_writetofile_binary(filename, best_partition, graph->nvtxs, nparts);
+		else
+			hunyuangraph_writetofile(filename, best_partition, graph->nvtxs, nparts);
+		gettimeofday(&end_write, NULL);
+		printf("Write_partition_time= %10.3lf ms\n", (end_write.tv_sec - begin_write.tv_sec) * 1000.0 + (end_write.tv_usec - begin_write.tv_usec) / 1000.0);
+	}
 
 	// double twoway_else = gpu_2way - (initmoveto + updatemoveto + computepwgts + thrustreduce + computegain + thrustsort + computegainv + inclusive + re_balance);
 
@@ -22,8 +22,9 @@ void hunyuangraph_allocate_cpu_2waymem(hunyuangraph_admin_t *hunyuangraph_admin,
 /*Compute cpu 2way-refine params*/
 void hunyuangraph_compute_cpu_2wayparam(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
 {
-  int i,j,nvtxs,nbnd,mincut,istart,iend,tid,ted,me;
-  int *xadj,*vwgt,*adjncy,*adjwgt,*pwgts;
+  int i,nvtxs,nbnd,mincut,tid,ted,me;
+  hunyuangraph_edge_t j,istart,iend,*xadj;
+  int *vwgt,*adjncy,*adjwgt,*pwgts;
   int *where,*bndptr,*bndlist,*id,*ed;
 
   nvtxs= graph->nvtxs;
@@ -76,8 +77,9 @@ void hunyuangraph_compute_cpu_2wayparam(hunyuangraph_admin_t *hunyuangraph_admin
 /*Cpu graph refine two partitions*/
 void hunyuangraph_cpu_2way_refine(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, float *ntpwgts, int iteration_num)
 {
-  int i,ii,j,k,kwgt,nvtxs,nbnd,nswaps,from,to,pass,limit,temp;
-  int *xadj,*vwgt,*adjncy,*adjwgt,*where,*id,*ed,*bndptr,*bndlist,*pwgts;
+  int i,ii,k,kwgt,nvtxs,nbnd,nswaps,from,to,pass,limit,temp;
+  hunyuangraph_edge_t j,*xadj;
+  int *vwgt,*adjncy,*adjwgt,*where,*id,*ed,*bndptr,*bndlist,*pwgts;
   int *moved,*swaps,*perm;
 
   hunyuangraph_queue_t *queues[2];
@@ -120,7 +122,7 @@ void hunyuangraph_cpu_2way_refine(hunyuangraph_admin_t *hunyuangraph_admin, huny
     newcut=mincut=initcut=graph->mincut;
     mindiff=abs(tpwgts[0]-pwgts[0]);
     nbnd=graph->nbnd;
-    hunyuangraph_int_randarrayofp(nbnd,perm,nbnd,1); 
+    hunyuangraph_int_randarrayofp(&hunyuangraph_admin->seed,nbnd,perm,nbnd,1); 
 
     for(ii=0;ii<nbnd;ii++){
       i=perm[ii];
@@ -244,8 +246,9 @@ void hunyuangraph_cpu_2way_refine(hunyuangraph_admin_t *hunyuangraph_admin, huny
 /*Cpu graph 2-way projection*/
 void hunyuangraph_2way_project(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
 {
-  int i,j,istart,iend,nvtxs,nbnd,me,tid,ted;
-  int *xadj,*adjncy,*adjwgt;
+  int i,nvtxs,nbnd,me,tid,ted;
+  hunyuangraph_edge_t j,istart,iend,*xadj;
+  int *adjncy,*adjwgt;
   int *cmap,*where,*bndptr,*bndlist;
   int *cwhere,*cbndptr;
   int *id,*ed;
@@ -320,6 +323,7 @@ void hunyuangraph_2way_project(hunyuangraph_admin_t *hunyuangraph_admin, hunyuan
 
 }
 
+#ifndef NO_CUDA
 __global__ void projectback_init(int *where, int *cwhere, int *cmap, int nvtxs)
 {
 	int ii = blockIdx.x * blockDim.x + threadIdx.x;
@@ -330,6 +334,7 @@ __global__ void projectback_init(int *where, int *cwhere, int *cmap, int nvtxs)
 		where[ii] = cwhere[t];
 	}
 }
+#endif
 
 /*Cpu refinement algorithm*/
 void hunyuangraph_cpu_refinement(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *orggraph, hunyuangraph_graph_t *graph, float *tpwgts)
@@ -28,7 +28,9 @@ hunyuangraph_graph_t *hunyuangraph_cpu_coarsen(hunyuangraph_admin_t *hunyuangrap
 		}
 
 		// hunyuangraph_cpu_match_HEM(hunyuangraph_admin,graph,level);
-		if (eqewgts || graph->nedges == 0)
+		if (hunyuangraph_admin->cpu_match != hunyuangraph_match_serial)
+			hunyuangraph_cpu_match_parallel(hunyuangraph_admin, graph, hunyuangraph_admin->cpu_match == hunyuangraph_match_deterministic);
+		else if (eqewgts || graph->nedges == 0)
           	hunyuangraph_cpu_match_RM(hunyuangraph_admin, graph);
         else
           	hunyuangraph_cpu_match_HEM(hunyuangraph_admin, graph);
@@ -5,97 +5,321 @@
 #include "hunyuangraph_graph.h"
 #include "hunyuangraph_timer.h"
 
-/*Create cpu coarsen graph by contract*/
-void hunyuangraph_cpu_create_cgraph(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int cnvtxs, int *match)
+/*Two-pass contraction of the CPU coarsener.
+  The coarse vertex c is made of its first fine vertex v (the c-th vertex with
+  v <= match[v]) and of match[v]. The first pass counts the distinct coarse
+  neighbors of every coarse vertex, a prefix sum turns the counts into cxadj,
+  and the second pass fills cadjncy/cadjwgt, which are allocated with the
+  exact number of coarse edges. Both passes run over the coarse vertices in
+  parallel, every thread merges the rows in a sparse accumulator: an open
+  addressing table sized to the degree of the row, so its memory does not
+  grow with cnvtxs. The rows are the same as those of the serial contraction:
+  the neighbors in the order of their first appearance, and the self edge of
+  a matched pair replaced by the last neighbor. With one thread, or fewer than
+  hunyuangraph_contract_parallel_nvtxs coarse vertices, the single pass of the
+  serial contraction is used instead: it fills buffers sized to the fine edges
+  and shrinks them to the coarse edges.*/
+
+#define hunyuangraph_contract_parallel_nvtxs (1 << 12)
+#define hunyuangraph_accumulator_init 64      //Initial positions of an accumulator
+
+typedef struct hunyuangraph_accumulator_t {
+	int size;                             //Table slots, a power of 2
+	int *table;                           //Coarse neighbor and its position in the row of every slot, -1 if empty
+	int *slots;                           //Slot of every position, to clear the table
+	int *adjncy;                          //The row being merged
+	int *adjwgt;
+	int capacity;                         //Positions of slots/adjncy/adjwgt
+} hunyuangraph_accumulator_t;
+
+/*Make room for a row of up to n neighbors, the capacity at least doubles*/
+void hunyuangraph_accumulator_reserve(hunyuangraph_accumulator_t *acc, int n)
 {
-  int j,k,m,istart,iend,nvtxs,nedges,cnedges,v,u;
-  int *xadj,*vwgt,*adjncy,*adjwgt;
-  int *cmap,*htable;
-  int *cxadj,*cvwgt,*cadjncy,*cadjwgt;
-  hunyuangraph_graph_t *cgraph;
-  
+	int size = 16;
+
+	if (n <= acc->capacity)
+		return;
+	n = hunyuangraph_max(n, 2 * acc->capacity);
+	while (size < 2 * n)
+		size <<= 1;
+	if (size > acc->size)
+	{
+		free(acc->table);
+		acc->size = size;
+		acc->table = (int *)malloc(sizeof(int) * 2 * size);
+		for (int i = 0; i < size; i++)
+			acc->table[2 * i + 1] = -1;
+	}
+	free(acc->slots);
+	free(acc->adjncy);
+	free(acc->adjwgt);
+	acc->capacity = n;
+	acc->slots = (int *)malloc(sizeof(int) * n);
+	acc->adjncy = (int *)malloc(sizeof(int) * n);
+	acc->adjwgt = (int *)malloc(sizeof(int) * n);
+}
+
+void hunyuangraph_accumulator_free(hunyuangraph_accumulator_t *acc)
+{
+	free(acc->table);
+	free(acc->slots);
+	free(acc->adjncy);
+	free(acc->adjwgt);
+}
+
+/*Add the edges of fine vertex v to the row of nedges neighbors, returns the new nedges*/
+static inline int hunyuangraph_accumulator_add(hunyuangraph_accumulator_t *acc, int nedges, hunyuangraph_edge_t *xadj,
+	int *adjncy, int *adjwgt, int *cmap, int v)
+{
+	unsigned int mask = acc->size - 1, s;
+	int k, *table = acc->table;
+
+	for (hunyuangraph_edge_t j = xadj[v]; j < xadj[v + 1]; j++)
+	{
+		k = cmap[adjncy[j]];
+		for (s = ((unsigned int)k * 0x9e3779b1u) & mask; table[2 * s + 1] != -1 && table[2 * s] != k; s = (s + 1) & mask);
+
+		if (table[2 * s + 1] == -1)
+		{
+			table[2 * s] = k;
+			table[2 * s + 1] = nedges;
+			acc->slots[nedges] = s;
+			acc->adjncy[nedges] = k;
+			acc->adjwgt[nedges++] = adjwgt[j];
+		}
+		else
+			acc->adjwgt[table[2 * s + 1]] += adjwgt[j];
+	}
+
+	return nedges;
+}
+
+/*Merge the row of coarse vertex c made of v and u, returns its degree*/
+static inline int hunyuangraph_accumulator_row(hunyuangraph_accumulator_t *acc, hunyuangraph_graph_t *graph, int c, int v, int u)
+{
+	int nedges, m;
+	unsigned int mask, s;
+
+	hunyuangraph_accumulator_reserve(acc, (int)(graph->xadj[v + 1] - graph->xadj[v] + (v != u ? graph->xadj[u + 1] - graph->xadj[u] : 0)));
+	mask = acc->size - 1;
+
+	nedges = hunyuangraph_accumulator_add(acc, 0, graph->xadj, graph->adjncy, graph->adjwgt, graph->cmap, v);
+	if (v != u)
+	{
+		nedges = hunyuangraph_accumulator_add(acc, nedges, graph->xadj, graph->adjncy, graph->adjwgt, graph->cmap, u);
+
+		for (s = ((unsigned int)c * 0x9e3779b1u) & mask; acc->table[2 * s + 1] != -1 && acc->table[2 * s] != c; s = (s + 1) & mask);
+		if ((m = acc->table[2 * s + 1]) != -1)
+		{
+			acc->table[2 * s + 1] = -1;
+			nedges--;
+			acc->adjncy[m] = acc->adjncy[nedges];
+			acc->adjwgt[m] = acc->adjwgt[nedges];
+			acc->slots[m] = acc->slots[nedges];
+		}
+	}
+
+	for (m = 0; m < nedges; m++)
+		acc->table[2 * acc->slots[m] + 1] = -1;
+
+	return nedges;
+}
+
+/*Turn the counts in xadj[1..n] into offsets, xadj[0]=0*/
+void hunyuangraph_contract_prefixsum(int n, hunyuangraph_edge_t *xadj, hunyuangraph_edge_t *sums)
+{
+	xadj[0] = 0;
+
+#pragma omp parallel if (n >= hunyuangraph_contract_parallel_nvtxs)
+	{
+		int t = 0, nt = 1;
+#ifdef _OPENMP
+		t = omp_get_thread_num();
+		nt = omp_get_num_threads();
+#endif
+		int first = (long long)n * t / nt + 1, last = (long long)n * (t + 1) / nt + 1;
+		hunyuangraph_edge_t sum = 0;
+
+		for (int i = first; i < last; i++)
+			sum += xadj[i];
+		sums[t + 1] = sum;
+
+#pragma omp barrier
+#pragma omp single
+		{
+			sums[0] = 0;
+			for (int i = 1; i <= nt; i++)
+				sums[i] += sums[i - 1];
+		}
+
+		sum = sums[t];
+		for (int i = first; i < last; i++)
+		{
+			sum += xadj[i];
+			xadj[i] = sum;
+		}
+	}
+}
+
+/*Single-pass contraction, the rows are merged in a shared htable of cnvtxs*/
+void hunyuangraph_cpu_contract_serial(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, hunyuangraph_graph_t *cgraph, int *match)
+{
+  int k,m,nvtxs,nedges,cnvtxs,v,u;
+  hunyuangraph_edge_t j,cnedges;
+  hunyuangraph_edge_t *xadj,*cxadj;
+  int *vwgt,*adjncy,*adjwgt,*cmap,*htable;
+  int *cvwgt,*cadjncy,*cadjwgt;
+
   nvtxs=graph->nvtxs;
   xadj=graph->xadj;
   vwgt=graph->vwgt;
   adjncy=graph->adjncy;
   adjwgt=graph->adjwgt;
-  cmap=graph->cmap;                  
-  
-  cgraph=hunyuangraph_set_cpu_cgraph(graph,cnvtxs);            
+  cmap=graph->cmap;
+
   cxadj=cgraph->xadj;
   cvwgt=cgraph->vwgt;
-  cadjncy=cgraph->adjncy;
-  cadjwgt=cgraph->adjwgt;                               
-  htable=hunyuangraph_int_set_value(cnvtxs,-1,hunyuangraph_int_malloc_space(hunyuangraph_admin,cnvtxs));      
-  cxadj[0] = cnvtxs = cnedges = 0; 
-  nedges=graph->nedges;
-   
-  for(v=0;v<nvtxs;v++){
+  cgraph->adjncy=cadjncy=(int *)malloc(sizeof(int)*hunyuangraph_max(graph->nedges,1));
+  cgraph->adjwgt=cadjwgt=(int *)malloc(sizeof(int)*hunyuangraph_max(graph->nedges,1));
+  htable=hunyuangraph_int_set_value(cgraph->nvtxs,-1,hunyuangraph_int_malloc_space(hunyuangraph_admin,cgraph->nvtxs));
+  cxadj[0]=cnvtxs=cnedges=0;
 
-    if((u=match[v])<v)         
-      continue;   
-
-    cvwgt[cnvtxs]=vwgt[v];                 
-    nedges=0;                                                    
-    istart=xadj[v];
-    iend=xadj[v+1];    
-
-    for(j=istart;j<iend;j++){
+  for(v=0;v<nvtxs;v++){
+    if((u=match[v])<v)
+      continue;
 
-      k=cmap[adjncy[j]];     
+    cvwgt[cnvtxs]=vwgt[v];
+    nedges=0;
 
+    for(j=xadj[v];j<xadj[v+1];j++){
+      k=cmap[adjncy[j]];
       if((m=htable[k])==-1){
-        cadjncy[nedges]=k;                           
-        cadjwgt[nedges] = adjwgt[j];                      
-        htable[k] = nedges++;  
-      }
-      else{
-        cadjwgt[m] += adjwgt[j];                                 
+        cadjncy[nedges]=k;
+        cadjwgt[nedges]=adjwgt[j];
+        htable[k]=nedges++;
       }
+      else
+        cadjwgt[m]+=adjwgt[j];
     }
 
-    if(v!=u){ 
-      cvwgt[cnvtxs]+=vwgt[u];                   
-      istart=xadj[u];                                    
-      iend=xadj[u+1];      
+    if(v!=u){
+      cvwgt[cnvtxs]+=vwgt[u];
 
-      for(j=istart;j<iend;j++){
+      for(j=xadj[u];j<xadj[u+1];j++){
         k=cmap[adjncy[j]];
-
         if((m=htable[k])==-1){
           cadjncy[nedges]=k;
           cadjwgt[nedges]=adjwgt[j];
           htable[k]=nedges++;
         }
-        else{
-          cadjwgt[m] += adjwgt[j];
-        }
+        else
+          cadjwgt[m]+=adjwgt[j];
       }
 
-      if((j=htable[cnvtxs])!=-1){
-        cadjncy[j]=cadjncy[--nedges];
-        cadjwgt[j]=cadjwgt[nedges];
-        htable[cnvtxs] = -1;
+      if((m=htable[cnvtxs])!=-1){
+        cadjncy[m]=cadjncy[--nedges];
+        cadjwgt[m]=cadjwgt[nedges];
+        htable[cnvtxs]=-1;
       }
     }
 
-    for(j=0;j<nedges;j++){
-       htable[cadjncy[j]] = -1;  
-    }
+    for(m=0;m<nedges;m++)
+      htable[cadjncy[m]]=-1;
 
     cnedges+=nedges;
     cxadj[++cnvtxs]=cnedges;
-    cadjncy+=nedges;                                                                 
+    cadjncy+=nedges;
     cadjwgt+=nedges;
   }
 
   cgraph->nedges=cnedges;
-  cgraph->tvwgt[0]=hunyuangraph_int_sum(cgraph->nvtxs,cgraph->vwgt); 
-  cgraph->tvwgt_reverse[0]=1.0/(cgraph->tvwgt[0]>0?cgraph->tvwgt[0]:1);    
+  cgraph->adjncy=(int *)realloc(cgraph->adjncy,sizeof(int)*hunyuangraph_max(cnedges,1));
+  cgraph->adjwgt=(int *)realloc(cgraph->adjwgt,sizeof(int)*hunyuangraph_max(cnedges,1));
+  cgraph->tvwgt[0]=hunyuangraph_int_sum(cgraph->nvtxs,cgraph->vwgt);
+  cgraph->tvwgt_reverse[0]=1.0/(cgraph->tvwgt[0]>0?cgraph->tvwgt[0]:1);
+}
+
+/*Create cpu coarsen graph by contract*/
+void hunyuangraph_cpu_create_cgraph(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int cnvtxs, int *match)
+{
+  int nvtxs,parallel;
+  long long tvwgt=0;
+  hunyuangraph_edge_t *cxadj,*sums;
+  int *vwgt,*cmap,*rep;
+  int *cvwgt,*cadjncy,*cadjwgt;
+  hunyuangraph_graph_t *cgraph;
+
+  nvtxs=graph->nvtxs;
+  vwgt=graph->vwgt;
+  cmap=graph->cmap;
+  parallel=(hunyuangraph_get_nthreads()>1&&cnvtxs>=hunyuangraph_contract_parallel_nvtxs);
+
+  cgraph=hunyuangraph_set_cpu_cgraph(graph,cnvtxs);
+  if(!parallel){
+    hunyuangraph_cpu_contract_serial(hunyuangraph_admin,graph,cgraph,match);
+    return;
+  }
+
+  cxadj=cgraph->xadj;
+  cvwgt=cgraph->vwgt;
+  rep=hunyuangraph_int_malloc_space(hunyuangraph_admin,cnvtxs);
+  sums=(hunyuangraph_edge_t *)hunyuangraph_malloc_space(hunyuangraph_admin,sizeof(hunyuangraph_edge_t)*(hunyuangraph_get_nthreads()+1));
+
+  /*the first fine vertex of every coarse vertex*/
+#pragma omp parallel for schedule(static)
+  for(int v=0;v<nvtxs;v++){
+    if(v<=match[v])
+      rep[cmap[v]]=v;
+  }
+
+  /*Pass 1: coarse degrees and vertex weights*/
+#pragma omp parallel
+  {
+    hunyuangraph_accumulator_t acc;
+    memset(&acc,0,sizeof(hunyuangraph_accumulator_t));
+    hunyuangraph_accumulator_reserve(&acc,hunyuangraph_accumulator_init);
+
+#pragma omp for schedule(dynamic,256) reduction(+:tvwgt)
+    for(int c=0;c<cnvtxs;c++){
+      int v=rep[c],u=match[v];
+      cvwgt[c]=vwgt[v]+(v!=u?vwgt[u]:0);
+      cxadj[c+1]=hunyuangraph_accumulator_row(&acc,graph,c,v,u);
+      tvwgt+=cvwgt[c];
+    }
+
+    hunyuangraph_accumulator_free(&acc);
+  }
+
+  hunyuangraph_contract_prefixsum(cnvtxs,cxadj,sums);
+
+  cgraph->nedges=cxadj[cnvtxs];
+  cgraph->adjncy=cadjncy=(int *)malloc(sizeof(int)*hunyuangraph_max(cgraph->nedges,1));
+  cgraph->adjwgt=cadjwgt=(int *)malloc(sizeof(int)*hunyuangraph_max(cgraph->nedges,1));
+
+  /*Pass 2: fill the rows*/
+#pragma omp parallel
+  {
+    hunyuangraph_accumulator_t acc;
+    memset(&acc,0,sizeof(hunyuangraph_accumulator_t));
+    hunyuangraph_accumulator_reserve(&acc,hunyuangraph_accumulator_init);
+
+#pragma omp for schedule(dynamic,256)
+    for(int c=0;c<cnvtxs;c++){
+      int v=rep[c];
+      int nedges=hunyuangraph_accumulator_row(&acc,graph,c,v,match[v]);
+      memcpy(cadjncy+cxadj[c],acc.adjncy,sizeof(int)*nedges);
+      memcpy(cadjwgt+cxadj[c],acc.adjwgt,sizeof(int)*nedges);
+    }
+
+    hunyuangraph_accumulator_free(&acc);
+  }
+
+  cgraph->tvwgt[0]=(int)tvwgt;
+  cgraph->tvwgt_reverse[0]=1.0/(cgraph->tvwgt[0]>0?cgraph->tvwgt[0]:1);
 
 //   printf("cnvtxs=%d cnedges=%d\n",cgraph->nvtxs,cgraph->nedges);
 
 }
 
 
-#endif
\ No newline at end of file
+#endif
@@ -9,6 +9,7 @@
 #include "hunyuangraph_balance.h"
 #include "hunyuangraph_CPU_2wayrefine.h"
 #include "hunyuangraph_CPU_splitgraph.h"
+#include "hunyuangraph_CPU_multistart.h"
 
 /*************************************************************************/
 /*! Computes the maximum load imbalance difference of a partitioning 
@@ -35,10 +36,11 @@ float ComputeLoadImbalanceDiff(hunyuangraph_graph_t *graph, int nparts, float *p
 /*Cpu growbisection algorithm*/
 void huyuangraph_cpu_growbisection(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, float *ntpwgts, int niparts)
 {
-  int i,j,k,nvtxs,dd,nleft,first,last,pwgts[2],oneminpwgt,onemaxpwgt, 
+  int i,k,nvtxs,dd,nleft,first,last,pwgts[2],oneminpwgt,onemaxpwgt, 
       bestcut=0,iter;
+  hunyuangraph_edge_t j,*xadj;
 
-  int *xadj,*vwgt,*adjncy,*where;
+  int *vwgt,*adjncy,*where;
   int *queue,*tra,*bestwhere;
 
   nvtxs=graph->nvtxs;
@@ -63,7 +65,7 @@ void huyuangraph_cpu_growbisection(hunyuangraph_admin_t *hunyuangraph_admin, hun
 
     pwgts[1]=graph->tvwgt[0];
     pwgts[0]=0;
-    queue[0]=hunyuangraph_int_randinrange(nvtxs);
+    queue[0]=hunyuangraph_int_randinrange(&hunyuangraph_admin->seed,nvtxs);
     tra[queue[0]]=1;
     first=0; 
     last=1;
@@ -76,7 +78,7 @@ void huyuangraph_cpu_growbisection(hunyuangraph_admin_t *hunyuangraph_admin, hun
           break;
         }
 
-        k=hunyuangraph_int_randinrange(nleft);
+        k=hunyuangraph_int_randinrange(&hunyuangraph_admin->seed,nleft);
 
         for(i=0;i<nvtxs;i++){
           if(tra[i]==0){
@@ -151,6 +153,7 @@ int hunyuangraph_cpu_mlevelbisect(hunyuangraph_admin_t *hunyuangraph_admin, huny
 	hunyuangraph_graph_t *tgraph = graph;
 	hunyuangraph_graph_t *cgraph;
 	double bestbal=0.0, curbal=0.0;
+	struct timeval begin_coarsen, end_coarsen;
 
 	hunyuangraph_compute_2way_balance(hunyuangraph_admin,graph,tpwgts);
 
@@ -247,10 +250,19 @@ int hunyuangraph_cpu_mlevelbisect(hunyuangraph_admin_t *hunyuangraph_admin, huny
 
   	for (int i = 0; i < hunyuangraph_admin->ncuts; i++) 
 	{
+		gettimeofday(&begin_coarsen, NULL);
 		cgraph=hunyuangraph_cpu_coarsen(hunyuangraph_admin,graph);
-
-		niparts = (cgraph->nvtxs <= hunyuangraph_admin->Coarsen_threshold ? 5 : 7);
-		huyuangraph_cpu_growbisection(hunyuangraph_admin,cgraph,tpwgts,niparts);
+		gettimeofday(&end_coarsen, NULL);
+		hunyuangraph_admin->cpu_coarsen_time += (end_coarsen.tv_sec - begin_coarsen.tv_sec) * 1000 + (end_coarsen.tv_usec - begin_coarsen.tv_usec) / 1000.0;
+
+		if (hunyuangraph_admin->nIparts > 0)
+			niparts = hunyuangraph_admin->nIparts;
+		else
+			niparts = (cgraph->nvtxs <= hunyuangraph_admin->Coarsen_threshold ? 5 : 7);
+		if (hunyuangraph_get_nthreads() > 1)
+			hunyuangraph_cpu_multistart_bisection(hunyuangraph_admin,cgraph,tpwgts,niparts);
+		else
+			huyuangraph_cpu_growbisection(hunyuangraph_admin,cgraph,tpwgts,niparts);
 
 		hunyuangraph_cpu_refinement(hunyuangraph_admin,graph,cgraph,tpwgts);
 
@@ -358,7 +370,7 @@ int hunyuangraph_mlevel_rbbisection(hunyuangraph_admin_t *hunyuangraph_admin, \
 }
 
 /*Cpu graph partition algorithm*/
-int hunyuangraph_rbbisection(int *nvtxs, int *xadj, int *adjncy, int *vwgt,int *adjwgt, int *nparts, float *tpwgts, float *ubvec, int *objval, int *part, int *tvwgt)
+int hunyuangraph_rbbisection(int *nvtxs, hunyuangraph_edge_t *xadj, int *adjncy, int *vwgt,int *adjwgt, int *nparts, float *tpwgts, float *ubvec, int *objval, int *part, int *tvwgt)
 {
 	hunyuangraph_graph_t *graph;
 	hunyuangraph_admin_t *hunyuangraph_admin;
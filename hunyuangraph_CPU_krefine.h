@@ -0,0 +1,740 @@
+#ifndef _H_CPU_KREFINE
+#define _H_CPU_KREFINE
+
+#include "hunyuangraph_struct.h"
+#include "hunyuangraph_common.h"
+#include "hunyuangraph_graph.h"
+#include "hunyuangraph_CPU_contraction.h"
+
+/*k-way refinement of the CPU backend, the host port of k_refine (Jet) in
+  hunyuangraph_GPU_krefine.h. Every vertex keeps a row of min(degree, nparts)
+  slots with its connectivity to the parts of its neighbors (gain_where and
+  gain_val, -1 after the last part). A balanced partition is refined by jetlp:
+  every unlocked vertex proposes the best other part of its row, the
+  afterburner re-evaluates each proposal as if the neighbors with higher gains
+  had already moved, and the proposals that keep a non-negative gain are moved
+  and locked for the next jetlp. An unbalanced partition is repaired by jetrw
+  (overweight parts send vertices to the best adjacent part with room) and, if
+  it stays unbalanced, by jetrs (the least bad evictions of the overweight
+  parts are handed out to the other parts by their remaining room). The kernels
+  become parallel loops over the vertices. The atomics of the GPU are replaced
+  by thread-local part buffers (row merges, part weight deltas) and by
+  per-thread bucket counts turned into offsets by a prefix sum, so every list
+  keeps the vertex order and the result does not depend on the number of
+  threads. The part weight limit is ubfactors[0] of the admin instead of IMB.*/
+
+#define hunyuangraph_krefine_parallel_nvtxs (1 << 12)
+#define hunyuangraph_krefine_buckets 50       //Gain buckets of a part in jetrw/jetrs
+#define hunyuangraph_krefine_mid_bucket 25    //Bucket of a loss of one edge weight per vertex weight
+#define hunyuangraph_krefine_iterations 5     //Iterations without a better partition before k_refine stops
+#define hunyuangraph_krefine_tol 0.999        //A cut below tol * best cut restarts the iterations
+
+typedef struct hunyuangraph_cpu_krefine_t {
+	int nparts;
+	int nthreads;                         //Threads of the parallel loops, sizes the per-thread buffers
+	int parallel;                         //nvtxs >= hunyuangraph_krefine_parallel_nvtxs
+	int mincut;                           //Edgecut of graph->where
+	hunyuangraph_edge_t *gain_offset;     //Row of every vertex in gain_where/gain_val
+	int *gain_where;                      //Parts adjacent to the vertex, -1 after the last
+	int *gain_val;                        //Connectivity of the vertex to these parts
+	int *dest_cache;                      //Proposal of jetlp while the row is unchanged, -1 if unknown
+	int *gain;                            //Gain of the proposal in dest_cache
+	int *dest_part;                       //Destination of every vertex, its previous part after perform_moves
+	int *pregain;                         //Gain of the jetlp candidates, IDX_MIN for the other vertices
+	int *bid;                             //Bucket of a vertex leaving its part in jetrw/jetrs, -1 otherwise
+	int *list;                            //jetlp candidates, or the vertices sorted by bucket in jetrw/jetrs
+	int *pos_move;                        //Vertices to move
+	char *lock;                           //Moved by the previous jetlp
+	char *select;                         //Marks of a filter, all 0 between the passes
+	int *pwgts;
+	int *opt_pwgts;                       //Target weight of every part
+	int *maxwgt;                          //opt_pwgts * ubfactor
+	int *undersized;                      //Parts with room in jetrw
+	int *evict_start;                     //First vertex of every part in list (evict), or its range of pos_move (jetrs)
+	int *evict_end;
+	hunyuangraph_edge_t *scan;            //Prefix sums of the vertex weights of a list
+	hunyuangraph_edge_t *offsets;         //Per-thread bucket counts, then offsets, in (part, bucket, thread) order
+	hunyuangraph_edge_t *sums;            //Per-thread sums of the prefix sums and compactions
+} hunyuangraph_cpu_krefine_t;
+
+/*Thread t of nt in a parallel region*/
+static inline void hunyuangraph_krefine_thread(int *t, int *nt)
+{
+	*t = 0;
+	*nt = 1;
+#ifdef _OPENMP
+	*t = omp_get_thread_num();
+	*nt = omp_get_num_threads();
+#endif
+}
+
+/*Items [first, last) of thread t of nt*/
+static inline void hunyuangraph_krefine_range(int n, int t, int nt, int *first, int *last)
+{
+	*first = (long long)n * t / nt;
+	*last = (long long)n * (t + 1) / nt;
+}
+
+/*Rebuild the row of v, vals (all -1) and parts are nparts buffers of the thread*/
+static inline void hunyuangraph_krefine_row(hunyuangraph_graph_t *graph, hunyuangraph_cpu_krefine_t *ws, int v, int *vals, int *parts)
+{
+	int k, q, n = 0;
+	hunyuangraph_edge_t j, begin = ws->gain_offset[v], end = ws->gain_offset[v + 1];
+
+	for (j = graph->xadj[v]; j < graph->xadj[v + 1]; j++)
+	{
+		q = graph->where[graph->adjncy[j]];
+		if (vals[q] == -1)
+		{
+			vals[q] = 0;
+			parts[n++] = q;
+		}
+		vals[q] += graph->adjwgt[j];
+	}
+
+	for (k = 0; k < n; k++)
+	{
+		ws->gain_where[begin + k] = parts[k];
+		ws->gain_val[begin + k] = vals[parts[k]];
+		vals[parts[k]] = -1;
+	}
+	for (j = begin + n; j < end; j++)
+	{
+		ws->gain_where[j] = -1;
+		ws->gain_val[j] = 0;
+	}
+}
+
+/*Connectivity of v to part p*/
+static inline int hunyuangraph_krefine_conn(hunyuangraph_cpu_krefine_t *ws, int v, int p)
+{
+	for (hunyuangraph_edge_t j = ws->gain_offset[v]; j < ws->gain_offset[v + 1] && ws->gain_where[j] != -1; j++)
+	{
+		if (ws->gain_where[j] == p)
+			return ws->gain_val[j];
+	}
+	return 0;
+}
+
+/*Bucket of a move by its gain per unit of vertex weight, 0 for gains, 1 for 0, then log1.5 of the loss around mid_bucket*/
+static inline int hunyuangraph_krefine_bucket(int gain_vertex, int vwgt)
+{
+	float gain = (float)gain_vertex / (float)hunyuangraph_max(vwgt, 1);
+	int gain_type;
+
+	if (gain > 0.0)
+		return 0;
+	if (gain == 0.0)
+		return 1;
+
+	gain_type = hunyuangraph_krefine_mid_bucket;
+	gain = -gain;
+	if (gain < 1.0)
+	{
+		while (gain < 1.0)
+		{
+			gain *= 1.5;
+			gain_type--;
+		}
+		if (gain_type < 2)
+			gain_type = 2;
+	}
+	else
+	{
+		while (gain > 1.0)
+		{
+			gain /= 1.5;
+			gain_type++;
+		}
+		if (gain_type >= hunyuangraph_krefine_buckets)
+			gain_type = hunyuangraph_krefine_buckets - 1;
+	}
+
+	return gain_type;
+}
+
+/*Copy the items of list (the vertices 0..n-1 if list is NULL) marked in select to out in order, returns their number*/
+int hunyuangraph_krefine_compact(hunyuangraph_cpu_krefine_t *ws, int n, const int *list, const char *select, int *out)
+{
+	int total = 0;
+	hunyuangraph_edge_t *sums = ws->sums;
+
+#pragma omp parallel if (ws->parallel && n >= hunyuangraph_krefine_parallel_nvtxs)
+	{
+		int t, nt, first, last, i, v;
+		hunyuangraph_edge_t k = 0;
+
+		hunyuangraph_krefine_thread(&t, &nt);
+		hunyuangraph_krefine_range(n, t, nt, &first, &last);
+
+		for (i = first; i < last; i++)
+			k += select[list == NULL ? i : list[i]];
+		sums[t + 1] = k;
+
+#pragma omp barrier
+#pragma omp single
+		{
+			sums[0] = 0;
+			for (i = 1; i <= nt; i++)
+				sums[i] += sums[i - 1];
+			total = (int)sums[nt];
+		}
+
+		k = sums[t];
+		for (i = first; i < last; i++)
+		{
+			v = (list == NULL ? i : list[i]);
+			if (select[v])
+				out[k++] = v;
+		}
+	}
+
+	return total;
+}
+
+/*Max part weight over target weight*/
+float hunyuangraph_krefine_imb(hunyuangraph_cpu_krefine_t *ws)
+{
+	float imb = 0.0;
+
+	for (int p = 0; p < ws->nparts; p++)
+		imb = hunyuangraph_max(imb, (float)ws->pwgts[p] / (float)ws->opt_pwgts[p]);
+
+	return imb;
+}
+
+/*Allocate the refinement state of graph->where: part weights, edgecut and the rows of all vertices*/
+hunyuangraph_cpu_krefine_t *hunyuangraph_cpu_krefine_create(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
+{
+	int nvtxs = graph->nvtxs, nparts = hunyuangraph_admin->nparts;
+	long long *pwgts;
+	hunyuangraph_cpu_krefine_t *ws;
+
+	ws = (hunyuangraph_cpu_krefine_t *)calloc(1, sizeof(hunyuangraph_cpu_krefine_t));
+	ws->nparts = nparts;
+	ws->nthreads = hunyuangraph_get_nthreads();
+	ws->parallel = (nvtxs >= hunyuangraph_krefine_parallel_nvtxs);
+
+	ws->sums = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (ws->nthreads + 1));
+	ws->gain_offset = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (nvtxs + 1));
+#pragma omp parallel for schedule(static) if (ws->parallel)
+	for (int v = 0; v < nvtxs; v++)
+		ws->gain_offset[v + 1] = hunyuangraph_min(graph->xadj[v + 1] - graph->xadj[v], (hunyuangraph_edge_t)nparts);
+	hunyuangraph_contract_prefixsum(nvtxs, ws->gain_offset, ws->sums);
+
+	ws->gain_where = (int *)malloc(sizeof(int) * hunyuangraph_max(ws->gain_offset[nvtxs], 1));
+	ws->gain_val = (int *)malloc(sizeof(int) * hunyuangraph_max(ws->gain_offset[nvtxs], 1));
+	ws->dest_cache = (int *)malloc(sizeof(int) * nvtxs);
+	ws->gain = (int *)malloc(sizeof(int) * nvtxs);
+	ws->dest_part = (int *)malloc(sizeof(int) * nvtxs);
+	ws->pregain = (int *)malloc(sizeof(int) * nvtxs);
+	ws->bid = (int *)malloc(sizeof(int) * nvtxs);
+	ws->list = (int *)malloc(sizeof(int) * nvtxs);
+	ws->pos_move = (int *)malloc(sizeof(int) * nvtxs);
+	ws->lock = (char *)calloc(nvtxs, sizeof(char));
+	ws->select = (char *)calloc(nvtxs, sizeof(char));
+	ws->scan = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (nvtxs + 1));
+	ws->offsets = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * ((size_t)nparts * hunyuangraph_krefine_buckets * ws->nthreads + 1));
+
+	ws->pwgts = (int *)malloc(sizeof(int) * nparts);
+	ws->opt_pwgts = (int *)malloc(sizeof(int) * nparts);
+	ws->maxwgt = (int *)malloc(sizeof(int) * nparts);
+	ws->undersized = (int *)malloc(sizeof(int) * nparts);
+	ws->evict_start = (int *)malloc(sizeof(int) * nparts);
+	ws->evict_end = (int *)malloc(sizeof(int) * nparts);
+
+	pwgts = (long long *)malloc(sizeof(long long) * nparts);
+	hunyuangraph_metrics_pwgts32(nvtxs, graph->vwgt, graph->where, nparts, pwgts);
+	for (int p = 0; p < nparts; p++)
+	{
+		ws->pwgts[p] = (int)pwgts[p];
+		ws->opt_pwgts[p] = hunyuangraph_max((int)(hunyuangraph_admin->tpwgts[p] * graph->tvwgt[0]), 1);
+		ws->maxwgt[p] = (int)(ws->opt_pwgts[p] * hunyuangraph_admin->ubfactors[0]);
+	}
+	free(pwgts);
+
+	ws->mincut = (int)hunyuangraph_computecut_cpu(graph, graph->where);
+
+#pragma omp parallel if (ws->parallel)
+	{
+		int *vals = (int *)malloc(sizeof(int) * 2 * nparts);
+		hunyuangraph_int_set_value(nparts, -1, vals);
+
+#pragma omp for schedule(dynamic, 1024)
+		for (int v = 0; v < nvtxs; v++)
+		{
+			ws->dest_cache[v] = -1;
+			hunyuangraph_krefine_row(graph, ws, v, vals, vals + nparts);
+		}
+
+		free(vals);
+	}
+
+	return ws;
+}
+
+void hunyuangraph_cpu_krefine_free(hunyuangraph_cpu_krefine_t **r_ws)
+{
+	hunyuangraph_cpu_krefine_t *ws = *r_ws;
+
+	free(ws->gain_offset);
+	free(ws->gain_where);
+	free(ws->gain_val);
+	free(ws->dest_cache);
+	free(ws->gain);
+	free(ws->dest_part);
+	free(ws->pregain);
+	free(ws->bid);
+	free(ws->list);
+	free(ws->pos_move);
+	free(ws->lock);
+	free(ws->select);
+	free(ws->pwgts);
+	free(ws->opt_pwgts);
+	free(ws->maxwgt);
+	free(ws->undersized);
+	free(ws->evict_start);
+	free(ws->evict_end);
+	free(ws->scan);
+	free(ws->offsets);
+	free(ws->sums);
+	free(ws);
+	*r_ws = NULL;
+}
+
+/*Label propagation with afterburner filtering, returns the number of moves in pos_move*/
+int hunyuangraph_cpu_jetlp(hunyuangraph_graph_t *graph, hunyuangraph_cpu_krefine_t *ws, int level)
+{
+	int nvtxs = graph->nvtxs, nfilter, num_pos;
+	int *where = graph->where;
+	double filter_ratio = (level == 0 ? 0.25 : 0.75);
+
+	/*Proposals of the vertices whose row changed, the candidates are the unlocked vertices with a proposal*/
+#pragma omp parallel for schedule(dynamic, 1024) if (ws->parallel)
+	for (int v = 0; v < nvtxs; v++)
+	{
+		int p = where[v], best = ws->dest_cache[v];
+
+		if (best == -1)
+		{
+			int q, conn, b_conn = 0, p_conn = 0;
+
+			best = p;
+			for (hunyuangraph_edge_t j = ws->gain_offset[v]; j < ws->gain_offset[v + 1] && (q = ws->gain_where[j]) != -1; j++)
+			{
+				conn = ws->gain_val[j];
+				if (conn > b_conn && q != p)
+				{
+					best = q;
+					b_conn = conn;
+				}
+				else if (q == p)
+					p_conn = conn;
+			}
+
+			ws->gain[v] = 0;
+			if (best != p)
+			{
+				if (b_conn >= p_conn || (p_conn - b_conn) < floor(filter_ratio * p_conn))
+					ws->gain[v] = b_conn - p_conn;
+				else
+					best = p;
+			}
+			ws->dest_cache[v] = best;
+		}
+
+		ws->dest_part[v] = best;
+		ws->select[v] = (best != p && ws->lock[v] == 0);
+		ws->pregain[v] = (ws->select[v] ? ws->gain[v] : IDX_MIN);
+	}
+
+	nfilter = hunyuangraph_krefine_compact(ws, nvtxs, NULL, ws->select, ws->list);
+
+	/*Afterburner: the gain of a candidate once the candidates with higher gains have moved*/
+#pragma omp parallel for schedule(dynamic, 256) if (ws->parallel)
+	for (int i = 0; i < nfilter; i++)
+	{
+		int v = ws->list[i], p = where[v], best = ws->dest_part[v], igain = ws->pregain[v], change = 0;
+
+		for (hunyuangraph_edge_t j = graph->xadj[v]; j < graph->xadj[v + 1]; j++)
+		{
+			int u = graph->adjncy[j], ugain = ws->pregain[u], w, q;
+
+			if (ugain > igain || (ugain == igain && u < v))
+			{
+				w = graph->adjwgt[j];
+				q = ws->dest_part[u];
+				if (q == p)
+					change -= w;
+				else if (q == best)
+					change += w;
+				q = where[u];
+				if (q == p)
+					change += w;
+				else if (q == best)
+					change -= w;
+			}
+		}
+
+		ws->select[v] = (igain + change >= 0);
+	}
+
+	num_pos = hunyuangraph_krefine_compact(ws, nfilter, ws->list, ws->select, ws->pos_move);
+
+	memset(ws->lock, 0, sizeof(char) * nvtxs);
+#pragma omp parallel if (ws->parallel)
+	{
+#pragma omp for schedule(static)
+		for (int i = 0; i < nfilter; i++)
+			ws->select[ws->list[i]] = 0;
+#pragma omp for schedule(static)
+		for (int i = 0; i < num_pos; i++)
+			ws->lock[ws->pos_move[i]] = 1;
+	}
+
+	return num_pos;
+}
+
+/*Move out of every overweight part the shortest prefix of its vertices, sorted by bid, that brings it down to maxwgt.
+  Returns the number of moves in pos_move, in (part, bucket, vertex) order.*/
+int hunyuangraph_cpu_krefine_evict(hunyuangraph_graph_t *graph, hunyuangraph_cpu_krefine_t *ws)
+{
+	int nvtxs = graph->nvtxs, nbuckets = ws->nparts * hunyuangraph_krefine_buckets, nlist = 0, num_pos;
+	int *where = graph->where, *bid = ws->bid;
+	hunyuangraph_edge_t *offsets = ws->offsets, *scan = ws->scan;
+
+#pragma omp parallel if (ws->parallel)
+	{
+		int t, nt, first, last, b, v;
+
+		hunyuangraph_krefine_thread(&t, &nt);
+		hunyuangraph_krefine_range(nvtxs, t, nt, &first, &last);
+
+		/*Counts of the thread in offsets[b * nt + t + 1]*/
+		for (b = 0; b < nbuckets; b++)
+			offsets[b * nt + t + 1] = 0;
+		for (v = first; v < last; v++)
+		{
+			if (bid[v] != -1)
+				offsets[bid[v] * nt + t + 1]++;
+		}
+
+#pragma omp barrier
+#pragma omp single
+		{
+			offsets[0] = 0;
+			for (b = 1; b <= nbuckets * nt; b++)
+				offsets[b] += offsets[b - 1];
+			for (int p = 0; p < ws->nparts; p++)
+				ws->evict_start[p] = (int)offsets[p * hunyuangraph_krefine_buckets * nt];
+			nlist = (int)offsets[nbuckets * nt];
+		}
+
+		for (v = first; v < last; v++)
+		{
+			if (bid[v] != -1)
+				ws->list[offsets[bid[v] * nt + t]++] = v;
+		}
+
+#pragma omp barrier
+#pragma omp for schedule(static)
+		for (int i = 0; i < nlist; i++)
+			scan[i + 1] = graph->vwgt[ws->list[i]];
+	}
+
+	hunyuangraph_contract_prefixsum(nlist, scan, ws->sums);
+
+	/*A vertex leaves if the weight before it in its part is below the overweight*/
+#pragma omp parallel for schedule(static) if (ws->parallel)
+	for (int i = 0; i < nlist; i++)
+	{
+		int v = ws->list[i], p = where[v];
+		ws->select[v] = (scan[i] - scan[ws->evict_start[p]] < ws->pwgts[p] - ws->maxwgt[p]);
+	}
+
+	num_pos = hunyuangraph_krefine_compact(ws, nlist, ws->list, ws->select, ws->pos_move);
+
+#pragma omp parallel for schedule(static) if (ws->parallel)
+	for (int i = 0; i < nlist; i++)
+		ws->select[ws->list[i]] = 0;
+
+	return num_pos;
+}
+
+/*Weak rebalance: vertices of overweight parts move to the adjacent part with room they are most connected to, or
+  to a part well below its limit. Returns the number of moves in pos_move.*/
+int hunyuangraph_cpu_jetrw(hunyuangraph_graph_t *graph, hunyuangraph_cpu_krefine_t *ws)
+{
+	int nvtxs = graph->nvtxs, nundersized = 0, max_dest;
+	int *where = graph->where, *vwgt = graph->vwgt, *pwgts = ws->pwgts, *maxwgt = ws->maxwgt;
+
+	for (int p = 0; p < ws->nparts; p++)
+	{
+		max_dest = (int)(maxwgt[p] * 0.99);
+		if (max_dest < maxwgt[p] - 100)
+			max_dest = maxwgt[p] - 100;
+		if (pwgts[p] < max_dest)
+			ws->undersized[nundersized++] = p;
+	}
+	if (nundersized == 0)
+		return 0;
+
+#pragma omp parallel for schedule(dynamic, 1024) if (ws->parallel)
+	for (int v = 0; v < nvtxs; v++)
+	{
+		int p = where[v], best = p, gain = 0, p_gain = 0, q;
+
+		ws->bid[v] = -1;
+		if (pwgts[p] > maxwgt[p] && vwgt[v] < 1.5 * (pwgts[p] - ws->opt_pwgts[p]))
+		{
+			for (hunyuangraph_edge_t j = ws->gain_offset[v]; j < ws->gain_offset[v + 1] && (q = ws->gain_where[j]) != -1; j++)
+			{
+				if (pwgts[q] < maxwgt[q] && ws->gain_val[j] > gain)
+				{
+					best = q;
+					gain = ws->gain_val[j];
+				}
+				if (q == p)
+					p_gain = ws->gain_val[j];
+			}
+
+			if (gain > 0)
+				gain -= p_gain;
+			else
+			{
+				best = ws->undersized[v % nundersized];
+				gain = -p_gain;
+			}
+
+			if (best != p)
+				ws->bid[v] = p * hunyuangraph_krefine_buckets + hunyuangraph_krefine_bucket(gain, vwgt[v]);
+		}
+		ws->dest_part[v] = best;
+	}
+
+	return hunyuangraph_cpu_krefine_evict(graph, ws);
+}
+
+/*First index in [start, end] whose scan is closest to find, as the cookie cutter of jetrs*/
+static inline int hunyuangraph_krefine_cut(hunyuangraph_edge_t *scan, int start, int end, hunyuangraph_edge_t find)
+{
+	int mid = (start + end) / 2;
+
+	while (start + 1 < end)
+	{
+		if (scan[mid] >= find)
+			end = mid;
+		else
+			start = mid;
+		mid = (start + end) / 2;
+	}
+
+	return (llabs((long long)(scan[end] - find)) < llabs((long long)(scan[start] - find)) ? end : start);
+}
+
+/*Strong rebalance: the least bad evictions of every overweight part, handed out in order to the parts by their room.
+  The gain of an eviction is the mean connectivity to the parts that are not overweight minus the connectivity to its
+  part. Returns the number of moves in pos_move.*/
+int hunyuangraph_cpu_jetrs(hunyuangraph_graph_t *graph, hunyuangraph_cpu_krefine_t *ws)
+{
+	int nvtxs = graph->nvtxs, num_pos, start, room;
+	int *where = graph->where, *vwgt = graph->vwgt, *pwgts = ws->pwgts, *maxwgt = ws->maxwgt;
+	hunyuangraph_edge_t *scan = ws->scan;
+
+#pragma omp parallel for schedule(dynamic, 1024) if (ws->parallel)
+	for (int v = 0; v < nvtxs; v++)
+	{
+		int p = where[v], p_gain = 0, tg = 0, tk = 0, q;
+
+		ws->bid[v] = -1;
+		if (pwgts[p] > maxwgt[p] && vwgt[v] < 2 * (pwgts[p] - ws->opt_pwgts[p]))
+		{
+			for (hunyuangraph_edge_t j = ws->gain_offset[v]; j < ws->gain_offset[v + 1] && (q = ws->gain_where[j]) != -1; j++)
+			{
+				if (q == p)
+					p_gain = ws->gain_val[j];
+				else if (pwgts[q] <= maxwgt[q])
+				{
+					tg += ws->gain_val[j];
+					tk++;
+				}
+			}
+			ws->bid[v] = p * hunyuangraph_krefine_buckets + hunyuangraph_krefine_bucket(tg / hunyuangraph_max(tk, 1) - p_gain, vwgt[v]);
+		}
+	}
+
+	num_pos = hunyuangraph_cpu_krefine_evict(graph, ws);
+	if (num_pos == 0)
+		return 0;
+
+	/*Cookie cutter: every part takes the next evictions whose weight is closest to its room*/
+#pragma omp parallel for schedule(static) if (ws->parallel)
+	for (int i = 0; i < num_pos; i++)
+		scan[i + 1] = vwgt[ws->pos_move[i]];
+	hunyuangraph_contract_prefixsum(num_pos, scan, ws->sums);
+
+	for (int p = start = 0; p < ws->nparts; p++)
+	{
+		room = hunyuangraph_max(maxwgt[p] - pwgts[p], 0);
+		ws->evict_start[p] = start;
+		ws->evict_end[p] = start = hunyuangraph_krefine_cut(scan, start, num_pos, scan[start] + room);
+	}
+
+#pragma omp parallel for schedule(dynamic, 1) if (ws->parallel)
+	for (int p = 0; p < ws->nparts; p++)
+	{
+		for (int i = ws->evict_start[p]; i < ws->evict_end[p]; i++)
+			ws->dest_part[ws->pos_move[i]] = p;
+	}
+
+	/*the evictions beyond the last range stay*/
+	return start;
+}
+
+/*Move pos_move to dest_part, update the part weights, the rows of the neighbors and the edgecut*/
+void hunyuangraph_cpu_perform_moves(hunyuangraph_graph_t *graph, hunyuangraph_cpu_krefine_t *ws, int num_pos)
+{
+	int nvtxs = graph->nvtxs, nparts = ws->nparts;
+	int *where = graph->where;
+	long long change = 0;
+
+	if (num_pos == 0)
+		return;
+
+	/*Cut change seen from the rows before the moves*/
+#pragma omp parallel for schedule(static) reduction(+ : change) if (ws->parallel)
+	for (int i = 0; i < num_pos; i++)
+	{
+		int v = ws->pos_move[i];
+		change += hunyuangraph_krefine_conn(ws, v, ws->dest_part[v]) - hunyuangraph_krefine_conn(ws, v, where[v]);
+	}
+
+#pragma omp parallel if (ws->parallel)
+	{
+		int *delta = (int *)calloc(nparts, sizeof(int));
+
+#pragma omp for schedule(static)
+		for (int i = 0; i < num_pos; i++)
+		{
+			int v = ws->pos_move[i], p = where[v], best = ws->dest_part[v];
+
+			delta[p] -= graph->vwgt[v];
+			delta[best] += graph->vwgt[v];
+			where[v] = best;
+			ws->dest_part[v] = p;
+			ws->dest_cache[v] = -1;
+			ws->select[v] = 1;
+		}
+
+#pragma omp critical
+		for (int p = 0; p < nparts; p++)
+			ws->pwgts[p] += delta[p];
+		free(delta);
+	}
+
+	/*The rows of the vertices with a moved neighbor*/
+#pragma omp parallel if (ws->parallel)
+	{
+		int *vals = (int *)malloc(sizeof(int) * 2 * nparts);
+		hunyuangraph_int_set_value(nparts, -1, vals);
+
+#pragma omp for schedule(dynamic, 1024)
+		for (int v = 0; v < nvtxs; v++)
+		{
+			for (hunyuangraph_edge_t j = graph->xadj[v]; j < graph->xadj[v + 1]; j++)
+			{
+				if (ws->select[graph->adjncy[j]])
+				{
+					ws->dest_cache[v] = -1;
+					hunyuangraph_krefine_row(graph, ws, v, vals, vals + nparts);
+					break;
+				}
+			}
+		}
+
+		free(vals);
+	}
+
+	/*Cut change seen from the rows after the moves*/
+#pragma omp parallel for schedule(static) reduction(+ : change) if (ws->parallel)
+	for (int i = 0; i < num_pos; i++)
+	{
+		int v = ws->pos_move[i];
+		change += hunyuangraph_krefine_conn(ws, v, where[v]) - hunyuangraph_krefine_conn(ws, v, ws->dest_part[v]);
+		ws->select[v] = 0;
+	}
+
+	ws->mincut -= (int)(change / 2);
+}
+
+/*Cpu k-way refinement of graph->where, keeps the best partition found and sets graph->mincut*/
+void hunyuangraph_cpu_k_refine(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int level)
+{
+	int nvtxs = graph->nvtxs, num_pos, balanced, best_cut, count = 0, balance_counter = 0, *best_where;
+	float ubfactor = hunyuangraph_admin->ubfactors[0], best_imb, curr_imb;
+	hunyuangraph_cpu_krefine_t *ws;
+
+	if (hunyuangraph_admin->nparts < 2 || nvtxs == 0)
+	{
+		graph->mincut = 0;
+		return;
+	}
+
+	ws = hunyuangraph_cpu_krefine_create(hunyuangraph_admin, graph);
+
+	best_cut = ws->mincut;
+	best_imb = hunyuangraph_krefine_imb(ws);
+	best_where = (int *)malloc(sizeof(int) * nvtxs);
+	memcpy(best_where, graph->where, sizeof(int) * nvtxs);
+
+	while (count++ <= hunyuangraph_krefine_iterations)
+	{
+		balanced = 1;
+		for (int p = 0; p < ws->nparts; p++)
+		{
+			if (ws->pwgts[p] > ws->maxwgt[p])
+				balanced = 0;
+		}
+
+		if (balanced)
+		{
+			num_pos = hunyuangraph_cpu_jetlp(graph, ws, level);
+			balance_counter = 0;
+		}
+		else
+		{
+			if (balance_counter < 2)
+				num_pos = hunyuangraph_cpu_jetrw(graph, ws);
+			else
+				num_pos = hunyuangraph_cpu_jetrs(graph, ws);
+			balance_counter++;
+		}
+
+		hunyuangraph_cpu_perform_moves(graph, ws, num_pos);
+
+		curr_imb = hunyuangraph_krefine_imb(ws);
+		if (best_imb > ubfactor && curr_imb < best_imb)
+		{
+			best_imb = curr_imb;
+			best_cut = ws->mincut;
+			memcpy(best_where, graph->where, sizeof(int) * nvtxs);
+			count = 0;
+		}
+		else if (ws->mincut < best_cut && (curr_imb <= ubfactor || curr_imb <= best_imb))
+		{
+			if (ws->mincut < hunyuangraph_krefine_tol * best_cut)
+				count = 0;
+			best_imb = curr_imb;
+			best_cut = ws->mincut;
+			memcpy(best_where, graph->where, sizeof(int) * nvtxs);
+		}
+	}
+
+	memcpy(graph->where, best_where, sizeof(int) * nvtxs);
+	graph->mincut = best_cut;
+
+	free(best_where);
+	hunyuangraph_cpu_krefine_free(&ws);
+}
+
+#endif
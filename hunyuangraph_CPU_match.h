@@ -37,8 +37,9 @@ int max, int *keys, int *tperm, int *perm)
 int Match_2HopAny(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int *perm, int *match, 
           int cnvtxs, size_t *r_nunmatched, size_t maxdegree)
 {
-  int i, pi, ii, j, jj, k, nvtxs;
-  int *xadj, *adjncy, *colptr, *rowind;
+  int i, pi, ii, jj, k, nvtxs;
+  hunyuangraph_edge_t j, *xadj;
+  int *adjncy, *colptr, *rowind;
   int *cmap;
   size_t nunmatched;
 
@@ -106,8 +107,9 @@ int Match_2HopAny(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t
 int Match_2HopAll(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int *perm, int *match, 
           int cnvtxs, size_t *r_nunmatched, size_t maxdegree)
 {
-  int i, pi, pk, ii, j, jj, k, nvtxs, mask, idegree;
-  int *xadj, *adjncy;
+  int i, pi, pk, ii, k, nvtxs, mask, idegree;
+  hunyuangraph_edge_t j, jj, *xadj;
+  int *adjncy;
   int *cmap, *mark;
   ikv_t *keys;
   size_t nunmatched, ncand;
@@ -193,8 +195,9 @@ int Match_2Hop(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *g
 
 int hunyuangraph_cpu_match_RM(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
 {
-	int i, pi, ii, j, jj, jjinc, k, nvtxs, cnvtxs, maxidx, last_unmatched;
-	int *xadj, *vwgt, *adjncy, *adjwgt, *maxvwgt;
+	int i, pi, ii, jj, jjinc, k, nvtxs, cnvtxs, maxidx, last_unmatched;
+	hunyuangraph_edge_t j, *xadj;
+	int *vwgt, *adjncy, *adjwgt, *maxvwgt;
 	int *match, *cmap, *perm;
 	size_t nunmatched=0;
 
@@ -211,7 +214,7 @@ int hunyuangraph_cpu_match_RM(hunyuangraph_admin_t *hunyuangraph_admin, hunyuang
 	match=hunyuangraph_int_set_value(nvtxs,-1, hunyuangraph_int_malloc_space(hunyuangraph_admin,nvtxs));
   	perm=hunyuangraph_int_malloc_space(hunyuangraph_admin,nvtxs);
 
-	hunyuangraph_int_randarrayofp(nvtxs,perm,nvtxs/8,1);   
+	hunyuangraph_int_randarrayofp(&hunyuangraph_admin->seed,nvtxs,perm,nvtxs/8,1);   
 
 	for (cnvtxs=0, last_unmatched=0, pi=0; pi<nvtxs; pi++) 
 	{
@@ -279,13 +282,16 @@ int hunyuangraph_cpu_match_RM(hunyuangraph_admin_t *hunyuangraph_admin, hunyuang
 	}
 
 	hunyuangraph_cpu_create_cgraph(hunyuangraph_admin, graph, cnvtxs, match);
+
+	return cnvtxs;
 }
 
 /*Get cpu graph matching params by hem*/
 int hunyuangraph_cpu_match_HEM(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
 {
-  int i,j,pi,k,nvtxs,cnvtxs,maxidx,maxwgt,last_unmatched,aved;
-  int *xadj,*vwgt,*adjncy,*adjwgt,maxvwgt;
+  int i,pi,k,nvtxs,cnvtxs,maxidx,maxwgt,last_unmatched,aved;
+  hunyuangraph_edge_t j,*xadj;
+  int *vwgt,*adjncy,*adjwgt,maxvwgt;
   int *match,*cmap,*d,*perm,*tperm;
   size_t nunmatched=0;
 
@@ -302,7 +308,7 @@ int hunyuangraph_cpu_match_HEM(hunyuangraph_admin_t *hunyuangraph_admin, hunyuan
   perm=hunyuangraph_int_malloc_space(hunyuangraph_admin,nvtxs);
   tperm=hunyuangraph_int_malloc_space(hunyuangraph_admin,nvtxs);
   d=hunyuangraph_int_malloc_space(hunyuangraph_admin,nvtxs);         
-  hunyuangraph_int_randarrayofp(nvtxs,tperm,nvtxs/8,1);   
+  hunyuangraph_int_randarrayofp(&hunyuangraph_admin->seed,nvtxs,tperm,nvtxs/8,1);   
   aved=0.7*(xadj[nvtxs]/nvtxs);
 
   for(i=0;i<nvtxs;i++){ 
@@ -402,4 +408,320 @@ int hunyuangraph_cpu_match_HEM(hunyuangraph_admin_t *hunyuangraph_admin, hunyuan
 }
 
 
+
+/*Parallel matching engine of the CPU coarsener.
+  Every vertex looks for its heaviest unmatched neighbor within maxvwgt, the
+  ties broken by a hash of the edge, so with equal edge weights it is a random
+  matching and otherwise a heavy-edge matching. The deterministic mode runs
+  handshake rounds: all vertices pick a partner from the matching of the
+  previous round, and the pairs that picked each other are matched, so the
+  result only depends on the seed, drawn from admin->seed, and not on the
+  threads. The parallel mode claims the partners in one pass with
+  compare-and-swap, which is faster but depends on the schedule. Island
+  vertices are matched with each other. The numbering of cmap is the same as
+  that of the serial matchings.*/
+
+#define hunyuangraph_match_rounds   32
+#define hunyuangraph_match_attempts 4
+#define hunyuangraph_match_parallel_nvtxs (1 << 12)
+
+/*Hash of the edge (u, v), the same from both ends*/
+static inline unsigned int hunyuangraph_match_hash(int u, int v, unsigned int seed)
+{
+	unsigned int a = (unsigned int)hunyuangraph_min(u, v), b = (unsigned int)hunyuangraph_max(u, v);
+	unsigned int h = ((a ^ seed) * 0x9e3779b1u ^ b) * 0x85ebca77u;
+
+	return h ^ (h >> 16);
+}
+
+/*Heaviest unmatched neighbor of v within maxvwgt, -1 if there is none*/
+static inline int hunyuangraph_match_best(hunyuangraph_graph_t *graph, int *match, int maxvwgt, unsigned int seed, int v)
+{
+	hunyuangraph_edge_t j;
+	int u, best = -1, bestwgt = -1;
+	unsigned int h, besthash = 0;
+
+	for (j = graph->xadj[v]; j < graph->xadj[v + 1]; j++)
+	{
+		u = graph->adjncy[j];
+		if (u == v || graph->adjwgt[j] < bestwgt || graph->vwgt[v] + graph->vwgt[u] > maxvwgt
+			|| __atomic_load_n(&match[u], __ATOMIC_RELAXED) != -1)
+			continue;
+
+		h = hunyuangraph_match_hash(u, v, seed);
+		if (graph->adjwgt[j] > bestwgt || h > besthash || (h == besthash && u > best))
+		{
+			best = u;
+			bestwgt = graph->adjwgt[j];
+			besthash = h;
+		}
+	}
+
+	return best;
+}
+
+/*Stable parallel compaction of the vertices of list (0..n-1 if list is NULL) whose flag is value*/
+int hunyuangraph_match_compact(int n, int *list, char *flag, char value, int *out, int *counts)
+{
+	int total = 0;
+
+#pragma omp parallel if (n >= hunyuangraph_match_parallel_nvtxs)
+	{
+		int i, v, k = 0, t = 0, nt = 1;
+#ifdef _OPENMP
+		t = omp_get_thread_num();
+		nt = omp_get_num_threads();
+#endif
+		int first = (long long)n * t / nt, last = (long long)n * (t + 1) / nt;
+
+		for (i = first; i < last; i++)
+		{
+			v = (list == NULL ? i : list[i]);
+			k += (flag[v] == value);
+		}
+		counts[t + 1] = k;
+
+#pragma omp barrier
+#pragma omp single
+		{
+			counts[0] = 0;
+			for (i = 1; i <= nt; i++)
+				counts[i] += counts[i - 1];
+			total = counts[nt];
+		}
+
+		for (k = counts[t], i = first; i < last; i++)
+		{
+			v = (list == NULL ? i : list[i]);
+			if (flag[v] == value)
+				out[k++] = v;
+		}
+	}
+
+	return total;
+}
+
+/*2-hop matching of the parallel engine: the unmatched vertices with fewer than maxdegree
+  neighbors are matched in pairs through their first neighbor, which owns them, so every
+  vertex is seen by one thread. key and hubs are workspaces of nvtxs. Returns the number
+  of vertices matched.*/
+int hunyuangraph_match_2hop(hunyuangraph_graph_t *graph, int *match, char *flag, int *key, int *hubs, int *counts, int maxdegree)
+{
+	int nvtxs = graph->nvtxs, nhubs, nmatched = 0;
+	hunyuangraph_edge_t *xadj = graph->xadj;
+	int *adjncy = graph->adjncy;
+
+#pragma omp parallel if (nvtxs >= hunyuangraph_match_parallel_nvtxs)
+	{
+#pragma omp for schedule(static)
+		for (int i = 0; i < nvtxs; i++)
+			flag[i] = 0;
+
+#pragma omp for schedule(static)
+		for (int i = 0; i < nvtxs; i++)
+		{
+			key[i] = -1;
+			if (match[i] == -1 && xadj[i + 1] > xadj[i] && xadj[i + 1] - xadj[i] < maxdegree)
+			{
+				key[i] = adjncy[xadj[i]];
+				__atomic_store_n(&flag[key[i]], 3, __ATOMIC_RELAXED);
+			}
+		}
+	}
+	nhubs = hunyuangraph_match_compact(nvtxs, NULL, flag, 3, hubs, counts);
+
+#pragma omp parallel for schedule(dynamic, 64) reduction(+ : nmatched) if (nhubs >= hunyuangraph_match_parallel_nvtxs)
+	for (int k = 0; k < nhubs; k++)
+	{
+		int h = hubs[k], v, prev = -1;
+
+		for (hunyuangraph_edge_t j = xadj[h]; j < xadj[h + 1]; j++)
+		{
+			v = adjncy[j];
+			if (key[v] != h || v == h || v == prev || match[v] != -1)
+				continue;
+
+			if (prev == -1)
+				prev = v;
+			else
+			{
+				match[v] = prev;
+				match[prev] = v;
+				prev = -1;
+				nmatched += 2;
+			}
+		}
+	}
+
+	return nmatched;
+}
+
+/*Get cpu graph matching params by the parallel engine*/
+int hunyuangraph_cpu_match_parallel(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int deterministic)
+{
+	int k, round, nvtxs, cnvtxs, maxvwgt, nactive, nislands, nmatched, nunmatched, parallel;
+	hunyuangraph_edge_t *xadj;
+	int *vwgt, *match, *cmap, *pick, *active, *next, *islands, *counts, *tmp;
+	char *flag;
+	unsigned int seed;
+
+	nvtxs = graph->nvtxs;
+	xadj = graph->xadj;
+	vwgt = graph->vwgt;
+	cmap = graph->cmap;
+	maxvwgt = hunyuangraph_admin->maxvwgt;
+	parallel = (nvtxs >= hunyuangraph_match_parallel_nvtxs);
+	seed = hunyuangraph_rand_next(&hunyuangraph_admin->seed);
+
+	match = hunyuangraph_int_malloc_space(hunyuangraph_admin, nvtxs);
+	pick = hunyuangraph_int_malloc_space(hunyuangraph_admin, nvtxs);
+	active = hunyuangraph_int_malloc_space(hunyuangraph_admin, nvtxs);
+	next = hunyuangraph_int_malloc_space(hunyuangraph_admin, nvtxs);
+	islands = hunyuangraph_int_malloc_space(hunyuangraph_admin, nvtxs);
+	counts = hunyuangraph_int_malloc_space(hunyuangraph_admin, hunyuangraph_get_nthreads() + 1);
+	flag = (char *)hunyuangraph_malloc_space(hunyuangraph_admin, nvtxs);
+
+	/*1: may be matched along an edge, 2: island*/
+#pragma omp parallel for schedule(static) if (parallel)
+	for (int i = 0; i < nvtxs; i++)
+	{
+		match[i] = -1;
+		pick[i] = -1;
+		flag[i] = (vwgt[i] < maxvwgt ? (xadj[i] == xadj[i + 1] ? 2 : 1) : 0);
+	}
+	nactive = hunyuangraph_match_compact(nvtxs, NULL, flag, 1, active, counts);
+	nislands = hunyuangraph_match_compact(nvtxs, NULL, flag, 2, islands, counts);
+
+	if (deterministic)
+	{
+		for (round = 0; round < hunyuangraph_match_rounds && nactive > 0; round++)
+		{
+			nmatched = 0;
+
+#pragma omp parallel if (nactive >= hunyuangraph_match_parallel_nvtxs)
+			{
+				/*the partners only get fewer, so a pick that is still unmatched is still the best*/
+#pragma omp for schedule(dynamic, 256)
+				for (k = 0; k < nactive; k++)
+				{
+					int v = active[k];
+					if (pick[v] == -1 || match[pick[v]] != -1)
+						pick[v] = hunyuangraph_match_best(graph, match, maxvwgt, seed, v);
+				}
+
+#pragma omp for schedule(static) reduction(+ : nmatched)
+				for (k = 0; k < nactive; k++)
+				{
+					int v = active[k], u = pick[v];
+					if (u != -1 && pick[u] == v)
+					{
+						match[v] = u;
+						nmatched++;
+					}
+					/*a vertex without a partner now has none later*/
+					flag[v] = (match[v] == -1 && u != -1);
+				}
+			}
+
+			if (nmatched == 0)
+				break;
+			nactive = hunyuangraph_match_compact(nactive, active, flag, 1, next, counts);
+			hunyuangraph_swap(active, next, tmp);
+		}
+	}
+	else
+	{
+#pragma omp parallel for schedule(dynamic, 256) if (parallel)
+		for (k = 0; k < nactive; k++)
+		{
+			int v = active[k], u, lock, attempt;
+
+			for (attempt = 0; attempt < hunyuangraph_match_attempts; attempt++)
+			{
+				if (__atomic_load_n(&match[v], __ATOMIC_ACQUIRE) != -1)
+					break;
+				u = hunyuangraph_match_best(graph, match, maxvwgt, seed, v);
+				if (u == -1)
+					break;
+
+				/*v is locked with -2 while u is claimed*/
+				lock = -1;
+				if (!__atomic_compare_exchange_n(&match[v], &lock, -2, 0, __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE))
+					break;
+				lock = -1;
+				if (__atomic_compare_exchange_n(&match[u], &lock, v, 0, __ATOMIC_ACQ_REL, __ATOMIC_ACQUIRE))
+				{
+					__atomic_store_n(&match[v], u, __ATOMIC_RELEASE);
+					break;
+				}
+				__atomic_store_n(&match[v], -1, __ATOMIC_RELEASE);
+			}
+		}
+	}
+
+	/* see if a 2-hop matching is required/allowed */
+	nunmatched = 0;
+#pragma omp parallel for schedule(static) reduction(+ : nunmatched) if (parallel)
+	for (int i = 0; i < nvtxs; i++)
+		nunmatched += (match[i] == -1 && xadj[i] < xadj[i + 1] && 3 * vwgt[i] < maxvwgt);
+
+	if (!hunyuangraph_admin->no2hop && nunmatched > 0.1 * nvtxs)
+	{
+		nunmatched -= hunyuangraph_match_2hop(graph, match, flag, pick, next, counts, 2);
+		if (nunmatched > 1.5 * 0.1 * nvtxs)
+			nunmatched -= hunyuangraph_match_2hop(graph, match, flag, pick, next, counts, 3);
+		if (nunmatched > 2.0 * 0.1 * nvtxs)
+			nunmatched -= hunyuangraph_match_2hop(graph, match, flag, pick, next, counts, nvtxs);
+	}
+
+	/*The matching of island vertices ignores maxvwgt, as in the serial matchings*/
+#pragma omp parallel for schedule(static) if (parallel)
+	for (k = 0; k < nislands / 2; k++)
+	{
+		match[islands[2 * k]] = islands[2 * k + 1];
+		match[islands[2 * k + 1]] = islands[2 * k];
+	}
+
+	/*match the final unmatched vertices with themselves and number the coarse vertices in vertex order*/
+#pragma omp parallel if (parallel)
+	{
+		int i, c = 0, t = 0, nt = 1;
+#ifdef _OPENMP
+		t = omp_get_thread_num();
+		nt = omp_get_num_threads();
+#endif
+		int first = (long long)nvtxs * t / nt, last = (long long)nvtxs * (t + 1) / nt;
+
+		for (i = first; i < last; i++)
+		{
+			if (match[i] == -1)
+				match[i] = i;
+			c += (i <= match[i]);
+		}
+		counts[t + 1] = c;
+
+#pragma omp barrier
+#pragma omp single
+		{
+			counts[0] = 0;
+			for (i = 1; i <= nt; i++)
+				counts[i] += counts[i - 1];
+			cnvtxs = counts[nt];
+		}
+
+		for (c = counts[t], i = first; i < last; i++)
+			if (i <= match[i])
+				cmap[i] = c++;
+
+#pragma omp barrier
+		for (i = first; i < last; i++)
+			if (i > match[i])
+				cmap[i] = cmap[match[i]];
+	}
+
+	hunyuangraph_cpu_create_cgraph(hunyuangraph_admin, graph, cnvtxs, match);
+
+	return cnvtxs;
+}
+
 #endif
\ No newline at end of file
@@ -0,0 +1,226 @@
+#ifndef _H_CPU_MULTISTART
+#define _H_CPU_MULTISTART
+
+#include "hunyuangraph_struct.h"
+#include "hunyuangraph_common.h"
+#include "hunyuangraph_admin.h"
+#include "hunyuangraph_graph.h"
+#include "hunyuangraph_balance.h"
+#include "hunyuangraph_CPU_2wayrefine.h"
+
+/*Multi-start initial bisection of the CPU backend, the host counterpart of the
+  sampled BFS bisection of the GPU. It replaces the serial trials of
+  huyuangraph_cpu_growbisection when more than one thread is available: nstarts
+  trials per thread (at least niparts) run concurrently, one per thread at a
+  time, so the time of the initial bisection does not grow with the threads.
+  The random state of a trial is drawn from the seed of the caller's admin and
+  the index of the trial, so its start vertex, balance and FM passes only
+  depend on them. It draws a random vertex; odd trials grow part 0 by BFS from
+  it, even trials from the pseudo-peripheral vertex of its component (the last
+  vertex reached by a BFS from it). The part is then balanced and refined by
+  FM passes. The first niparts trials run to the end and their best cut is the
+  reference of the others: a trial whose cut after the first pass is above
+  hunyuangraph_multistart_dominance times the reference is dropped. The best
+  where is kept, of equal cuts the one of the lower trial, so the result
+  depends on the seed and the threads but not on the schedule. Every thread
+  (at most one per trial) sets up one admin, work space and set of 2-way
+  arrays over the CSR of the coarse graph for all of its trials, so no
+  workspace is shared between threads; a trial resets the random state and
+  the work space, and rebuilds where and the boundary by its growth and
+  hunyuangraph_compute_cpu_2wayparam.*/
+
+#define hunyuangraph_multistart_dominance 1.25     //Drop a trial whose first pass cut is above this times the reference cut
+
+/*BFS from start over its component, returns the last vertex reached*/
+int hunyuangraph_multistart_peripheral(hunyuangraph_graph_t *graph, int *queue, int *tra, int start)
+{
+	int i, k, first, last;
+	hunyuangraph_edge_t j;
+
+	hunyuangraph_int_set_value(graph->nvtxs, 0, tra);
+	queue[0] = start;
+	tra[start] = 1;
+
+	for (first = 0, last = 1; first < last; first++)
+	{
+		i = queue[first];
+		for (j = graph->xadj[i]; j < graph->xadj[i + 1]; j++)
+		{
+			k = graph->adjncy[j];
+			if (tra[k] == 0)
+			{
+				queue[last++] = k;
+				tra[k] = 1;
+			}
+		}
+	}
+
+	return queue[last - 1];
+}
+
+/*Grow part 0 by BFS from start, the growth of huyuangraph_cpu_growbisection*/
+void hunyuangraph_multistart_grow(hunyuangraph_graph_t *graph, int *queue, int *tra, int start, int oneminpwgt, int onemaxpwgt, unsigned int *state)
+{
+	int i, k, nvtxs, nleft, first, last, dd, pwgts[2];
+	hunyuangraph_edge_t j;
+	int *vwgt = graph->vwgt, *where = graph->where;
+
+	nvtxs = graph->nvtxs;
+	hunyuangraph_int_set_value(nvtxs, 1, where);
+	hunyuangraph_int_set_value(nvtxs, 0, tra);
+
+	pwgts[1] = graph->tvwgt[0];
+	pwgts[0] = 0;
+	queue[0] = start;
+	tra[start] = 1;
+	first = 0;
+	last = 1;
+	nleft = nvtxs - 1;
+	dd = 0;
+
+	for (;;)
+	{
+		if (first == last)
+		{
+			if (nleft == 0 || dd)
+				break;
+
+			k = hunyuangraph_int_randinrange(state, nleft);
+			for (i = 0; i < nvtxs; i++)
+			{
+				if (tra[i] == 0)
+				{
+					if (k == 0)
+						break;
+					k--;
+				}
+			}
+
+			queue[0] = i;
+			tra[i] = 1;
+			first = 0;
+			last = 1;
+			nleft--;
+		}
+
+		i = queue[first++];
+
+		if (pwgts[0] > 0 && pwgts[1] - vwgt[i] < oneminpwgt)
+		{
+			dd = 1;
+			continue;
+		}
+
+		where[i] = 0;
+		hunyuangraph_add_sub(pwgts[0], pwgts[1], vwgt[i]);
+
+		if (pwgts[1] <= onemaxpwgt)
+			break;
+
+		dd = 0;
+		for (j = graph->xadj[i]; j < graph->xadj[i + 1]; j++)
+		{
+			k = graph->adjncy[j];
+			if (tra[k] == 0)
+			{
+				queue[last++] = k;
+				tra[k] = 1;
+				nleft--;
+			}
+		}
+	}
+}
+
+/*Run the trials first..last-1 and keep the best in bestwhere, bestcut and besttrial,
+  a trial whose first pass cut is above the dominance of reference (-1: none) is dropped*/
+void hunyuangraph_multistart_trials(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, float *ntpwgts, int first, int last,
+	unsigned int seed, int oneminpwgt, int onemaxpwgt, int reference, int *bestwhere, int *bestcut, int *besttrial)
+{
+	int nvtxs = graph->nvtxs;
+
+#pragma omp parallel num_threads(hunyuangraph_max(1, hunyuangraph_min(last - first, hunyuangraph_get_nthreads())))
+	{
+		int *queue = (int *)malloc(sizeof(int) * nvtxs);
+		int *tra = (int *)malloc(sizeof(int) * nvtxs);
+		hunyuangraph_graph_t *tgraph;
+		hunyuangraph_admin_t *tadmin;
+
+		tgraph = hunyuangraph_set_graph(hunyuangraph_admin, nvtxs, graph->xadj, graph->adjncy, graph->vwgt, graph->adjwgt, graph->tvwgt);
+		hunyuangraph_allocate_cpu_2waymem(hunyuangraph_admin, tgraph);
+
+		tadmin = hunyuangraph_set_graph_admin(2, NULL, NULL);
+		tadmin->ubfactors[0] = hunyuangraph_admin->ubfactors[0];
+		tadmin->part_balance[0] = hunyuangraph_admin->part_balance[0];
+		tadmin->part_balance[1] = hunyuangraph_admin->part_balance[1];
+		tadmin->iteration_num = hunyuangraph_admin->iteration_num;
+		hunyuangraph_allocatespace(tadmin, tgraph);
+
+#pragma omp for schedule(dynamic, 1)
+		for (int t = first; t < last; t++)
+		{
+			int start;
+
+			tadmin->seed = seed ^ ((unsigned int)t * 0x9e3779b1u);
+			hunyuangraph_reset_mcore(tadmin);
+
+			start = hunyuangraph_int_randinrange(&tadmin->seed, nvtxs);
+			if (t % 2 == 0)
+				start = hunyuangraph_multistart_peripheral(tgraph, queue, tra, start);
+
+			hunyuangraph_multistart_grow(tgraph, queue, tra, start, oneminpwgt, onemaxpwgt, &tadmin->seed);
+			hunyuangraph_compute_cpu_2wayparam(tadmin, tgraph);
+			hunyuangraph_2way_bal(tadmin, tgraph, ntpwgts);
+			hunyuangraph_cpu_2way_refine(tadmin, tgraph, ntpwgts, 1);
+
+			if (reference == -1 || tgraph->mincut <= hunyuangraph_multistart_dominance * reference)
+			{
+				if (tadmin->iteration_num > 1)
+					hunyuangraph_cpu_2way_refine(tadmin, tgraph, ntpwgts, tadmin->iteration_num - 1);
+
+#pragma omp critical
+				{
+					if (*bestcut == -1 || tgraph->mincut < *bestcut || (tgraph->mincut == *bestcut && t < *besttrial))
+					{
+						hunyuangraph_int_copy(nvtxs, tgraph->where, bestwhere);
+						*bestcut = tgraph->mincut;
+						*besttrial = t;
+					}
+				}
+			}
+		}
+
+		tgraph->xadj = NULL;
+		tgraph->vwgt = NULL;
+		tgraph->adjncy = NULL;
+		tgraph->adjwgt = NULL;
+		hunyuangraph_free_graph(&tgraph);
+		hunyuangraph_free_admin(&tadmin);
+		free(queue);
+		free(tra);
+	}
+}
+
+/*Cpu multi-start bisection of graph, leaves its where, 2-way params and mincut like huyuangraph_cpu_growbisection*/
+void hunyuangraph_cpu_multistart_bisection(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, float *ntpwgts, int niparts)
+{
+	int nvtxs, ntrials, oneminpwgt, onemaxpwgt, bestcut = -1, besttrial = -1;
+	unsigned int seed;
+
+	nvtxs = graph->nvtxs;
+	ntrials = hunyuangraph_max(niparts, hunyuangraph_min(hunyuangraph_get_nthreads() * hunyuangraph_admin->nstarts, nvtxs));
+
+	hunyuangraph_allocate_cpu_2waymem(hunyuangraph_admin, graph);
+
+	onemaxpwgt = hunyuangraph_admin->ubfactors[0] * graph->tvwgt[0] * ntpwgts[1];
+	oneminpwgt = (1.0 / hunyuangraph_admin->ubfactors[0]) * graph->tvwgt[0] * ntpwgts[1];
+	seed = hunyuangraph_rand_next(&hunyuangraph_admin->seed);
+
+	/*the first niparts trials set the reference of the others*/
+	hunyuangraph_multistart_trials(hunyuangraph_admin, graph, ntpwgts, 0, niparts, seed, oneminpwgt, onemaxpwgt, -1, graph->where, &bestcut, &besttrial);
+	if (bestcut > 0)
+		hunyuangraph_multistart_trials(hunyuangraph_admin, graph, ntpwgts, niparts, ntrials, seed, oneminpwgt, onemaxpwgt, bestcut, graph->where, &bestcut, &besttrial);
+
+	hunyuangraph_compute_cpu_2wayparam(hunyuangraph_admin, graph);
+}
+
+#endif
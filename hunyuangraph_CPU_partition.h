@@ -0,0 +1,223 @@
+#ifndef _H_CPU_PARTITION
+#define _H_CPU_PARTITION
+
+#include "hunyuangraph_struct.h"
+#include "hunyuangraph_common.h"
+#include "hunyuangraph_admin.h"
+#include "hunyuangraph_graph.h"
+#include "hunyuangraph_timer.h"
+#include "hunyuangraph_CPU_initialpartition.h"
+#include "hunyuangraph_CPU_krefine.h"
+
+/*CPU backend of hunyuangraph_PartitionGraph (HUNYUANGRAPH_BACKEND=cpu, and the
+  only backend of the -DNO_CUDA build). The k-way partition is computed on the
+  host by multilevel recursive bisection: every subgraph is coarsened by
+  hunyuangraph_cpu_coarsen (with the matching engine of HUNYUANGRAPH_CPU_MATCH),
+  bisected on the coarsest graph, refined back by hunyuangraph_cpu_refinement
+  and split into the subgraphs of its two halves. The recursion runs one depth
+  at a time. While a depth has fewer subgraphs than threads, the threads are
+  shared out among its subgraphs and used inside their bisections (parallel
+  matching and contraction); the deeper depths bisect their subgraphs
+  concurrently, one per thread. Every bisection has its own admin, so no
+  workspace is shared between threads, and its own random state, drawn from
+  the seed of the caller's admin and the parts of its subgraph, so the
+  partition only depends on the seed and the threads, not on the schedule.
+  The coarsening time of a depth is that of its bisections divided by the
+  threads that ran them. The imbalance allowed to a bisection is
+  ubfactor^(1/ceil(log2(nparts))), so the k-way partition stays within
+  ubfactor. The k-way partition is then refined on the input graph by
+  hunyuangraph_cpu_k_refine, the host port of the Jet refinement of the GPU
+  uncoarsening.*/
+
+typedef struct hunyuangraph_cpu_task_t {
+	hunyuangraph_graph_t *graph;          //Subgraph, label maps it to the input graph (NULL for the input graph)
+	int nparts;                           //Parts of the subgraph
+	int fpart;                            //First of its parts
+	float *tpwgts;                        //Target weights of its parts, sum to 1
+} hunyuangraph_cpu_task_t;
+
+/*Free a subgraph, the input graph keeps the arrays of the caller*/
+void hunyuangraph_cpu_task_free(hunyuangraph_graph_t **r_graph)
+{
+	hunyuangraph_graph_t *graph = *r_graph;
+
+	if (graph->label == NULL)
+	{
+		graph->xadj = NULL;
+		graph->vwgt = NULL;
+		graph->adjncy = NULL;
+		graph->adjwgt = NULL;
+	}
+	hunyuangraph_free_graph(r_graph);
+}
+
+/*Bisect the subgraph of a task, write its vertices to part and set the tasks of its halves (graph NULL when done),
+  returns the time of its coarsening*/
+double hunyuangraph_cpu_bisect_task(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_cpu_task_t *task, int *part, hunyuangraph_cpu_task_t *children)
+{
+	int i, lnparts, *where, *label;
+	float tpwgts2[2];
+	double coarsen_time;
+	hunyuangraph_graph_t *graph = task->graph, *lgraph, *rgraph;
+	hunyuangraph_admin_t *badmin;
+
+	children[0].graph = children[1].graph = NULL;
+	if (graph->nvtxs == 0)
+	{
+		hunyuangraph_cpu_task_free(&task->graph);
+		return 0;
+	}
+
+	badmin = hunyuangraph_set_graph_admin(2, NULL, NULL);
+	badmin->ubfactors[0] = hunyuangraph_admin->ubfactors[0];
+	badmin->cpu_match = hunyuangraph_admin->cpu_match;
+	badmin->no2hop = hunyuangraph_admin->no2hop;
+	badmin->Coarsen_threshold = hunyuangraph_admin->Coarsen_threshold;
+	badmin->nIparts = hunyuangraph_admin->nIparts;
+	badmin->nstarts = hunyuangraph_admin->nstarts;
+	badmin->seed = hunyuangraph_admin->seed ^ ((unsigned int)task->fpart * 0x9e3779b1u) ^ ((unsigned int)task->nparts * 0x85ebca6bu);
+	hunyuangraph_allocatespace(badmin, graph);
+
+	lnparts = task->nparts >> 1;
+	tpwgts2[0] = hunyuangraph_float_sum(lnparts, task->tpwgts);
+	tpwgts2[1] = 1.0 - tpwgts2[0];
+
+	hunyuangraph_cpu_mlevelbisect(badmin, graph, tpwgts2);
+
+	where = graph->where;
+	label = graph->label;
+	for (i = 0; i < graph->nvtxs; i++)
+		part[label == NULL ? i : label[i]] = where[i] + task->fpart;
+
+	if (task->nparts > 2)
+	{
+		if (label == NULL)
+			hunyuangraph_splitgraph_first(badmin, graph, &lgraph, &rgraph);
+		else
+			hunyuangraph_splitgraph(badmin, graph, &lgraph, &rgraph);
+
+		hunyuangraph_tpwgts_rescale(lnparts, 1.0 / tpwgts2[0], task->tpwgts);
+		hunyuangraph_tpwgts_rescale(task->nparts - lnparts, 1.0 / tpwgts2[1], task->tpwgts + lnparts);
+
+		children[0].graph = lgraph;
+		children[0].nparts = lnparts;
+		children[0].fpart = task->fpart;
+		children[0].tpwgts = task->tpwgts;
+		children[1].graph = rgraph;
+		children[1].nparts = task->nparts - lnparts;
+		children[1].fpart = task->fpart + lnparts;
+		children[1].tpwgts = task->tpwgts + lnparts;
+
+		/*nparts == 3: the left half is a single part*/
+		if (lnparts == 1)
+			hunyuangraph_cpu_task_free(&children[0].graph);
+	}
+
+	hunyuangraph_cpu_task_free(&task->graph);
+	coarsen_time = badmin->cpu_coarsen_time;
+	hunyuangraph_free_admin(&badmin);
+
+	return coarsen_time;
+}
+
+/*Cpu k-way partition by recursive bisection, returns the time of its coarsening*/
+double hunyuangraph_cpu_kway_partition(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int *part)
+{
+	int t, ntasks, nnext, nthreads, nouter, ninner, depth, nparts;
+	float ubfactor, *tpwgts;
+	double coarsen_time = 0, depth_time;
+	hunyuangraph_cpu_task_t *tasks, *next, *temp;
+
+	nparts = hunyuangraph_admin->nparts;
+	if (nparts == 1)
+	{
+		hunyuangraph_int_set_value(graph->nvtxs, 0, part);
+		return 0;
+	}
+
+	nthreads = hunyuangraph_get_nthreads();
+	depth = hunyuangraph_compute_log2(nparts - 1) + 1;
+	ubfactor = hunyuangraph_admin->ubfactors[0];
+	hunyuangraph_admin->ubfactors[0] = (float)pow(ubfactor, 1.0 / depth);
+
+	tpwgts = (float *)malloc(sizeof(float) * nparts);
+	memcpy(tpwgts, hunyuangraph_admin->tpwgts, sizeof(float) * nparts);
+	tasks = (hunyuangraph_cpu_task_t *)malloc(sizeof(hunyuangraph_cpu_task_t) * nparts);
+	next = (hunyuangraph_cpu_task_t *)malloc(sizeof(hunyuangraph_cpu_task_t) * 2 * nparts);
+
+	tasks[0].graph = hunyuangraph_set_graph(hunyuangraph_admin, graph->nvtxs, graph->xadj, graph->adjncy, graph->vwgt, graph->adjwgt, graph->tvwgt);
+	tasks[0].nparts = nparts;
+	tasks[0].fpart = 0;
+	tasks[0].tpwgts = tpwgts;
+	ntasks = 1;
+
+#ifdef _OPENMP
+	int max_levels = omp_get_max_active_levels();
+	omp_set_max_active_levels(2);
+#endif
+
+	while (ntasks > 0)
+	{
+		nouter = hunyuangraph_min(ntasks, nthreads);
+		ninner = hunyuangraph_max(1, nthreads / nouter);
+		depth_time = 0;
+
+#pragma omp parallel for schedule(dynamic, 1) num_threads(nouter) if (nouter > 1) reduction(+ : depth_time)
+		for (t = 0; t < ntasks; t++)
+		{
+#ifdef _OPENMP
+			omp_set_num_threads(ninner);
+#endif
+			depth_time += hunyuangraph_cpu_bisect_task(hunyuangraph_admin, &tasks[t], part, &next[2 * t]);
+		}
+		coarsen_time += depth_time / nouter;
+
+		for (nnext = 0, t = 0; t < 2 * ntasks; t++)
+		{
+			if (next[t].graph != NULL)
+				next[nnext++] = next[t];
+		}
+		ntasks = nnext;
+		hunyuangraph_swap(tasks, next, temp);
+	}
+
+#ifdef _OPENMP
+	omp_set_max_active_levels(max_levels);
+#endif
+
+	hunyuangraph_admin->ubfactors[0] = ubfactor;
+	free(tasks);
+	free(next);
+	free(tpwgts);
+
+	return coarsen_time;
+}
+
+/*Cpu graph partition algorithm, same results as the GPU path: part[nvtxs] of the input graph*/
+void hunyuangraph_cpu_partitiongraph(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, int *part)
+{
+	double coarsen_time;
+
+	printf("hunyuangraph_backend=cpu threads=%d\n", hunyuangraph_get_nthreads());
+
+	printf("begin partition\n");
+	gettimeofday(&begin_part_all, NULL);
+	// the recursive bisection coarsens and refines every subgraph itself, its coarsening is timed as part_coarsen and the rest as the initial partition
+	gettimeofday(&begin_part_init, NULL);
+	coarsen_time = hunyuangraph_cpu_kway_partition(hunyuangraph_admin, graph, part);
+	gettimeofday(&end_part_init, NULL);
+	part_coarsen += coarsen_time;
+	part_init += (end_part_init.tv_sec - begin_part_init.tv_sec) * 1000 + (end_part_init.tv_usec - begin_part_init.tv_usec) / 1000.0 - coarsen_time;
+
+	gettimeofday(&begin_part_uncoarsen, NULL);
+	graph->where = part;
+	hunyuangraph_cpu_k_refine(hunyuangraph_admin, graph, 0);
+	graph->where = NULL;
+	gettimeofday(&end_part_uncoarsen, NULL);
+	part_uncoarsen += (end_part_uncoarsen.tv_sec - begin_part_uncoarsen.tv_sec) * 1000 + (end_part_uncoarsen.tv_usec - begin_part_uncoarsen.tv_usec) / 1000.0;
+	gettimeofday(&end_part_all, NULL);
+	part_all += (end_part_all.tv_sec - begin_part_all.tv_sec) * 1000 + (end_part_all.tv_usec - begin_part_all.tv_usec) / 1000.0;
+	printf("end partition\n");
+}
+
+#endif
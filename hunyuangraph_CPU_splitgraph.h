@@ -8,9 +8,11 @@
 void hunyuangraph_splitgraph(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, \
     hunyuangraph_graph_t **r_lgraph, hunyuangraph_graph_t **r_rgraph)
 {
-  int i,j,k,l,istart,iend,mypart,nvtxs,snvtxs[2],snedges[2];
-  int *xadj,*vwgt,*adjncy,*adjwgt,*label,*where,*bndptr;
-  int *sxadj[2],*svwgt[2],*sadjncy[2],*sadjwgt[2],*slabel[2];
+  int i,k,mypart,nvtxs,snvtxs[2];
+  hunyuangraph_edge_t j,l,istart,iend,snedges[2];
+  hunyuangraph_edge_t *xadj,*sxadj[2];
+  int *vwgt,*adjncy,*adjwgt,*label,*where,*bndptr;
+  int *svwgt[2],*sadjncy[2],*sadjwgt[2],*slabel[2];
   int *rename;
   int *temp_adjncy,*temp_adjwgt;
 
@@ -93,8 +95,8 @@ void hunyuangraph_splitgraph(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangr
     iend=sxadj[mypart][snvtxs[mypart]];
     temp_adjncy=sadjncy[mypart];
 
-    for(i=0;i<iend;i++){ 
-      temp_adjncy[i]=rename[temp_adjncy[i]];
+    for(j=0;j<iend;j++){ 
+      temp_adjncy[j]=rename[temp_adjncy[j]];
     }
   }
 
@@ -169,9 +171,11 @@ void hunyuangraph_splitgraph(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangr
 void hunyuangraph_splitgraph_first(hunyuangraph_admin_t *hunyuangraph_admin, \
 	hunyuangraph_graph_t *graph, hunyuangraph_graph_t **r_lgraph, hunyuangraph_graph_t **r_rgraph)
 {
-  int i,j,k,l,istart,iend,mypart,nvtxs,snvtxs[2],snedges[2];
-  int *xadj,*vwgt,*adjncy,*adjwgt,*label,*where,*bndptr;
-  int *sxadj[2],*svwgt[2],*sadjncy[2],*sadjwgt[2],*slabel[2];
+  int i,k,mypart,nvtxs,snvtxs[2];
+  hunyuangraph_edge_t j,l,istart,iend,snedges[2];
+  hunyuangraph_edge_t *xadj,*sxadj[2];
+  int *vwgt,*adjncy,*adjwgt,*label,*where,*bndptr;
+  int *svwgt[2],*sadjncy[2],*sadjwgt[2],*slabel[2];
   int *rename;
   int *temp_adjncy,*temp_adjwgt;
 
@@ -253,8 +257,8 @@ void hunyuangraph_splitgraph_first(hunyuangraph_admin_t *hunyuangraph_admin, \
     iend=sxadj[mypart][snvtxs[mypart]];
     temp_adjncy=sadjncy[mypart];
 
-    for(i=0;i<iend;i++){ 
-      temp_adjncy[i]=rename[temp_adjncy[i]];
+    for(j=0;j<iend;j++){ 
+      temp_adjncy[j]=rename[temp_adjncy[j]];
     }
   }
 
@@ -56,7 +56,7 @@ void hunyuangraph_memcpy_coarsentoinit(hunyuangraph_graph_t *graph)
     int nedges = graph->nedges;
 
 #ifdef FIGURE10_CGRAPH
-    graph->xadj = (int *)malloc(sizeof(int) * (nvtxs + 1));
+    graph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (nvtxs + 1));
     graph->vwgt = (int *)malloc(sizeof(int) * nvtxs);
     graph->adjncy = (int *)malloc(sizeof(int) * nedges);
     graph->adjwgt = (int *)malloc(sizeof(int) * nedges);
@@ -64,7 +64,7 @@ void hunyuangraph_memcpy_coarsentoinit(hunyuangraph_graph_t *graph)
 
     // cudaDeviceSynchronize();
     // gettimeofday(&begin_coarsen_memcpy, NULL);
-    cudaMemcpy(graph->xadj, graph->cuda_xadj, (nvtxs + 1) * sizeof(int), cudaMemcpyDeviceToHost);
+    hunyuangraph_xadj_to_host(graph->xadj, graph->cuda_xadj, nvtxs);
     cudaMemcpy(graph->vwgt, graph->cuda_vwgt, nvtxs * sizeof(int), cudaMemcpyDeviceToHost);
     cudaMemcpy(graph->adjncy, graph->cuda_adjncy, nedges * sizeof(int), cudaMemcpyDeviceToHost);
     cudaMemcpy(graph->adjwgt, graph->cuda_adjwgt, nedges * sizeof(int), cudaMemcpyDeviceToHost);
@@ -238,7 +238,7 @@ hunyuangraph_graph_t *hunyuangarph_coarsen(hunyuangraph_admin_t *hunyuangraph_ad
 
         // break;
 #ifdef FIGURE9_SUM
-        printf("level %2d: nvtxs %10d nedges %10d nedges/nvtxs=%7.2lf adjwgtsum %12d\n", level[0], graph->nvtxs, graph->nedges, (double)graph->nedges / (double)graph->nvtxs, compute_graph_adjwgtsum_gpu(graph));
+        printf("level %2d: nvtxs %10d nedges %10d nedges/nvtxs=%7.2lf adjwgtsum %12d\n", level[0], graph->nvtxs, (int)graph->nedges, (double)graph->nedges / (double)graph->nvtxs, compute_graph_adjwgtsum_gpu(graph));
 #endif
 
     } while (
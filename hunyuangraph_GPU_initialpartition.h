@@ -3934,7 +3934,7 @@ void hunyuangraph_gpu_RecursiveBisection(hunyuangraph_admin_t *hunyuangraph_admi
     tpwgts0    = tpwgts2[0];
     // exit(0);
 
-    int start_num = SM_NUM * 4;
+    int start_num = SM_NUM * hunyuangraph_admin->nstarts;
     int sampling = 1;
     if(start_num > graph->nvtxs)
     {
@@ -509,13 +509,13 @@ void splitgraph_GPU(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph
 	cudaDeviceSynchronize();*/
   	// printf("lgraph->tvwgt=%d lgraph->tvwgt_reverse=%f rgraph->tvwgt=%d rgraph->tvwgt_reverse=%f\n",lgraph->tvwgt[0],lgraph->tvwgt_reverse[0],rgraph->tvwgt[0],rgraph->tvwgt_reverse[0]);
 	
-	lgraph->xadj = (int *)malloc(sizeof(int) * (lnvtxs + 1));
+	lgraph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (lnvtxs + 1));
 	lgraph->adjncy = (int *)malloc(sizeof(int) * lnedges);
 	lgraph->adjwgt = (int *)malloc(sizeof(int) * lnedges);
 	lgraph->vwgt = (int *)malloc(sizeof(int) * lnvtxs);
 	lgraph->label = (int *)malloc(sizeof(int) * lnvtxs);
 
-	rgraph->xadj = (int *)malloc(sizeof(int) * (rnvtxs + 1));
+	rgraph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (rnvtxs + 1));
 	rgraph->adjncy = (int *)malloc(sizeof(int) * rnedges);
 	rgraph->adjwgt = (int *)malloc(sizeof(int) * rnedges);
 	rgraph->vwgt = (int *)malloc(sizeof(int) * rnvtxs);
@@ -523,13 +523,13 @@ void splitgraph_GPU(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph
 
 	cudaDeviceSynchronize();
 	gettimeofday(&begin_memcpy_split, NULL);
-	cudaMemcpy(lgraph->xadj,lgraph->cuda_xadj,sizeof(int) * (lnvtxs + 1), cudaMemcpyDeviceToHost);
+	hunyuangraph_xadj_to_host(lgraph->xadj, lgraph->cuda_xadj, lnvtxs);
 	cudaMemcpy(lgraph->adjncy,lgraph->cuda_adjncy,sizeof(int) * lnedges, cudaMemcpyDeviceToHost);
 	cudaMemcpy(lgraph->adjwgt,lgraph->cuda_adjwgt,sizeof(int) * lnedges, cudaMemcpyDeviceToHost);
 	cudaMemcpy(lgraph->vwgt,lgraph->cuda_vwgt,sizeof(int) * lnvtxs, cudaMemcpyDeviceToHost);
 	cudaMemcpy(lgraph->label,lgraph->cuda_label,sizeof(int) * lnvtxs, cudaMemcpyDeviceToHost);
 
-	cudaMemcpy(rgraph->xadj,rgraph->cuda_xadj,sizeof(int) * (rnvtxs + 1), cudaMemcpyDeviceToHost);
+	hunyuangraph_xadj_to_host(rgraph->xadj, rgraph->cuda_xadj, rnvtxs);
 	cudaMemcpy(rgraph->adjncy,rgraph->cuda_adjncy,sizeof(int) * rnedges, cudaMemcpyDeviceToHost);
 	cudaMemcpy(rgraph->adjwgt,rgraph->cuda_adjwgt,sizeof(int) * rnedges, cudaMemcpyDeviceToHost);
 	cudaMemcpy(rgraph->vwgt,rgraph->cuda_vwgt,sizeof(int) * rnvtxs, cudaMemcpyDeviceToHost);
@@ -1205,12 +1205,12 @@ void exam_cpu_subgraph(hunyuangraph_graph_t *graph)
 
 	// exit(0);
 
-	lgraph->xadj = (int *)malloc(sizeof(int) * (lnvtxs + 1));
+	lgraph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (lnvtxs + 1));
 	lgraph->vwgt = (int *)malloc(sizeof(int) * lnvtxs);
 	lgraph->adjncy = (int *)malloc(sizeof(int) * lnedges);
 	lgraph->adjwgt = (int *)malloc(sizeof(int) * lnedges);
 	lgraph->label = (int *)malloc(sizeof(int) * lnvtxs);
-	rgraph->xadj = (int *)malloc(sizeof(int) * (rnvtxs + 1));
+	rgraph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (rnvtxs + 1));
 	rgraph->vwgt = (int *)malloc(sizeof(int) * rnvtxs);
 	rgraph->adjncy = (int *)malloc(sizeof(int) * rnedges);
 	rgraph->adjwgt = (int *)malloc(sizeof(int) * rnedges);
@@ -1279,7 +1279,7 @@ void exam_cpu_subgraph(hunyuangraph_graph_t *graph)
 	printf("\n");
 	for(int i = 0;i <= lnvtxs;i++)
 	{
-		printf("%7d ", lgraph->xadj[i]);
+		printf("%7d ", (int)lgraph->xadj[i]);
 	}
 	printf("\n");
 	printf("adjncy/adjwgt/where:\n");
@@ -1315,7 +1315,7 @@ void exam_cpu_subgraph(hunyuangraph_graph_t *graph)
 	printf("\n");
 	for(int i = 0;i <= rnvtxs;i++)
 	{
-		printf("%7d ", rgraph->xadj[i]);
+		printf("%7d ", (int)rgraph->xadj[i]);
 	}
 	printf("\n");
 	printf("adjncy/adjwgt/where:\n");
@@ -2,6 +2,60 @@
 #define _H_ADMIN
 
 #include "hunyuangraph_struct.h"
+#include "hunyuangraph_define.h"
+#include "hunyuangraph_common.h"
+
+/*Matching engine of the CPU coarsener from the environment, serial when unset*/
+int hunyuangraph_cpu_match_mode()
+{
+  char *mode = getenv(hunyuangraph_match_env);
+
+  if(mode==NULL||mode[0]=='\0'||strcmp(mode,"serial")==0)
+    return hunyuangraph_match_serial;
+  if(strcmp(mode,"parallel")==0)
+    return hunyuangraph_match_parallel;
+  if(strcmp(mode,"deterministic")==0)
+    return hunyuangraph_match_deterministic;
+
+  hunyuangraph_error_exit("%s=%s: expected serial, parallel or deterministic\n",hunyuangraph_match_env,mode);
+  return hunyuangraph_match_serial;
+}
+
+/*Backend of hunyuangraph_PartitionGraph from the environment, gpu when unset (cpu with -DNO_CUDA)*/
+int hunyuangraph_backend_mode()
+{
+  char *mode = getenv(hunyuangraph_backend_env);
+
+#ifdef NO_CUDA
+  if(mode==NULL||mode[0]=='\0'||strcmp(mode,"cpu")==0)
+    return hunyuangraph_backend_cpu;
+  if(strcmp(mode,"gpu")==0)
+    hunyuangraph_error_exit("%s=gpu: hunyuangraph was built with -DNO_CUDA\n",hunyuangraph_backend_env);
+#else
+  if(mode==NULL||mode[0]=='\0'||strcmp(mode,"gpu")==0)
+    return hunyuangraph_backend_gpu;
+  if(strcmp(mode,"cpu")==0)
+    return hunyuangraph_backend_cpu;
+#endif
+
+  hunyuangraph_error_exit("%s=%s: expected gpu or cpu\n",hunyuangraph_backend_env,mode);
+  return hunyuangraph_backend_cpu;
+}
+
+/*Seed of the random choices from the environment, hunyuangraph_seed_default when unset*/
+unsigned int hunyuangraph_seed_value()
+{
+  char *str = getenv(hunyuangraph_seed_env), *end;
+  unsigned long seed;
+
+  if(str==NULL||str[0]=='\0')
+    return hunyuangraph_seed_default;
+  seed=strtoul(str,&end,10);
+  if(*end!='\0'||str[0]=='-')
+    hunyuangraph_error_exit("%s=%s: expected an unsigned integer\n",hunyuangraph_seed_env,str);
+
+  return (unsigned int)seed;
+}
 
 /*Set graph admin params*/
 hunyuangraph_admin_t *hunyuangraph_set_graph_admin(int nparts, float *tpwgts, float *ubvec)
@@ -13,7 +67,11 @@ hunyuangraph_admin_t *hunyuangraph_set_graph_admin(int nparts, float *tpwgts, fl
 
   hunyuangraph_admin->iteration_num=10;
   hunyuangraph_admin->Coarsen_threshold=200;
+  hunyuangraph_admin->nstarts=4;
   hunyuangraph_admin->nparts=nparts; 
+  hunyuangraph_admin->cpu_match=hunyuangraph_cpu_match_mode();
+  hunyuangraph_admin->backend=hunyuangraph_backend_mode();
+  hunyuangraph_admin->seed=hunyuangraph_seed_value();
 
   hunyuangraph_admin->maxvwgt=0;  
   hunyuangraph_admin->ncuts=1; 
@@ -30,5 +88,29 @@ hunyuangraph_admin_t *hunyuangraph_set_graph_admin(int nparts, float *tpwgts, fl
   return hunyuangraph_admin;  
 }
 
+/*Free graph admin and its work space*/
+void hunyuangraph_free_admin(hunyuangraph_admin_t **r_admin)
+{
+  hunyuangraph_admin_t *hunyuangraph_admin=*r_admin;
+  hunyuangraph_mcore_t *mcore=hunyuangraph_admin->mcore;
+
+  if(mcore!=NULL){
+    for(size_t i=0;i<mcore->cmop;i++){
+      if(mcore->mops[i].type==3)
+        free(mcore->mops[i].ptr);
+    }
+    free(mcore->core);
+    free(mcore->mops);
+    free(mcore);
+  }
+
+  free(hunyuangraph_admin->tpwgts);
+  free(hunyuangraph_admin->ubfactors);
+  free(hunyuangraph_admin->part_balance);
+  free(hunyuangraph_admin->time_coarsen);
+  free(hunyuangraph_admin);
+  *r_admin=NULL;
+}
+
 
 #endif
\ No newline at end of file
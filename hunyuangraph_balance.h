@@ -26,8 +26,9 @@ float hunyuangraph_compute_cpu_imbal(hunyuangraph_graph_t *graph, int nparts, fl
 /*Balance two partition by moving boundary vertex*/
 void hunyuangraph_bndvertex_2way_bal(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph, float *ntpwgts)
 {
-  int i,ii,j,k,kwgt,nvtxs,nbnd,nswaps,from,to,temp;
-  int *xadj,*vwgt,*adjncy,*adjwgt,*where,*id,*ed,*bndptr,*bndlist,*pwgts;
+  int i,ii,k,kwgt,nvtxs,nbnd,nswaps,from,to,temp;
+  hunyuangraph_edge_t j,*xadj;
+  int *vwgt,*adjncy,*adjwgt,*where,*id,*ed,*bndptr,*bndlist,*pwgts;
   int *moved,*perm;
 
   hunyuangraph_queue_t *queue;
@@ -58,7 +59,7 @@ void hunyuangraph_bndvertex_2way_bal(hunyuangraph_admin_t *hunyuangraph_admin, h
   queue=hunyuangraph_queue_create(nvtxs);
   hunyuangraph_int_set_value(nvtxs,-1,moved);
   nbnd=graph->nbnd;
-  hunyuangraph_int_randarrayofp(nbnd,perm,nbnd/5,1);
+  hunyuangraph_int_randarrayofp(&hunyuangraph_admin->seed,nbnd,perm,nbnd/5,1);
 
   for(ii=0;ii<nbnd;ii++){
     i=perm[ii];
@@ -4,6 +4,10 @@
 #include "hunyuangraph_struct.h"
 #include "hunyuangraph_define.h"
 
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
 /*Error exit*/
 void hunyuangraph_error_exit(char *f_str,...)
 {
@@ -22,6 +26,16 @@ void hunyuangraph_error_exit(char *f_str,...)
     exit(-2);
 }
 
+/*Get the number of host threads*/
+int hunyuangraph_get_nthreads()
+{
+#ifdef _OPENMP
+  return omp_get_max_threads();
+#else
+  return 1;
+#endif
+}
+
 /*Compute log2 algorithm*/
 int hunyuangraph_compute_log2(int a)
 {
@@ -39,10 +53,24 @@ int hunyuangraph_int_rand()
     return (int)(uint64_t)rand(); 
 }
 
-/*Get int rand number between (0,max)*/
-int hunyuangraph_int_randinrange(int max) 
+/*Next random number of a state, the state is a LCG and its output is mixed*/
+unsigned int hunyuangraph_rand_next(unsigned int *state)
+{
+  unsigned int h;
+
+  *state=*state*1664525u+1013904223u;
+  h=*state;
+  h^=h>>16;
+  h*=0x85ebca6bu;
+  h^=h>>13;
+
+  return h;
+}
+
+/*Get int rand number between (0,max) from a random state*/
+int hunyuangraph_int_randinrange(unsigned int *state, int max) 
 {
-  return (int)((hunyuangraph_int_rand())%max); 
+  return (int)(hunyuangraph_rand_next(state)%max); 
 }
 
 /*Compute sum of int array*/
@@ -101,8 +129,8 @@ float *hunyuangraph_tpwgts_rescale(size_t n, float wsum, float *a)
   return a;
 }
 
-/*Get random permute of p*/
-void hunyuangraph_int_randarrayofp(int n, int *p, int m, int flag)
+/*Get random permute of p from a random state*/
+void hunyuangraph_int_randarrayofp(unsigned int *state, int n, int *p, int m, int flag)
 {
   int i,u,v;
   int temp;
@@ -114,8 +142,8 @@ void hunyuangraph_int_randarrayofp(int n, int *p, int m, int flag)
   if(n<10){
     for(i=0;i<n;i++){
 
-      v=hunyuangraph_int_randinrange(n);
-      u=hunyuangraph_int_randinrange(n);
+      v=hunyuangraph_int_randinrange(state,n);
+      u=hunyuangraph_int_randinrange(state,n);
      
       hunyuangraph_swap(p[v],p[u],temp);
 
@@ -124,8 +152,8 @@ void hunyuangraph_int_randarrayofp(int n, int *p, int m, int flag)
   else{
     for(i=0;i<m;i++){
 
-      v=hunyuangraph_int_randinrange(n-3);
-      u=hunyuangraph_int_randinrange(n-3);
+      v=hunyuangraph_int_randinrange(state,n-3);
+      u=hunyuangraph_int_randinrange(state,n-3);
       
       hunyuangraph_swap(p[v+0],p[u+2],temp);
       hunyuangraph_swap(p[v+1],p[u+3],temp);
@@ -153,6 +181,21 @@ hunyuangraph_mcore_t *hunyuangraph_create_mcore(size_t coresize)
   return mcore;
 }
 
+/*Return the work space of the admin to its empty state, freeing what did not fit in the core*/
+void hunyuangraph_reset_mcore(hunyuangraph_admin_t *hunyuangraph_admin)
+{
+  hunyuangraph_mcore_t *mcore=hunyuangraph_admin->mcore;
+
+  for(size_t i=0;i<mcore->cmop;i++){
+    if(mcore->mops[i].type==3)
+      free(mcore->mops[i].ptr);
+  }
+  mcore->cmop=0;
+  mcore->corecpos=0;
+  mcore->cur_callocs=0;
+  mcore->cur_hallocs=0;
+}
+
 /*Allocate work space*/
 void hunyuangraph_allocatespace(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
 {
@@ -0,0 +1,302 @@
+#ifndef _H_CSRCACHE
+#define _H_CSRCACHE
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+/*Binary CSR cache of a METIS graph file.
+  The cache is written next to the graph file as <graph>.bcsr32 (32-bit
+  indices, hunyuangraph/graph_to_grf) or <graph>.bcsr64 (64-bit indices,
+  mygpmetis) and is mapped with MAP_PRIVATE so that xadj/adjncy/vwgt/adjwgt
+  point straight into the mapping. It is rebuilt when the size, mtime or the
+  sampled content hash of the graph file change.
+
+  The header also keeps the validation summary of the graph once it has been
+  validated, so that later runs can skip the validation.
+
+  Layout: header | xadj[nvtxs+1] | adjncy[nedges] | vwgt[nvtxs] | adjwgt[nedges],
+  every section aligned to hunyuangraph_csrcache_align bytes.*/
+
+#define hunyuangraph_csrcache_magic "HYCSRBIN"
+#define hunyuangraph_csrcache_version 2
+#define hunyuangraph_csrcache_align 64
+#define hunyuangraph_csrcache_sample (1 << 20)
+
+/*Summary of the validation of a graph, see hunyuangraph_validate.h*/
+typedef struct hunyuangraph_graphcheck_t {
+	int32_t done;                         //The counts below are valid
+	int32_t reserved;
+	int64_t selfloops;                    //Adjacency entries (v, v)
+	int64_t duplicates;                   //Repeated entries (v, u) in the list of v
+	int64_t asymmetric;                   //Entries (v, u) without an entry (u, v)
+	int64_t mismatched;                   //Entries (v, u) whose weight differs from (u, v)
+} hunyuangraph_graphcheck_t;
+
+typedef struct hunyuangraph_csrcache_header_t {
+	char magic[8];
+	uint32_t version;
+	uint32_t idxwidth;                    //Bytes per index (4 or 8)
+	int64_t nvtxs;
+	int64_t nedges;                       //Adjacency entries (twice the edges)
+	int32_t fmt;                          //fmt flags of the graph file
+	uint32_t reserved;
+	uint64_t src_size;                    //Size of the graph file
+	int64_t src_mtime_sec;                //mtime of the graph file
+	int64_t src_mtime_nsec;
+	uint64_t src_hash;                    //Hash of the first and last MB of the graph file
+	uint64_t xadj_offset;
+	uint64_t adjncy_offset;
+	uint64_t vwgt_offset;
+	uint64_t adjwgt_offset;
+	uint64_t file_size;
+	hunyuangraph_graphcheck_t check;      //Validation summary, check.done == 0 if never validated
+} hunyuangraph_csrcache_header_t;
+
+typedef struct hunyuangraph_csrcache_t {
+	char *base;                           //Mapping of the whole cache file
+	size_t size;
+	hunyuangraph_csrcache_header_t *header;
+	void *xadj;
+	void *adjncy;
+	void *vwgt;
+	void *adjwgt;
+} hunyuangraph_csrcache_t;
+
+/*Get cache file name of a graph file*/
+void hunyuangraph_csrcache_name(const char *graphfile, int idxwidth, char *cachefile, size_t size)
+{
+	snprintf(cachefile, size, "%s.bcsr%d", graphfile, idxwidth * 8);
+}
+
+uint64_t hunyuangraph_csrcache_fnv(uint64_t hash, const unsigned char *p, size_t n)
+{
+	size_t i;
+	for (i = 0; i < n; i++)
+	{
+		hash ^= p[i];
+		hash *= 1099511628211ULL;
+	}
+	return hash;
+}
+
+/*Stat and hash the graph file into the source fields of header, returns 0 on failure*/
+int hunyuangraph_csrcache_source(const char *graphfile, hunyuangraph_csrcache_header_t *header)
+{
+	int fd;
+	ssize_t n;
+	struct stat status;
+	uint64_t hash = 14695981039346656037ULL;
+	unsigned char *buf;
+
+	fd = open(graphfile, O_RDONLY);
+	if (fd == -1)
+		return 0;
+	if (fstat(fd, &status) == -1)
+	{
+		close(fd);
+		return 0;
+	}
+
+	buf = (unsigned char *)malloc(hunyuangraph_csrcache_sample);
+	n = pread(fd, buf, hunyuangraph_csrcache_sample, 0);
+	if (n > 0)
+		hash = hunyuangraph_csrcache_fnv(hash, buf, n);
+	if (status.st_size > hunyuangraph_csrcache_sample)
+	{
+		n = pread(fd, buf, hunyuangraph_csrcache_sample, status.st_size - hunyuangraph_csrcache_sample);
+		if (n > 0)
+			hash = hunyuangraph_csrcache_fnv(hash, buf, n);
+	}
+	hash = hunyuangraph_csrcache_fnv(hash, (const unsigned char *)&status.st_size, sizeof(status.st_size));
+	free(buf);
+	close(fd);
+
+	header->src_size = status.st_size;
+	header->src_mtime_sec = status.st_mtim.tv_sec;
+	header->src_mtime_nsec = status.st_mtim.tv_nsec;
+	header->src_hash = hash;
+
+	return 1;
+}
+
+uint64_t hunyuangraph_csrcache_roundup(uint64_t n)
+{
+	return (n + hunyuangraph_csrcache_align - 1) / hunyuangraph_csrcache_align * hunyuangraph_csrcache_align;
+}
+
+/*Compute the section offsets of header*/
+void hunyuangraph_csrcache_layout(hunyuangraph_csrcache_header_t *header)
+{
+	uint64_t w = header->idxwidth;
+
+	header->xadj_offset = hunyuangraph_csrcache_roundup(sizeof(hunyuangraph_csrcache_header_t));
+	header->adjncy_offset = hunyuangraph_csrcache_roundup(header->xadj_offset + w * (header->nvtxs + 1));
+	header->vwgt_offset = hunyuangraph_csrcache_roundup(header->adjncy_offset + w * header->nedges);
+	header->adjwgt_offset = hunyuangraph_csrcache_roundup(header->vwgt_offset + w * header->nvtxs);
+	header->file_size = header->adjwgt_offset + w * header->nedges;
+}
+
+/*Map the cache of graphfile, returns 1 if a valid cache was mapped*/
+int hunyuangraph_csrcache_open(const char *graphfile, int idxwidth, hunyuangraph_csrcache_t *cache)
+{
+	int fd;
+	char cachefile[4096];
+	struct stat status;
+	hunyuangraph_csrcache_header_t source, check, *header;
+
+	memset(cache, 0, sizeof(hunyuangraph_csrcache_t));
+
+	hunyuangraph_csrcache_name(graphfile, idxwidth, cachefile, sizeof(cachefile));
+	fd = open(cachefile, O_RDONLY);
+	if (fd == -1)
+		return 0;
+	if (fstat(fd, &status) == -1 || (size_t)status.st_size < sizeof(hunyuangraph_csrcache_header_t))
+	{
+		close(fd);
+		return 0;
+	}
+
+	cache->size = status.st_size;
+	cache->base = (char *)mmap(NULL, cache->size, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+	close(fd);
+	if (cache->base == MAP_FAILED)
+	{
+		cache->base = NULL;
+		return 0;
+	}
+
+	header = cache->header = (hunyuangraph_csrcache_header_t *)cache->base;
+	memcpy(&check, header, sizeof(hunyuangraph_csrcache_header_t));
+	hunyuangraph_csrcache_layout(&check);
+
+	if (memcmp(header->magic, hunyuangraph_csrcache_magic, 8) != 0 ||
+		header->version != hunyuangraph_csrcache_version ||
+		header->idxwidth != (uint32_t)idxwidth ||
+		header->nvtxs <= 0 || header->nedges < 0 ||
+		check.xadj_offset != header->xadj_offset ||
+		check.adjncy_offset != header->adjncy_offset ||
+		check.vwgt_offset != header->vwgt_offset ||
+		check.adjwgt_offset != header->adjwgt_offset ||
+		check.file_size != header->file_size ||
+		header->file_size > cache->size ||
+		!hunyuangraph_csrcache_source(graphfile, &source) ||
+		source.src_size != header->src_size ||
+		source.src_mtime_sec != header->src_mtime_sec ||
+		source.src_mtime_nsec != header->src_mtime_nsec ||
+		source.src_hash != header->src_hash)
+	{
+		munmap(cache->base, cache->size);
+		memset(cache, 0, sizeof(hunyuangraph_csrcache_t));
+		return 0;
+	}
+
+	cache->xadj = cache->base + header->xadj_offset;
+	cache->adjncy = cache->base + header->adjncy_offset;
+	cache->vwgt = cache->base + header->vwgt_offset;
+	cache->adjwgt = cache->base + header->adjwgt_offset;
+	madvise(cache->base, cache->size, MADV_WILLNEED);
+
+	return 1;
+}
+
+/*Unmap the cache*/
+void hunyuangraph_csrcache_close(hunyuangraph_csrcache_t *cache)
+{
+	if (cache->base != NULL)
+		munmap(cache->base, cache->size);
+	memset(cache, 0, sizeof(hunyuangraph_csrcache_t));
+}
+
+int hunyuangraph_csrcache_put(FILE *fp, uint64_t offset, const void *data, uint64_t nbytes)
+{
+	static const char zeros[hunyuangraph_csrcache_align] = {0};
+	long pos = ftell(fp);
+
+	if (pos < 0 || (uint64_t)pos > offset)
+		return 0;
+	if (offset - pos > 0 && fwrite(zeros, 1, offset - pos, fp) != offset - pos)
+		return 0;
+	return nbytes == 0 || fwrite(data, 1, nbytes, fp) == nbytes;
+}
+
+/*Write the cache of graphfile, returns 1 on success. The cache is written to a
+  temporary file and renamed so that concurrent runs never see a partial cache.*/
+int hunyuangraph_csrcache_write(const char *graphfile, int idxwidth, int64_t nvtxs, int64_t nedges, int fmt,
+								const void *xadj, const void *adjncy, const void *vwgt, const void *adjwgt)
+{
+	FILE *fp;
+	int ok;
+	char cachefile[4096], tmpfile[4200];
+	hunyuangraph_csrcache_header_t header;
+
+	memset(&header, 0, sizeof(hunyuangraph_csrcache_header_t));
+	memcpy(header.magic, hunyuangraph_csrcache_magic, 8);
+	header.version = hunyuangraph_csrcache_version;
+	header.idxwidth = idxwidth;
+	header.nvtxs = nvtxs;
+	header.nedges = nedges;
+	header.fmt = fmt;
+	if (!hunyuangraph_csrcache_source(graphfile, &header))
+		return 0;
+	hunyuangraph_csrcache_layout(&header);
+
+	hunyuangraph_csrcache_name(graphfile, idxwidth, cachefile, sizeof(cachefile));
+	snprintf(tmpfile, sizeof(tmpfile), "%s.tmp.%d", cachefile, (int)getpid());
+
+	fp = fopen(tmpfile, "wb");
+	if (fp == NULL)
+		return 0;
+
+	ok = fwrite(&header, sizeof(header), 1, fp) == 1 &&
+		 hunyuangraph_csrcache_put(fp, header.xadj_offset, xadj, (uint64_t)idxwidth * (nvtxs + 1)) &&
+		 hunyuangraph_csrcache_put(fp, header.adjncy_offset, adjncy, (uint64_t)idxwidth * nedges) &&
+		 hunyuangraph_csrcache_put(fp, header.vwgt_offset, vwgt, (uint64_t)idxwidth * nvtxs) &&
+		 hunyuangraph_csrcache_put(fp, header.adjwgt_offset, adjwgt, (uint64_t)idxwidth * nedges);
+	ok = (fclose(fp) == 0) && ok;
+
+	if (!ok || rename(tmpfile, cachefile) != 0)
+	{
+		unlink(tmpfile);
+		return 0;
+	}
+
+	return 1;
+}
+
+/*Store the validation summary in the header of the cache of graphfile, returns 1 on success*/
+int hunyuangraph_csrcache_set_check(const char *graphfile, int idxwidth, const hunyuangraph_graphcheck_t *check)
+{
+	int fd, ok;
+	char cachefile[4096];
+	hunyuangraph_csrcache_header_t header, source;
+
+	hunyuangraph_csrcache_name(graphfile, idxwidth, cachefile, sizeof(cachefile));
+	fd = open(cachefile, O_RDWR);
+	if (fd == -1)
+		return 0;
+
+	ok = pread(fd, &header, sizeof(header), 0) == sizeof(header) &&
+		 memcmp(header.magic, hunyuangraph_csrcache_magic, 8) == 0 &&
+		 header.version == hunyuangraph_csrcache_version &&
+		 hunyuangraph_csrcache_source(graphfile, &source) &&
+		 source.src_size == header.src_size &&
+		 source.src_mtime_sec == header.src_mtime_sec &&
+		 source.src_mtime_nsec == header.src_mtime_nsec &&
+		 source.src_hash == header.src_hash;
+	if (ok)
+	{
+		header.check = *check;
+		ok = pwrite(fd, &header, sizeof(header), 0) == sizeof(header);
+	}
+	ok = (close(fd) == 0) && ok;
+
+	return ok;
+}
+
+#endif
@@ -19,6 +19,26 @@
 #define hunyuangraph_listdelete(n,list,lptr,i) do{list[lptr[i]]=list[--(n)];lptr[list[n]]=lptr[i];lptr[i]=-1;} while(0) 
 #define M_GT_N(m,n) ((m)>(n))
 
+/*Matching engines of the CPU coarsener, selected by the HUNYUANGRAPH_CPU_MATCH environment variable*/
+#define hunyuangraph_match_env "HUNYUANGRAPH_CPU_MATCH"
+#define hunyuangraph_match_serial 0             //hunyuangraph_cpu_match_RM/HEM
+#define hunyuangraph_match_parallel 1           //hunyuangraph_cpu_match_parallel, claimed with atomics
+#define hunyuangraph_match_deterministic 2      //hunyuangraph_cpu_match_parallel, handshake rounds
+
+/*Execution backends of hunyuangraph_PartitionGraph, selected by the HUNYUANGRAPH_BACKEND environment variable*/
+#define hunyuangraph_backend_env "HUNYUANGRAPH_BACKEND"
+#define hunyuangraph_backend_gpu 0              //hunyuangraph_kway_partition, the default of the CUDA build
+#define hunyuangraph_backend_cpu 1              //hunyuangraph_cpu_kway_partition, the only backend of the -DNO_CUDA build
+
+/*Seed of the random choices of the CPU backend, set by the HUNYUANGRAPH_SEED environment variable*/
+#define hunyuangraph_seed_env "HUNYUANGRAPH_SEED"
+#define hunyuangraph_seed_default 1
+
+#ifdef NO_CUDA
+/*Host-only build: the timing fences of the host code have nothing to wait for*/
+#define cudaDeviceSynchronize() 0
+#endif
+
 #define CHECK(call)                                   \
 do                                                    \
 {                                                     \
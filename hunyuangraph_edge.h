@@ -0,0 +1,22 @@
+#ifndef _H_EDGE
+#define _H_EDGE
+
+#include <stdint.h>
+#include <limits.h>
+
+/*Type of the edge offsets of a host graph (xadj and nedges).
+  By default they are int like the vertex ids. Built with -DEDGE64 they are
+  64-bit, so that graphs with more than INT_MAX adjacency entries (about 1.07
+  billion undirected edges) can be read, coarsened, contracted and split on
+  the CPU, while the vertex ids, weights and adjncy stay 32-bit. The GPU
+  arrays keep int offsets, see hunyuangraph_xadj_to_device.*/
+
+#ifdef EDGE64
+typedef int64_t hunyuangraph_edge_t;
+#define hunyuangraph_edge_max INT64_MAX
+#else
+typedef int hunyuangraph_edge_t;
+#define hunyuangraph_edge_max INT_MAX
+#endif
+
+#endif
@@ -0,0 +1,379 @@
+#include "HunyuanGRAPH.h"
+
+/*Quality of partitions of one graph.
+
+  hunyuangraph_evaluate <graph> <part file>... [-l list] [-k nparts] [-b batch] [-p] [-o out.json]
+
+  The graph is read once, with the csr cache of hunyuangraph_readgraph. The partition files, text
+  <graph>.part.<k> or binary <graph>.part.<k>.bin, are given on the command line or listed one per line
+  in -l. They are read in batches of -b files in parallel (default: one per thread), and every
+  partition of a batch is then evaluated with all the threads, in two parallel passes over the graph:
+    pass 1: part weights, edgecut, boundary vertices and communication volume (the number of other parts
+            adjacent to a vertex, summed over the vertices), and the edges inside the parts are merged
+            into a lock-free union-find;
+    pass 2: the roots of the union-find, the connected components of every part.
+  nparts is taken from -k, the binary header or the largest part id. The imbalance is the one printed
+  by hunyuangraph, the balance is the heaviest part over the average part weight. -p adds the per-part
+  weights, boundary vertices, volumes and components. The table of all files is written as JSON to -o
+  (default: <graph>.eval.json).*/
+
+typedef struct evaluate_result_t {
+	const char *filename;
+	const char *error;
+	int nvtxs;
+	int nparts;
+	long long edgecut;
+	float imbalance;
+	double balance;
+	long long max_pwgt;
+	long long min_pwgt;
+	int empty_parts;
+	long long comm_volume;
+	long long max_part_volume;
+	long long boundary;
+	long long max_part_boundary;
+	long long components;
+	long long max_part_components;
+	int disconnected_parts;
+	double time_ms;
+	long long *pwgts;                     //-p: per part
+	long long *pboundary;
+	long long *pvolume;
+	long long *pcomponents;
+} evaluate_result_t;
+
+int evaluate_nthreads()
+{
+#ifdef _OPENMP
+	return omp_get_max_threads();
+#else
+	return 1;
+#endif
+}
+
+int evaluate_thread()
+{
+#ifdef _OPENMP
+	return omp_get_thread_num();
+#else
+	return 0;
+#endif
+}
+
+/*Root of x with path halving, safe against concurrent evaluate_union*/
+static inline int evaluate_find(int *parent, int x)
+{
+	int p = __atomic_load_n(&parent[x], __ATOMIC_RELAXED);
+
+	while (p != x)
+	{
+		int gp = __atomic_load_n(&parent[p], __ATOMIC_RELAXED);
+		if (gp != p)
+			__atomic_store_n(&parent[x], gp, __ATOMIC_RELAXED);
+		x = p;
+		p = gp;
+	}
+
+	return x;
+}
+
+/*Hook the larger root under the smaller one*/
+static inline void evaluate_union(int *parent, int a, int b)
+{
+	while (1)
+	{
+		a = evaluate_find(parent, a);
+		b = evaluate_find(parent, b);
+		if (a == b)
+			return;
+		if (a < b)
+		{
+			int t = a;
+			a = b;
+			b = t;
+		}
+		int expected = a;
+		if (__atomic_compare_exchange_n(&parent[a], &expected, b, 0, __ATOMIC_RELAXED, __ATOMIC_RELAXED))
+			return;
+	}
+}
+
+/*Evaluate one partition with all the threads, parent is scratch of nvtxs ints*/
+void evaluate_partition(hunyuangraph_graph_t *graph, int *where, evaluate_result_t *r, int *parent, int perpart)
+{
+	int nvtxs = graph->nvtxs, nparts = r->nparts, nthreads = evaluate_nthreads();
+	long long edgecut = 0, tvwgt = 0;
+	long long *pwgts = (long long *)calloc((size_t)nthreads * nparts, sizeof(long long));
+	long long *pboundary = (long long *)calloc((size_t)nthreads * nparts, sizeof(long long));
+	long long *pvolume = (long long *)calloc((size_t)nthreads * nparts, sizeof(long long));
+	long long *pcomponents = (long long *)calloc((size_t)nthreads * nparts, sizeof(long long));
+	int *marker = (int *)malloc(sizeof(int) * (size_t)nthreads * nparts);
+
+#pragma omp parallel for
+	for (int i = 0; i < nvtxs; i++)
+		parent[i] = i;
+
+#pragma omp parallel reduction(+ : edgecut, tvwgt)
+	{
+		int t = evaluate_thread();
+		long long *mypwgts = pwgts + (size_t)t * nparts, *myboundary = pboundary + (size_t)t * nparts;
+		long long *myvolume = pvolume + (size_t)t * nparts;
+		int *mymarker = marker + (size_t)t * nparts;
+
+		for (int p = 0; p < nparts; p++)
+			mymarker[p] = -1;
+
+#pragma omp for schedule(dynamic, 1024)
+		for (int i = 0; i < nvtxs; i++)
+		{
+			int me = where[i], nbrs = 0;
+
+			mypwgts[me] += graph->vwgt[i];
+			tvwgt += graph->vwgt[i];
+			for (hunyuangraph_edge_t j = graph->xadj[i]; j < graph->xadj[i + 1]; j++)
+			{
+				int k = graph->adjncy[j], other = where[k];
+				if (other != me)
+				{
+					edgecut += graph->adjwgt[j];
+					if (mymarker[other] != i)
+					{
+						mymarker[other] = i;
+						nbrs++;
+					}
+				}
+				else if (k < i)
+					evaluate_union(parent, i, k);
+			}
+			if (nbrs > 0)
+			{
+				myboundary[me]++;
+				myvolume[me] += nbrs;
+			}
+		}
+
+#pragma omp for schedule(static)
+		for (int i = 0; i < nvtxs; i++)
+			if (evaluate_find(parent, i) == i)
+				pcomponents[(size_t)t * nparts + where[i]]++;
+	}
+
+	for (int t = 1; t < nthreads; t++)
+		for (int p = 0; p < nparts; p++)
+		{
+			pwgts[p] += pwgts[(size_t)t * nparts + p];
+			pboundary[p] += pboundary[(size_t)t * nparts + p];
+			pvolume[p] += pvolume[(size_t)t * nparts + p];
+			pcomponents[p] += pcomponents[(size_t)t * nparts + p];
+		}
+
+	r->edgecut = edgecut / 2;
+	r->max_pwgt = r->min_pwgt = pwgts[0];
+	r->empty_parts = r->disconnected_parts = 0;
+	r->comm_volume = r->max_part_volume = r->boundary = r->max_part_boundary = 0;
+	r->components = r->max_part_components = 0;
+	for (int p = 0; p < nparts; p++)
+	{
+		r->max_pwgt = hunyuangraph_max(r->max_pwgt, pwgts[p]);
+		r->min_pwgt = hunyuangraph_min(r->min_pwgt, pwgts[p]);
+		r->empty_parts += (pwgts[p] == 0);
+		r->comm_volume += pvolume[p];
+		r->max_part_volume = hunyuangraph_max(r->max_part_volume, pvolume[p]);
+		r->boundary += pboundary[p];
+		r->max_part_boundary = hunyuangraph_max(r->max_part_boundary, pboundary[p]);
+		r->components += pcomponents[p];
+		r->max_part_components = hunyuangraph_max(r->max_part_components, pcomponents[p]);
+		r->disconnected_parts += (pcomponents[p] > 1);
+	}
+	//as hunyuangraph_compute_imbalance_cpu
+	r->imbalance = (float)r->max_pwgt / (float)((float)nvtxs / (float)nparts) - (IMB - 1.03);
+	r->balance = (tvwgt > 0 ? (double)r->max_pwgt * nparts / tvwgt : 0);
+
+	if (perpart)
+	{
+		r->pwgts = pwgts;
+		r->pboundary = pboundary;
+		r->pvolume = pvolume;
+		r->pcomponents = pcomponents;
+	}
+	else
+	{
+		free(pwgts);
+		free(pboundary);
+		free(pvolume);
+		free(pcomponents);
+	}
+	free(marker);
+}
+
+/*Check the part ids, returns NULL or the error*/
+const char *evaluate_check(int *where, int n, int nvtxs, int nparts)
+{
+	int bad = 0;
+
+	if (n != nvtxs)
+		return "the number of part ids differs from nvtxs";
+	if (nparts <= 0)
+		return "no parts";
+#pragma omp parallel for reduction(+ : bad)
+	for (int i = 0; i < n; i++)
+		bad += (where[i] < 0 || where[i] >= nparts);
+
+	return bad ? "part id out of range" : NULL;
+}
+
+void evaluate_json_array(FILE *fp, const char *name, long long *a, int n)
+{
+	fprintf(fp, ", \"%s\": [", name);
+	for (int p = 0; p < n; p++)
+		fprintf(fp, "%s%lld", p ? ", " : "", a[p]);
+	fprintf(fp, "]");
+}
+
+void evaluate_write_json(const char *filename, const char *graphfile, hunyuangraph_graph_t *graph, evaluate_result_t *results, int nresults)
+{
+	FILE *fp = hunyuangraph_fopen((char *)filename, (char *)"w", "evaluate_write_json");
+
+	fprintf(fp, "{\"graph\": \"%s\", \"nvtxs\": %d, \"nedges\": %lld, \"partitions\": [\n", graphfile, graph->nvtxs, (long long)graph->nedges / 2);
+	for (int i = 0; i < nresults; i++)
+	{
+		evaluate_result_t *r = &results[i];
+
+		fprintf(fp, " {\"file\": \"%s\"", r->filename);
+		if (r->error != NULL)
+			fprintf(fp, ", \"error\": \"%s\"", r->error);
+		else
+		{
+			fprintf(fp, ", \"nparts\": %d, \"edgecut\": %lld, \"imbalance\": %.3f, \"balance\": %.6lf", r->nparts, r->edgecut, r->imbalance, r->balance);
+			fprintf(fp, ", \"max_pwgt\": %lld, \"min_pwgt\": %lld, \"empty_parts\": %d", r->max_pwgt, r->min_pwgt, r->empty_parts);
+			fprintf(fp, ", \"comm_volume\": %lld, \"max_part_volume\": %lld", r->comm_volume, r->max_part_volume);
+			fprintf(fp, ", \"boundary\": %lld, \"max_part_boundary\": %lld", r->boundary, r->max_part_boundary);
+			fprintf(fp, ", \"components\": %lld, \"max_part_components\": %lld, \"disconnected_parts\": %d", r->components, r->max_part_components, r->disconnected_parts);
+			fprintf(fp, ", \"time_ms\": %.3lf", r->time_ms);
+			if (r->pwgts != NULL)
+			{
+				evaluate_json_array(fp, "pwgts", r->pwgts, r->nparts);
+				evaluate_json_array(fp, "part_boundary", r->pboundary, r->nparts);
+				evaluate_json_array(fp, "part_volume", r->pvolume, r->nparts);
+				evaluate_json_array(fp, "part_components", r->pcomponents, r->nparts);
+			}
+		}
+		fprintf(fp, "}%s\n", i + 1 < nresults ? "," : "");
+	}
+	fprintf(fp, "]}\n");
+	fclose(fp);
+}
+
+/*Add the files listed in filename, one per line*/
+int evaluate_read_list(const char *filename, char ***files, int nfiles, int *capacity)
+{
+	char buf[4096];
+	FILE *fp = hunyuangraph_fopen((char *)filename, (char *)"r", "evaluate_read_list");
+
+	while (fgets(buf, sizeof(buf), fp) != NULL)
+	{
+		buf[strcspn(buf, "\r\n")] = '\0';
+		if (buf[0] == '\0' || buf[0] == '#')
+			continue;
+		if (nfiles == *capacity)
+		{
+			*capacity *= 2;
+			*files = (char **)realloc(*files, sizeof(char *) * (*capacity));
+		}
+		(*files)[nfiles++] = strdup(buf);
+	}
+	fclose(fp);
+
+	return nfiles;
+}
+
+int main(int argc, char **argv)
+{
+	char *graphfile = NULL, *out = NULL, outbuf[4096];
+	char **files;
+	int nfiles = 0, capacity = 16, nparts = 0, batch = evaluate_nthreads(), perpart = 0;
+	struct timeval begin, end;
+
+	files = (char **)malloc(sizeof(char *) * capacity);
+	for (int i = 1; i < argc; i++)
+	{
+		if (strcmp(argv[i], "-l") == 0 && i + 1 < argc)
+			nfiles = evaluate_read_list(argv[++i], &files, nfiles, &capacity);
+		else if (strcmp(argv[i], "-k") == 0 && i + 1 < argc)
+			nparts = atoi(argv[++i]);
+		else if (strcmp(argv[i], "-b") == 0 && i + 1 < argc)
+			batch = hunyuangraph_max(1, atoi(argv[++i]));
+		else if (strcmp(argv[i], "-o") == 0 && i + 1 < argc)
+			out = argv[++i];
+		else if (strcmp(argv[i], "-p") == 0)
+			perpart = 1;
+		else if (argv[i][0] == '-')
+			hunyuangraph_error_exit("Usage: %s <graph> <part file>... [-l list] [-k nparts] [-b batch] [-p] [-o out.json]\n", argv[0]);
+		else if (graphfile == NULL)
+			graphfile = argv[i];
+		else
+		{
+			if (nfiles == capacity)
+			{
+				capacity *= 2;
+				files = (char **)realloc(files, sizeof(char *) * capacity);
+			}
+			files[nfiles++] = argv[i];
+		}
+	}
+	if (graphfile == NULL || nfiles == 0)
+		hunyuangraph_error_exit("Usage: %s <graph> <part file>... [-l list] [-k nparts] [-b batch] [-p] [-o out.json]\n", argv[0]);
+	if (out == NULL)
+	{
+		snprintf(outbuf, sizeof(outbuf), "%s.eval.json", graphfile);
+		out = outbuf;
+	}
+
+	hunyuangraph_graph_t *graph = hunyuangraph_readgraph(graphfile);
+	evaluate_result_t *results = (evaluate_result_t *)calloc(nfiles, sizeof(evaluate_result_t));
+	int *parent = (int *)malloc(sizeof(int) * (graph->nvtxs + 1));
+	int **wheres = (int **)malloc(sizeof(int *) * batch);
+	int *ns = (int *)malloc(sizeof(int) * batch);
+	int *nps = (int *)malloc(sizeof(int) * batch);
+
+	gettimeofday(&begin, NULL);
+	for (int first = 0; first < nfiles; first += batch)
+	{
+		int count = hunyuangraph_min(batch, nfiles - first);
+
+		//one file per thread, the text parser is serial
+#pragma omp parallel for schedule(dynamic, 1)
+		for (int b = 0; b < count; b++)
+			wheres[b] = hunyuangraph_partfile_read(files[first + b], &ns[b], &nps[b]);
+
+		for (int b = 0; b < count; b++)
+		{
+			evaluate_result_t *r = &results[first + b];
+			struct timeval file_begin, file_end;
+
+			gettimeofday(&file_begin, NULL);
+			r->filename = files[first + b];
+			r->nvtxs = graph->nvtxs;
+			r->nparts = (nparts > 0 ? nparts : nps[b]);
+			r->error = (wheres[b] == NULL ? "cannot read the partition file" : evaluate_check(wheres[b], ns[b], graph->nvtxs, r->nparts));
+			if (r->error == NULL)
+				evaluate_partition(graph, wheres[b], r, parent, perpart);
+			gettimeofday(&file_end, NULL);
+			r->time_ms = (file_end.tv_sec - file_begin.tv_sec) * 1000 + (file_end.tv_usec - file_begin.tv_usec) / 1000.0;
+
+			if (r->error != NULL)
+				printf("%s: %s\n", r->filename, r->error);
+			else
+				printf("%s: nparts=%d edgecut=%lld imbalance=%.3f comm_volume=%lld boundary=%lld components=%lld %.3lf ms\n",
+					r->filename, r->nparts, r->edgecut, r->imbalance, r->comm_volume, r->boundary, r->components, r->time_ms);
+			free(wheres[b]);
+		}
+	}
+	gettimeofday(&end, NULL);
+
+	evaluate_write_json(out, graphfile, graph, results, nfiles);
+	printf("Evaluate_time=        %10.3lf ms %d files, %s\n",
+		(end.tv_sec - begin.tv_sec) * 1000 + (end.tv_usec - begin.tv_usec) / 1000.0, nfiles, out);
+
+	return 0;
+}
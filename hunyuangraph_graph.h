@@ -1,9 +1,13 @@
 #ifndef _H_GRAPH
 #define _H_GRAPH
 
+#include <sys/mman.h>
 #include "hunyuangraph_struct.h"
 #include "hunyuangraph_common.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_memory.h"
+#endif
+#include "hunyuangraph_metrics.h"
 
 /*Set graph params*/
 void hunyuangraph_init_cpu_graph(hunyuangraph_graph_t *graph)
@@ -29,6 +33,8 @@ void hunyuangraph_init_cpu_graph(hunyuangraph_graph_t *graph)
 	graph->bndlist = NULL;
 	graph->coarser = NULL;
 	graph->finer = NULL;
+	graph->map_base = NULL;
+	graph->map_size = 0;
 	graph->h_bin_offset = NULL;
 
 	//GPU
@@ -91,7 +97,7 @@ void hunyuangraph_set_graph_label(hunyuangraph_graph_t *graph)
 }
 
 /*Set graph information*/
-hunyuangraph_graph_t *hunyuangraph_set_graph(hunyuangraph_admin_t *hunyuangraph_admin, int nvtxs, int *xadj, int *adjncy, int *vwgt, int *adjwgt, int *tvwgt)
+hunyuangraph_graph_t *hunyuangraph_set_graph(hunyuangraph_admin_t *hunyuangraph_admin, int nvtxs, hunyuangraph_edge_t *xadj, int *adjncy, int *vwgt, int *adjwgt, int *tvwgt)
 {
   hunyuangraph_graph_t *graph = hunyuangraph_create_cpu_graph();
 
@@ -117,7 +123,7 @@ hunyuangraph_graph_t *hunyuangraph_set_graph(hunyuangraph_admin_t *hunyuangraph_
   return graph;
 }
 
-hunyuangraph_graph_t *hunyuangraph_set_first_level_graph(int nvtxs, int *xadj, int *adjncy, int *vwgt, int *adjwgt)
+hunyuangraph_graph_t *hunyuangraph_set_first_level_graph(int nvtxs, hunyuangraph_edge_t *xadj, int *adjncy, int *vwgt, int *adjwgt)
 {
   int i;
   hunyuangraph_graph_t *graph;
@@ -140,36 +146,60 @@ hunyuangraph_graph_t *hunyuangraph_set_first_level_graph(int nvtxs, int *xadj, i
   return graph;
 }
 
-/*Compute Partition result edge-cut*/
-int hunyuangraph_computecut_cpu(hunyuangraph_graph_t *graph, int *where)
+#ifndef NO_CUDA
+/*Copy a host xadj to the int xadj of the GPU graph, narrowed with -DEDGE64*/
+void hunyuangraph_xadj_to_device(int *cuda_xadj, hunyuangraph_edge_t *xadj, int nvtxs)
 {
-  int i, j, cut = 0;
-  for (i = 0; i < graph->nvtxs; i++)
-  {
-    // printf("i=%d\n",i);
-    for (j = graph->xadj[i]; j < graph->xadj[i + 1]; j++)
-      if (where[i] != where[graph->adjncy[j]])
-        cut += graph->adjwgt[j];
-  }
-  return cut / 2;
+#ifdef EDGE64
+  int *buffer = (int *)malloc(sizeof(int) * (nvtxs + 1));
+#pragma omp parallel for if (nvtxs >= (1 << 16))
+  for (int i = 0; i <= nvtxs; i++)
+    buffer[i] = (int)xadj[i];
+  cudaMemcpy(cuda_xadj, buffer, (nvtxs + 1) * sizeof(int), cudaMemcpyHostToDevice);
+  free(buffer);
+#else
+  cudaMemcpy(cuda_xadj, xadj, (nvtxs + 1) * sizeof(int), cudaMemcpyHostToDevice);
+#endif
+}
+
+/*Copy the int xadj of the GPU graph to a host xadj, widened with -DEDGE64*/
+void hunyuangraph_xadj_to_host(hunyuangraph_edge_t *xadj, int *cuda_xadj, int nvtxs)
+{
+#ifdef EDGE64
+  int *buffer = (int *)malloc(sizeof(int) * (nvtxs + 1));
+  cudaMemcpy(buffer, cuda_xadj, (nvtxs + 1) * sizeof(int), cudaMemcpyDeviceToHost);
+#pragma omp parallel for if (nvtxs >= (1 << 16))
+  for (int i = 0; i <= nvtxs; i++)
+    xadj[i] = buffer[i];
+  free(buffer);
+#else
+  cudaMemcpy(xadj, cuda_xadj, (nvtxs + 1) * sizeof(int), cudaMemcpyDeviceToHost);
+#endif
+}
+#endif
+
+/*Compute Partition result edge-cut, in parallel, see hunyuangraph_metrics.h*/
+long long hunyuangraph_computecut_cpu(hunyuangraph_graph_t *graph, int *where)
+{
+  return hunyuangraph_metrics_edgecut32(graph->nvtxs, graph->xadj, graph->adjncy, graph->adjwgt, where);
 }
 
 float hunyuangraph_compute_imbalance_cpu(hunyuangraph_graph_t *graph, int *where, int nparts)
 {
-	int i, j, cut = 0;
+	int i;
 	float imbalance = 0.0;
-	int *pwgts = (int *)malloc(sizeof(int) * nparts);
-	memset(pwgts, 0, sizeof(int) * nparts);
+	long long *pwgts = (long long *)malloc(sizeof(long long) * nparts);
 
-	for(i = 0; i < graph->nvtxs; i++)
-		pwgts[where[i]] += graph->vwgt[i];
+	hunyuangraph_metrics_pwgts32(graph->nvtxs, graph->vwgt, where, nparts, pwgts);
 
 	for(i = 0;i < nparts;i++)
-		imbalance = max(imbalance, (float)pwgts[i] / (float)((float)graph->nvtxs / (float)nparts));
+		imbalance = hunyuangraph_max(imbalance, (float)pwgts[i] / (float)((float)graph->nvtxs / (float)nparts));
 	imbalance -= (IMB - 1.03);
+	free(pwgts);
 	return imbalance;
 }
 
+#ifndef NO_CUDA
 __device__ int reduction_warp(int val)
 {
 	val += __shfl_down_sync(0xffffffff, val, 16);
@@ -315,20 +345,24 @@ int compute_graph_select_gpu(hunyuangraph_graph_t *graph)
 	return sum_block;
 }
 
+#endif
+
 int compute_graph_adjwgtsum_cpu(hunyuangraph_graph_t *graph)
 {
   int sum = 0;
-  for (int i = 0; i < graph->nedges; i++)
+  for (hunyuangraph_edge_t i = 0; i < graph->nedges; i++)
     sum += graph->adjwgt[i];
   return sum;
 }
 
+#ifndef NO_CUDA
 int compute_graph_adjwgtsum_gpu(hunyuangraph_graph_t *graph)
 {
   int sum = thrust::reduce(thrust::device, graph->cuda_adjwgt, graph->cuda_adjwgt + graph->nedges);
 
   return sum;
 }
+#endif
 
 /*Malloc cpu coarsen graph params*/
 hunyuangraph_graph_t *hunyuangraph_set_cpu_cgraph(hunyuangraph_graph_t *graph, int cnvtxs)
@@ -337,9 +371,8 @@ hunyuangraph_graph_t *hunyuangraph_set_cpu_cgraph(hunyuangraph_graph_t *graph, i
   cgraph = hunyuangraph_create_cpu_graph();
 
   cgraph->nvtxs = cnvtxs;
-  cgraph->xadj = (int *)malloc(sizeof(int) * (cnvtxs + 1));
-  cgraph->adjncy = (int *)malloc(sizeof(int) * (graph->nedges));
-  cgraph->adjwgt = (int *)malloc(sizeof(int) * (graph->nedges));
+  // adjncy/adjwgt are allocated by the contraction once the number of coarse edges is known
+  cgraph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (cnvtxs + 1));
   cgraph->vwgt = (int *)malloc(sizeof(int) * cnvtxs);
   cgraph->tvwgt = (int *)malloc(sizeof(int));
   cgraph->tvwgt_reverse = (float *)malloc(sizeof(float));
@@ -367,7 +400,7 @@ hunyuangraph_graph_t *hunyuangraph_set_gpu_cgraph(hunyuangraph_graph_t *graph, i
 }
 
 /*Set split graph params*/
-hunyuangraph_graph_t *hunyuangraph_set_splitgraph(hunyuangraph_graph_t *graph, int snvtxs, int snedges)
+hunyuangraph_graph_t *hunyuangraph_set_splitgraph(hunyuangraph_graph_t *graph, int snvtxs, hunyuangraph_edge_t snedges)
 {
   hunyuangraph_graph_t *sgraph;
   sgraph = hunyuangraph_create_cpu_graph();
@@ -375,7 +408,7 @@ hunyuangraph_graph_t *hunyuangraph_set_splitgraph(hunyuangraph_graph_t *graph, i
   sgraph->nvtxs = snvtxs;
   sgraph->nedges = snedges;
 
-  sgraph->xadj = (int *)malloc(sizeof(int) * (snvtxs + 1));
+  sgraph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (snvtxs + 1));
   sgraph->vwgt = (int *)malloc(sizeof(int) * (snvtxs + 1));
   sgraph->adjncy = (int *)malloc(sizeof(int) * (snedges));
   sgraph->adjwgt = (int *)malloc(sizeof(int) * (snedges));
@@ -392,10 +425,20 @@ void hunyuangraph_free_graph(hunyuangraph_graph_t **r_graph)
   hunyuangraph_graph_t *graph;
   graph = *r_graph;
 
-  free(graph->xadj);
-  free(graph->vwgt);
-  free(graph->adjncy);
-  free(graph->adjwgt);
+  if (graph->map_base != NULL)
+  {
+    // with -DEDGE64 the xadj of a csr cache is a widened copy
+    if ((char *)graph->xadj < graph->map_base || (char *)graph->xadj >= graph->map_base + graph->map_size)
+      free(graph->xadj);
+    munmap(graph->map_base, graph->map_size);
+  }
+  else
+  {
+    free(graph->xadj);
+    free(graph->vwgt);
+    free(graph->adjncy);
+    free(graph->adjwgt);
+  }
   free(graph->where);
   free(graph->pwgts);
   free(graph->id);
@@ -410,6 +453,7 @@ void hunyuangraph_free_graph(hunyuangraph_graph_t **r_graph)
   *r_graph = NULL;
 }
 
+#ifndef NO_CUDA
 __global__ void exam_csr(int nvtxs, int *xadj, int *adjncy, int *adjwgt)
 {
 	// for (int i = 0; i <= nvtxs && i < 200; i++)
@@ -506,4 +550,6 @@ __global__ void exam_map(int nvtxs, int *map, int *where)
 	printf("\n");
 }
 
+#endif
+
 #endif
\ No newline at end of file
@@ -0,0 +1,366 @@
+#ifndef _H_GZSTREAM
+#define _H_GZSTREAM
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <pthread.h>
+#ifndef NO_ZLIB
+#include <zlib.h>
+#endif
+
+/*Streaming gzip decompression for the graph and matrix readers.
+  A decompressor thread inflates the file while the caller parses what has
+  already been inflated, so nothing is ever written to scratch disk. Two ways
+  of consuming the stream are offered:
+  - blocks: the thread fills a ring of hunyuangraph_gzstream_nblocks buffers,
+    every block ends at a line boundary (the partial last line is carried over
+    into the next block), so each block can be handed to a line parser as is;
+  - FILE *: the thread writes into a pipe whose read end is returned as a
+    FILE *, for fscanf based readers such as mmio.
+  Build with -DNO_ZLIB to drop the zlib dependency, gzip files are then
+  detected but cannot be opened.*/
+
+#define hunyuangraph_gzstream_nblocks 4
+#define hunyuangraph_gzstream_block_size (16 << 20)
+#define hunyuangraph_gzstream_pipe_size (1 << 20)
+
+typedef struct hunyuangraph_gzblock_t {
+	char *data;
+	size_t size;                          //Bytes of complete lines
+	size_t cap;
+} hunyuangraph_gzblock_t;
+
+typedef struct hunyuangraph_gzstream_t {
+#ifndef NO_ZLIB
+	gzFile gz;
+#endif
+	pthread_t thread;
+	pthread_mutex_t lock;
+	pthread_cond_t cond;
+	hunyuangraph_gzblock_t blocks[hunyuangraph_gzstream_nblocks];
+	int head;                             //First filled block
+	int count;                            //Filled blocks
+	int done;                             //The thread has delivered the last block
+	volatile int stop;                    //The consumer asks the thread to stop
+	int error;                            //Decompression failed
+	size_t total;                         //Inflated bytes delivered
+	int pipefd[2];
+	FILE *fp;
+} hunyuangraph_gzstream_t;
+
+/*Check the gzip magic of a file*/
+int hunyuangraph_gzstream_is_gz(const char *filename)
+{
+	int fd;
+	unsigned char magic[2];
+	ssize_t n;
+
+	fd = open(filename, O_RDONLY);
+	if (fd == -1)
+		return 0;
+	n = read(fd, magic, 2);
+	close(fd);
+
+	return n == 2 && magic[0] == 0x1f && magic[1] == 0x8b;
+}
+
+#ifndef NO_ZLIB
+
+/*Inflate up to n bytes, returns the bytes read or -1 on error*/
+ssize_t hunyuangraph_gzstream_read(hunyuangraph_gzstream_t *s, char *buf, size_t n)
+{
+	size_t len = 0;
+	int r;
+
+	while (len < n)
+	{
+		r = gzread(s->gz, buf + len, (unsigned int)(n - len < (1U << 30) ? n - len : (1U << 30)));
+		if (r < 0)
+			return -1;
+		if (r == 0)
+			break;
+		len += r;
+	}
+
+	return len;
+}
+
+/*Decompressor thread of the block mode*/
+void *hunyuangraph_gzstream_blocks_thread(void *arg)
+{
+	hunyuangraph_gzstream_t *s = (hunyuangraph_gzstream_t *)arg;
+	hunyuangraph_gzblock_t *b;
+	char *carry = NULL, *nl;
+	size_t ncarry = 0, carrycap = 0, len, tail;
+	ssize_t n;
+	int eof = 0, error = 0;
+
+	while (!eof && !error)
+	{
+		pthread_mutex_lock(&s->lock);
+		while (s->count == hunyuangraph_gzstream_nblocks && !s->stop)
+			pthread_cond_wait(&s->cond, &s->lock);
+		if (s->stop)
+		{
+			pthread_mutex_unlock(&s->lock);
+			break;
+		}
+		b = &s->blocks[(s->head + s->count) % hunyuangraph_gzstream_nblocks];
+		pthread_mutex_unlock(&s->lock);
+
+		/*Start with the partial line of the previous block*/
+		if (b->cap < ncarry + hunyuangraph_gzstream_block_size)
+		{
+			b->cap = ncarry + hunyuangraph_gzstream_block_size;
+			b->data = (char *)realloc(b->data, b->cap);
+		}
+		memcpy(b->data, carry, ncarry);
+		len = ncarry;
+
+		while (1)
+		{
+			n = hunyuangraph_gzstream_read(s, b->data + len, b->cap - len);
+			if (n < 0)
+			{
+				error = 1;
+				break;
+			}
+			len += n;
+			if (len < b->cap)
+			{
+				eof = 1;
+				break;
+			}
+
+			for (tail = len; tail > ncarry && b->data[tail - 1] != '\n'; tail--)
+				;
+			if (tail > ncarry)
+			{
+				nl = b->data + tail - 1;
+				break;
+			}
+
+			/*A line longer than the block*/
+			b->cap *= 2;
+			b->data = (char *)realloc(b->data, b->cap);
+		}
+
+		if (eof || error)
+		{
+			b->size = len;
+			ncarry = 0;
+		}
+		else
+		{
+			b->size = nl + 1 - b->data;
+			ncarry = len - b->size;
+			if (carrycap < ncarry)
+			{
+				carrycap = ncarry;
+				carry = (char *)realloc(carry, carrycap);
+			}
+			memcpy(carry, nl + 1, ncarry);
+		}
+
+		pthread_mutex_lock(&s->lock);
+		if (!error && b->size > 0)
+		{
+			s->count++;
+			s->total += b->size;
+		}
+		s->error = error;
+		s->done = eof || error;
+		pthread_cond_broadcast(&s->cond);
+		pthread_mutex_unlock(&s->lock);
+	}
+
+	free(carry);
+	return NULL;
+}
+
+/*Open a gzip file for block reading, returns 0 on failure*/
+int hunyuangraph_gzstream_open(const char *filename, hunyuangraph_gzstream_t *s)
+{
+	memset(s, 0, sizeof(hunyuangraph_gzstream_t));
+
+	s->gz = gzopen(filename, "rb");
+	if (s->gz == NULL)
+		return 0;
+	gzbuffer(s->gz, 1 << 20);
+
+	pthread_mutex_init(&s->lock, NULL);
+	pthread_cond_init(&s->cond, NULL);
+	if (pthread_create(&s->thread, NULL, hunyuangraph_gzstream_blocks_thread, s) != 0)
+	{
+		gzclose(s->gz);
+		return 0;
+	}
+
+	return 1;
+}
+
+/*Wait for the next block, returns its size or 0 at the end of the stream (check s->error)*/
+size_t hunyuangraph_gzstream_next(hunyuangraph_gzstream_t *s, const char **data)
+{
+	size_t size = 0;
+
+	pthread_mutex_lock(&s->lock);
+	while (s->count == 0 && !s->done)
+		pthread_cond_wait(&s->cond, &s->lock);
+	if (s->count > 0)
+	{
+		*data = s->blocks[s->head].data;
+		size = s->blocks[s->head].size;
+	}
+	pthread_mutex_unlock(&s->lock);
+
+	return size;
+}
+
+/*Give the block returned by hunyuangraph_gzstream_next back to the thread*/
+void hunyuangraph_gzstream_release(hunyuangraph_gzstream_t *s)
+{
+	pthread_mutex_lock(&s->lock);
+	s->head = (s->head + 1) % hunyuangraph_gzstream_nblocks;
+	s->count--;
+	pthread_cond_broadcast(&s->cond);
+	pthread_mutex_unlock(&s->lock);
+}
+
+/*Stop the thread and free the blocks*/
+void hunyuangraph_gzstream_close(hunyuangraph_gzstream_t *s)
+{
+	int i;
+
+	pthread_mutex_lock(&s->lock);
+	s->stop = 1;
+	pthread_cond_broadcast(&s->cond);
+	pthread_mutex_unlock(&s->lock);
+	pthread_join(s->thread, NULL);
+
+	gzclose(s->gz);
+	pthread_mutex_destroy(&s->lock);
+	pthread_cond_destroy(&s->cond);
+	for (i = 0; i < hunyuangraph_gzstream_nblocks; i++)
+		free(s->blocks[i].data);
+}
+
+/*Decompressor thread of the FILE * mode*/
+void *hunyuangraph_gzstream_pipe_thread(void *arg)
+{
+	hunyuangraph_gzstream_t *s = (hunyuangraph_gzstream_t *)arg;
+	char *buf = (char *)malloc(hunyuangraph_gzstream_pipe_size);
+	ssize_t n, w, off;
+
+	while (!s->stop)
+	{
+		n = hunyuangraph_gzstream_read(s, buf, hunyuangraph_gzstream_pipe_size);
+		if (n <= 0)
+		{
+			s->error = (n < 0);
+			break;
+		}
+		for (off = 0; off < n; off += w)
+		{
+			w = write(s->pipefd[1], buf + off, n - off);
+			if (w <= 0)
+				break;
+		}
+		if (off < n)
+			break;
+		s->total += n;
+	}
+
+	close(s->pipefd[1]);
+	free(buf);
+	return NULL;
+}
+
+/*Open a gzip file as a FILE * fed by the decompressor thread, returns NULL on failure*/
+FILE *hunyuangraph_gzstream_fopen(const char *filename, hunyuangraph_gzstream_t *s)
+{
+	memset(s, 0, sizeof(hunyuangraph_gzstream_t));
+
+	s->gz = gzopen(filename, "rb");
+	if (s->gz == NULL)
+		return NULL;
+	gzbuffer(s->gz, 1 << 20);
+
+	if (pipe(s->pipefd) != 0)
+	{
+		gzclose(s->gz);
+		return NULL;
+	}
+#ifdef F_SETPIPE_SZ
+	fcntl(s->pipefd[1], F_SETPIPE_SZ, hunyuangraph_gzstream_pipe_size);
+#endif
+
+	s->fp = fdopen(s->pipefd[0], "r");
+	if (s->fp == NULL || pthread_create(&s->thread, NULL, hunyuangraph_gzstream_pipe_thread, s) != 0)
+	{
+		if (s->fp != NULL)
+			fclose(s->fp);
+		else
+			close(s->pipefd[0]);
+		close(s->pipefd[1]);
+		gzclose(s->gz);
+		return NULL;
+	}
+	setvbuf(s->fp, NULL, _IOFBF, hunyuangraph_gzstream_pipe_size);
+
+	return s->fp;
+}
+
+/*Close a FILE * opened by hunyuangraph_gzstream_fopen. The rest of the pipe is
+  drained so that the thread never writes into a closed pipe.*/
+void hunyuangraph_gzstream_fclose(hunyuangraph_gzstream_t *s)
+{
+	char buf[65536];
+
+	s->stop = 1;
+	while (fread(buf, 1, sizeof(buf), s->fp) > 0)
+		;
+	pthread_join(s->thread, NULL);
+
+	fclose(s->fp);
+	gzclose(s->gz);
+	s->fp = NULL;
+}
+
+#else
+
+int hunyuangraph_gzstream_open(const char *filename, hunyuangraph_gzstream_t *s)
+{
+	memset(s, 0, sizeof(hunyuangraph_gzstream_t));
+	return 0;
+}
+
+size_t hunyuangraph_gzstream_next(hunyuangraph_gzstream_t *s, const char **data)
+{
+	return 0;
+}
+
+void hunyuangraph_gzstream_release(hunyuangraph_gzstream_t *s)
+{
+}
+
+void hunyuangraph_gzstream_close(hunyuangraph_gzstream_t *s)
+{
+}
+
+FILE *hunyuangraph_gzstream_fopen(const char *filename, hunyuangraph_gzstream_t *s)
+{
+	memset(s, 0, sizeof(hunyuangraph_gzstream_t));
+	return NULL;
+}
+
+void hunyuangraph_gzstream_fclose(hunyuangraph_gzstream_t *s)
+{
+}
+
+#endif
+
+#endif
@@ -4,6 +4,11 @@
 #include <stdio.h>
 #include "hunyuangraph_struct.h"
 #include "hunyuangraph_graph.h"
+#include "hunyuangraph_parse.h"
+#include "hunyuangraph_csrcache.h"
+#include "hunyuangraph_gzstream.h"
+#include "hunyuangraph_partfile.h"
+#include "hunyuangraph_validate.h"
 
 /*Open file*/
 FILE *hunyuangraph_fopen(char *fname, char *mode, const char *msg)
@@ -21,39 +26,88 @@ FILE *hunyuangraph_fopen(char *fname, char *mode, const char *msg)
 	return NULL;
 }
 
-/*Read graph file*/
-hunyuangraph_graph_t *hunyuangraph_readgraph(char *filename)
+/*Read graph from its binary csr cache, the csr arrays point into the mapping.
+  With -DEDGE64 the 32-bit xadj of the cache is widened into a copy.*/
+int hunyuangraph_readgraph_csrcache(char *filename, hunyuangraph_graph_t *graph, hunyuangraph_graphcheck_t *check)
 {
-	int i, k, fmt, nfields, readew, readvw, readvs, edge, ewgt;
-	int *xadj, *adjncy, *vwgt, *adjwgt;
-	char *line = NULL, fmtstr[256], *curstr, *newstr;
-	size_t lnlen = 0;
-	FILE *fpin;
-
-	hunyuangraph_graph_t *graph;
-	graph = hunyuangraph_create_cpu_graph();
+	hunyuangraph_csrcache_t cache;
 
-	fpin = hunyuangraph_fopen(filename, "r", "Readgraph: Graph");
+	if (!hunyuangraph_csrcache_open(filename, sizeof(int), &cache))
+		return 0;
 
-	do
+	if (cache.header->nvtxs > INT32_MAX || cache.header->nedges > INT32_MAX)
 	{
-		if (getline(&line, &lnlen, fpin) == -1)
-		{
-			hunyuangraph_error_exit("Premature end of input file: file: %s\n", filename);
-		}
-	} while (line[0] == '%');
+		hunyuangraph_csrcache_close(&cache);
+		return 0;
+	}
+
+	graph->nvtxs = cache.header->nvtxs;
+	graph->nedges = cache.header->nedges;
+#ifdef EDGE64
+	graph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (graph->nvtxs + 1));
+#pragma omp parallel for
+	for (int i = 0; i <= graph->nvtxs; i++)
+		graph->xadj[i] = ((int *)cache.xadj)[i];
+#else
+	graph->xadj = (int *)cache.xadj;
+#endif
+	graph->adjncy = (int *)cache.adjncy;
+	graph->vwgt = (int *)cache.vwgt;
+	graph->adjwgt = (int *)cache.adjwgt;
+	graph->map_base = cache.base;
+	graph->map_size = cache.size;
+	*check = cache.header->check;
+
+	return 1;
+}
+
+/*Write the binary csr cache of a graph read from its file. The cache has
+  32-bit offsets: with -DEDGE64 the xadj is narrowed into a copy, and a
+  graph with more than INT32_MAX adjacency entries gets no cache.*/
+int hunyuangraph_writegraph_csrcache(char *filename, hunyuangraph_graph_t *graph, int fmt)
+{
+#ifdef EDGE64
+	int ok, *xadj;
+
+	if (graph->nedges > INT32_MAX)
+		return 1;
+
+	xadj = (int *)malloc(sizeof(int) * (graph->nvtxs + 1));
+#pragma omp parallel for
+	for (int i = 0; i <= graph->nvtxs; i++)
+		xadj[i] = (int)graph->xadj[i];
+	ok = hunyuangraph_csrcache_write(filename, sizeof(int), graph->nvtxs, graph->nedges, fmt, xadj, graph->adjncy, graph->vwgt, graph->adjwgt);
+	free(xadj);
+
+	return ok;
+#else
+	return hunyuangraph_csrcache_write(filename, sizeof(int), graph->nvtxs, graph->nedges, fmt, graph->xadj, graph->adjncy, graph->vwgt, graph->adjwgt);
+#endif
+}
+
+/*Parse the first line of a graph file and allocate the csr arrays*/
+void hunyuangraph_readgraph_header(char *header, hunyuangraph_graph_t *graph, int *r_fmt, int *r_readvw, int *r_readew)
+{
+	int fmt, nfields;
+	long long nedges;
+	char fmtstr[256];
 
 	fmt = 0;
-	nfields = sscanf(line, "%d %d %d", &(graph->nvtxs), &(graph->nedges), &fmt);
+	nfields = sscanf(header, "%d %lld %d", &(graph->nvtxs), &nedges, &fmt);
 
 	if (nfields < 2)
 	{
 		hunyuangraph_error_exit("The input file does not specify the number of vertices and edges.\n");
 	}
 
-	if (graph->nvtxs <= 0 || graph->nedges <= 0)
+	if (graph->nvtxs <= 0 || nedges <= 0)
+	{
+		hunyuangraph_error_exit("The supplied nvtxs:%d and nedges:%lld must be positive.\n", graph->nvtxs, nedges);
+	}
+
+	if (nedges > hunyuangraph_edge_max / 2)
 	{
-		hunyuangraph_error_exit("The supplied nvtxs:%d and nedges:%d must be positive.\n", graph->nvtxs, graph->nedges);
+		hunyuangraph_error_exit("The graph has %lld edges, more than the edge offsets can index (build with -DEDGE64).\n", nedges);
 	}
 
 	if (fmt > 111)
@@ -62,117 +116,204 @@ hunyuangraph_graph_t *hunyuangraph_readgraph(char *filename)
 	}
 
 	sprintf(fmtstr, "%03d", fmt % 1000);
-	readvs = (fmtstr[0] == '1');
-	readvw = (fmtstr[1] == '1');
-	readew = (fmtstr[2] == '1');
+	*r_fmt = fmt;
+	*r_readvw = (fmtstr[1] == '1');
+	*r_readew = (fmtstr[2] == '1');
+
+	graph->nedges = 2 * nedges;
 
-	graph->nedges *= 2;
+	graph->xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (graph->nvtxs + 1));
+	graph->adjncy = (int *)malloc(sizeof(int) * (graph->nedges));
+	graph->vwgt = (int *)malloc(sizeof(int) * (graph->nvtxs));
+	graph->adjwgt = (int *)malloc(sizeof(int) * (graph->nedges));
 
-	xadj = graph->xadj = (int *)malloc(sizeof(int) * (graph->nvtxs + 1));
-	for (i = 0; i < graph->nvtxs + 1; i++)
+	graph->xadj[0] = 0;
+}
+
+/*Read a memory-mapped graph file, returns the vertex lines read*/
+size_t hunyuangraph_readgraph_text(char *filename, hunyuangraph_graph_t *graph, int *r_fmt, size_t *r_nedges, size_t *r_filesize)
+{
+	int readew, readvw;
+	size_t nread;
+	char header[256];
+	const char *body, *end;
+	hunyuangraph_mapfile_t map;
+
+	hunyuangraph_mapfile_open(filename, &map);
+	end = map.data + map.size;
+	*r_filesize = map.size;
+
+	body = hunyuangraph_parse_header(map.data, end, header, sizeof(header));
+	if (body == NULL)
 	{
-		xadj[i] = graph->xadj[i] = 0;
+		hunyuangraph_error_exit("Premature end of input file: file: %s\n", filename);
 	}
 
-	adjncy = graph->adjncy = (int *)malloc(sizeof(int) * (graph->nedges));
+	hunyuangraph_readgraph_header(header, graph, r_fmt, &readvw, &readew);
 
-	vwgt = graph->vwgt = (int *)malloc(sizeof(int) * (graph->nvtxs));
+	*r_nedges = 0;
+	nread = hunyuangraph_parse_segment(body, end, graph->nvtxs, graph->nedges, readvw, readew,
+									   0, r_nedges, graph->xadj, graph->adjncy, graph->vwgt, graph->adjwgt);
+	hunyuangraph_mapfile_close(&map);
 
-	for (i = 0; i < graph->nvtxs; i++)
+	return nread;
+}
+
+/*Read a gzip-compressed graph file, returns the vertex lines read.
+  The file is inflated block by block on a separate thread while the blocks
+  already inflated are parsed.*/
+size_t hunyuangraph_readgraph_gz(char *filename, hunyuangraph_graph_t *graph, int *r_fmt, size_t *r_nedges, size_t *r_filesize)
+{
+	int readew, readvw;
+	size_t nread, size;
+	char header[256];
+	const char *data, *body;
+	hunyuangraph_gzstream_t stream;
+
+	if (!hunyuangraph_gzstream_open(filename, &stream))
 	{
-		vwgt[i] = graph->vwgt[i] = 1;
+		hunyuangraph_error_exit("Failed on file gzopen(): file: %s\n", filename);
 	}
 
-	adjwgt = graph->adjwgt = (int *)malloc(sizeof(int) * (graph->nedges));
-	for (i = 0; i < graph->nedges; i++)
+	/*The header is in the first block that is not all comments*/
+	do
 	{
-		adjwgt[i] = graph->adjwgt[i] = 1;
+		size = hunyuangraph_gzstream_next(&stream, &data);
+		if (size == 0)
+		{
+			hunyuangraph_error_exit("Premature end of input file: file: %s\n", filename);
+		}
+		body = hunyuangraph_parse_header(data, data + size, header, sizeof(header));
+		if (body == NULL)
+			hunyuangraph_gzstream_release(&stream);
+	} while (body == NULL);
+
+	hunyuangraph_readgraph_header(header, graph, r_fmt, &readvw, &readew);
+
+	nread = 0;
+	*r_nedges = 0;
+	while (size > 0)
+	{
+		nread += hunyuangraph_parse_segment(body, data + size, graph->nvtxs, graph->nedges, readvw, readew,
+											nread, r_nedges, graph->xadj, graph->adjncy, graph->vwgt, graph->adjwgt);
+		hunyuangraph_gzstream_release(&stream);
+
+		size = hunyuangraph_gzstream_next(&stream, &data);
+		body = data;
 	}
 
-	for (xadj[0] = 0, k = 0, i = 0; i < graph->nvtxs; i++)
+	if (stream.error)
 	{
-		do
-		{
-			if (getline(&line, &lnlen, fpin) == -1)
-			{
-				hunyuangraph_error_exit("Premature end of input file while reading vertex %d.\n", i + 1);
-			}
-		} while (line[0] == '%');
+		hunyuangraph_error_exit("Failed on file gzread(): file: %s\n", filename);
+	}
 
-		curstr = line;
-		newstr = NULL;
+	*r_filesize = stream.total;
+	hunyuangraph_gzstream_close(&stream);
 
-		if (readvw)
+	return nread;
+}
+
+/*Validate the graph read from filename (Graph_Check 1) and repair it (Graph_Check 2).
+  A summary found in the csr cache is reused, a new one is stored in the cache.*/
+void hunyuangraph_checkgraph(char *filename, hunyuangraph_graph_t *graph, hunyuangraph_graphcheck_t *check)
+{
+	int cached, repaired = 0, *adjncy, *adjwgt, *vwgt;
+	hunyuangraph_edge_t *xadj;
+	struct timeval begin_check, end_check;
+	double check_time;
+
+	gettimeofday(&begin_check, NULL);
+
+	cached = check->done;
+	if (!cached || (Graph_Check == 2 && (check->selfloops || check->duplicates || check->asymmetric || check->mismatched)))
+	{
+		repaired = hunyuangraph_validate_csr(graph->nvtxs, graph->xadj, graph->adjncy, graph->adjwgt, check,
+											 Graph_Check == 2, &xadj, &adjncy, &adjwgt);
+#ifndef NO_CSR_CACHE
+		if (!cached)
+			hunyuangraph_csrcache_set_check(filename, sizeof(int), check);
+#endif
+	}
+
+	if (repaired)
+	{
+		// with -DEDGE64 the xadj of a csr cache is a widened copy
+		if (graph->map_base == NULL || (char *)graph->xadj < graph->map_base || (char *)graph->xadj >= graph->map_base + graph->map_size)
+			free(graph->xadj);
+		if (graph->map_base != NULL)
 		{
-			vwgt[i] = strtol(curstr, &newstr, 10);
-
-			if (newstr == curstr)
-			{
-				hunyuangraph_error_exit("The line for vertex %d does not have enough weights "
-										"for the %d constraints.\n",
-										i + 1, 1);
-			}
-			if (vwgt[i] < 0)
-			{
-				hunyuangraph_error_exit("The weight vertex %d and constraint %d must be >= 0\n", i + 1, 0);
-			}
-			curstr = newstr;
+			vwgt = (int *)malloc(sizeof(int) * graph->nvtxs);
+			memcpy(vwgt, graph->vwgt, sizeof(int) * graph->nvtxs);
+			munmap(graph->map_base, graph->map_size);
+			graph->map_base = NULL;
+			graph->map_size = 0;
+			graph->vwgt = vwgt;
 		}
-
-		while (1)
+		else
 		{
-			edge = strtol(curstr, &newstr, 10);
-			if (newstr == curstr)
-			{
-				break;
-			}
-
-			curstr = newstr;
-			if (edge < 1 || edge > graph->nvtxs)
-			{
-				hunyuangraph_error_exit("Edge %d for vertex %d is out of bounds\n", edge, i + 1);
-			}
-
-			ewgt = 1;
-
-			if (readew)
-			{
-				ewgt = strtol(curstr, &newstr, 10);
-
-				if (newstr == curstr)
-				{
-					hunyuangraph_error_exit("Premature end of line for vertex %d\n", i + 1);
-				}
-
-				if (ewgt <= 0)
-				{
-					hunyuangraph_error_exit("The weight (%d) for edge (%d, %d) must be positive.\n", ewgt, i + 1, edge);
-				}
-
-				curstr = newstr;
-			}
-
-			if (k == graph->nedges)
-			{
-				hunyuangraph_error_exit("There are more edges in the file than the %d specified.\n", graph->nedges / 2);
-			}
-
-			adjncy[k] = edge - 1;
-			adjwgt[k] = ewgt;
-			k++;
+			free(graph->adjncy);
+			free(graph->adjwgt);
 		}
-		xadj[i + 1] = k;
+		graph->xadj = xadj;
+		graph->adjncy = adjncy;
+		graph->adjwgt = adjwgt;
+		graph->nedges = xadj[graph->nvtxs];
 	}
-	fclose(fpin);
 
-	if (k != graph->nedges)
+	gettimeofday(&end_check, NULL);
+	check_time = (end_check.tv_sec - begin_check.tv_sec) * 1000.0 + (end_check.tv_usec - begin_check.tv_usec) / 1000.0;
+	printf("Check_graph_time=     %10.3lf ms selfloops=%lld duplicates=%lld asymmetric=%lld mismatched=%lld%s\n", check_time,
+		   (long long)check->selfloops, (long long)check->duplicates, (long long)check->asymmetric, (long long)check->mismatched,
+		   cached ? " (csr cache)" : "");
+	if (repaired)
+		printf("Repaired graph: nedges=%lld\n", (long long)graph->nedges);
+}
+
+/*Read graph file*/
+hunyuangraph_graph_t *hunyuangraph_readgraph(char *filename)
+{
+	int fmt;
+	size_t nread, k, filesize;
+	struct timeval begin_read, end_read;
+	double read_time;
+	hunyuangraph_graphcheck_t check;
+
+	hunyuangraph_graph_t *graph;
+	graph = hunyuangraph_create_cpu_graph();
+
+	memset(&check, 0, sizeof(hunyuangraph_graphcheck_t));
+	gettimeofday(&begin_read, NULL);
+
+#ifndef NO_CSR_CACHE
+	if (hunyuangraph_readgraph_csrcache(filename, graph, &check))
+	{
+		gettimeofday(&end_read, NULL);
+		read_time = (end_read.tv_sec - begin_read.tv_sec) * 1000.0 + (end_read.tv_usec - begin_read.tv_usec) / 1000.0;
+		printf("Read_graph_time=      %10.3lf ms %10.2lf MB/s (csr cache)\n", read_time, graph->map_size / 1048576.0 / hunyuangraph_max(read_time, 1e-3) * 1000.0);
+		if (Graph_Check)
+			hunyuangraph_checkgraph(filename, graph, &check);
+		return graph;
+	}
+#endif
+
+	if (hunyuangraph_gzstream_is_gz(filename))
+		nread = hunyuangraph_readgraph_gz(filename, graph, &fmt, &k, &filesize);
+	else
+		nread = hunyuangraph_readgraph_text(filename, graph, &fmt, &k, &filesize);
+
+	if (nread < (size_t)graph->nvtxs)
+	{
+		hunyuangraph_error_exit("Premature end of input file while reading vertex %d.\n", (int)nread + 1);
+	}
+
+	if (k != (size_t)graph->nedges)
 	{
 		printf("------------------------------------------------------------------------------\n");
 		printf("***  I detected an error in your input file  ***\n\n");
 		printf("In the first line of the file, you specified that the graph contained\n"
-			   "%d edges. However, I only found %d edges in the file.\n",
-			   graph->nedges / 2, k / 2);
-		if (2 * k == graph->nedges)
+			   "%lld edges. However, I only found %lld edges in the file.\n",
+			   (long long)graph->nedges / 2, (long long)k / 2);
+		if (2 * k == (size_t)graph->nedges)
 		{
 			printf("\n *> I detected that you specified twice the number of edges that you have in\n");
 			printf("    the file. Remember that the number of edges specified in the first line\n");
@@ -182,26 +323,50 @@ hunyuangraph_graph_t *hunyuangraph_readgraph(char *filename)
 		printf("------------------------------------------------------------------------------\n");
 		exit(0);
 	}
-	free(line);
+
+	gettimeofday(&end_read, NULL);
+	read_time = (end_read.tv_sec - begin_read.tv_sec) * 1000.0 + (end_read.tv_usec - begin_read.tv_usec) / 1000.0;
+	printf("Read_graph_time=      %10.3lf ms %10.2lf MB/s\n", read_time, filesize / 1048576.0 / hunyuangraph_max(read_time, 1e-3) * 1000.0);
+
+#ifndef NO_CSR_CACHE
+	if (!hunyuangraph_writegraph_csrcache(filename, graph, fmt))
+		printf("Failed to write the csr cache of %s\n", filename);
+#endif
+
+	if (Graph_Check)
+		hunyuangraph_checkgraph(filename, graph, &check);
+
 	return graph;
 }
 
 /*Write to file*/
 void hunyuangraph_writetofile(char *fname, int *part, int n, int nparts)
 {
-	FILE *fpout;
-	int i;
-	char filename[1280000];
+	char *filename = (char *)malloc(strlen(fname) + 32);
 	sprintf(filename, "%s.part.%d", fname, nparts);
 
-	fpout = hunyuangraph_fopen(filename, "w", __func__);
+	if (!hunyuangraph_partfile_write_text(filename, part, n))
+	{
+		perror(filename);
+		hunyuangraph_error_exit("Failed on file write: file: %s\n", filename);
+	}
+
+	free(filename);
+}
+
+/*Write to binary file*/
+void hunyuangraph_writetofile_binary(char *fname, int *part, int n, int nparts)
+{
+	char *filename = (char *)malloc(strlen(fname) + 32);
+	sprintf(filename, "%s.part.%d.bin", fname, nparts);
 
-	for (i = 0; i < n; i++)
+	if (!hunyuangraph_partfile_write_binary(filename, part, n, nparts))
 	{
-		fprintf(fpout, "%d\n", part[i]);
+		perror(filename);
+		hunyuangraph_error_exit("Failed on file write: file: %s\n", filename);
 	}
 
-	fclose(fpout);
+	free(filename);
 }
 
 #endif
\ No newline at end of file
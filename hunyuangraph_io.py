@@ -0,0 +1,284 @@
+"""NumPy loader for METIS graphs and partitions.
+
+Reads .graph files (plain or gzip) into CSR arrays with a vectorized parser,
+maps the <graph>.bcsr32/.bcsr64 binary csr cache written by hunyuangraph when
+it is up to date, reads the <graph>.part.<k> and <graph>.part.<k>.bin files
+written by hunyuangraph_writetofile(_binary) and computes edge-cut and
+imbalance the same way as hunyuangraph_computecut_cpu and
+hunyuangraph_compute_imbalance_cpu.
+
+    python3 hunyuangraph_io.py graph.graph [graph.graph.part.8]
+"""
+import gzip
+import os
+import re
+import sys
+
+import numpy as np
+
+IMB = 1.04
+
+CSRCACHE_MAGIC = b'HYCSRBIN'
+CSRCACHE_VERSION = 2
+CSRCACHE_HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('idxwidth', '<u4'),
+    ('nvtxs', '<i8'),
+    ('nedges', '<i8'),
+    ('fmt', '<i4'),
+    ('reserved', '<u4'),
+    ('src_size', '<u8'),
+    ('src_mtime_sec', '<i8'),
+    ('src_mtime_nsec', '<i8'),
+    ('src_hash', '<u8'),
+    ('xadj_offset', '<u8'),
+    ('adjncy_offset', '<u8'),
+    ('vwgt_offset', '<u8'),
+    ('adjwgt_offset', '<u8'),
+    ('file_size', '<u8'),
+    ('check_done', '<i4'),
+    ('check_reserved', '<i4'),
+    ('selfloops', '<i8'),
+    ('duplicates', '<i8'),
+    ('asymmetric', '<i8'),
+    ('mismatched', '<i8'),
+])
+
+PARTFILE_MAGIC = b'HYPARTBN'
+PARTFILE_VERSION = 1
+PARTFILE_HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('width', '<u4'),
+    ('nvtxs', '<i8'),
+    ('nparts', '<i4'),
+    ('reserved', '<u4'),
+])
+
+_BLANK = np.zeros(256, dtype=bool)
+_BLANK[[ord(' '), ord('\t'), ord('\r'), ord('\v'), ord('\f'), ord('\n')]] = True
+
+
+class Graph:
+    """CSR graph, nedges counts every edge twice like graph->nedges.
+
+    check is the validation summary stored in the csr cache, if any.
+    """
+
+    def __init__(self, xadj, adjncy, vwgt, adjwgt, fmt=0, check=None):
+        self.nvtxs = len(xadj) - 1
+        self.nedges = int(xadj[-1])
+        self.xadj = xadj
+        self.adjncy = adjncy
+        self.vwgt = vwgt
+        self.adjwgt = adjwgt
+        self.fmt = fmt
+        self.check = check
+
+
+def read_csrcache(filename, idxwidth=4):
+    """Map the binary csr cache of filename, returns None if there is no up to date cache.
+
+    The cache is trusted when the size and mtime of the graph file match, the
+    sampled content hash checked by the C reader is not recomputed here.
+    """
+    cachefile = '%s.bcsr%d' % (filename, idxwidth * 8)
+    try:
+        source = os.stat(filename)
+        size = os.path.getsize(cachefile)
+    except OSError:
+        return None
+    if size < CSRCACHE_HEADER.itemsize:
+        return None
+
+    header = np.fromfile(cachefile, dtype=CSRCACHE_HEADER, count=1)[0]
+    if (header['magic'] != CSRCACHE_MAGIC or header['version'] != CSRCACHE_VERSION
+            or header['idxwidth'] != idxwidth or header['file_size'] > size
+            or header['src_size'] != source.st_size
+            or header['src_mtime_sec'] * 1000000000 + header['src_mtime_nsec'] != source.st_mtime_ns):
+        return None
+
+    dtype = np.int32 if idxwidth == 4 else np.int64
+    nvtxs, nedges = int(header['nvtxs']), int(header['nedges'])
+
+    def section(offset, count):
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(cachefile, dtype=dtype, mode='r', offset=int(offset), shape=(count,))
+
+    check = None
+    if header['check_done']:
+        check = {name: int(header[name]) for name in ('selfloops', 'duplicates', 'asymmetric', 'mismatched')}
+
+    return Graph(section(header['xadj_offset'], nvtxs + 1),
+                 section(header['adjncy_offset'], nedges),
+                 section(header['vwgt_offset'], nvtxs),
+                 section(header['adjwgt_offset'], nedges),
+                 int(header['fmt']), check)
+
+
+def _read_bytes(filename):
+    with open(filename, 'rb') as f:
+        magic = f.read(2)
+    if magic == b'\x1f\x8b':
+        with gzip.open(filename, 'rb') as f:
+            return f.read()
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def parse_graph(data):
+    """Parse the bytes of a .graph file into a Graph."""
+    if len(data) == 0:
+        raise ValueError('Premature end of input file')
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord('\n'))
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(buf)]))
+    if ends[-1] == starts[-1]:
+        starts, ends = starts[:-1], ends[:-1]
+
+    comment = np.zeros(len(starts), dtype=bool)
+    nonempty = starts < ends
+    comment[nonempty] = buf[starts[nonempty]] == ord('%')
+    lines = np.flatnonzero(~comment)
+    if len(lines) == 0:
+        raise ValueError('Premature end of input file')
+
+    header = data[starts[lines[0]]:ends[lines[0]]].split()
+    if len(header) < 2:
+        raise ValueError('The input file does not specify the number of vertices and edges.')
+    nvtxs, nedges = int(header[0]), int(header[1]) * 2
+    fmt = int(header[2]) if len(header) > 2 else 0
+    if nvtxs <= 0 or nedges <= 0:
+        raise ValueError('The supplied nvtxs:%d and nedges:%d must be positive.' % (nvtxs, nedges // 2))
+    if fmt > 111:
+        raise ValueError('Cannot read this type of file format [fmt=%d]!' % fmt)
+    readvw = (fmt // 10) % 10 == 1
+    readew = fmt % 10 == 1
+
+    # Body lines: the non-comment lines after the header, at most nvtxs of them
+    body = lines[1:nvtxs + 1]
+    if len(body) < nvtxs:
+        raise ValueError('Premature end of input file while reading vertex %d.' % (len(body) + 1))
+    begin, end = starts[body[0]], ends[body[-1]]
+
+    # Blank the comment lines inside the body so that they have no tokens
+    text = buf[begin:end].copy()
+    inside = comment & (starts >= begin) & (ends <= end)
+    if inside.any():
+        mark = np.zeros(len(text) + 1, dtype=np.int64)
+        np.add.at(mark, starts[inside] - begin, 1)
+        np.add.at(mark, ends[inside] - begin, -1)
+        text[np.cumsum(mark[:-1]) > 0] = ord(' ')
+
+    # Tokens and the vertex line each token belongs to
+    blank = _BLANK[text]
+    first = np.flatnonzero(~blank & np.concatenate(([True], blank[:-1])))
+    vertex = np.searchsorted(ends[body] - begin, first, side='left')
+    ntokens = np.bincount(vertex, minlength=nvtxs)
+
+    values = np.fromstring(text.tobytes(), dtype=np.int64, sep=' ')
+    if len(values) != len(first):
+        raise ValueError('Invalid entry in the input file')
+
+    if readvw:
+        if np.any(ntokens == 0):
+            v = int(np.flatnonzero(ntokens == 0)[0])
+            raise ValueError('The line for vertex %d does not have enough weights for the 1 constraints.' % (v + 1))
+        isvwgt = np.zeros(len(values), dtype=bool)
+        isvwgt[np.concatenate(([0], np.cumsum(ntokens)[:-1]))] = True
+        vwgt = values[isvwgt]
+        if np.any(vwgt < 0):
+            v = int(np.flatnonzero(vwgt < 0)[0])
+            raise ValueError('The weight vertex %d and constraint 0 must be >= 0' % (v + 1))
+        values = values[~isvwgt]
+        ntokens = ntokens - 1
+    else:
+        vwgt = np.ones(nvtxs, dtype=np.int64)
+
+    if readew:
+        if np.any(ntokens & 1):
+            v = int(np.flatnonzero(ntokens & 1)[0])
+            raise ValueError('Premature end of line for vertex %d' % (v + 1))
+        adjncy, adjwgt = values[0::2], values[1::2]
+        if np.any(adjwgt <= 0):
+            raise ValueError('The weight for edge %d must be positive.' % int(np.flatnonzero(adjwgt <= 0)[0]))
+        degree = ntokens >> 1
+    else:
+        adjncy, adjwgt = values, np.ones(len(values), dtype=np.int64)
+        degree = ntokens
+
+    if len(adjncy) != nedges:
+        raise ValueError('In the first line of the file, you specified that the graph contained '
+                         '%d edges. However, I only found %d edges in the file.' % (nedges // 2, len(adjncy) // 2))
+    if len(adjncy) > 0 and (adjncy.min() < 1 or adjncy.max() > nvtxs):
+        raise ValueError('Edge out of bounds')
+
+    xadj = np.zeros(nvtxs + 1, dtype=np.int64)
+    np.cumsum(degree, out=xadj[1:])
+    dtype = np.int32 if nedges <= np.iinfo(np.int32).max else np.int64
+
+    return Graph(xadj.astype(dtype), (adjncy - 1).astype(dtype), vwgt.astype(dtype), adjwgt.astype(dtype), fmt)
+
+
+def read_graph(filename, use_cache=True):
+    """Read a .graph file, from its binary csr cache when one is up to date."""
+    if use_cache:
+        graph = read_csrcache(filename)
+        if graph is not None:
+            return graph
+    return parse_graph(_read_bytes(filename))
+
+
+def partition_file(graphfile, nparts, binary=False):
+    return '%s.part.%d%s' % (graphfile, nparts, '.bin' if binary else '')
+
+
+def read_partition(filename):
+    """Read a text partition file (one part id per line) or a binary .part.<k>.bin file."""
+    data = _read_bytes(filename)
+    if data[:8] == PARTFILE_MAGIC:
+        header = np.frombuffer(data, dtype=PARTFILE_HEADER, count=1)[0]
+        if header['version'] != PARTFILE_VERSION or header['width'] not in (2, 4):
+            raise ValueError('Unknown partition file format: %s' % filename)
+        dtype = np.int16 if header['width'] == 2 else np.int32
+        return np.frombuffer(data, dtype=dtype, count=int(header['nvtxs']),
+                             offset=PARTFILE_HEADER.itemsize).astype(np.int32)
+    return np.fromstring(data, dtype=np.int32, sep=' ')
+
+
+def edgecut(graph, where):
+    """Same as hunyuangraph_computecut_cpu, accumulated in 64 bits."""
+    where = np.asarray(where)
+    src = np.repeat(np.arange(graph.nvtxs), np.diff(graph.xadj))
+    cut = np.sum(graph.adjwgt[where[src] != where[graph.adjncy]], dtype=np.int64)
+    return int(cut // 2)
+
+
+def imbalance(graph, where, nparts):
+    """Same as hunyuangraph_compute_imbalance_cpu, in float32 like the C version."""
+    pwgts = np.bincount(np.asarray(where), weights=graph.vwgt, minlength=nparts).astype(np.int64)
+    ratio = pwgts.astype(np.float32) / (np.float32(graph.nvtxs) / np.float32(nparts))
+    imb = max(np.float32(0.0), ratio.max())
+    return float(np.float32(np.float64(imb) - (IMB - 1.03)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('usage: python3 hunyuangraph_io.py <graph> [<partition>]')
+        sys.exit(1)
+
+    graph = read_graph(sys.argv[1])
+    print('graph:%s %d %d' % (sys.argv[1], graph.nvtxs, graph.nedges))
+
+    if len(sys.argv) > 2:
+        where = read_partition(sys.argv[2])
+        if len(where) != graph.nvtxs:
+            print('The partition has %d entries, the graph has %d vertices' % (len(where), graph.nvtxs))
+            sys.exit(1)
+        match = re.search(r'\.part\.(\d+)(\.bin)?$', sys.argv[2])
+        nparts = int(match.group(1)) if match else int(where.max()) + 1
+        print('edge-cut=                    %10d' % edgecut(graph, where))
+        print('imbalance=                   %10.3f' % imbalance(graph, where, nparts))
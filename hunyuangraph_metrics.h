@@ -0,0 +1,218 @@
+#ifndef _H_METRICS
+#define _H_METRICS
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include "hunyuangraph_edge.h"
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#if defined(__AVX2__)
+#define hunyuangraph_metrics_avx2 1       //The compiler targets AVX2, no dispatch
+#define hunyuangraph_metrics_target
+#elif (defined(__x86_64__) || defined(__i386__)) && defined(__GNUC__)
+#define hunyuangraph_metrics_avx2 2       //AVX2 functions selected at runtime
+#define hunyuangraph_metrics_target __attribute__((target("avx2")))
+#endif
+#ifdef hunyuangraph_metrics_avx2
+#include <immintrin.h>
+#endif
+
+/*Edgecut and part weights of a partition, shared by hunyuangraph (32-bit
+  vertex ids, hunyuangraph_edge_t offsets) and mygpmetis (64-bit csr).
+  The vertices are split over the threads and the sums are reduced in 64-bit
+  integers, so the results are the same as the serial loops for every number
+  of threads. On x86 the edges of a vertex are scanned 8 (32-bit) or 4
+  (64-bit) at a time with an AVX2 gather of where[adjncy[j]]. The AVX2
+  functions are compiled with the avx2 target attribute and selected at
+  runtime when the CPU supports it, so no -mavx2 is needed and the binaries
+  still run on CPUs without AVX2; with -mavx2 or -march=native they are
+  called directly. Otherwise, and for the remainder of a row, a scalar loop
+  is used. Graphs with fewer than hunyuangraph_metrics_parallel edges are
+  scanned by one thread.*/
+
+#define hunyuangraph_metrics_parallel (1 << 16)
+
+/*Cut weight of the edges j..end-1 of a vertex in part me*/
+static inline long long hunyuangraph_metrics_tail32(hunyuangraph_edge_t j, hunyuangraph_edge_t end, const int *adjncy, const int *adjwgt, const int *where, int me)
+{
+	long long cut = 0;
+
+	for (; j < end; j++)
+		if (where[adjncy[j]] != me)
+			cut += adjwgt[j];
+
+	return cut;
+}
+
+static inline long long hunyuangraph_metrics_tail64(int64_t j, int64_t end, const int64_t *adjncy, const int64_t *adjwgt, const int64_t *where, int64_t me)
+{
+	long long cut = 0;
+
+	for (; j < end; j++)
+		if (where[adjncy[j]] != me)
+			cut += adjwgt[j];
+
+	return cut;
+}
+
+#ifdef hunyuangraph_metrics_avx2
+/*Cut weight of the edges of vertex i, AVX2*/
+hunyuangraph_metrics_target static inline long long hunyuangraph_metrics_row32_avx2(const hunyuangraph_edge_t *xadj, const int *adjncy, const int *adjwgt, const int *where, int i)
+{
+	hunyuangraph_edge_t j = xadj[i], end = xadj[i + 1];
+	int me = where[i];
+	long long cut = 0;
+
+	if (end - j >= 8)
+	{
+		__m256i vme = _mm256_set1_epi32(me), vsum = _mm256_setzero_si256();
+		for (; j + 8 <= end; j += 8)
+		{
+			__m256i vadj = _mm256_loadu_si256((const __m256i *)(adjncy + j));
+			__m256i vpart = _mm256_i32gather_epi32(where, vadj, 4);
+			__m256i vwgt = _mm256_loadu_si256((const __m256i *)(adjwgt + j));
+			__m256i vcut = _mm256_andnot_si256(_mm256_cmpeq_epi32(vpart, vme), vwgt);
+			//widened to 64-bit lanes, as the serial sum
+			vsum = _mm256_add_epi64(vsum, _mm256_cvtepi32_epi64(_mm256_castsi256_si128(vcut)));
+			vsum = _mm256_add_epi64(vsum, _mm256_cvtepi32_epi64(_mm256_extracti128_si256(vcut, 1)));
+		}
+		long long lanes[4];
+		_mm256_storeu_si256((__m256i *)lanes, vsum);
+		cut = lanes[0] + lanes[1] + lanes[2] + lanes[3];
+	}
+
+	return cut + hunyuangraph_metrics_tail32(j, end, adjncy, adjwgt, where, me);
+}
+
+hunyuangraph_metrics_target static inline long long hunyuangraph_metrics_row64_avx2(const int64_t *xadj, const int64_t *adjncy, const int64_t *adjwgt, const int64_t *where, int64_t i)
+{
+	int64_t j = xadj[i], end = xadj[i + 1], me = where[i];
+	long long cut = 0;
+
+	if (end - j >= 4)
+	{
+		__m256i vme = _mm256_set1_epi64x(me), vsum = _mm256_setzero_si256();
+		for (; j + 4 <= end; j += 4)
+		{
+			__m256i vadj = _mm256_loadu_si256((const __m256i *)(adjncy + j));
+			__m256i vpart = _mm256_i64gather_epi64((const long long *)where, vadj, 8);
+			__m256i vwgt = _mm256_loadu_si256((const __m256i *)(adjwgt + j));
+			vsum = _mm256_add_epi64(vsum, _mm256_andnot_si256(_mm256_cmpeq_epi64(vpart, vme), vwgt));
+		}
+		long long lanes[4];
+		_mm256_storeu_si256((__m256i *)lanes, vsum);
+		cut = lanes[0] + lanes[1] + lanes[2] + lanes[3];
+	}
+
+	return cut + hunyuangraph_metrics_tail64(j, end, adjncy, adjwgt, where, me);
+}
+
+hunyuangraph_metrics_target long long hunyuangraph_metrics_edgecut32_avx2(int nvtxs, const hunyuangraph_edge_t *xadj, const int *adjncy, const int *adjwgt, const int *where)
+{
+	long long cut = 0;
+
+#pragma omp parallel for schedule(dynamic, 1024) reduction(+ : cut) if (xadj[nvtxs] >= hunyuangraph_metrics_parallel)
+	for (int i = 0; i < nvtxs; i++)
+		cut += hunyuangraph_metrics_row32_avx2(xadj, adjncy, adjwgt, where, i);
+
+	return cut / 2;
+}
+
+hunyuangraph_metrics_target long long hunyuangraph_metrics_edgecut64_avx2(int64_t nvtxs, const int64_t *xadj, const int64_t *adjncy, const int64_t *adjwgt, const int64_t *where)
+{
+	long long cut = 0;
+
+#pragma omp parallel for schedule(dynamic, 1024) reduction(+ : cut) if (xadj[nvtxs] >= hunyuangraph_metrics_parallel)
+	for (int64_t i = 0; i < nvtxs; i++)
+		cut += hunyuangraph_metrics_row64_avx2(xadj, adjncy, adjwgt, where, i);
+
+	return cut / 2;
+}
+
+/*Whether the AVX2 functions can run on this CPU*/
+static inline int hunyuangraph_metrics_has_avx2(void)
+{
+#if hunyuangraph_metrics_avx2 == 1
+	return 1;
+#else
+	return __builtin_cpu_supports("avx2");
+#endif
+}
+#endif
+
+/*Edgecut of where, every edge counted once*/
+long long hunyuangraph_metrics_edgecut32(int nvtxs, const hunyuangraph_edge_t *xadj, const int *adjncy, const int *adjwgt, const int *where)
+{
+	long long cut = 0;
+
+#ifdef hunyuangraph_metrics_avx2
+	if (hunyuangraph_metrics_has_avx2())
+		return hunyuangraph_metrics_edgecut32_avx2(nvtxs, xadj, adjncy, adjwgt, where);
+#endif
+
+#pragma omp parallel for schedule(dynamic, 1024) reduction(+ : cut) if (xadj[nvtxs] >= hunyuangraph_metrics_parallel)
+	for (int i = 0; i < nvtxs; i++)
+		cut += hunyuangraph_metrics_tail32(xadj[i], xadj[i + 1], adjncy, adjwgt, where, where[i]);
+
+	return cut / 2;
+}
+
+long long hunyuangraph_metrics_edgecut64(int64_t nvtxs, const int64_t *xadj, const int64_t *adjncy, const int64_t *adjwgt, const int64_t *where)
+{
+	long long cut = 0;
+
+#ifdef hunyuangraph_metrics_avx2
+	if (hunyuangraph_metrics_has_avx2())
+		return hunyuangraph_metrics_edgecut64_avx2(nvtxs, xadj, adjncy, adjwgt, where);
+#endif
+
+#pragma omp parallel for schedule(dynamic, 1024) reduction(+ : cut) if (xadj[nvtxs] >= hunyuangraph_metrics_parallel)
+	for (int64_t i = 0; i < nvtxs; i++)
+		cut += hunyuangraph_metrics_tail64(xadj[i], xadj[i + 1], adjncy, adjwgt, where, where[i]);
+
+	return cut / 2;
+}
+
+/*Part weights of where into pwgts[nparts]*/
+void hunyuangraph_metrics_pwgts32(int nvtxs, const int *vwgt, const int *where, int nparts, long long *pwgts)
+{
+	memset(pwgts, 0, sizeof(long long) * nparts);
+
+#pragma omp parallel if (nvtxs >= hunyuangraph_metrics_parallel)
+	{
+		long long *local = (long long *)calloc(nparts, sizeof(long long));
+
+#pragma omp for schedule(static) nowait
+		for (int i = 0; i < nvtxs; i++)
+			local[where[i]] += vwgt[i];
+
+#pragma omp critical
+		for (int p = 0; p < nparts; p++)
+			pwgts[p] += local[p];
+		free(local);
+	}
+}
+
+void hunyuangraph_metrics_pwgts64(int64_t nvtxs, const int64_t *vwgt, const int64_t *where, int64_t nparts, long long *pwgts)
+{
+	memset(pwgts, 0, sizeof(long long) * nparts);
+
+#pragma omp parallel if (nvtxs >= hunyuangraph_metrics_parallel)
+	{
+		long long *local = (long long *)calloc(nparts, sizeof(long long));
+
+#pragma omp for schedule(static) nowait
+		for (int64_t i = 0; i < nvtxs; i++)
+			local[where[i]] += vwgt[i];
+
+#pragma omp critical
+		for (int64_t p = 0; p < nparts; p++)
+			pwgts[p] += local[p];
+		free(local);
+	}
+}
+
+#endif
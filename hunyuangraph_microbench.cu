@@ -0,0 +1,596 @@
+#include "HunyuanGRAPH.h"
+
+/*Microbenchmarks of the CPU multilevel kernels on fixed graphs.
+
+  hunyuangraph_microbench [-f graph] [-x side] [-l levels] [-i iters] [-w baseline] [-b baseline] [-t tolerance]
+
+  The input is a graph file or, by default, a side x side 2D mesh with weighted edges. It is coarsened
+  with hunyuangraph_cpu_match_HEM into up to -l levels, and every kernel is timed on every level:
+  hunyuangraph_cpu_match_RM, hunyuangraph_cpu_match_HEM and both modes of hunyuangraph_cpu_match_parallel
+  (all include their contraction),
+  hunyuangraph_cpu_create_cgraph alone, hunyuangraph_cpu_2way_refine and hunyuangraph_splitgraph from a
+  fixed bisection, and a sequence of hunyuangraph_queue_* operations. The inputs of every iteration are
+  restored outside of the timed region, and the random matchings are seeded the same way every time.
+  After the matchings of a level, the speedup of the parallel engine over the serial matching that
+  hunyuangraph_cpu_coarsen would use (RM for equal edge weights, HEM otherwise) is reported with the
+  coarse vertices of each, with OMP_NUM_THREADS threads.
+
+  Each line reports the median time of an iteration, ns per vertex, edges/s and the malloc/calloc/realloc
+  calls and bytes of one iteration. -w writes the ns per vertex and allocations to a baseline file, -b
+  compares with one and exits with 1 if a kernel is slower than the baseline by more than the tolerance
+  (default 0.10) or allocates more. The cost of 64-bit edge offsets is measured by writing a baseline
+  with this binary and comparing the one built with -DEDGE64 (make microbench_edge64) against it.*/
+
+#define MICROBENCH_MAXLEVELS  16
+#define MICROBENCH_MAXKERNELS 128
+#define MICROBENCH_MINTIME    200.0      //ms per kernel when -i is not given
+#define MICROBENCH_MINNVTXS   200        //Coarsen_threshold, the coarsest level
+
+/*Allocation counters, the allocator of glibc is interposed*/
+extern "C" void *__libc_malloc(size_t size);
+extern "C" void *__libc_calloc(size_t nmemb, size_t size);
+extern "C" void *__libc_realloc(void *ptr, size_t size);
+
+size_t microbench_nallocs = 0;
+size_t microbench_nbytes = 0;
+
+extern "C" void *malloc(size_t size) throw()
+{
+	__atomic_fetch_add(&microbench_nallocs, 1, __ATOMIC_RELAXED);
+	__atomic_fetch_add(&microbench_nbytes, size, __ATOMIC_RELAXED);
+	return __libc_malloc(size);
+}
+
+extern "C" void *calloc(size_t nmemb, size_t size) throw()
+{
+	__atomic_fetch_add(&microbench_nallocs, 1, __ATOMIC_RELAXED);
+	__atomic_fetch_add(&microbench_nbytes, nmemb * size, __ATOMIC_RELAXED);
+	return __libc_calloc(nmemb, size);
+}
+
+extern "C" void *realloc(void *ptr, size_t size) throw()
+{
+	__atomic_fetch_add(&microbench_nallocs, 1, __ATOMIC_RELAXED);
+	__atomic_fetch_add(&microbench_nbytes, size, __ATOMIC_RELAXED);
+	return __libc_realloc(ptr, size);
+}
+
+typedef struct microbench_result_t {
+	char kernel[64];
+	int level;
+	int nvtxs;
+	int nedges;
+	int iters;
+	double median_ms;
+	double ns_per_vtx;
+	double edges_per_s;
+	double allocs;                        //Allocations per iteration
+	double bytes;                         //Allocated bytes per iteration
+} microbench_result_t;
+
+microbench_result_t microbench_results[MICROBENCH_MAXKERNELS];
+int microbench_nresults = 0;
+
+/*Monotonic time in ms*/
+double microbench_now()
+{
+	struct timespec ts;
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return ts.tv_sec * 1000.0 + ts.tv_nsec / 1000000.0;
+}
+
+int microbench_compare_double(const void *a, const void *b)
+{
+	double x = *(const double *)a, y = *(const double *)b;
+	return (x > y) - (x < y);
+}
+
+/*Side x side 2D mesh, the diagonal edges of every cell included, with edge weights 1..4*/
+hunyuangraph_graph_t *microbench_mesh(int side)
+{
+	int nvtxs = side * side, nedges = 0;
+	hunyuangraph_edge_t *xadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (nvtxs + 1));
+	int *adjncy = (int *)malloc(sizeof(int) * nvtxs * 6);
+	int *adjwgt = (int *)malloc(sizeof(int) * nvtxs * 6);
+	int *vwgt = (int *)malloc(sizeof(int) * nvtxs);
+	int dx[6] = {-1, 1, 0, 0, -1, 1};
+	int dy[6] = {0, 0, -1, 1, -1, 1};
+
+	for (int v = 0; v < nvtxs; v++)
+	{
+		int x = v % side, y = v / side;
+		xadj[v] = nedges;
+		vwgt[v] = 1;
+		for (int d = 0; d < 6; d++)
+		{
+			int nx = x + dx[d], ny = y + dy[d];
+			if (nx < 0 || nx >= side || ny < 0 || ny >= side)
+				continue;
+			int u = ny * side + nx;
+			adjncy[nedges] = u;
+			// symmetric weight of the edge (v, u)
+			adjwgt[nedges] = 1 + ((hunyuangraph_min(u, v) * 7 + hunyuangraph_max(u, v) * 3) & 3);
+			nedges++;
+		}
+	}
+	xadj[nvtxs] = nedges;
+
+	return hunyuangraph_set_first_level_graph(nvtxs, xadj, adjncy, vwgt, adjwgt);
+}
+
+void microbench_free_mcore(hunyuangraph_admin_t *hunyuangraph_admin)
+{
+	hunyuangraph_reset_mcore(hunyuangraph_admin);
+	free(hunyuangraph_admin->mcore->core);
+	free(hunyuangraph_admin->mcore->mops);
+	free(hunyuangraph_admin->mcore);
+	hunyuangraph_admin->mcore = NULL;
+}
+
+/*Deterministic bisection, a breadth-first region grown from vertex 0 to half of the weight*/
+void microbench_bisection(hunyuangraph_graph_t *graph, int *where)
+{
+	int nvtxs = graph->nvtxs, first = 0, last = 0, pwgt = 0, next = 0;
+	int *queue = (int *)malloc(sizeof(int) * nvtxs);
+
+	for (int i = 0; i < nvtxs; i++)
+		where[i] = 1;
+
+	while (pwgt < graph->tvwgt[0] / 2)
+	{
+		if (first == last)
+		{
+			// the next component
+			while (next < nvtxs && where[next] == 0)
+				next++;
+			if (next == nvtxs)
+				break;
+			queue[last++] = next;
+			where[next] = 0;
+			pwgt += graph->vwgt[next];
+			continue;
+		}
+		int v = queue[first++];
+		for (hunyuangraph_edge_t j = graph->xadj[v]; j < graph->xadj[v + 1] && pwgt < graph->tvwgt[0] / 2; j++)
+		{
+			int u = graph->adjncy[j];
+			if (where[u] == 1)
+			{
+				where[u] = 0;
+				pwgt += graph->vwgt[u];
+				queue[last++] = u;
+			}
+		}
+	}
+
+	free(queue);
+}
+
+typedef struct microbench_level_t {
+	hunyuangraph_graph_t *graph;
+	int *where;                           //Fixed bisection
+	int *cmap;                            //cmap and match of the hierarchy
+	int *match;
+	int cnvtxs;
+	int ncoarse[4];                       //Coarse vertices of the RM, HEM, parallel and deterministic matchings
+} microbench_level_t;
+
+typedef void (*microbench_fn_t)(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase);
+#define MICROBENCH_SETUP 0
+#define MICROBENCH_RUN   1
+#define MICROBENCH_CLEAN 2
+
+void microbench_match_RM(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		hunyuangraph_admin->seed = hunyuangraph_seed_default;
+		graph->coarser = NULL;
+	}
+	else if (phase == MICROBENCH_RUN)
+		level->ncoarse[0] = hunyuangraph_cpu_match_RM(hunyuangraph_admin, graph);
+	else
+		hunyuangraph_free_graph(&graph->coarser);
+}
+
+void microbench_match_HEM(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		hunyuangraph_admin->seed = hunyuangraph_seed_default;
+		graph->coarser = NULL;
+	}
+	else if (phase == MICROBENCH_RUN)
+		level->ncoarse[1] = hunyuangraph_cpu_match_HEM(hunyuangraph_admin, graph);
+	else
+		hunyuangraph_free_graph(&graph->coarser);
+}
+
+void microbench_match_parallel(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		hunyuangraph_admin->seed = hunyuangraph_seed_default;
+		graph->coarser = NULL;
+	}
+	else if (phase == MICROBENCH_RUN)
+		level->ncoarse[2] = hunyuangraph_cpu_match_parallel(hunyuangraph_admin, graph, 0);
+	else
+		hunyuangraph_free_graph(&graph->coarser);
+}
+
+void microbench_match_deterministic(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		hunyuangraph_admin->seed = hunyuangraph_seed_default;
+		graph->coarser = NULL;
+	}
+	else if (phase == MICROBENCH_RUN)
+		level->ncoarse[3] = hunyuangraph_cpu_match_parallel(hunyuangraph_admin, graph, 1);
+	else
+		hunyuangraph_free_graph(&graph->coarser);
+}
+
+void microbench_create_cgraph(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		memcpy(graph->cmap, level->cmap, sizeof(int) * graph->nvtxs);
+		graph->coarser = NULL;
+	}
+	else if (phase == MICROBENCH_RUN)
+		hunyuangraph_cpu_create_cgraph(hunyuangraph_admin, graph, level->cnvtxs, level->match);
+	else
+		hunyuangraph_free_graph(&graph->coarser);
+}
+
+void microbench_2way_refine(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+	float ntpwgts[2] = {0.5, 0.5};
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		memcpy(graph->where, level->where, sizeof(int) * graph->nvtxs);
+		hunyuangraph_compute_cpu_2wayparam(hunyuangraph_admin, graph);
+		hunyuangraph_admin->seed = hunyuangraph_seed_default;
+	}
+	else if (phase == MICROBENCH_RUN)
+		hunyuangraph_cpu_2way_refine(hunyuangraph_admin, graph, ntpwgts, hunyuangraph_admin->iteration_num);
+}
+
+hunyuangraph_graph_t *microbench_lgraph, *microbench_rgraph;
+
+void microbench_splitgraph(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+
+	if (phase == MICROBENCH_SETUP)
+	{
+		memcpy(graph->where, level->where, sizeof(int) * graph->nvtxs);
+		hunyuangraph_compute_cpu_2wayparam(hunyuangraph_admin, graph);
+	}
+	else if (phase == MICROBENCH_RUN)
+		hunyuangraph_splitgraph(hunyuangraph_admin, graph, &microbench_lgraph, &microbench_rgraph);
+	else
+	{
+		hunyuangraph_free_graph(&microbench_lgraph);
+		hunyuangraph_free_graph(&microbench_rgraph);
+	}
+}
+
+/*Insert every vertex with its external degree as key, update half of them, delete a quarter and pop the rest*/
+void microbench_queue(hunyuangraph_admin_t *hunyuangraph_admin, microbench_level_t *level, int phase)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+	int nvtxs = graph->nvtxs;
+
+	if (phase != MICROBENCH_RUN)
+		return;
+
+	hunyuangraph_queue_t *queue = hunyuangraph_queue_create(nvtxs);
+	for (int i = 0; i < nvtxs; i++)
+		hunyuangraph_queue_insert(queue, i, graph->xadj[i + 1] - graph->xadj[i] + (i * 37 & 15));
+	for (int i = 0; i < nvtxs; i += 2)
+		hunyuangraph_queue_update(queue, i, (i * 53) & 31);
+	for (int i = 1; i < nvtxs; i += 4)
+		hunyuangraph_queue_delete(queue, i);
+	while (hunyuangraph_queue_top(queue) != -1);
+	hunyuangraph_queue_free(queue);
+}
+
+/*Time one kernel on one level*/
+void microbench_run(const char *kernel, microbench_fn_t fn, microbench_level_t *level, int l, int iters)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+	hunyuangraph_admin_t *hunyuangraph_admin;
+	float tpwgts[2] = {0.5, 0.5}, ubvec = 1.03;
+	int n = 0, cap = 64;
+	double *times = (double *)malloc(sizeof(double) * cap), total = 0;
+	size_t nallocs = 0, nbytes = 0;
+
+	hunyuangraph_admin = hunyuangraph_set_graph_admin(2, tpwgts, &ubvec);
+	hunyuangraph_admin->maxvwgt = 1.5 * graph->tvwgt[0] / hunyuangraph_admin->Coarsen_threshold;
+	hunyuangraph_allocatespace(hunyuangraph_admin, graph);
+
+	// one untimed iteration warms the caches and the allocator
+	for (int it = -1; iters > 0 ? it < iters : (it < 5 || total < MICROBENCH_MINTIME); it++)
+	{
+		hunyuangraph_reset_mcore(hunyuangraph_admin);
+		fn(hunyuangraph_admin, level, MICROBENCH_SETUP);
+
+		size_t a0 = microbench_nallocs, b0 = microbench_nbytes;
+		double begin = microbench_now();
+		fn(hunyuangraph_admin, level, MICROBENCH_RUN);
+		double t = microbench_now() - begin;
+		size_t a1 = microbench_nallocs, b1 = microbench_nbytes;
+
+		fn(hunyuangraph_admin, level, MICROBENCH_CLEAN);
+		if (it < 0)
+			continue;
+
+		if (n == cap)
+		{
+			cap *= 2;
+			times = (double *)realloc(times, sizeof(double) * cap);
+		}
+		times[n++] = t;
+		total += t;
+		nallocs += a1 - a0;
+		nbytes += b1 - b0;
+	}
+
+	qsort(times, n, sizeof(double), microbench_compare_double);
+
+	microbench_result_t *r = &microbench_results[microbench_nresults++];
+	snprintf(r->kernel, sizeof(r->kernel), "%s", kernel);
+	r->level = l;
+	r->nvtxs = graph->nvtxs;
+	r->nedges = graph->nedges;
+	r->iters = n;
+	r->median_ms = times[n / 2];
+	r->ns_per_vtx = r->median_ms * 1000000.0 / (graph->nvtxs > 0 ? graph->nvtxs : 1);
+	r->edges_per_s = r->median_ms > 0 ? graph->nedges / (r->median_ms / 1000.0) : 0;
+	r->allocs = (double)nallocs / n;
+	r->bytes = (double)nbytes / n;
+
+	printf("%-36s level=%2d nvtxs=%9d nedges=%10d iters=%5d median=%10.3lf ms %10.2lf ns/vtx %8.2lf Medges/s allocs=%8.1lf bytes=%12.0lf\n",
+		r->kernel, r->level, r->nvtxs, r->nedges, r->iters, r->median_ms, r->ns_per_vtx, r->edges_per_s / 1000000.0, r->allocs, r->bytes);
+
+	microbench_free_mcore(hunyuangraph_admin);
+	free(hunyuangraph_admin->tpwgts);
+	free(hunyuangraph_admin->ubfactors);
+	free(hunyuangraph_admin->part_balance);
+	free(hunyuangraph_admin);
+	free(times);
+}
+
+/*Median time of a kernel on a level*/
+double microbench_median(const char *kernel, int l)
+{
+	for (int i = 0; i < microbench_nresults; i++)
+		if (strcmp(microbench_results[i].kernel, kernel) == 0 && microbench_results[i].level == l)
+			return microbench_results[i].median_ms;
+	return 0;
+}
+
+/*Speedup of the parallel matching engine over the serial matching of hunyuangraph_cpu_coarsen*/
+void microbench_match_speedup(microbench_level_t *level, int l)
+{
+	hunyuangraph_graph_t *graph = level->graph;
+	int eqewgts = 1, serial;
+
+	for (hunyuangraph_edge_t j = 1; j < graph->nedges; j++)
+		if (graph->adjwgt[j] != graph->adjwgt[0])
+		{
+			eqewgts = 0;
+			break;
+		}
+	serial = (eqewgts || graph->nedges == 0 ? 0 : 1);
+
+	double t = microbench_median(serial == 0 ? "hunyuangraph_cpu_match_RM" : "hunyuangraph_cpu_match_HEM", l);
+	double tp = microbench_median("hunyuangraph_cpu_match_parallel", l);
+	double td = microbench_median("hunyuangraph_cpu_match_deterministic", l);
+
+	printf("match speedup level=%2d threads=%3d over %s: parallel=%6.2lfx deterministic=%6.2lfx cnvtxs: serial=%d parallel=%d deterministic=%d\n",
+		l, hunyuangraph_get_nthreads(), serial == 0 ? "RM" : "HEM", tp > 0 ? t / tp : 0, td > 0 ? t / td : 0,
+		level->ncoarse[serial], level->ncoarse[2], level->ncoarse[3]);
+}
+
+void microbench_write_baseline(const char *filename)
+{
+	FILE *fp = fopen(filename, "w");
+	if (fp == NULL)
+		hunyuangraph_error_exit("Failed to open %s\n", filename);
+
+	fprintf(fp, "# kernel level nvtxs nedges ns_per_vtx allocs\n");
+	for (int i = 0; i < microbench_nresults; i++)
+	{
+		microbench_result_t *r = &microbench_results[i];
+		fprintf(fp, "%s %d %d %d %.3lf %.1lf\n", r->kernel, r->level, r->nvtxs, r->nedges, r->ns_per_vtx, r->allocs);
+	}
+	fclose(fp);
+}
+
+/*Compare with a baseline file, returns the number of regressions*/
+int microbench_compare_baseline(const char *filename, double tolerance)
+{
+	FILE *fp = fopen(filename, "r");
+	char line[256], kernel[64];
+	int level, nvtxs, nedges, nregressions = 0;
+	double ns_per_vtx, allocs;
+
+	if (fp == NULL)
+		hunyuangraph_error_exit("Failed to open %s\n", filename);
+
+	printf("baseline:%s tolerance=%.2lf\n", filename, tolerance);
+	while (fgets(line, sizeof(line), fp) != NULL)
+	{
+		if (line[0] == '#' || sscanf(line, "%63s %d %d %d %lf %lf", kernel, &level, &nvtxs, &nedges, &ns_per_vtx, &allocs) != 6)
+			continue;
+
+		for (int i = 0; i < microbench_nresults; i++)
+		{
+			microbench_result_t *r = &microbench_results[i];
+			if (strcmp(r->kernel, kernel) != 0 || r->level != level)
+				continue;
+
+			if (r->nvtxs != nvtxs || r->nedges != nedges)
+			{
+				printf("%-36s level=%2d other input: nvtxs=%d nedges=%d in the baseline\n", kernel, level, nvtxs, nedges);
+				break;
+			}
+
+			double ratio = ns_per_vtx > 0 ? r->ns_per_vtx / ns_per_vtx : 1.0;
+			int slower = ratio > 1.0 + tolerance, more = r->allocs > allocs + 0.5;
+			printf("%-36s level=%2d %10.2lf -> %10.2lf ns/vtx %+7.1lf%% allocs %8.1lf -> %8.1lf %s\n", kernel, level, ns_per_vtx, r->ns_per_vtx,
+				(ratio - 1.0) * 100.0, allocs, r->allocs, slower || more ? "REGRESSION" : "ok");
+			nregressions += slower || more;
+			break;
+		}
+	}
+	fclose(fp);
+
+	return nregressions;
+}
+
+int main(int argc, char **argv)
+{
+	char *filename = NULL, *write_file = NULL, *baseline_file = NULL;
+	int side = 256, nlevels = 4, iters = 0;
+	double tolerance = 0.10;
+	microbench_level_t levels[MICROBENCH_MAXLEVELS];
+
+	for (int i = 1; i < argc; i++)
+	{
+		if (strcmp(argv[i], "-f") == 0 && i + 1 < argc)
+			filename = argv[++i];
+		else if (strcmp(argv[i], "-x") == 0 && i + 1 < argc)
+			side = atoi(argv[++i]);
+		else if (strcmp(argv[i], "-l") == 0 && i + 1 < argc)
+			nlevels = atoi(argv[++i]);
+		else if (strcmp(argv[i], "-i") == 0 && i + 1 < argc)
+			iters = atoi(argv[++i]);
+		else if (strcmp(argv[i], "-w") == 0 && i + 1 < argc)
+			write_file = argv[++i];
+		else if (strcmp(argv[i], "-b") == 0 && i + 1 < argc)
+			baseline_file = argv[++i];
+		else if (strcmp(argv[i], "-t") == 0 && i + 1 < argc)
+			tolerance = atof(argv[++i]);
+		else
+		{
+			printf("Usage: %s [-f graph] [-x side] [-l levels] [-i iters] [-w baseline] [-b baseline] [-t tolerance]\n", argv[0]);
+			return 1;
+		}
+	}
+	nlevels = hunyuangraph_max(1, hunyuangraph_min(nlevels, MICROBENCH_MAXLEVELS));
+
+	hunyuangraph_graph_t *graph;
+	if (filename != NULL)
+	{
+		graph = hunyuangraph_readgraph(filename);
+		printf("graph:%s nvtxs=%d nedges=%lld\n", filename, graph->nvtxs, (long long)graph->nedges);
+	}
+	else
+	{
+		graph = microbench_mesh(side);
+		printf("graph:mesh%dx%d nvtxs=%d nedges=%lld\n", side, side, graph->nvtxs, (long long)graph->nedges);
+	}
+
+	// the hierarchy, coarsened the way hunyuangraph_cpu_coarsen does
+	int n = 0;
+	for (hunyuangraph_graph_t *g = graph; g != NULL && n < nlevels; n++)
+	{
+		float tpwgts[2] = {0.5, 0.5}, ubvec = 1.03;
+		hunyuangraph_admin_t *hunyuangraph_admin = hunyuangraph_set_graph_admin(2, tpwgts, &ubvec);
+		microbench_level_t *level = &levels[n];
+
+		if (g->tvwgt == NULL)
+			hunyuangraph_set_graph_tvwgt(g);
+		hunyuangraph_set_graph_label(g);
+		hunyuangraph_allocate_cpu_2waymem(hunyuangraph_admin, g);
+		level->graph = g;
+		level->where = (int *)malloc(sizeof(int) * g->nvtxs);
+		microbench_bisection(g, level->where);
+
+		hunyuangraph_admin->maxvwgt = 1.5 * g->tvwgt[0] / hunyuangraph_admin->Coarsen_threshold;
+		hunyuangraph_allocatespace(hunyuangraph_admin, g);
+		g->cmap = (int *)malloc(sizeof(int) * g->nvtxs);
+		hunyuangraph_cpu_match_HEM(hunyuangraph_admin, g);
+		microbench_free_mcore(hunyuangraph_admin);
+		free(hunyuangraph_admin->tpwgts);
+		free(hunyuangraph_admin->ubfactors);
+		free(hunyuangraph_admin->part_balance);
+		free(hunyuangraph_admin);
+
+		// the matching, from the vertices that share a coarse vertex
+		level->cmap = (int *)malloc(sizeof(int) * g->nvtxs);
+		level->match = (int *)malloc(sizeof(int) * g->nvtxs);
+		memcpy(level->cmap, g->cmap, sizeof(int) * g->nvtxs);
+		level->cnvtxs = g->coarser->nvtxs;
+		int *first = (int *)malloc(sizeof(int) * level->cnvtxs);
+		for (int c = 0; c < level->cnvtxs; c++)
+			first[c] = -1;
+		for (int v = 0; v < g->nvtxs; v++)
+		{
+			int c = g->cmap[v];
+			level->match[v] = v;
+			if (first[c] == -1)
+				first[c] = v;
+			else
+			{
+				level->match[v] = first[c];
+				level->match[first[c]] = v;
+			}
+		}
+		free(first);
+
+		hunyuangraph_graph_t *coarser = g->coarser;
+		if (coarser->nvtxs <= MICROBENCH_MINNVTXS || coarser->nvtxs >= 0.85 * g->nvtxs)
+		{
+			n++;
+			break;
+		}
+		g = coarser;
+	}
+	nlevels = n;
+
+	for (int l = 0; l < nlevels; l++)
+	{
+		microbench_level_t *level = &levels[l];
+		hunyuangraph_graph_t *coarser = level->graph->coarser;
+
+		microbench_run("hunyuangraph_cpu_match_RM", microbench_match_RM, level, l, iters);
+		microbench_run("hunyuangraph_cpu_match_HEM", microbench_match_HEM, level, l, iters);
+		microbench_run("hunyuangraph_cpu_match_parallel", microbench_match_parallel, level, l, iters);
+		microbench_run("hunyuangraph_cpu_match_deterministic", microbench_match_deterministic, level, l, iters);
+		microbench_match_speedup(level, l);
+		microbench_run("hunyuangraph_cpu_create_cgraph", microbench_create_cgraph, level, l, iters);
+		microbench_run("hunyuangraph_cpu_2way_refine", microbench_2way_refine, level, l, iters);
+		microbench_run("hunyuangraph_splitgraph", microbench_splitgraph, level, l, iters);
+		microbench_run("hunyuangraph_queue", microbench_queue, level, l, iters);
+
+		level->graph->coarser = coarser;
+	}
+
+	int nregressions = 0;
+	if (write_file != NULL)
+		microbench_write_baseline(write_file);
+	if (baseline_file != NULL)
+		nregressions = microbench_compare_baseline(baseline_file, tolerance);
+	if (nregressions > 0)
+		printf("%d kernels regressed\n", nregressions);
+
+	return nregressions > 0;
+}
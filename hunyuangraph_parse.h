@@ -0,0 +1,316 @@
+#ifndef _H_PARSE
+#define _H_PARSE
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include "hunyuangraph_struct.h"
+#include "hunyuangraph_common.h"
+
+/*Host-side METIS graph parser shared by hunyuangraph and the graph tools.
+  The file is memory-mapped, split into line-aligned chunks and parsed in two
+  passes: the first pass counts the vertex lines and adjacency entries of every
+  chunk, a prefix sum over the chunks gives each chunk its first vertex and
+  first adjacency entry, and the second pass parses the chunks in parallel
+  straight into xadj/adjncy/vwgt/adjwgt.*/
+
+#define hunyuangraph_parse_chunk_size (1 << 20)
+
+/*Map file into memory*/
+void hunyuangraph_mapfile_open(char *filename, hunyuangraph_mapfile_t *map)
+{
+	struct stat status;
+
+	map->fd = open(filename, O_RDONLY);
+	if (map->fd == -1)
+	{
+		perror(filename);
+		hunyuangraph_error_exit("Failed on file open()\n");
+	}
+
+	if (fstat(map->fd, &status) == -1)
+	{
+		perror(filename);
+		hunyuangraph_error_exit("Failed on file fstat()\n");
+	}
+
+	map->size = status.st_size;
+	if (map->size == 0)
+		hunyuangraph_error_exit("Premature end of input file: file: %s\n", filename);
+
+	map->data = (char *)mmap(NULL, map->size, PROT_READ, MAP_PRIVATE, map->fd, 0);
+	if (map->data == MAP_FAILED)
+	{
+		perror(filename);
+		hunyuangraph_error_exit("Failed on file mmap()\n");
+	}
+	madvise(map->data, map->size, MADV_SEQUENTIAL);
+}
+
+/*Unmap file*/
+void hunyuangraph_mapfile_close(hunyuangraph_mapfile_t *map)
+{
+	munmap(map->data, map->size);
+	close(map->fd);
+	map->data = NULL;
+	map->size = 0;
+	map->fd = -1;
+}
+
+/*Get the end of the line starting at p (the '\n' or end)*/
+static inline const char *hunyuangraph_line_end(const char *p, const char *end)
+{
+	const char *q = (const char *)memchr(p, '\n', end - p);
+	return q == NULL ? end : q;
+}
+
+static inline int hunyuangraph_is_blank(char c)
+{
+	return c == ' ' || c == '\t' || c == '\r' || c == '\v' || c == '\f';
+}
+
+/*Parse one integer of a line, returns NULL if there is none (same as strtol failing)*/
+static inline const char *hunyuangraph_parse_int(const char *p, const char *end, long long *val)
+{
+	long long x = 0;
+	int neg = 0;
+	const char *q;
+
+	while (p < end && hunyuangraph_is_blank(*p))
+		p++;
+	if (p < end && (*p == '-' || *p == '+'))
+	{
+		neg = (*p == '-');
+		p++;
+	}
+	for (q = p; q < end && *q >= '0' && *q <= '9'; q++)
+		x = x * 10 + (*q - '0');
+	if (q == p)
+		return NULL;
+
+	*val = neg ? -x : x;
+	return q;
+}
+
+/*Skip the comment lines and read the first line of a graph file*/
+const char *hunyuangraph_parse_header(const char *data, const char *end, char *header, size_t size)
+{
+	const char *p = data, *le;
+	size_t len;
+
+	do
+	{
+		if (p >= end)
+			return NULL;
+		le = hunyuangraph_line_end(p, end);
+		if (*p != '%')
+			break;
+		p = le + 1;
+	} while (1);
+
+	len = le - p;
+	if (len > size - 1)
+		len = size - 1;
+	memcpy(header, p, len);
+	header[len] = '\0';
+
+	return le < end ? le + 1 : end;
+}
+
+/*Count the vertex lines and adjacency entries of a chunk*/
+void hunyuangraph_count_chunk(hunyuangraph_chunk_t *chunk, size_t maxlines, int readvw, int readew)
+{
+	const char *p = chunk->begin, *end = chunk->end, *le;
+	size_t nlines = 0, nedges = 0, ntokens;
+	int intoken;
+
+	while (p < end && nlines < maxlines)
+	{
+		le = hunyuangraph_line_end(p, end);
+
+		if (*p != '%')
+		{
+			for (ntokens = 0, intoken = 0; p < le; p++)
+			{
+				if (hunyuangraph_is_blank(*p))
+					intoken = 0;
+				else if (!intoken)
+				{
+					intoken = 1;
+					ntokens++;
+				}
+			}
+			if (ntokens > (size_t)readvw)
+				nedges += (ntokens - readvw) >> readew;
+			nlines++;
+		}
+
+		p = le + 1;
+	}
+
+	chunk->end = (p < end ? p : end);
+	chunk->nlines = nlines;
+	chunk->nedges = nedges;
+}
+
+/*Parse a counted chunk into the csr arrays*/
+void hunyuangraph_fill_chunk(hunyuangraph_chunk_t *chunk, int nvtxs, int readvw, int readew, hunyuangraph_edge_t *xadj, int *adjncy, int *vwgt, int *adjwgt)
+{
+	const char *p = chunk->begin, *end = chunk->end, *le, *q;
+	size_t i = chunk->vstart, k = chunk->estart, kend = chunk->estart + chunk->nedges;
+	long long edge, ewgt, vw;
+
+	while (p < end)
+	{
+		le = hunyuangraph_line_end(p, end);
+
+		if (*p == '%')
+		{
+			p = le + 1;
+			continue;
+		}
+
+		vwgt[i] = 1;
+		if (readvw)
+		{
+			q = hunyuangraph_parse_int(p, le, &vw);
+			if (q == NULL)
+			{
+				hunyuangraph_error_exit("The line for vertex %d does not have enough weights "
+										"for the %d constraints.\n",
+										(int)i + 1, 1);
+			}
+			if (vw < 0)
+			{
+				hunyuangraph_error_exit("The weight vertex %d and constraint %d must be >= 0\n", (int)i + 1, 0);
+			}
+			vwgt[i] = (int)vw;
+			p = q;
+		}
+
+		while (1)
+		{
+			q = hunyuangraph_parse_int(p, le, &edge);
+			if (q == NULL)
+			{
+				break;
+			}
+
+			p = q;
+			if (edge < 1 || edge > nvtxs)
+			{
+				hunyuangraph_error_exit("Edge %lld for vertex %d is out of bounds\n", edge, (int)i + 1);
+			}
+
+			ewgt = 1;
+
+			if (readew)
+			{
+				q = hunyuangraph_parse_int(p, le, &ewgt);
+
+				if (q == NULL)
+				{
+					hunyuangraph_error_exit("Premature end of line for vertex %d\n", (int)i + 1);
+				}
+
+				if (ewgt <= 0)
+				{
+					hunyuangraph_error_exit("The weight (%lld) for edge (%d, %lld) must be positive.\n", ewgt, (int)i + 1, edge);
+				}
+
+				p = q;
+			}
+
+			if (k == kend)
+			{
+				hunyuangraph_error_exit("Unexpected entry in the line for vertex %d\n", (int)i + 1);
+			}
+
+			adjncy[k] = (int)edge - 1;
+			adjwgt[k] = (int)ewgt;
+			k++;
+		}
+
+		xadj[++i] = (hunyuangraph_edge_t)k;
+		p = le + 1;
+	}
+
+	if (k != kend)
+	{
+		hunyuangraph_error_exit("Invalid entry in the lines for vertices %d to %d\n", (int)chunk->vstart + 1, (int)i);
+	}
+}
+
+/*Parse the complete lines in [begin, end) as the vertices starting at vstart.
+  xadj[vstart] must hold *r_estart. Returns the number of vertex lines read.*/
+size_t hunyuangraph_parse_segment(const char *begin, const char *end, int nvtxs, hunyuangraph_edge_t nedges, int readvw, int readew,
+								  size_t vstart, size_t *r_estart, hunyuangraph_edge_t *xadj, int *adjncy, int *vwgt, int *adjwgt)
+{
+	int c, nchunks;
+	size_t step, nlines, estart, maxlines;
+	const char *p;
+	hunyuangraph_chunk_t *chunks;
+
+	if (begin >= end || vstart >= (size_t)nvtxs)
+		return 0;
+
+	nchunks = hunyuangraph_get_nthreads() * 8;
+	if ((size_t)nchunks > (end - begin) / hunyuangraph_parse_chunk_size + 1)
+		nchunks = (end - begin) / hunyuangraph_parse_chunk_size + 1;
+	chunks = (hunyuangraph_chunk_t *)malloc(sizeof(hunyuangraph_chunk_t) * nchunks);
+
+	/*Split at line boundaries*/
+	step = (end - begin) / nchunks;
+	for (p = begin, c = 0; c < nchunks; c++)
+	{
+		chunks[c].begin = p;
+		if (c == nchunks - 1 || p + step >= end)
+			p = end;
+		else
+		{
+			p = hunyuangraph_line_end(p + step, end);
+			p = (p < end ? p + 1 : end);
+		}
+		chunks[c].end = p;
+	}
+
+	/*Pass 1: count*/
+#pragma omp parallel for schedule(dynamic, 1)
+	for (c = 0; c < nchunks; c++)
+		hunyuangraph_count_chunk(&chunks[c], (size_t)-1, readvw, readew);
+
+	/*Prefix sum over the chunks, dropping the lines beyond nvtxs*/
+	maxlines = nvtxs - vstart;
+	estart = *r_estart;
+	for (nlines = 0, c = 0; c < nchunks; c++)
+	{
+		if (nlines + chunks[c].nlines > maxlines)
+			hunyuangraph_count_chunk(&chunks[c], maxlines - nlines, readvw, readew);
+
+		chunks[c].vstart = vstart + nlines;
+		chunks[c].estart = estart;
+		nlines += chunks[c].nlines;
+		estart += chunks[c].nedges;
+
+		if (estart > (size_t)nedges)
+		{
+			hunyuangraph_error_exit("There are more edges in the file than the %lld specified.\n", (long long)(nedges / 2));
+		}
+	}
+
+	/*Pass 2: fill*/
+#pragma omp parallel for schedule(dynamic, 1)
+	for (c = 0; c < nchunks; c++)
+		hunyuangraph_fill_chunk(&chunks[c], nvtxs, readvw, readew, xadj, adjncy, vwgt, adjwgt);
+
+	free(chunks);
+
+	*r_estart = estart;
+	return nlines;
+}
+
+#endif
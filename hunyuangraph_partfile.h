@@ -0,0 +1,233 @@
+#ifndef _H_PARTFILE
+#define _H_PARTFILE
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+/*Partition files.
+  Text: <graph>.part.<k>, one part id per line, as written by METIS.
+  Binary: <graph>.part.<k>.bin, a hunyuangraph_partfile_header_t followed by
+  nvtxs little-endian part ids of width bytes each (int16 when nparts fits,
+  int32 otherwise).
+  Both writers work in rounds of hunyuangraph_partfile_chunk vertices per
+  thread: the chunks of a round are formatted in parallel into their own
+  buffers and then written with one fwrite each.*/
+
+#define hunyuangraph_partfile_magic "HYPARTBN"
+#define hunyuangraph_partfile_version 1
+#define hunyuangraph_partfile_chunk (1 << 16)
+
+typedef struct hunyuangraph_partfile_header_t {
+	char magic[8];
+	uint32_t version;
+	uint32_t width;                       //Bytes per part id (2 or 4)
+	int64_t nvtxs;
+	int32_t nparts;
+	uint32_t reserved;
+} hunyuangraph_partfile_header_t;
+
+int hunyuangraph_partfile_nthreads()
+{
+#ifdef _OPENMP
+	return omp_get_max_threads();
+#else
+	return 1;
+#endif
+}
+
+/*Format val and a newline at buf, returns the bytes written*/
+static inline int hunyuangraph_partfile_itoa(int val, char *buf)
+{
+	char tmp[12];
+	int len = 0, i = 0;
+	unsigned int u = val < 0 ? 0U - (unsigned int)val : (unsigned int)val;
+
+	do
+	{
+		tmp[len++] = '0' + u % 10;
+		u /= 10;
+	} while (u > 0);
+
+	if (val < 0)
+		buf[i++] = '-';
+	while (len > 0)
+		buf[i++] = tmp[--len];
+	buf[i++] = '\n';
+
+	return i;
+}
+
+/*Write the text partition file, returns 1 on success*/
+int hunyuangraph_partfile_write_text(const char *filename, const int *part, int n)
+{
+	FILE *fp;
+	int nchunks, c, ok = 1;
+	size_t round, *len;
+	char **buf;
+
+	fp = fopen(filename, "w");
+	if (fp == NULL)
+		return 0;
+
+	nchunks = hunyuangraph_partfile_nthreads() * 4;
+	buf = (char **)malloc(sizeof(char *) * nchunks);
+	len = (size_t *)malloc(sizeof(size_t) * nchunks);
+	for (c = 0; c < nchunks; c++)
+		buf[c] = (char *)malloc(12 * hunyuangraph_partfile_chunk);
+
+	for (round = 0; round < (size_t)n && ok; round += (size_t)nchunks * hunyuangraph_partfile_chunk)
+	{
+#pragma omp parallel for schedule(static, 1)
+		for (c = 0; c < nchunks; c++)
+		{
+			size_t i, begin, end;
+			char *p = buf[c];
+
+			begin = round + (size_t)c * hunyuangraph_partfile_chunk;
+			end = begin + hunyuangraph_partfile_chunk;
+			if (begin > (size_t)n)
+				begin = n;
+			if (end > (size_t)n)
+				end = n;
+
+			for (i = begin; i < end; i++)
+				p += hunyuangraph_partfile_itoa(part[i], p);
+			len[c] = p - buf[c];
+		}
+
+		for (c = 0; c < nchunks && ok; c++)
+			ok = len[c] == 0 || fwrite(buf[c], 1, len[c], fp) == len[c];
+	}
+
+	for (c = 0; c < nchunks; c++)
+		free(buf[c]);
+	free(buf);
+	free(len);
+
+	return (fclose(fp) == 0) && ok;
+}
+
+/*Write the binary partition file, returns 1 on success*/
+int hunyuangraph_partfile_write_binary(const char *filename, const int *part, int n, int nparts)
+{
+	FILE *fp;
+	int ok;
+	size_t i, begin, end, step;
+	int16_t *buf;
+	hunyuangraph_partfile_header_t header;
+
+	memset(&header, 0, sizeof(hunyuangraph_partfile_header_t));
+	memcpy(header.magic, hunyuangraph_partfile_magic, 8);
+	header.version = hunyuangraph_partfile_version;
+	header.width = (nparts <= INT16_MAX ? 2 : 4);
+	header.nvtxs = n;
+	header.nparts = nparts;
+
+	fp = fopen(filename, "wb");
+	if (fp == NULL)
+		return 0;
+
+	ok = fwrite(&header, sizeof(header), 1, fp) == 1;
+
+	if (header.width == 4)
+		ok = ok && (n == 0 || fwrite(part, sizeof(int), n, fp) == (size_t)n);
+	else
+	{
+		step = (size_t)hunyuangraph_partfile_nthreads() * 4 * hunyuangraph_partfile_chunk;
+		buf = (int16_t *)malloc(sizeof(int16_t) * step);
+		for (begin = 0; begin < (size_t)n && ok; begin += step)
+		{
+			end = begin + step < (size_t)n ? begin + step : (size_t)n;
+#pragma omp parallel for
+			for (i = begin; i < end; i++)
+				buf[i - begin] = (int16_t)part[i];
+			ok = fwrite(buf, sizeof(int16_t), end - begin, fp) == end - begin;
+		}
+		free(buf);
+	}
+
+	return (fclose(fp) == 0) && ok;
+}
+
+/*Read a text or binary partition file, returns NULL on failure*/
+int *hunyuangraph_partfile_read(const char *filename, int *r_n, int *r_nparts)
+{
+	FILE *fp;
+	int *part;
+	int16_t *buf;
+	size_t i, n, cap;
+	long val;
+	hunyuangraph_partfile_header_t header;
+
+	fp = fopen(filename, "rb");
+	if (fp == NULL)
+		return NULL;
+
+	if (fread(&header, sizeof(header), 1, fp) == 1 && memcmp(header.magic, hunyuangraph_partfile_magic, 8) == 0)
+	{
+		if (header.version != hunyuangraph_partfile_version || (header.width != 2 && header.width != 4) || header.nvtxs < 0)
+		{
+			fclose(fp);
+			return NULL;
+		}
+
+		n = header.nvtxs;
+		part = (int *)malloc(sizeof(int) * (n + 1));
+		if (header.width == 4)
+		{
+			if (fread(part, sizeof(int), n, fp) != n)
+			{
+				free(part);
+				part = NULL;
+			}
+		}
+		else
+		{
+			buf = (int16_t *)malloc(sizeof(int16_t) * (n + 1));
+			if (fread(buf, sizeof(int16_t), n, fp) != n)
+			{
+				free(part);
+				part = NULL;
+			}
+			else
+			{
+#pragma omp parallel for
+				for (i = 0; i < n; i++)
+					part[i] = buf[i];
+			}
+			free(buf);
+		}
+
+		fclose(fp);
+		*r_n = n;
+		*r_nparts = header.nparts;
+		return part;
+	}
+
+	rewind(fp);
+	cap = 1 << 20;
+	part = (int *)malloc(sizeof(int) * cap);
+	*r_nparts = 0;
+	for (n = 0; fscanf(fp, "%ld", &val) == 1; n++)
+	{
+		if (n == cap)
+		{
+			cap *= 2;
+			part = (int *)realloc(part, sizeof(int) * cap);
+		}
+		part[n] = val;
+		if (val + 1 > *r_nparts)
+			*r_nparts = val + 1;
+	}
+	fclose(fp);
+
+	*r_n = n;
+	return part;
+}
+
+#endif
@@ -3,9 +3,11 @@
 
 #include "hunyuangraph_struct.h"
 #include "hunyuangraph_timer.h"
+#include "hunyuangraph_CPU_initialpartition.h"
+#include "hunyuangraph_CPU_partition.h"
+#ifndef NO_CUDA
 #include "hunyuangraph_GPU_memory.h"
 #include "hunyuangraph_GPU_coarsen.h"
-#include "hunyuangraph_CPU_initialpartition.h"
 #include "hunyuangraph_GPU_initialpartition.h"
 #include "hunyuangraph_GPU_uncoarsen.h"
 
@@ -148,6 +150,8 @@ figure10_sampling:
 	// exit(0);
 }
 
+#endif
+
 /*Set kway balance params*/
 void hunyuangraph_set_kway_bal(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
 {
@@ -155,6 +159,7 @@ void hunyuangraph_set_kway_bal(hunyuangraph_admin_t *hunyuangraph_admin, hunyuan
 		hunyuangraph_admin->part_balance[i + j] = graph->tvwgt_reverse[j] / hunyuangraph_admin->tpwgts[i + j];
 }
 
+#ifndef NO_CUDA
 __global__ void init_vwgt(int *vwgt, int nvtxs)
 {
 	int ii = blockIdx.x * blockDim.x + threadIdx.x;
@@ -204,7 +209,7 @@ void hunyuangraph_malloc_original_coarseninfo(hunyuangraph_admin_t *hunyuangraph
 	// cudaMalloc((void**)&graph->cuda_adjncy,nedges*sizeof(int));
 	// cudaMalloc((void**)&graph->cuda_adjwgt,nedges*sizeof(int));
 
-	cudaMemcpy(graph->cuda_xadj, graph->xadj, (nvtxs + 1) * sizeof(int), cudaMemcpyHostToDevice);
+	hunyuangraph_xadj_to_device(graph->cuda_xadj, graph->xadj, nvtxs);
 	cudaMemcpy(graph->cuda_adjncy, graph->adjncy, nedges * sizeof(int), cudaMemcpyHostToDevice);
 
 	// ����CUDA��
@@ -279,9 +284,10 @@ void hunyuangraph_malloc_original_coarseninfo(hunyuangraph_admin_t *hunyuangraph
 	// // ����CUDA��
 	// cudaStreamDestroy(stream);
 }
+#endif
 
 /*Graph partition algorithm*/
-void hunyuangraph_PartitionGraph(int *nvtxs, int *xadj, int *adjncy, int *vwgt, int *adjwgt, int *nparts, float *tpwgts, float *ubvec, int *part)
+void hunyuangraph_PartitionGraph(int *nvtxs, hunyuangraph_edge_t *xadj, int *adjncy, int *vwgt, int *adjwgt, int *nparts, float *tpwgts, float *ubvec, int *part)
 {
 	hunyuangraph_graph_t *graph;
 	hunyuangraph_admin_t *hunyuangraph_admin;
@@ -290,6 +296,27 @@ void hunyuangraph_PartitionGraph(int *nvtxs, int *xadj, int *adjncy, int *vwgt,
 
 	graph = hunyuangraph_set_first_level_graph(*nvtxs, xadj, adjncy, vwgt, adjwgt);
 
+	if (hunyuangraph_admin->backend == hunyuangraph_backend_cpu)
+	{
+		hunyuangraph_set_kway_bal(hunyuangraph_admin, graph);
+		hunyuangraph_tune_apply(hunyuangraph_admin, graph);
+		hunyuangraph_cpu_partitiongraph(hunyuangraph_admin, graph, part);
+
+		graph->xadj = NULL;
+		graph->vwgt = NULL;
+		graph->adjncy = NULL;
+		graph->adjwgt = NULL;
+		hunyuangraph_free_graph(&graph);
+		hunyuangraph_free_admin(&hunyuangraph_admin);
+		return;
+	}
+
+#ifndef NO_CUDA
+	if (graph->nedges > INT_MAX)
+	{
+		hunyuangraph_error_exit("The graph has %lld adjacency entries, the GPU arrays are indexed with int.\n", (long long)graph->nedges);
+	}
+
 	hunyuangraph_set_kway_bal(hunyuangraph_admin, graph);
 
 	hunyuangraph_admin->Coarsen_threshold = hunyuangraph_max((*nvtxs) / (20 * (hunyuangraph_compute_log2(*nparts))), 30 * (*nparts));
@@ -301,6 +328,7 @@ void hunyuangraph_PartitionGraph(int *nvtxs, int *xadj, int *adjncy, int *vwgt,
 		hunyuangraph_admin->Coarsen_threshold = (*nparts) * 2;
 		hunyuangraph_admin->Coarsen_threshold = hunyuangraph_max(1024, hunyuangraph_admin->Coarsen_threshold);
 	}
+	hunyuangraph_tune_apply(hunyuangraph_admin, graph);
 	printf("hunyuangraph_admin->Coarsen_threshold=%10d\n", hunyuangraph_admin->Coarsen_threshold);
 
 	if(GPU_Memory_Pool)
@@ -344,6 +372,7 @@ void hunyuangraph_PartitionGraph(int *nvtxs, int *xadj, int *adjncy, int *vwgt,
 	// lfree_with_check(sizeof(int) * graph->nvtxs,"cu_bn");						//cu_bn
 	if(GPU_Memory_Pool)
 		Free_GPU_Memory();
+#endif
 }
 
 #endif
\ No newline at end of file
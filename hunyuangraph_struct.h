@@ -2,6 +2,7 @@
 #define _H_STRUCT
 
 #include <sys/types.h>
+#include "hunyuangraph_edge.h"
 
 typedef signed char hunyuangraph_int8_t;
 
@@ -9,8 +10,8 @@ typedef signed char hunyuangraph_int8_t;
 typedef struct hunyuangraph_graph_t {
 	/*graph cpu params*/
 	int nvtxs;                            //Graph vertex
-	int nedges;	                          //Graph edge
-	int *xadj;                            //Graph vertex csr array (xadj[nvtxs+1])
+	hunyuangraph_edge_t nedges;           //Graph edge
+	hunyuangraph_edge_t *xadj;            //Graph vertex csr array (xadj[nvtxs+1])
 	int *adjncy;                          //Graph adjacency list (adjncy[nedges])
 	int *adjwgt;   		                    //Graph edge weight array (adjwgt[nedges])
 	int *vwgt;			                      //Graph vertex weight array(vwgr[nvtxs])
@@ -27,6 +28,8 @@ typedef struct hunyuangraph_graph_t {
 	int *id;                              //The sum of edge weight in same part
 	int *ed;                              //The sum of edge weight in different part
 	int ncon;
+	char *map_base;                       //Binary csr cache mapping that xadj/adjncy/vwgt/adjwgt point into
+	size_t map_size;
 	struct hunyuangraph_graph_t *coarser; //The coarser graph
 	struct hunyuangraph_graph_t *finer;   //The finer graph
 	/*graph gpu params*/
@@ -133,8 +136,13 @@ typedef struct hunyuangraph_mcore_t {
 /*Control information*/
 typedef struct hunyuangraph_admin_t {
   int Coarsen_threshold;		
-  int nIparts;      
+  int nIparts;                  /*Initial bisections of a CPU bisection, 0: 5 or 7 by the size of the coarsest graph*/
+  int nstarts;                  /*Sampled BFS starts per SM of the GPU bisection, per thread of the CPU one*/
   int no2hop;                                                                                                                                 
+  int cpu_match;                /*Matching engine of the CPU coarsener, hunyuangraph_match_serial/parallel/deterministic*/
+  int backend;                  /*Backend of hunyuangraph_PartitionGraph, hunyuangraph_backend_gpu/cpu*/
+  unsigned int seed;            /*Random state of the CPU backend, starts at the HUNYUANGRAPH_SEED seed*/
+  double cpu_coarsen_time;      /*Time of hunyuangraph_cpu_coarsen in the bisections of this admin, ms*/
   int iteration_num;                               
   int maxvwgt;		                
   int nparts;
@@ -183,4 +191,21 @@ typedef struct ikv_t{
   int val;
 } ikv_t;
 
+/*Memory-mapped input file*/
+typedef struct hunyuangraph_mapfile_t {
+  char *data;                           //Mapped file content
+  size_t size;                          //File size in bytes
+  int fd;
+} hunyuangraph_mapfile_t;
+
+/*Line-aligned chunk of a graph file for the parallel parser*/
+typedef struct hunyuangraph_chunk_t {
+  const char *begin;                    //First byte of the chunk
+  const char *end;                      //One past the last byte of the chunk
+  size_t nlines;                        //Vertex lines in the chunk
+  size_t nedges;                        //Adjacency entries in the chunk
+  size_t vstart;                        //First vertex of the chunk
+  size_t estart;                        //First adjacency entry of the chunk
+} hunyuangraph_chunk_t;
+
 #endif
\ No newline at end of file
@@ -5,7 +5,9 @@
 #include "hunyuangraph_common.h"
 #include "hunyuangraph_graph.h"
 
+#ifndef NO_CUDA
 #include <cuda_runtime.h>
+#endif
 
 /*Time function params*/
 // all time
@@ -315,7 +317,7 @@ struct timeval end_save_init;
 
 void print_graph_infor(hunyuangraph_graph_t *graph, char *filename)
 {
-    printf("graph:%s %d %d\n", filename, graph->nvtxs, graph->nedges);
+    printf("graph:%s %d %lld\n", filename, graph->nvtxs, (long long)graph->nedges);
 }
 
 void init_timer()
@@ -432,7 +434,7 @@ void init_timer()
     rs_select_dest_parts = 0;
 }
 
-void print_time_all(hunyuangraph_graph_t *graph, int *part, int edgecut, float imbalance)
+void print_time_all(hunyuangraph_graph_t *graph, int *part, long long edgecut, float imbalance)
 {
     printf("---------------------------------------------------------\n");
     printf("Hunyuangraph-Partition-end\n");
@@ -441,7 +443,7 @@ void print_time_all(hunyuangraph_graph_t *graph, int *part, int edgecut, float i
     printf("------Init_time=             %10.2lf ms\n", part_init);
     printf("------Uncoarsen_time=        %10.2lf ms\n", part_uncoarsen);
     printf("------else_time=             %10.2lf ms\n", part_all - (part_coarsen + part_init + part_uncoarsen));
-    printf("edge-cut=                    %10d\n", edgecut);
+    printf("edge-cut=                    %10lld\n", edgecut);
     printf("imbalance=                   %10.3f\n", imbalance);
     printf("---------------------------------------------------------\n");
 }
@@ -0,0 +1,161 @@
+#ifndef _H_TUNE
+#define _H_TUNE
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include "hunyuangraph_struct.h"
+
+/*Tuned partitioning parameters.
+  The file named by the HUNYUANGRAPH_TUNE_FILE environment variable holds one
+  entry per line, '#' starts a comment:
+      <class> <nparts> <Coarsen_threshold> <nIparts> <nstarts>
+  <class> is the feature class of hunyuangraph_tune_class or '*' for every
+  graph, an <nparts> of 0 matches every nparts and '-' keeps the default of a
+  parameter. The most specific entry wins: class and nparts, then class only,
+  then nparts only, then '* 0'; of equally specific entries the last one.
+  The file is read once, by the first hunyuangraph_PartitionGraph, and is
+  written by autotune.py.*/
+
+#define hunyuangraph_tune_env "HUNYUANGRAPH_TUNE_FILE"
+#define hunyuangraph_tune_keep -1
+
+typedef struct hunyuangraph_tune_t {
+	char gclass[32];
+	int nparts;
+	int Coarsen_threshold;
+	int nIparts;                          //Initial bisections of the coarsest graph of a CPU bisection
+	int nstarts;                          //Sampled BFS starts per SM of the GPU bisection, per thread of the CPU one
+} hunyuangraph_tune_t;
+
+hunyuangraph_tune_t *hunyuangraph_tune_table = NULL;
+int hunyuangraph_tune_size = -1;          //-1: not read yet
+
+/*Feature class of a graph, v<log10 nvtxs>_d<log2 average degree>_s<skew>.
+  The skew is 0 for a max degree below 8x the average degree (meshes, roads),
+  1 below 256x and 2 above (power-law graphs).*/
+void hunyuangraph_tune_class(int nvtxs, hunyuangraph_edge_t *xadj, char *gclass)
+{
+	int i, v = 0, d = 0, s;
+	hunyuangraph_edge_t maxdeg = 0;
+	double avgdeg = (nvtxs > 0 ? (double)xadj[nvtxs] / nvtxs : 0);
+
+#pragma omp parallel for reduction(max : maxdeg)
+	for (i = 0; i < nvtxs; i++)
+		if (xadj[i + 1] - xadj[i] > maxdeg)
+			maxdeg = xadj[i + 1] - xadj[i];
+
+	if (nvtxs > 0)
+		v = (int)log10((double)nvtxs);
+	if (avgdeg >= 1)
+		d = (int)log2(avgdeg);
+	s = (maxdeg < 8 * avgdeg ? 0 : (maxdeg < 256 * avgdeg ? 1 : 2));
+
+	sprintf(gclass, "v%d_d%d_s%d", v, d, s);
+}
+
+/*Parse a parameter, '-' keeps the default*/
+int hunyuangraph_tune_value(const char *str, const char *filename, int line)
+{
+	char *end;
+	long val;
+
+	if (strcmp(str, "-") == 0)
+		return hunyuangraph_tune_keep;
+	val = strtol(str, &end, 10);
+	if (*end != '\0' || val <= 0)
+		hunyuangraph_error_exit("%s:%d: bad parameter %s\n", filename, line, str);
+
+	return (int)val;
+}
+
+/*Read the tune file once, no file leaves the table empty*/
+void hunyuangraph_tune_read()
+{
+	FILE *fp;
+	char *filename, buf[1024], gclass[64], p[4][32];
+	int capacity = 16, line = 0, nparts, n;
+
+	if (hunyuangraph_tune_size >= 0)
+		return;
+	hunyuangraph_tune_size = 0;
+
+	filename = getenv(hunyuangraph_tune_env);
+	if (filename == NULL || filename[0] == '\0')
+		return;
+	fp = fopen(filename, "r");
+	if (fp == NULL)
+		hunyuangraph_error_exit("Failed to open the tune file %s\n", filename);
+
+	hunyuangraph_tune_table = (hunyuangraph_tune_t *)malloc(sizeof(hunyuangraph_tune_t) * capacity);
+	while (fgets(buf, sizeof(buf), fp) != NULL)
+	{
+		line++;
+		if (strchr(buf, '#') != NULL)
+			*strchr(buf, '#') = '\0';
+		n = sscanf(buf, "%63s %d %31s %31s %31s %31s", gclass, &nparts, p[0], p[1], p[2], p[3]);
+		if (n <= 0)
+			continue;
+		if (n != 5 || strlen(gclass) >= 32 || nparts < 0)
+			hunyuangraph_error_exit("%s:%d: expected <class> <nparts> <Coarsen_threshold> <nIparts> <nstarts>\n", filename, line);
+
+		if (hunyuangraph_tune_size == capacity)
+		{
+			capacity *= 2;
+			hunyuangraph_tune_table = (hunyuangraph_tune_t *)realloc(hunyuangraph_tune_table, sizeof(hunyuangraph_tune_t) * capacity);
+		}
+		hunyuangraph_tune_t *entry = &hunyuangraph_tune_table[hunyuangraph_tune_size++];
+		strcpy(entry->gclass, gclass);
+		entry->nparts = nparts;
+		entry->Coarsen_threshold = hunyuangraph_tune_value(p[0], filename, line);
+		entry->nIparts = hunyuangraph_tune_value(p[1], filename, line);
+		entry->nstarts = hunyuangraph_tune_value(p[2], filename, line);
+	}
+	fclose(fp);
+}
+
+/*Override the parameters of hunyuangraph_admin with the best entry of the tune file*/
+void hunyuangraph_tune_apply(hunyuangraph_admin_t *hunyuangraph_admin, hunyuangraph_graph_t *graph)
+{
+	int i, rank, best_rank = 0;
+	char gclass[32];
+	hunyuangraph_tune_t *best = NULL;
+
+	hunyuangraph_tune_read();
+	if (hunyuangraph_tune_size == 0)
+		return;
+
+	hunyuangraph_tune_class(graph->nvtxs, graph->xadj, gclass);
+	printf("hunyuangraph_tune_class=%s\n", gclass);
+
+	for (i = 0; i < hunyuangraph_tune_size; i++)
+	{
+		hunyuangraph_tune_t *entry = &hunyuangraph_tune_table[i];
+		int class_match = strcmp(entry->gclass, gclass) == 0;
+		int nparts_match = entry->nparts == hunyuangraph_admin->nparts;
+
+		if (!class_match && strcmp(entry->gclass, "*") != 0)
+			continue;
+		if (!nparts_match && entry->nparts != 0)
+			continue;
+		rank = 1 + 2 * class_match + nparts_match;
+		if (rank >= best_rank)
+		{
+			best_rank = rank;
+			best = entry;
+		}
+	}
+	if (best == NULL)
+		return;
+
+	if (best->Coarsen_threshold != hunyuangraph_tune_keep)
+		hunyuangraph_admin->Coarsen_threshold = best->Coarsen_threshold;
+	if (best->nIparts != hunyuangraph_tune_keep)
+		hunyuangraph_admin->nIparts = best->nIparts;
+	if (best->nstarts != hunyuangraph_tune_keep)
+		hunyuangraph_admin->nstarts = best->nstarts;
+	printf("hunyuangraph_tune=%s %d %d %d %d\n", best->gclass, best->nparts, hunyuangraph_admin->Coarsen_threshold, hunyuangraph_admin->nIparts, hunyuangraph_admin->nstarts);
+}
+
+#endif
@@ -0,0 +1,240 @@
+#ifndef _H_VALIDATE
+#define _H_VALIDATE
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <limits.h>
+#include "hunyuangraph_struct.h"
+#include "hunyuangraph_common.h"
+#include "hunyuangraph_csrcache.h"
+
+/*Parallel validation and repair of an input graph.
+  Every adjacency list is copied and sorted as (neighbor, weight) keys, which
+  makes self-loops and duplicates runs of equal neighbors and lets the reverse
+  entry (u, v) of every (v, u) be found with a binary search in the sorted
+  list of u. All passes run over the vertices in parallel.
+
+  The repair builds a new graph whose lists are sorted, free of self-loops and
+  duplicates (their weights summed) and symmetric: a missing reverse entry is
+  added with the weight of the existing one, and an edge whose two entries
+  disagree gets the larger weight on both sides.*/
+
+int Graph_Check = 0;                      // 0: none, 1: validate the input graph, 2: validate and repair
+
+#define hunyuangraph_validate_key(u, w) (((uint64_t)(uint32_t)(u) << 32) | (uint32_t)(w))
+#define hunyuangraph_validate_adj(key) ((int)((key) >> 32))
+#define hunyuangraph_validate_wgt(key) ((int)(uint32_t)(key))
+
+int hunyuangraph_validate_compare(const void *a, const void *b)
+{
+	uint64_t x = *(const uint64_t *)a, y = *(const uint64_t *)b;
+	return (x > y) - (x < y);
+}
+
+/*Sort a list of keys*/
+static inline void hunyuangraph_validate_sort(uint64_t *keys, int n)
+{
+	int i, j;
+	uint64_t key;
+
+	if (n > 32)
+	{
+		qsort(keys, n, sizeof(uint64_t), hunyuangraph_validate_compare);
+		return;
+	}
+
+	for (i = 1; i < n; i++)
+	{
+		key = keys[i];
+		for (j = i - 1; j >= 0 && keys[j] > key; j--)
+			keys[j + 1] = keys[j];
+		keys[j + 1] = key;
+	}
+}
+
+/*Find the entries of u in a sorted list, returns 1 and their summed weight if there are any*/
+static inline int hunyuangraph_validate_find(const uint64_t *keys, hunyuangraph_edge_t begin, hunyuangraph_edge_t end, int u, int64_t *wgt)
+{
+	hunyuangraph_edge_t mid, lo = begin, hi = end;
+	uint64_t key = hunyuangraph_validate_key(u, 0);
+
+	while (lo < hi)
+	{
+		mid = lo + (hi - lo) / 2;
+		if (keys[mid] < key)
+			lo = mid + 1;
+		else
+			hi = mid;
+	}
+
+	*wgt = 0;
+	for (hi = lo; hi < end && hunyuangraph_validate_adj(keys[hi]) == u; hi++)
+		*wgt += hunyuangraph_validate_wgt(keys[hi]);
+
+	return hi > lo;
+}
+
+/*Validate a csr graph and fill check. With repair set and defects found, the
+  repaired graph is returned in r_xadj/r_adjncy/r_adjwgt and 1 is returned.*/
+int hunyuangraph_validate_csr(int nvtxs, const hunyuangraph_edge_t *xadj, const int *adjncy, const int *adjwgt, hunyuangraph_graphcheck_t *check,
+							  int repair, hunyuangraph_edge_t **r_xadj, int **r_adjncy, int **r_adjwgt)
+{
+	int v, *nuniq = NULL, *extra = NULL, *nadjncy, *nadjwgt;
+	hunyuangraph_edge_t *nxadj;
+	int64_t nedges = xadj[nvtxs], nnedges, selfloops = 0, duplicates = 0, asymmetric = 0, mismatched = 0, *fill;
+	uint64_t *keys, *nkeys;
+
+	keys = (uint64_t *)malloc(sizeof(uint64_t) * (nedges + 1));
+	if (repair)
+	{
+		nuniq = (int *)calloc(nvtxs, sizeof(int));
+		extra = (int *)calloc(nvtxs, sizeof(int));
+	}
+
+	/*Sort the lists*/
+#pragma omp parallel for schedule(dynamic, 1024)
+	for (v = 0; v < nvtxs; v++)
+	{
+		hunyuangraph_edge_t j;
+		for (j = xadj[v]; j < xadj[v + 1]; j++)
+		{
+			if (adjncy[j] < 0 || adjncy[j] >= nvtxs)
+			{
+				hunyuangraph_error_exit("Edge %d for vertex %d is out of bounds\n", adjncy[j] + 1, v + 1);
+			}
+			keys[j] = hunyuangraph_validate_key(adjncy[j], adjwgt[j]);
+		}
+		hunyuangraph_validate_sort(keys + xadj[v], xadj[v + 1] - xadj[v]);
+	}
+
+	/*Check every run of equal neighbors*/
+#pragma omp parallel for schedule(dynamic, 1024) reduction(+ : selfloops, duplicates, asymmetric, mismatched)
+	for (v = 0; v < nvtxs; v++)
+	{
+		int u;
+		hunyuangraph_edge_t j, k;
+		int64_t wgt, rwgt;
+
+		for (j = xadj[v]; j < xadj[v + 1]; j = k)
+		{
+			u = hunyuangraph_validate_adj(keys[j]);
+			for (k = j, wgt = 0; k < xadj[v + 1] && hunyuangraph_validate_adj(keys[k]) == u; k++)
+				wgt += hunyuangraph_validate_wgt(keys[k]);
+
+			if (u == v)
+			{
+				selfloops += k - j;
+				continue;
+			}
+
+			duplicates += k - j - 1;
+			if (repair)
+				nuniq[v]++;
+
+			if (!hunyuangraph_validate_find(keys, xadj[u], xadj[u + 1], v, &rwgt))
+			{
+				asymmetric++;
+				if (repair)
+				{
+#pragma omp atomic
+					extra[u]++;
+				}
+			}
+			else if (rwgt != wgt)
+				mismatched++;
+		}
+	}
+
+	check->done = 1;
+	check->reserved = 0;
+	check->selfloops = selfloops;
+	check->duplicates = duplicates;
+	check->asymmetric = asymmetric;
+	check->mismatched = mismatched;
+
+	if (!repair || (selfloops == 0 && duplicates == 0 && asymmetric == 0 && mismatched == 0))
+	{
+		free(keys);
+		free(nuniq);
+		free(extra);
+		return 0;
+	}
+
+	/*Sizes of the repaired lists*/
+	fill = (int64_t *)malloc(sizeof(int64_t) * (nvtxs + 1));
+	fill[0] = 0;
+	for (v = 0; v < nvtxs; v++)
+		fill[v + 1] = fill[v] + nuniq[v] + extra[v];
+	nnedges = fill[nvtxs];
+	if (nnedges > hunyuangraph_edge_max)
+	{
+		hunyuangraph_error_exit("The repaired graph has %lld adjacency entries, more than the edge offsets can index (see -DEDGE64).\n", (long long)nnedges);
+	}
+
+	nxadj = (hunyuangraph_edge_t *)malloc(sizeof(hunyuangraph_edge_t) * (nvtxs + 1));
+	nkeys = (uint64_t *)malloc(sizeof(uint64_t) * (nnedges + 1));
+	for (v = 0; v <= nvtxs; v++)
+		nxadj[v] = fill[v];
+	for (v = 0; v < nvtxs; v++)
+		fill[v] = nxadj[v] + nuniq[v];
+
+	/*Merge the runs, the missing reverse entries go behind the unique entries of their list*/
+#pragma omp parallel for schedule(dynamic, 1024)
+	for (v = 0; v < nvtxs; v++)
+	{
+		int u;
+		hunyuangraph_edge_t j, k, p = nxadj[v];
+		int64_t wgt, rwgt, pos;
+
+		for (j = xadj[v]; j < xadj[v + 1]; j = k)
+		{
+			u = hunyuangraph_validate_adj(keys[j]);
+			for (k = j, wgt = 0; k < xadj[v + 1] && hunyuangraph_validate_adj(keys[k]) == u; k++)
+				wgt += hunyuangraph_validate_wgt(keys[k]);
+			if (u == v)
+				continue;
+
+			if (!hunyuangraph_validate_find(keys, xadj[u], xadj[u + 1], v, &rwgt))
+			{
+#pragma omp atomic capture
+				pos = fill[u]++;
+				nkeys[pos] = hunyuangraph_validate_key(v, wgt);
+			}
+			else if (rwgt > wgt)
+				wgt = rwgt;
+
+			nkeys[p++] = hunyuangraph_validate_key(u, wgt);
+		}
+	}
+
+	nadjncy = (int *)malloc(sizeof(int) * (nnedges + 1));
+	nadjwgt = (int *)malloc(sizeof(int) * (nnedges + 1));
+
+#pragma omp parallel for schedule(dynamic, 1024)
+	for (v = 0; v < nvtxs; v++)
+	{
+		hunyuangraph_edge_t j;
+		hunyuangraph_validate_sort(nkeys + nxadj[v], nxadj[v + 1] - nxadj[v]);
+		for (j = nxadj[v]; j < nxadj[v + 1]; j++)
+		{
+			nadjncy[j] = hunyuangraph_validate_adj(nkeys[j]);
+			nadjwgt[j] = hunyuangraph_validate_wgt(nkeys[j]);
+		}
+	}
+
+	free(keys);
+	free(nkeys);
+	free(nuniq);
+	free(extra);
+	free(fill);
+
+	*r_xadj = nxadj;
+	*r_adjncy = nadjncy;
+	*r_adjwgt = nadjwgt;
+
+	return 1;
+}
+
+#endif
@@ -78,49 +78,35 @@ current_path=$(pwd)
 echo "current_path:${current_path}."
 
 # figure 8 11 12 13 15
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread
 
 # figure 8 11 12
+# bench.py keeps every run in bench/*.jsonl and resumes an interrupted sweep,
+# --log writes the raw output the data/ scripts parse
 echo "Processing Hunyuangraph for figure 8 11 12."
-input="graph_9.csv"
 p_values="8 32 128 512"  # 改为字符串，用空格分隔
 
 for p in $p_values; do  # 遍历空格分隔的值
-    i=0
-    while IFS=',' read -r Name; do
-        ./hunyuangraph ${current_path}/graphs/${Name}.graph $p 1 >> 5090_hunyuan_1_${p}_graph9_time.txt
-        
-        echo "Processed $i files: ${Name}.graph"
-        i=$((i + 1))
-    done < "$input"
-
-    mv "5090_hunyuan_1_${p}_graph9_time.txt" ${current_path}/data/hunyuan
+    python3 bench.py --tool hunyuangraph --graphs graph_9.csv --graph-dir ${current_path}/graphs --nparts $p \
+        --out ${current_path}/bench/hunyuangraph_graph9.jsonl --log ${current_path}/data/hunyuan/5090_hunyuan_1_${p}_graph9_time.txt
 
     echo "Processed $p partitions."
 done
 
 # figure 13 15
 echo "Processing Hunyuangraph for figure 13 15."
-input="graph_all.csv"
 p_values="8"  # 改为字符串，用空格分隔
 
 for p in $p_values; do  # 遍历空格分隔的值
-    i=0
-    while IFS=',' read -r Name; do
-        ./hunyuangraph ${current_path}/graphs/${Name}.graph $p 1 >> 5090_hunyuan_1_${p}_graphall_time.txt
-
-        echo "Processed $i files: ${Name}.graph"
-        i=$((i + 1))
-    done < "$input"
-
-    mv "5090_hunyuan_1_${p}_graphall_time.txt" ${current_path}/data/hunyuan
+    python3 bench.py --tool hunyuangraph --graphs graph_all.csv --graph-dir ${current_path}/graphs --nparts $p \
+        --out ${current_path}/bench/hunyuangraph_graphall.jsonl --log ${current_path}/data/hunyuan/5090_hunyuan_1_${p}_graphall_time.txt
 
     echo "Processed $p partitions."
 done
 
 # figure 9
 echo "Processing Hunyuangraph for figure 9."
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -DFIGURE9_SUM
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread -DFIGURE9_SUM
 input="graph_9.csv"
 p_values="8"  # 改为字符串，用空格分隔
 
@@ -136,7 +122,7 @@ for p in $p_values; do  # 遍历空格分隔的值
     echo "Processed $p partitions."
 done
 
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -DFIGURE9_TIME
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread -DFIGURE9_TIME
 input="graph_9.csv"
 p_values="8"  # 改为字符串，用空格分隔
 
@@ -155,7 +141,7 @@ done
 # figure 10
 echo "Processing Hunyuangraph for figure 10."
 mkdir -p init_graphs
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -DFIGURE10_CGRAPH
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread -DFIGURE10_CGRAPH
 
 input="graph_9.csv"
 p_values="1024"  # 改为字符串，用空格分隔
@@ -175,7 +161,7 @@ for p in $p_values; do  # 遍历空格分隔的值
     echo "Processed $p partitions."
 done
 
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -DFIGURE10_EXHAUSTIVE
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread -DFIGURE10_EXHAUSTIVE
 
 input="graph_9.csv"
 p_values="2"  # 改为字符串，用空格分隔
@@ -194,7 +180,7 @@ for p in $p_values; do  # 遍历空格分隔的值
     echo "Processed $p partitions."
 done
 
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -DFIGURE10_SAMPLING
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread -DFIGURE10_SAMPLING
 
 input="graph_9.csv"
 p_values="2"  # 改为字符串，用空格分隔
@@ -217,40 +203,27 @@ cd mygp_0.9.9_test_initpartition || { echo "Failed to enter mygp_0.9.9_test_init
 gcc -O3 mygpmetis.c -o mygpmetis -lm
 cd .. || exit 1
 
-input="graph_9.csv"
 p_values="2"  # 改为字符串，用空格分隔
 
 for p in $p_values; do  # 遍历空格分隔的值
-    i=0
-    while IFS=',' read -r Name; do
-        "${current_path}/mygp_0.9.9_test_initpartition/mygpmetis" ${current_path}/init_graphs/${Name}_gpu_1024.graph 2 >> 5090_metis_1024_${p}_0_metis.txt
-
-        echo "Processed $i files: ${Name}.graph"
-        i=$((i + 1))
-    done < "$input"
-    
-    mv 5090_metis_1024_${p}_0_metis.txt ${current_path}/Figure/Figure10/init_partition/metis_cpu/
+    # CPU only, the graphs are partitioned concurrently on the cores
+    python3 bench.py --tool mygpmetis --graphs graph_9.csv --graph-dir ${current_path}/init_graphs --suffix _gpu_1024.graph \
+        --nparts $p --jobs $(nproc) --out ${current_path}/bench/mygpmetis_1024.jsonl \
+        --log ${current_path}/Figure/Figure10/init_partition/metis_cpu/5090_metis_1024_${p}_0_metis.txt
 
     echo "Processed $p partitions."
 done
 
 # figure 14
 echo "Processing Hunyuangraph for figure 14."
-nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -DFIGURE14_EDGECUT
+nvcc -std=c++11 -gencode ${NEW_ARCH} -O3 hunyuangraph.cu -o  hunyuangraph  --expt-relaxed-constexpr -w -Xcompiler -fopenmp -lz -lpthread -DFIGURE14_EDGECUT
 
-input="graph_all.csv"
 p_values="8"  # 改为字符串，用空格分隔
 
 for p in $p_values; do  # 遍历空格分隔的值
-    i=0
-    while IFS=',' read -r Name; do
-        ./hunyuangraph ${current_path}/graphs/${Name}.graph $p 1 >> 5090_hunyuan_1_${p}_graphall_edgecut.txt
-
-        echo "Processed $i files: ${Name}.graph"
-        i=$((i + 1))
-    done < "$input"
-
-    mv "5090_hunyuan_1_${p}_graphall_edgecut.txt" ${current_path}/data/hunyuan
+    # a separate results file, this build also prints best_edgecut
+    python3 bench.py --tool hunyuangraph --graphs graph_all.csv --graph-dir ${current_path}/graphs --nparts $p \
+        --out ${current_path}/bench/hunyuangraph_graphall_edgecut.jsonl --log ${current_path}/data/hunyuan/5090_hunyuan_1_${p}_graphall_edgecut.txt
 
     echo "Processed $p partitions."
 done
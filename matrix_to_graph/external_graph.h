@@ -0,0 +1,778 @@
+#ifndef _EXTERNAL_GRAPH_
+#define _EXTERNAL_GRAPH_
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <limits.h>
+#include <unistd.h>
+#include <sys/time.h>
+#include "mmio_highlevel.h"
+#include "graph_writer.h"
+#include "../hunyuangraph_csrcache.h"
+
+// Out-of-core conversion of matrices larger than the memory, every buffer
+// is carved out of mem_limit bytes.
+// runs:   the coordinates are streamed in blocks, every entry (i, j), i != j,
+//         gives the keys (i, j) and (j, i); the full key buffer is sorted in
+//         slices, one per thread, and every slice is written as a
+//         deduplicated run
+// merge:  while there are more runs than can be merged at once, groups of
+//         runs are merged into longer runs
+// output: the last merge writes the degrees and the neighbors to two scratch
+//         files, which are streamed into the requested outputs
+// Unlike the in-memory conversion, duplicate entries of the matrix are
+// removed as well.
+
+#define EXTERNAL_MIN_BUFFER (1 << 16)   // bytes per run while merging
+#define EXTERNAL_MAX_FANIN  512
+#define EXTERNAL_BLOCK      (1 << 24)   // bytes of mtx text parsed at once
+
+#define external_row(key) ((int)((key) >> 32))
+#define external_col(key) ((int)(uint32_t)(key))
+
+typedef struct
+{
+    char prefix[4096];                  // scratch file prefix
+    size_t mem_limit;
+    int nruns;                          // runs written so far, names are prefix.run.<i>
+    double read, write;                 // bytes of the current phase
+    struct timeval begin;
+} external_t;
+
+// buffered reader of a run
+typedef struct
+{
+    FILE *fp;
+    uint64_t *buf;
+    size_t cap, len, pos;
+} external_run_t;
+
+// output of the last merge: the degree of every vertex and the neighbors
+typedef struct
+{
+    FILE *deg, *adj;
+    int *degbuf, *adjbuf;
+    size_t ndeg, nadj, cap;
+    int n, row, count;                  // current row and its degree so far
+    int64_t nnz;
+} external_sink_t;
+
+// buffered text output
+typedef struct
+{
+    FILE *fp;
+    char *buf;
+    size_t len, cap;
+} external_text_t;
+
+static inline size_t external_read(external_t *ext, void *buf, size_t size, size_t n, FILE *fp)
+{
+    size_t r = fread(buf, size, n, fp);
+    ext->read += (double)r * size;
+    return r;
+}
+
+static inline int external_write(external_t *ext, const void *buf, size_t size, size_t n, FILE *fp)
+{
+    ext->write += (double)size * n;
+    return n == 0 || fwrite(buf, size, n, fp) == n;
+}
+
+void external_run_name(external_t *ext, int run, char *name, size_t size)
+{
+    snprintf(name, size, "%s.run.%d", ext->prefix, run);
+}
+
+void external_phase_begin(external_t *ext)
+{
+    ext->read = ext->write = 0;
+    gettimeofday(&ext->begin, NULL);
+}
+
+void external_phase_end(external_t *ext, const char *phase)
+{
+    struct timeval end;
+
+    gettimeofday(&end, NULL);
+    fprintf(stderr, "%-21s %10.3lf ms read=%10.2lf MB write=%10.2lf MB runs=%d\n", phase,
+            (end.tv_sec - ext->begin.tv_sec) * 1000.0 + (end.tv_usec - ext->begin.tv_usec) / 1000.0,
+            ext->read / 1048576.0, ext->write / 1048576.0, ext->nruns);
+}
+
+// in-place quicksort, qsort may take a buffer as large as the keys
+void external_sort(uint64_t *keys, size_t n)
+{
+    while (n > 16)
+    {
+        uint64_t a = keys[0], b = keys[n / 2], c = keys[n - 1], pivot, t;
+        size_t i = 0, j = n - 1;
+
+        pivot = a < b ? (b < c ? b : (a < c ? c : a)) : (a < c ? a : (b < c ? c : b));
+        for (;;)
+        {
+            while (keys[i] < pivot)
+                i++;
+            while (keys[j] > pivot)
+                j--;
+            if (i >= j)
+                break;
+            t = keys[i];
+            keys[i++] = keys[j];
+            keys[j--] = t;
+        }
+
+        // recurse into the smaller part
+        if (j + 1 < n - j - 1)
+        {
+            external_sort(keys, j + 1);
+            keys += j + 1;
+            n -= j + 1;
+        }
+        else
+        {
+            external_sort(keys + j + 1, n - j - 1);
+            n = j + 1;
+        }
+    }
+
+    for (size_t i = 1; i < n; i++)
+    {
+        uint64_t key = keys[i];
+        size_t j = i;
+        while (j > 0 && keys[j-1] > key)
+        {
+            keys[j] = keys[j-1];
+            j--;
+        }
+        keys[j] = key;
+    }
+}
+
+// sort the keys in one slice per thread and write every slice as a run
+int external_flush(external_t *ext, uint64_t *keys, size_t nkeys)
+{
+    int nslices = 1, ok = 1;
+    size_t *len;
+
+    if (nkeys == 0)
+        return 1;
+#ifdef _OPENMP
+    nslices = omp_get_max_threads();
+#endif
+    if ((size_t)nslices > nkeys)
+        nslices = nkeys;
+    len = (size_t *)malloc(sizeof(size_t) * nslices);
+
+    #pragma omp parallel for schedule(static, 1)
+    for (int s = 0; s < nslices; s++)
+    {
+        size_t begin = nkeys * s / nslices, end = nkeys * (s + 1) / nslices, j = begin;
+
+        external_sort(&keys[begin], end - begin);
+        for (size_t i = begin; i < end; i++)
+        {
+            if (i == begin || keys[i] != keys[j-1])
+                keys[j++] = keys[i];
+        }
+        len[s] = j - begin;
+    }
+
+    for (int s = 0; s < nslices && ok; s++)
+    {
+        char name[4200];
+        FILE *fp;
+
+        external_run_name(ext, ext->nruns++, name, sizeof(name));
+        fp = fopen(name, "wb");
+        ok = fp != NULL && external_write(ext, &keys[nkeys * s / nslices], sizeof(uint64_t), len[s], fp);
+        ok = fp != NULL && (fclose(fp) == 0) && ok;
+    }
+
+    free(len);
+    return ok;
+}
+
+// stream the coordinates of filename into runs, returns 0 on success
+int external_make_runs(external_t *ext, char *filename, int *r_n)
+{
+    int ret_code, total, remaining;
+    size_t blocksize, carry = 0, len, nkeys = 0, maxkeys;
+    char *block;
+    uint64_t *keys;
+    FILE *f;
+    hunyuangraph_gzstream_t gz;
+    mmio_coo_t coo = {NULL};
+
+    if ((f = mmio_fopen(filename, &gz)) == NULL)
+        return -1;
+    ret_code = mmio_read_header(f, &coo);
+    if (ret_code == 0 && coo.m != coo.n)
+    {
+        fprintf(stderr, "The matrix is not square: %d x %d.\n", coo.m, coo.n);
+        ret_code = -3;
+    }
+    if (ret_code != 0)
+    {
+        mmio_fclose(f, &gz);
+        return ret_code;
+    }
+    *r_n = coo.n;
+    total = remaining = coo.nnz_mtx_report;
+
+    // the text block and its coordinates take 3/8 of the memory, the keys the rest
+    blocksize = ext->mem_limit / 8;
+    if (blocksize > EXTERNAL_BLOCK)
+        blocksize = EXTERNAL_BLOCK;
+    if (blocksize < 4096)
+        blocksize = 4096;
+    block = (char *)malloc(blocksize);
+    coo.rowIdx = (int *)malloc(sizeof(int) * (blocksize / 4 + 1));
+    coo.colIdx = (int *)malloc(sizeof(int) * (blocksize / 4 + 1));
+    maxkeys = (ext->mem_limit > 3 * blocksize ? ext->mem_limit - 3 * blocksize : blocksize) / sizeof(uint64_t);
+    if (maxkeys < 2)
+        maxkeys = 2;
+    keys = (uint64_t *)malloc(sizeof(uint64_t) * maxkeys);
+
+    ret_code = 0;
+    while (remaining > 0 && ret_code == 0)
+    {
+        size_t nread = external_read(ext, block + carry, 1, blocksize - carry, f);
+        int eof = (nread < blocksize - carry), nlines;
+
+        // parse up to the last complete line, the rest is carried to the next block
+        len = carry + nread;
+        if (!eof)
+        {
+            while (len > 0 && block[len-1] != '\n')
+                len--;
+            if (len == 0)
+            {
+                fprintf(stderr, "A line of the mtx file is longer than %zu bytes.\n", blocksize);
+                ret_code = -5;
+                break;
+            }
+        }
+
+        coo.nnz_mtx_report = remaining;
+        nlines = mmio_parse_coo(block, block + len, &coo);
+        if (nlines < 0)
+        {
+            ret_code = -5;
+            break;
+        }
+        remaining -= nlines;
+
+        for (int i = 0; i < nlines; i++)
+        {
+            int r = coo.rowIdx[i], c = coo.colIdx[i];
+
+            if (r < 0 || r >= coo.n || c < 0 || c >= coo.n)
+            {
+                fprintf(stderr, "Entry (%d, %d) is out of bounds.\n", r + 1, c + 1);
+                ret_code = -5;
+                break;
+            }
+            if (r == c)
+                continue;
+
+            if (nkeys + 2 > maxkeys)
+            {
+                if (!external_flush(ext, keys, nkeys))
+                {
+                    ret_code = -6;
+                    break;
+                }
+                nkeys = 0;
+            }
+            keys[nkeys++] = ((uint64_t)r << 32) | (uint32_t)c;
+            keys[nkeys++] = ((uint64_t)c << 32) | (uint32_t)r;
+        }
+
+        carry = carry + nread - len;
+        memmove(block, block + len, carry);
+        if (eof)
+            break;
+    }
+
+    if (ret_code == 0 && remaining > 0)
+    {
+        fprintf(stderr, "Premature end of the mtx file: %d of %d entries.\n", total - remaining, total);
+        ret_code = -5;
+    }
+    if (ret_code == 0 && !external_flush(ext, keys, nkeys))
+        ret_code = -6;
+
+    mmio_fclose(f, &gz);
+    free(block);
+    free(coo.rowIdx);
+    free(coo.colIdx);
+    free(keys);
+
+    return ret_code;
+}
+
+static inline int external_run_next(external_t *ext, external_run_t *run, uint64_t *key)
+{
+    if (run->pos == run->len)
+    {
+        run->len = external_read(ext, run->buf, sizeof(uint64_t), run->cap, run->fp);
+        run->pos = 0;
+        if (run->len == 0)
+            return 0;
+    }
+    *key = run->buf[run->pos++];
+    return 1;
+}
+
+static inline int external_sink_flush(external_t *ext, external_sink_t *sink)
+{
+    int ok = external_write(ext, sink->degbuf, sizeof(int), sink->ndeg, sink->deg) &&
+             external_write(ext, sink->adjbuf, sizeof(int), sink->nadj, sink->adj);
+    sink->ndeg = sink->nadj = 0;
+    return ok;
+}
+
+// close the rows up to row
+static inline int external_sink_row(external_t *ext, external_sink_t *sink, int row)
+{
+    while (sink->row < row)
+    {
+        if (sink->ndeg == sink->cap && !external_sink_flush(ext, sink))
+            return 0;
+        sink->degbuf[sink->ndeg++] = sink->count;
+        sink->count = 0;
+        sink->row++;
+    }
+    return 1;
+}
+
+static inline int external_sink_put(external_t *ext, external_sink_t *sink, uint64_t key)
+{
+    if (!external_sink_row(ext, sink, external_row(key)))
+        return 0;
+    if (sink->nadj == sink->cap && !external_sink_flush(ext, sink))
+        return 0;
+    sink->adjbuf[sink->nadj++] = external_col(key);
+    sink->count++;
+    sink->nnz++;
+    return 1;
+}
+
+static inline void external_heap_down(int *heap, int nheap, const uint64_t *top, int i)
+{
+    int r = heap[i], c;
+
+    while ((c = 2 * i + 1) < nheap)
+    {
+        if (c + 1 < nheap && top[heap[c+1]] < top[heap[c]])
+            c++;
+        if (top[heap[c]] >= top[r])
+            break;
+        heap[i] = heap[c];
+        i = c;
+    }
+    heap[i] = r;
+}
+
+// merge the runs [first, first + k) into a new run, or into sink if it is not NULL.
+// The merged runs are removed.
+int external_merge(external_t *ext, int first, int k, external_sink_t *sink)
+{
+    int nheap = 0, ok = 1, have_last = 0;
+    size_t bufkeys, nout = 0;
+    uint64_t *top, *out = NULL, key, last = 0;
+    int *heap;
+    external_run_t *runs;
+    FILE *fout = NULL;
+    char name[4200];
+
+    bufkeys = ext->mem_limit / (k + 1) / sizeof(uint64_t);
+    if (bufkeys < EXTERNAL_MIN_BUFFER / sizeof(uint64_t))
+        bufkeys = EXTERNAL_MIN_BUFFER / sizeof(uint64_t);
+
+    runs = (external_run_t *)calloc(k > 0 ? k : 1, sizeof(external_run_t));
+    heap = (int *)malloc(sizeof(int) * (k > 0 ? k : 1));
+    top = (uint64_t *)malloc(sizeof(uint64_t) * (k > 0 ? k : 1));
+
+    for (int r = 0; r < k && ok; r++)
+    {
+        external_run_name(ext, first + r, name, sizeof(name));
+        runs[r].fp = fopen(name, "rb");
+        runs[r].buf = (uint64_t *)malloc(sizeof(uint64_t) * bufkeys);
+        runs[r].cap = bufkeys;
+        ok = runs[r].fp != NULL;
+        if (ok && external_run_next(ext, &runs[r], &top[r]))
+            heap[nheap++] = r;
+    }
+    for (int i = nheap / 2 - 1; i >= 0; i--)
+        external_heap_down(heap, nheap, top, i);
+
+    if (sink == NULL)
+    {
+        external_run_name(ext, ext->nruns++, name, sizeof(name));
+        fout = fopen(name, "wb");
+        out = (uint64_t *)malloc(sizeof(uint64_t) * bufkeys);
+        ok = ok && fout != NULL;
+    }
+
+    while (nheap > 0 && ok)
+    {
+        int r = heap[0];
+
+        key = top[r];
+        if (!have_last || key != last)
+        {
+            if (sink != NULL)
+                ok = external_sink_put(ext, sink, key);
+            else
+            {
+                if (nout == bufkeys)
+                {
+                    ok = external_write(ext, out, sizeof(uint64_t), nout, fout);
+                    nout = 0;
+                }
+                out[nout++] = key;
+            }
+            last = key;
+            have_last = 1;
+        }
+
+        if (!external_run_next(ext, &runs[r], &top[r]))
+            heap[0] = heap[--nheap];
+        external_heap_down(heap, nheap, top, 0);
+    }
+
+    if (sink != NULL)
+        ok = ok && external_sink_row(ext, sink, sink->n) && external_sink_flush(ext, sink);
+    else
+    {
+        ok = ok && external_write(ext, out, sizeof(uint64_t), nout, fout);
+        if (fout != NULL)
+            ok = (fclose(fout) == 0) && ok;
+    }
+
+    for (int r = 0; r < k; r++)
+    {
+        if (runs[r].fp != NULL)
+            fclose(runs[r].fp);
+        free(runs[r].buf);
+        external_run_name(ext, first + r, name, sizeof(name));
+        unlink(name);
+    }
+    free(runs);
+    free(heap);
+    free(top);
+    free(out);
+
+    return ok;
+}
+
+static inline int external_text_reserve(external_t *ext, external_text_t *text, size_t len)
+{
+    int ok = 1;
+
+    if (text->fp != NULL && text->len + len > text->cap)
+    {
+        ok = external_write(ext, text->buf, 1, text->len, text->fp);
+        text->len = 0;
+    }
+    return ok;
+}
+
+// stream the degrees and neighbors into the .graph and/or .grf files
+int external_write_text(external_t *ext, FILE *fdeg, FILE *fadj, int n, int64_t nnz, external_text_t *graph, external_text_t *grf)
+{
+    size_t cap = ext->mem_limit / 4 / sizeof(int), ndeg = 0, pdeg = 0, nadj = 0, padj = 0;
+    int *deg, *adj, ok = 1;
+
+    if (cap < 4096)
+        cap = 4096;
+    deg = (int *)malloc(sizeof(int) * cap);
+    adj = (int *)malloc(sizeof(int) * cap);
+
+    if (graph->fp != NULL)
+        ok = fprintf(graph->fp, "%d\t%lld\n", n, (long long)(nnz / 2)) > 0;
+    if (grf->fp != NULL)
+        ok = ok && fprintf(grf->fp, "0\n%d\t%lld\n0\t000\n", n, (long long)nnz) > 0;
+
+    for (int i = 0; i < n && ok; i++)
+    {
+        int d;
+
+        if (pdeg == ndeg)
+        {
+            ndeg = external_read(ext, deg, sizeof(int), cap, fdeg);
+            pdeg = 0;
+            if (ndeg == 0)
+            {
+                ok = 0;
+                break;
+            }
+        }
+        d = deg[pdeg++];
+
+        ok = external_text_reserve(ext, grf, 12);
+        if (grf->fp != NULL)
+        {
+            grf->len = graph_writer_itoa(d, grf->buf + grf->len) - grf->buf;
+            grf->buf[grf->len++] = '\t';
+        }
+
+        for (int j = 0; j < d && ok; j++)
+        {
+            int v;
+
+            if (padj == nadj)
+            {
+                nadj = external_read(ext, adj, sizeof(int), cap, fadj);
+                padj = 0;
+                if (nadj == 0)
+                {
+                    ok = 0;
+                    break;
+                }
+            }
+            v = adj[padj++];
+
+            ok = external_text_reserve(ext, graph, 12) && external_text_reserve(ext, grf, 12);
+            if (graph->fp != NULL)
+            {
+                graph->len = graph_writer_itoa(v + 1, graph->buf + graph->len) - graph->buf;
+                graph->buf[graph->len++] = ' ';
+                graph->buf[graph->len++] = ' ';
+            }
+            if (grf->fp != NULL)
+            {
+                grf->len = graph_writer_itoa(v, grf->buf + grf->len) - grf->buf;
+                grf->buf[grf->len++] = '\t';
+            }
+        }
+
+        ok = ok && external_text_reserve(ext, graph, 1) && external_text_reserve(ext, grf, 1);
+        if (graph->fp != NULL)
+            graph->buf[graph->len++] = '\n';
+        if (grf->fp != NULL)
+            grf->buf[grf->len++] = '\n';
+    }
+
+    // the converted graphs always ended with an empty line
+    ok = ok && external_text_reserve(ext, graph, 1);
+    if (graph->fp != NULL)
+        graph->buf[graph->len++] = '\n';
+    ok = ok && external_text_reserve(ext, graph, graph->cap + 1) && external_text_reserve(ext, grf, grf->cap + 1);
+
+    free(deg);
+    free(adj);
+    return ok;
+}
+
+// stream the degrees and neighbors into the csr cache of graphfile
+int external_write_bcsr(external_t *ext, FILE *fdeg, FILE *fadj, int n, int64_t nnz, const char *graphfile)
+{
+    FILE *fp;
+    int ok, *buf;
+    size_t cap = ext->mem_limit / sizeof(int), len;
+    int64_t i, sum = 0;
+    char cachefile[4096], tmpfile[4200];
+    hunyuangraph_csrcache_header_t header;
+
+    if (nnz > INT_MAX)
+    {
+        fprintf(stderr, "The graph has %lld adjacency entries, too many for a 32-bit csr.\n", (long long)nnz);
+        return 0;
+    }
+
+    memset(&header, 0, sizeof(hunyuangraph_csrcache_header_t));
+    memcpy(header.magic, hunyuangraph_csrcache_magic, 8);
+    header.version = hunyuangraph_csrcache_version;
+    header.idxwidth = sizeof(int);
+    header.nvtxs = n;
+    header.nedges = nnz;
+    if (!hunyuangraph_csrcache_source(graphfile, &header))
+        return 0;
+    hunyuangraph_csrcache_layout(&header);
+
+    hunyuangraph_csrcache_name(graphfile, sizeof(int), cachefile, sizeof(cachefile));
+    snprintf(tmpfile, sizeof(tmpfile), "%s.tmp.%d", cachefile, (int)getpid());
+    fp = fopen(tmpfile, "wb");
+    if (fp == NULL)
+        return 0;
+
+    if (cap < 4096)
+        cap = 4096;
+    buf = (int *)malloc(sizeof(int) * cap);
+    ok = external_write(ext, &header, sizeof(header), 1, fp);
+
+    // xadj is the prefix sum of the degrees
+    buf[0] = 0;
+    ok = ok && hunyuangraph_csrcache_put(fp, header.xadj_offset, buf, sizeof(int));
+    for (i = 0; i < n && ok; i += len)
+    {
+        len = external_read(ext, buf, sizeof(int), cap, fdeg);
+        ok = len > 0;
+        for (size_t j = 0; j < len && ok; j++)
+        {
+            sum += buf[j];
+            buf[j] = sum;
+        }
+        ok = ok && external_write(ext, buf, sizeof(int), len, fp);
+    }
+
+    // adjncy is the neighbor file as it is
+    ok = ok && hunyuangraph_csrcache_put(fp, header.adjncy_offset, NULL, 0);
+    for (i = 0; i < nnz && ok; i += len)
+    {
+        len = external_read(ext, buf, sizeof(int), cap, fadj);
+        ok = len > 0 && external_write(ext, buf, sizeof(int), len, fp);
+    }
+
+    // unit vertex and edge weights, as read from a fmt 0 graph
+    for (size_t j = 0; j < cap; j++)
+        buf[j] = 1;
+    ok = ok && hunyuangraph_csrcache_put(fp, header.vwgt_offset, NULL, 0);
+    for (i = 0; i < n && ok; i += len)
+    {
+        len = (size_t)(n - i) < cap ? (size_t)(n - i) : cap;
+        ok = external_write(ext, buf, sizeof(int), len, fp);
+    }
+    ok = ok && hunyuangraph_csrcache_put(fp, header.adjwgt_offset, NULL, 0);
+    for (i = 0; i < nnz && ok; i += len)
+    {
+        len = (size_t)(nnz - i) < cap ? (size_t)(nnz - i) : cap;
+        ok = external_write(ext, buf, sizeof(int), len, fp);
+    }
+
+    free(buf);
+    ok = (fclose(fp) == 0) && ok;
+    if (!ok || rename(tmpfile, cachefile) != 0)
+    {
+        unlink(tmpfile);
+        return 0;
+    }
+
+    return 1;
+}
+
+// convert filename with at most mem_limit bytes of buffers, the scratch files
+// go to tmpdir or next to the outputs. Returns 0 on success.
+int external_convert(char *filename, size_t mem_limit, const char *tmpdir, const char *graphfile, const char *grffile, int write_bcsr)
+{
+    int n = 0, fanin, first = 0, ok, ret_code;
+    char degname[4200], adjname[4200], name[4200];
+    const char *base;
+    external_t ext;
+    external_sink_t sink;
+    external_text_t graph = {NULL}, grf = {NULL};
+
+    memset(&ext, 0, sizeof(external_t));
+    ext.mem_limit = mem_limit;
+    base = graphfile != NULL ? graphfile : grffile;
+    if (tmpdir != NULL)
+    {
+        const char *slash = strrchr(base, '/');
+        snprintf(ext.prefix, sizeof(ext.prefix), "%s/%s.tmp.%d", tmpdir, slash != NULL ? slash + 1 : base, (int)getpid());
+    }
+    else
+        snprintf(ext.prefix, sizeof(ext.prefix), "%s.tmp.%d", base, (int)getpid());
+    snprintf(degname, sizeof(degname), "%s.deg", ext.prefix);
+    snprintf(adjname, sizeof(adjname), "%s.adj", ext.prefix);
+
+    // sorted runs
+    external_phase_begin(&ext);
+    ret_code = external_make_runs(&ext, filename, &n);
+    external_phase_end(&ext, "External_runs_time=");
+    if (ret_code != 0)
+    {
+        for (int r = 0; r < ext.nruns; r++)
+        {
+            external_run_name(&ext, r, name, sizeof(name));
+            unlink(name);
+        }
+        return ret_code;
+    }
+
+    // merge passes, the last one into the degree and neighbor files
+    external_phase_begin(&ext);
+    fanin = mem_limit / EXTERNAL_MIN_BUFFER - 1;
+    if (fanin > EXTERNAL_MAX_FANIN)
+        fanin = EXTERNAL_MAX_FANIN;
+    if (fanin < 2)
+        fanin = 2;
+    ok = 1;
+    while (ext.nruns - first > fanin && ok)
+    {
+        ok = external_merge(&ext, first, fanin, NULL);
+        first += fanin;
+    }
+
+    memset(&sink, 0, sizeof(external_sink_t));
+    sink.n = n;
+    sink.cap = mem_limit / (ext.nruns - first + 1) / 2 / sizeof(int);
+    if (sink.cap < EXTERNAL_MIN_BUFFER / sizeof(int))
+        sink.cap = EXTERNAL_MIN_BUFFER / sizeof(int);
+    sink.degbuf = (int *)malloc(sizeof(int) * sink.cap);
+    sink.adjbuf = (int *)malloc(sizeof(int) * sink.cap);
+    sink.deg = fopen(degname, "wb");
+    sink.adj = fopen(adjname, "wb");
+    ok = ok && sink.deg != NULL && sink.adj != NULL &&
+         external_merge(&ext, first, ext.nruns - first, &sink);
+    if (sink.deg != NULL)
+        ok = (fclose(sink.deg) == 0) && ok;
+    if (sink.adj != NULL)
+        ok = (fclose(sink.adj) == 0) && ok;
+    free(sink.degbuf);
+    free(sink.adjbuf);
+    external_phase_end(&ext, "External_merge_time=");
+
+    // outputs
+    external_phase_begin(&ext);
+    if (ok)
+    {
+        FILE *fdeg = fopen(degname, "rb"), *fadj = fopen(adjname, "rb");
+
+        ok = fdeg != NULL && fadj != NULL;
+        if (ok && (graphfile != NULL || grffile != NULL))
+        {
+            graph.cap = grf.cap = mem_limit / 4 > 4096 ? mem_limit / 4 : 4096;
+            if (graphfile != NULL)
+            {
+                graph.fp = fopen(graphfile, "w");
+                graph.buf = (char *)malloc(graph.cap);
+                ok = graph.fp != NULL;
+            }
+            if (grffile != NULL)
+            {
+                grf.fp = fopen(grffile, "w");
+                grf.buf = (char *)malloc(grf.cap);
+                ok = ok && grf.fp != NULL;
+            }
+            ok = ok && external_write_text(&ext, fdeg, fadj, n, sink.nnz, &graph, &grf);
+            if (graph.fp != NULL)
+                ok = (fclose(graph.fp) == 0) && ok;
+            if (grf.fp != NULL)
+                ok = (fclose(grf.fp) == 0) && ok;
+            free(graph.buf);
+            free(grf.buf);
+        }
+        if (ok && write_bcsr)
+        {
+            rewind(fdeg);
+            rewind(fadj);
+            ok = external_write_bcsr(&ext, fdeg, fadj, n, sink.nnz, graphfile);
+        }
+        if (fdeg != NULL)
+            fclose(fdeg);
+        if (fadj != NULL)
+            fclose(fadj);
+    }
+    external_phase_end(&ext, "External_write_time=");
+
+    unlink(degname);
+    unlink(adjname);
+
+    return ok ? 0 : -6;
+}
+
+#endif
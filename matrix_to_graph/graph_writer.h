@@ -0,0 +1,151 @@
+#ifndef _GRAPH_WRITER_
+#define _GRAPH_WRITER_
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+// Text writers of a symmetric CSR graph (0-based, no diagonal), with int or
+// int64_t row pointers.
+// .graph: METIS format, "n m" and one line of 1-based neighbors per vertex
+// .grf:   Jet format, "0", "n nnz", "0 000" and one line "degree neighbors..." per vertex
+// The rows are formatted in rounds of GRAPH_WRITER_ROWS rows per chunk, the
+// chunks of a round in parallel into their own buffers, and written with one
+// fwrite per chunk.
+
+#define GRAPH_WRITER_ROWS 4096
+#define GRAPH_WRITER_GRAPH 0
+#define GRAPH_WRITER_GRF 1
+
+static inline char *graph_writer_itoa(int val, char *p)
+{
+    char tmp[12];
+    int len = 0;
+
+    do
+    {
+        tmp[len++] = '0' + val % 10;
+        val /= 10;
+    } while (val > 0);
+
+    while (len > 0)
+        *p++ = tmp[--len];
+
+    return p;
+}
+
+static inline int64_t graph_writer_ptr(const int *rowPtr, const int64_t *rowPtr64, int64_t i)
+{
+    return rowPtr64 != NULL ? rowPtr64[i] : rowPtr[i];
+}
+
+// format rows [begin, end) at p, returns the end of the text
+char *graph_writer_rows(char *p, int begin, int end, const int *rowPtr, const int64_t *rowPtr64, const int *colIdx, int format)
+{
+    for (int i = begin; i < end; i++)
+    {
+        int64_t rbegin = graph_writer_ptr(rowPtr, rowPtr64, i), rend = graph_writer_ptr(rowPtr, rowPtr64, i+1);
+
+        if (format == GRAPH_WRITER_GRF)
+        {
+            p = graph_writer_itoa(rend - rbegin, p);
+            *p++ = '\t';
+            for (int64_t j = rbegin; j < rend; j++)
+            {
+                p = graph_writer_itoa(colIdx[j], p);
+                *p++ = '\t';
+            }
+        }
+        else
+        {
+            for (int64_t j = rbegin; j < rend; j++)
+            {
+                p = graph_writer_itoa(colIdx[j] + 1, p);
+                *p++ = ' ';
+                *p++ = ' ';
+            }
+        }
+        *p++ = '\n';
+    }
+
+    return p;
+}
+
+// write the graph in the given format, one of rowPtr and rowPtr64 is given. Returns 1 on success
+int graph_writer_write_csr(const char *filename, int n, const int *rowPtr, const int64_t *rowPtr64, const int *colIdx, int format)
+{
+    FILE *fp;
+    int nchunks = 1, ok;
+    int64_t nnz = graph_writer_ptr(rowPtr, rowPtr64, n);
+    size_t *cap, *len;
+    char **buf;
+
+    fp = fopen(filename, "w");
+    if (fp == NULL)
+        return 0;
+
+    if (format == GRAPH_WRITER_GRF)
+        ok = fprintf(fp, "0\n%d\t%lld\n0\t000\n", n, (long long)nnz) > 0;
+    else
+        ok = fprintf(fp, "%d\t%lld\n", n, (long long)(nnz/2)) > 0;
+
+#ifdef _OPENMP
+    nchunks = omp_get_max_threads() * 4;
+#endif
+    buf = (char **)calloc(nchunks, sizeof(char *));
+    cap = (size_t *)calloc(nchunks, sizeof(size_t));
+    len = (size_t *)calloc(nchunks, sizeof(size_t));
+
+    for (long long round = 0; round < n && ok; round += (long long)nchunks * GRAPH_WRITER_ROWS)
+    {
+        #pragma omp parallel for schedule(dynamic, 1)
+        for (int c = 0; c < nchunks; c++)
+        {
+            long long begin = round + (long long)c * GRAPH_WRITER_ROWS;
+            long long end = begin + GRAPH_WRITER_ROWS;
+            size_t bound;
+
+            if (begin > n)
+                begin = n;
+            if (end > n)
+                end = n;
+
+            // at most 10 digits and a separator per number
+            bound = (size_t)(end - begin) * 12 + (size_t)(graph_writer_ptr(rowPtr, rowPtr64, end) - graph_writer_ptr(rowPtr, rowPtr64, begin)) * 12;
+            if (bound > cap[c])
+            {
+                free(buf[c]);
+                buf[c] = (char *)malloc(bound);
+                cap[c] = bound;
+            }
+            len[c] = graph_writer_rows(buf[c], begin, end, rowPtr, rowPtr64, colIdx, format) - buf[c];
+        }
+
+        for (int c = 0; c < nchunks && ok; c++)
+            ok = len[c] == 0 || fwrite(buf[c], 1, len[c], fp) == len[c];
+    }
+
+    // the converted graphs always ended with an empty line
+    if (format == GRAPH_WRITER_GRAPH && ok)
+        ok = fputc('\n', fp) != EOF;
+
+    for (int c = 0; c < nchunks; c++)
+        free(buf[c]);
+    free(buf);
+    free(cap);
+    free(len);
+
+    return (fclose(fp) == 0) && ok;
+}
+
+// write the graph in the given format, returns 1 on success
+int graph_writer_write(const char *filename, int n, const int *rowPtr, const int *colIdx, int format)
+{
+    return graph_writer_write_csr(filename, n, rowPtr, NULL, colIdx, format);
+}
+
+#endif
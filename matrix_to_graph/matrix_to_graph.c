@@ -8,6 +8,9 @@
 #include<malloc.h>
 
 #include "mmio_highlevel.h"
+#include "graph_writer.h"
+#include "external_graph.h"
+#include "../hunyuangraph_csrcache.h"
 
 void merge_findsize(int *startA, int lenA, int *startB, int lenB, int *lenC)
 {
@@ -113,66 +116,70 @@ void merge_computeval(int *startA, int lenA, int *startB, int lenB, int *startC)
 
 int main(int argc, char ** argv)
 {
-    
-     char *filename=argv[1];
+     char *filename=NULL;
      int n,nnz,issymmetricr;
-     
-     int length=0;
-     for(int i=0;;i++){
-       if(filename[i]!='\0')
-       length++;
-       else
-       break;
+     int write_graph=0,write_grf=0,write_bcsr=0;
+     size_t mem_limit=0;
+     char *tmpdir=NULL;
+     struct timeval begin_write, end_write;
+
+     // matrix_to_graph [-g] [-r] [-b] [--mem-limit MB [--tmp-dir dir]] x.mtx[.gz]
+     //   -g  x.graph, the default when no output is given
+     //   -r  x.grf for Jet
+     //   -b  x.graph.bcsr32, the binary csr cache of x.graph read by hunyuangraph (implies -g)
+     //   --mem-limit  convert out of core with at most MB megabytes of buffers (external_graph.h),
+     //                the scratch files go to --tmp-dir or next to the outputs
+     for(int i=1;i<argc;i++){
+       if(strcmp(argv[i],"-g")==0) write_graph=1;
+       else if(strcmp(argv[i],"-r")==0) write_grf=1;
+       else if(strcmp(argv[i],"-b")==0) write_bcsr=write_graph=1;
+       else if(strcmp(argv[i],"--mem-limit")==0&&i+1<argc) mem_limit=(size_t)(atof(argv[++i])*1048576.0);
+       else if(strcmp(argv[i],"--tmp-dir")==0&&i+1<argc) tmpdir=argv[++i];
+       else filename=argv[i];
      }
-     
-     
-   //  int length=sizeof(filename)/sizeof(char);
-     
-     char *file1=(char*)malloc(sizeof(char)*(length+2));
-     //printf("length=%d\n",length);
-     for(int i=0;i<length+2;i++){
-       if(i<length-4){
-       file1[i]=filename[i];
-       }
-       else if(i==length-4){file1[i]='.';}
-       else if(i==length-3){file1[i]='g';}
-       else if(i==length-2){file1[i]='r';}
-       else if(i==length-1){file1[i]='a';}
-       else if(i==length){file1[i]='p';}
-       else if(i==length+1){file1[i]='h';}
-
+     if(filename==NULL){
+       fprintf(stderr,"Usage: %s [-g] [-r] [-b] [--mem-limit MB [--tmp-dir dir]] matrix.mtx[.gz]\n",argv[0]);
+       return 1;
+     }
+     if(!write_graph&&!write_grf)
+       write_graph=1;
+
+     int length=strlen(filename);
+     // x.mtx.gz is written to x.graph as well
+     if(length>3&&strcmp(filename+length-3,".gz")==0)
+       length-=3;
+     length=length>4?length-4:0;
+
+     char *file1=(char*)malloc(sizeof(char)*(length+8));
+     char *file2=(char*)malloc(sizeof(char)*(length+8));
+     sprintf(file1,"%.*s.graph",length,filename);
+     sprintf(file2,"%.*s.grf",length,filename);
+
+     if(mem_limit>0){
+       int ret_code=external_convert(filename,mem_limit,tmpdir,write_graph?file1:NULL,write_grf?file2:NULL,write_bcsr);
+       if(ret_code!=0)
+         fprintf(stderr,"Failed to convert %s\n",filename);
+       free(file1);
+       free(file2);
+       return ret_code!=0;
      }
-    // freopen("Transport.txt","w",stdout);
-     
-    // printf("%s",file1);
-     freopen(file1,"w",stdout);
-    //
-/*
-    char *partitionfile=filename;
-    char s2[8]={'.','g','r','a','p','h'};
-    int i1=0,j1=0;
-    for( i1=0;partitionfile[i1]!='\0';i1++ );
-    do
+
+    // malloc A in CSR, the values are not needed for the unweighted graph
+    if (mmio_info(&n,&n,&nnz,&issymmetricr,filename) != 0)
     {
-       partitionfile[i1++]=s2[j1];
-    } while(s2[j1++]!='\0');
-    //printf("partitionfile=%s\n", partitionfile);   
-     freopen(partitionfile,"w",stdout);*/
-//
-    // malloc A in CSR
-    mmio_info(&n,&n,&nnz,&issymmetricr,filename);
+        fprintf(stderr, "Failed to read %s\n", filename);
+        return 1;
+    }
     int *csrRowPtrA = (int *)malloc(sizeof(int) * (n+1));
     int *csrColIdxA = (int *)malloc(sizeof(int) * nnz);
-    float *csrValA = (float *)malloc(sizeof(float) * nnz);
-    mmio_data(csrRowPtrA,csrColIdxA,csrValA,filename);
+    mmio_data(csrRowPtrA,csrColIdxA,NULL,filename);
 
 
     // malloc A in CSC
     int *cscColPtrA = (int *)malloc(sizeof(int) * (n+1));
     int *cscRowIdxA = (int *)malloc(sizeof(int) * nnz);
-    float *cscValA = (float *)malloc(sizeof(float) * nnz);
-    matrix_transposition(n, n, nnz, csrRowPtrA, csrColIdxA, csrValA,
-                         cscRowIdxA, cscColPtrA, cscValA);
+    matrix_transposition(n, n, nnz, csrRowPtrA, csrColIdxA, NULL,
+                         cscRowIdxA, cscColPtrA, NULL);
 
   /*  for (int i = 0; i < n+1; i++)
         printf("cscColPtrA[%i] = %i\n", i, cscColPtrA[i]);
@@ -182,12 +189,12 @@ int main(int argc, char ** argv)
     // malloc AT in CSR
     int *csrRowPtrAT = cscColPtrA;
     int *csrColIdxAT = cscRowIdxA;
-    float *csrValAT = cscValA;
 
     // malloc C = A+AT
     int *csrRowPtrC = (int *)malloc(sizeof(int) * (n+1));
 
     // add A and AT in CSR (only for sizes)
+    #pragma omp parallel for schedule(dynamic, 1024)
     for (int i = 0; i < n; i++)
     {
         int lenC = 0;
@@ -207,9 +214,9 @@ int main(int argc, char ** argv)
 
     int nnzC = csrRowPtrC[n];
     int *csrColIdxC = (int *)malloc(sizeof(int) * nnzC);
-    float *csrValC = (float *)malloc(sizeof(float) * nnzC);
 
     // add A and AT in CSR (for values)
+    #pragma omp parallel for schedule(dynamic, 1024)
     for (int i = 0; i < n; i++)
     {
         int lenC = 0;
@@ -225,10 +232,17 @@ int main(int argc, char ** argv)
    /* for (int i = 0; i < nnzC; i++)
         printf("csrColIdxC[%i] = %i\n", i, csrColIdxC[i]);*/
 
+    // A and AT are not needed any more
+    free(csrRowPtrA);
+    free(csrColIdxA);
+    free(cscColPtrA);
+    free(cscRowIdxA);
+
     // malloc C = A+AT without diagonal
     int *csrRowPtrCnew = (int *)malloc(sizeof(int) * (n+1));
 
     // remove diagonals
+    #pragma omp parallel for schedule(dynamic, 1024)
     for (int i = 0; i < n; i++)
     {
         int len = csrRowPtrC[i+1] - csrRowPtrC[i];
@@ -241,18 +255,11 @@ int main(int argc, char ** argv)
     // prefix scan csrRowPtrC
     exclusive_scan(csrRowPtrCnew, n + 1);
 
-  /*  for (int i = 0; i < n+1; i++)
-        printf("cscColPtrCnew[%i] = %i\n", i, csrRowPtrCnew[i]);*/
-    for (int i = 0; i < n+1; i++)
-       // printf("cscColPtrCnew[%i] = %i\n", i, csrRowPtrCnew[i]);
-    {}
-    printf("%d\t%i\n", n, csrRowPtrCnew[n]/2);
-
     int nnzCnew = csrRowPtrCnew[n];
     int *csrColIdxCnew = (int *)malloc(sizeof(int) * nnzCnew);
-    float *csrValCnew = (float *)malloc(sizeof(float) * nnzCnew);
 
     // copy C into Cnew (without dia)
+    #pragma omp parallel for schedule(dynamic, 1024)
     for (int i = 0; i < n; i++)
     {
         int jnew = csrRowPtrCnew[i];
@@ -266,44 +273,37 @@ int main(int argc, char ** argv)
         }
     }
 
-    int a=0;
-    while ( a < n+1)
-    { 
-       
-        for(int j=csrRowPtrCnew[a];j<csrRowPtrCnew[a+1];j++)
-        {
-        //printf("csrColIdxCnew[%i] = %i\t", i, csrColIdxCnew[i]);
-           printf("%d  ",csrColIdxCnew[j]+1);
-           //a++;
-        }
-         a++;
-        printf("\n");
-    } 
-    fclose(stdout);
-}
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    free(csrRowPtrC);
+    free(csrColIdxC);
 
+    // write the outputs from the same csr
+    gettimeofday(&begin_write, NULL);
+    if (write_graph && !graph_writer_write(file1, n, csrRowPtrCnew, csrColIdxCnew, GRAPH_WRITER_GRAPH))
+    {
+        fprintf(stderr, "Failed to write %s\n", file1);
+        return 1;
+    }
+    if (write_grf && !graph_writer_write(file2, n, csrRowPtrCnew, csrColIdxCnew, GRAPH_WRITER_GRF))
+    {
+        fprintf(stderr, "Failed to write %s\n", file2);
+        return 1;
+    }
+    if (write_bcsr)
+    {
+        // unit vertex and edge weights, as read from a fmt 0 graph
+        int *ones = (int *)malloc(sizeof(int) * (nnzCnew > n ? nnzCnew : n));
+        #pragma omp parallel for
+        for (int i = 0; i < (nnzCnew > n ? nnzCnew : n); i++)
+            ones[i] = 1;
+        if (!hunyuangraph_csrcache_write(file1, sizeof(int), n, nnzCnew, 0, csrRowPtrCnew, csrColIdxCnew, ones, ones))
+            fprintf(stderr, "Failed to write the csr cache of %s\n", file1);
+        free(ones);
+    }
+    gettimeofday(&end_write, NULL);
+    fprintf(stderr, "Write_graph_time=     %10.3lf ms\n", (end_write.tv_sec - begin_write.tv_sec) * 1000.0 + (end_write.tv_usec - begin_write.tv_usec) / 1000.0);
 
+    free(csrRowPtrCnew);
+    free(csrColIdxCnew);
+    free(file1);
+    free(file2);
+}
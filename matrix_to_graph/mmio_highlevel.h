@@ -5,296 +5,549 @@
 #define VALUE_TYPE float
 #endif
 
+#include <stdint.h>
+#include <string.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <sys/time.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
 #include "mmio.h"
+#include "../hunyuangraph_gzstream.h"
 //#include "common.h"
 
-// read matrix infomation from mtx file
-int mmio_info(int *m, int *n, int *nnz, int *isSymmetric, char *filename)
+#define MMIO_CHUNK_SIZE (1 << 20)
+
+// coordinates of a mtx file in file order (0-based), kept between mmio_info and mmio_data
+typedef struct
 {
-    int m_tmp, n_tmp, nnz_tmp;
+    char *filename;
+    int m, n, nnz_mtx_report;
+    int isInteger, isReal, isPattern, isSymmetric, isComplex;
+    int *rowIdx;
+    int *colIdx;
+    VALUE_TYPE *val;        // NULL if the values were not read
+} mmio_coo_t;
+
+mmio_coo_t mmio_coo = {NULL};
+
+// line aligned piece of the mapped file, parsed by one thread
+typedef struct
+{
+    const char *begin, *end;
+    int nlines;
+    int start;
+} mmio_chunk_t;
 
-    int ret_code;
-    MM_typecode matcode;
-    FILE *f;
+// open mtx file, gzip-compressed files are inflated on a separate thread
+FILE *mmio_fopen(char *filename, hunyuangraph_gzstream_t *gz)
+{
+    gz->fp = NULL;
+    if (hunyuangraph_gzstream_is_gz(filename))
+        return hunyuangraph_gzstream_fopen(filename, gz);
+    return fopen(filename, "r");
+}
 
-    int nnz_mtx_report;
-    int isInteger = 0, isReal = 0, isPattern = 0, isSymmetric_tmp = 0, isComplex = 0;
+void mmio_fclose(FILE *f, hunyuangraph_gzstream_t *gz)
+{
+    if (gz->fp != NULL)
+        hunyuangraph_gzstream_fclose(gz);
+    else if (f != stdin)
+        fclose(f);
+}
 
-    // load matrix
-    if ((f = fopen(filename, "r")) == NULL)
-        return -1;
+void mmio_coo_free(mmio_coo_t *coo)
+{
+    free(coo->filename);
+    free(coo->rowIdx);
+    free(coo->colIdx);
+    free(coo->val);
+    memset(coo, 0, sizeof(mmio_coo_t));
+}
 
-    if (mm_read_banner(f, &matcode) != 0)
+static inline int mmio_is_blank(char c)
+{
+    return c == ' ' || c == '\t' || c == '\r' || c == '\v' || c == '\f';
+}
+
+static inline const char *mmio_line_end(const char *p, const char *end)
+{
+    const char *q = (const char *)memchr(p, '\n', end - p);
+    return q == NULL ? end : q;
+}
+
+// data lines are the lines with a token, as fscanf skips the empty ones
+static inline int mmio_is_data_line(const char *p, const char *le)
+{
+    while (p < le && mmio_is_blank(*p))
+        p++;
+    return p < le;
+}
+
+static inline const char *mmio_parse_int(const char *p, const char *end, int *val)
+{
+    long long x = 0;
+    int neg = 0;
+    const char *q;
+
+    while (p < end && mmio_is_blank(*p))
+        p++;
+    if (p < end && (*p == '-' || *p == '+'))
     {
-        printf("Could not process Matrix Market banner.\n");
-        return -2;
+        neg = (*p == '-');
+        p++;
     }
+    for (q = p; q < end && *q >= '0' && *q <= '9'; q++)
+        x = x * 10 + (*q - '0');
+    if (q == p)
+        return NULL;
 
-    if ( mm_is_pattern( matcode ) )  { isPattern = 1; /*printf("type = Pattern\n");*/ }
-    if ( mm_is_real ( matcode) )     { isReal = 1; /*printf("type = real\n");*/ }
-    if ( mm_is_complex( matcode ) )  { isComplex = 1; /*printf("type = real\n");*/ }
-    if ( mm_is_integer ( matcode ) ) { isInteger = 1; /*printf("type = integer\n");*/ }
+    *val = (int)(neg ? -x : x);
+    return q;
+}
 
-    /* find out size of sparse matrix .... */
-    ret_code = mm_read_mtx_crd_size(f, &m_tmp, &n_tmp, &nnz_mtx_report);
-    if (ret_code != 0)
-        return -4;
+static inline const char *mmio_parse_double(const char *p, const char *end, double *val)
+{
+    char buf[128];
+    int len = 0;
+    char *stop;
 
-    if ( mm_is_symmetric( matcode ) || mm_is_hermitian( matcode ) )
+    while (p < end && mmio_is_blank(*p))
+        p++;
+    while (p + len < end && !mmio_is_blank(p[len]) && len < 127)
     {
-        isSymmetric_tmp = 1;
-        //printf("input matrix is symmetric = true\n");
+        buf[len] = p[len];
+        len++;
     }
-    else
+    buf[len] = '\0';
+    *val = strtod(buf, &stop);
+    if (stop == buf)
+        return NULL;
+
+    return p + (stop - buf);
+}
+
+// count the data lines of a chunk, at most maxlines
+void mmio_count_chunk(mmio_chunk_t *chunk, int maxlines)
+{
+    const char *p = chunk->begin, *le;
+    int nlines = 0;
+
+    while (p < chunk->end && nlines < maxlines)
     {
-        //printf("input matrix is symmetric = false\n");
+        le = mmio_line_end(p, chunk->end);
+        if (mmio_is_data_line(p, le))
+            nlines++;
+        p = le + 1;
     }
 
-    int *csrRowPtr_counter = (int *)malloc((m_tmp+1) * sizeof(int));
-    memset(csrRowPtr_counter, 0, (m_tmp+1) * sizeof(int));
+    chunk->end = (p < chunk->end ? p : chunk->end);
+    chunk->nlines = nlines;
+}
 
-    int *csrRowIdx_tmp = (int *)malloc(nnz_mtx_report * sizeof(int));
-    int *csrColIdx_tmp = (int *)malloc(nnz_mtx_report * sizeof(int));
-    //VALUE_TYPE *csrVal_tmp    = (VALUE_TYPE *)malloc(nnz_mtx_report * sizeof(VALUE_TYPE));
+// parse the data lines of a counted chunk, returns 0 or the first bad line
+int mmio_fill_chunk(mmio_chunk_t *chunk, mmio_coo_t *coo)
+{
+    const char *p = chunk->begin, *le, *q;
+    int i = chunk->start, idxi, idxj, ival;
+    double fval, fval_im;
 
-    /* NOTE: when reading in doubles, ANSI C requires the use of the "l"  */
-    /*   specifier as in "%lg", "%lf", "%le", otherwise errors will occur */
-    /*  (ANSI C X3.159-1989, Sec. 4.9.6.2, p. 136 lines 13-15)            */
+    while (p < chunk->end)
+    {
+        le = mmio_line_end(p, chunk->end);
+        if (!mmio_is_data_line(p, le))
+        {
+            p = le + 1;
+            continue;
+        }
 
-    for (int i = 0; i < nnz_mtx_report; i++)
+        q = mmio_parse_int(p, le, &idxi);
+        q = (q != NULL ? mmio_parse_int(q, le, &idxj) : NULL);
+        if (q == NULL)
+            return i + 1;
+
+        if (coo->val != NULL)
+        {
+            fval = 1.0;
+            if (coo->isReal || coo->isComplex)
+            {
+                q = mmio_parse_double(q, le, &fval);
+                if (q != NULL && coo->isComplex)
+                    q = mmio_parse_double(q, le, &fval_im);
+            }
+            else if (coo->isInteger)
+            {
+                q = mmio_parse_int(q, le, &ival);
+                fval = ival;
+            }
+            if (q == NULL)
+                return i + 1;
+            coo->val[i] = fval;
+        }
+
+        // adjust from 1-based to 0-based
+        coo->rowIdx[i] = idxi - 1;
+        coo->colIdx[i] = idxj - 1;
+        i++;
+        p = le + 1;
+    }
+
+    return 0;
+}
+
+// parse the coordinates of a mapped file in parallel, returns the lines read or -1
+int mmio_parse_coo(const char *begin, const char *end, mmio_coo_t *coo)
+{
+    int c, nchunks, nlines, bad = 0;
+    size_t step;
+    const char *p;
+    mmio_chunk_t *chunks;
+
+    nchunks = 1;
+#ifdef _OPENMP
+    nchunks = omp_get_max_threads() * 8;
+#endif
+    if ((size_t)nchunks > (end - begin) / MMIO_CHUNK_SIZE + 1)
+        nchunks = (end - begin) / MMIO_CHUNK_SIZE + 1;
+    chunks = (mmio_chunk_t *)malloc(sizeof(mmio_chunk_t) * nchunks);
+
+    // split at line boundaries
+    step = (end - begin) / nchunks;
+    for (p = begin, c = 0; c < nchunks; c++)
+    {
+        chunks[c].begin = p;
+        if (c == nchunks - 1 || p + step >= end)
+            p = end;
+        else
+        {
+            p = mmio_line_end(p + step, end);
+            p = (p < end ? p + 1 : end);
+        }
+        chunks[c].end = p;
+    }
+
+    // pass 1: count the lines of every chunk
+    #pragma omp parallel for schedule(dynamic, 1)
+    for (c = 0; c < nchunks; c++)
+        mmio_count_chunk(&chunks[c], INT32_MAX);
+
+    // prefix sum, dropping the lines beyond nnz_mtx_report
+    for (nlines = 0, c = 0; c < nchunks; c++)
+    {
+        if ((long long)nlines + chunks[c].nlines > coo->nnz_mtx_report)
+            mmio_count_chunk(&chunks[c], coo->nnz_mtx_report - nlines);
+        chunks[c].start = nlines;
+        nlines += chunks[c].nlines;
+    }
+
+    // pass 2: parse
+    #pragma omp parallel for schedule(dynamic, 1) reduction(max : bad)
+    for (c = 0; c < nchunks; c++)
+    {
+        int r = mmio_fill_chunk(&chunks[c], coo);
+        if (r > bad)
+            bad = r;
+    }
+
+    free(chunks);
+    if (bad)
+    {
+        fprintf(stderr, "Invalid entry %d in the mtx file.\n", bad);
+        return -1;
+    }
+
+    return nlines;
+}
+
+// read the coordinates of a gzip-compressed file with fscanf
+int mmio_read_coo_stream(FILE *f, mmio_coo_t *coo)
+{
+    for (int i = 0; i < coo->nnz_mtx_report; i++)
     {
         int idxi, idxj;
         double fval, fval_im;
         int ival;
         int returnvalue;
 
-        if (isReal)
+        if (coo->isReal)
         {
             returnvalue = fscanf(f, "%d %d %lg\n", &idxi, &idxj, &fval);
         }
-        else if (isComplex)
+        else if (coo->isComplex)
         {
             returnvalue = fscanf(f, "%d %d %lg %lg\n", &idxi, &idxj, &fval, &fval_im);
         }
-        else if (isInteger)
+        else if (coo->isInteger)
         {
             returnvalue = fscanf(f, "%d %d %d\n", &idxi, &idxj, &ival);
             fval = ival;
         }
-        else if (isPattern)
+        else if (coo->isPattern)
         {
             returnvalue = fscanf(f, "%d %d\n", &idxi, &idxj);
             fval = 1.0;
         }
+        if (returnvalue < 2)
+            return i;
 
         // adjust from 1-based to 0-based
-        idxi--;
-        idxj--;
-
-        csrRowPtr_counter[idxi]++;
-        csrRowIdx_tmp[i] = idxi;
-        csrColIdx_tmp[i] = idxj;
-        //csrVal_tmp[i] = fval;
+        coo->rowIdx[i] = idxi - 1;
+        coo->colIdx[i] = idxj - 1;
+        if (coo->val != NULL)
+            coo->val[i] = fval;
     }
 
-    if (f != stdin)
-        fclose(f);
-
-    if (isSymmetric_tmp)
-    {
-        for (int i = 0; i < nnz_mtx_report; i++)
-        {
-            if (csrRowIdx_tmp[i] != csrColIdx_tmp[i])
-                csrRowPtr_counter[csrColIdx_tmp[i]]++;
-        }
-    }
+    return coo->nnz_mtx_report;
+}
 
-    // exclusive scan for csrRowPtr_counter
-    int old_val, new_val;
+// read the banner and the size line, f is left at the first coordinate
+int mmio_read_header(FILE *f, mmio_coo_t *coo)
+{
+    MM_typecode matcode;
 
-    old_val = csrRowPtr_counter[0];
-    csrRowPtr_counter[0] = 0;
-    for (int i = 1; i <= m_tmp; i++)
+    if (mm_read_banner(f, &matcode) != 0)
     {
-        new_val = csrRowPtr_counter[i];
-        csrRowPtr_counter[i] = old_val + csrRowPtr_counter[i-1];
-        old_val = new_val;
+        printf("Could not process Matrix Market banner.\n");
+        return -2;
     }
 
-    nnz_tmp = csrRowPtr_counter[m_tmp];
+    if ( mm_is_pattern( matcode ) )  { coo->isPattern = 1; /*printf("type = Pattern\n");*/ }
+    if ( mm_is_real ( matcode) )     { coo->isReal = 1; /*printf("type = real\n");*/ }
+    if ( mm_is_complex( matcode ) )  { coo->isComplex = 1; /*printf("type = real\n");*/ }
+    if ( mm_is_integer ( matcode ) ) { coo->isInteger = 1; /*printf("type = integer\n");*/ }
 
-    *m = m_tmp;
-    *n = n_tmp;
-    *nnz = nnz_tmp;
-    *isSymmetric = isSymmetric_tmp;
+    /* find out size of sparse matrix .... */
+    if (mm_read_mtx_crd_size(f, &coo->m, &coo->n, &coo->nnz_mtx_report) != 0)
+        return -4;
 
-    // free tmp space
-    free(csrColIdx_tmp);
-    //free(csrVal_tmp);
-    free(csrRowIdx_tmp);
-    free(csrRowPtr_counter);
+    if ( mm_is_symmetric( matcode ) || mm_is_hermitian( matcode ) )
+    {
+        coo->isSymmetric = 1;
+        //printf("input matrix is symmetric = true\n");
+    }
 
     return 0;
 }
 
-// read matrix infomation from mtx file
-int mmio_data(int *csrRowPtr, int *csrColIdx, VALUE_TYPE *csrVal, char *filename)
+// read the coordinates of a mtx file into coo, with values if readval is set
+int mmio_read_coo(char *filename, int readval, mmio_coo_t *coo)
 {
-    int m_tmp, n_tmp, nnz_tmp;
-
-    int ret_code;
-    MM_typecode matcode;
+    int ret_code, nread;
     FILE *f;
+    hunyuangraph_gzstream_t gz;
+    long offset;
+    size_t filesize;
+    struct timeval begin_read, end_read;
+    double read_time;
 
-    int nnz_mtx_report;
-    int isInteger = 0, isReal = 0, isPattern = 0, isSymmetric_tmp = 0, isComplex = 0;
+    if (coo->filename != NULL && strcmp(coo->filename, filename) == 0 && (!readval || coo->val != NULL))
+        return 0;
+    mmio_coo_free(coo);
+
+    gettimeofday(&begin_read, NULL);
 
     // load matrix
-    if ((f = fopen(filename, "r")) == NULL)
+    if ((f = mmio_fopen(filename, &gz)) == NULL)
         return -1;
 
-    if (mm_read_banner(f, &matcode) != 0)
+    ret_code = mmio_read_header(f, coo);
+    if (ret_code != 0)
     {
-        printf("Could not process Matrix Market banner.\n");
-        return -2;
+        mmio_fclose(f, &gz);
+        return ret_code;
     }
 
-    if ( mm_is_pattern( matcode ) )  { isPattern = 1; /*printf("type = Pattern\n");*/ }
-    if ( mm_is_real ( matcode) )     { isReal = 1; /*printf("type = real\n");*/ }
-    if ( mm_is_complex( matcode ) )  { isComplex = 1; /*printf("type = real\n");*/ }
-    if ( mm_is_integer ( matcode ) ) { isInteger = 1; /*printf("type = integer\n");*/ }
+    coo->rowIdx = (int *)malloc(coo->nnz_mtx_report * sizeof(int));
+    coo->colIdx = (int *)malloc(coo->nnz_mtx_report * sizeof(int));
+    coo->val = readval ? (VALUE_TYPE *)malloc(coo->nnz_mtx_report * sizeof(VALUE_TYPE)) : NULL;
 
-    /* find out size of sparse matrix .... */
-    ret_code = mm_read_mtx_crd_size(f, &m_tmp, &n_tmp, &nnz_mtx_report);
-    if (ret_code != 0)
-        return -4;
-
-    if ( mm_is_symmetric( matcode ) || mm_is_hermitian( matcode ) )
+    if (gz.fp != NULL)
     {
-        isSymmetric_tmp = 1;
-        //printf("input matrix is symmetric = true\n");
+        nread = mmio_read_coo_stream(f, coo);
+        filesize = gz.total;
+        mmio_fclose(f, &gz);
     }
     else
     {
-        //printf("input matrix is symmetric = false\n");
+        // the coordinates are parsed from a mapping of the file, in parallel
+        struct stat status;
+        char *data;
+
+        offset = ftell(f);
+        fstat(fileno(f), &status);
+        filesize = status.st_size;
+        data = (char *)mmap(NULL, filesize, PROT_READ, MAP_PRIVATE, fileno(f), 0);
+        mmio_fclose(f, &gz);
+        if (offset < 0 || data == MAP_FAILED)
+        {
+            mmio_coo_free(coo);
+            return -1;
+        }
+        madvise(data, filesize, MADV_SEQUENTIAL);
+
+        nread = mmio_parse_coo(data + offset, data + filesize, coo);
+        munmap(data, filesize);
     }
 
-    int *csrRowPtr_counter = (int *)malloc((m_tmp+1) * sizeof(int));
-    memset(csrRowPtr_counter, 0, (m_tmp+1) * sizeof(int));
+    if (nread < coo->nnz_mtx_report)
+    {
+        fprintf(stderr, "Premature end of the mtx file: %d of %d entries.\n", nread < 0 ? 0 : nread, coo->nnz_mtx_report);
+        mmio_coo_free(coo);
+        return -5;
+    }
 
-    int *csrRowIdx_tmp = (int *)malloc(nnz_mtx_report * sizeof(int));
-    int *csrColIdx_tmp = (int *)malloc(nnz_mtx_report * sizeof(int));
-    VALUE_TYPE *csrVal_tmp    = (VALUE_TYPE *)malloc(nnz_mtx_report * sizeof(VALUE_TYPE));
+    coo->filename = strdup(filename);
 
-    /* NOTE: when reading in doubles, ANSI C requires the use of the "l"  */
-    /*   specifier as in "%lg", "%lf", "%le", otherwise errors will occur */
-    /*  (ANSI C X3.159-1989, Sec. 4.9.6.2, p. 136 lines 13-15)            */
+    gettimeofday(&end_read, NULL);
+    read_time = (end_read.tv_sec - begin_read.tv_sec) * 1000.0 + (end_read.tv_usec - begin_read.tv_usec) / 1000.0;
+    fprintf(stderr, "Read_mtx_time=        %10.3lf ms %10.2lf MB/s\n", read_time, filesize / 1048576.0 / (read_time > 1e-3 ? read_time : 1e-3) * 1000.0);
 
-    for (int i = 0; i < nnz_mtx_report; i++)
-    {
-        int idxi, idxj;
-        double fval, fval_im;
-        int ival;
-        int returnvalue;
+    return 0;
+}
 
-        if (isReal)
-        {
-            returnvalue = fscanf(f, "%d %d %lg\n", &idxi, &idxj, &fval);
-        }
-        else if (isComplex)
-        {
-            returnvalue = fscanf(f, "%d %d %lg %lg\n", &idxi, &idxj, &fval, &fval_im);
-        }
-        else if (isInteger)
+// read matrix infomation from mtx file
+int mmio_info(int *m, int *n, int *nnz, int *isSymmetric, char *filename)
+{
+    int ret_code;
+    long long nnz_tmp;
+    mmio_coo_t *coo = &mmio_coo;
+
+    ret_code = mmio_read_coo(filename, 0, coo);
+    if (ret_code != 0)
+        return ret_code;
+
+    // the off-diagonal entries of a symmetric matrix are stored twice
+    nnz_tmp = coo->nnz_mtx_report;
+    if (coo->isSymmetric)
+    {
+        #pragma omp parallel for reduction(+ : nnz_tmp)
+        for (int i = 0; i < coo->nnz_mtx_report; i++)
         {
-            returnvalue = fscanf(f, "%d %d %d\n", &idxi, &idxj, &ival);
-            fval = ival;
-        }
-        else if (isPattern)
-        {
-            returnvalue = fscanf(f, "%d %d\n", &idxi, &idxj);
-            fval = 1.0;
+            if (coo->rowIdx[i] != coo->colIdx[i])
+                nnz_tmp++;
         }
+    }
 
-        // adjust from 1-based to 0-based
-        idxi--;
-        idxj--;
+    *m = coo->m;
+    *n = coo->n;
+    *nnz = nnz_tmp;
+    *isSymmetric = coo->isSymmetric;
 
-        csrRowPtr_counter[idxi]++;
-        csrRowIdx_tmp[i] = idxi;
-        csrColIdx_tmp[i] = idxj;
-        csrVal_tmp[i] = fval;
-    }
+    return 0;
+}
 
-    if (f != stdin)
-        fclose(f);
+int mmio_key_compare(const void *a, const void *b)
+{
+    uint64_t x = *(const uint64_t *)a, y = *(const uint64_t *)b;
+    return (x > y) - (x < y);
+}
 
-    if (isSymmetric_tmp)
+// read matrix data from mtx file, csrVal may be NULL when only the pattern is needed.
+// The rows are filled with a parallel counting sort; every entry carries its
+// line number so that the rows can be put back into file order, as a serial
+// counting sort would leave them.
+int mmio_data(int *csrRowPtr, int *csrColIdx, VALUE_TYPE *csrVal, char *filename)
+{
+    int ret_code;
+    mmio_coo_t *coo = &mmio_coo;
+
+    ret_code = mmio_read_coo(filename, csrVal != NULL, coo);
+    if (ret_code != 0)
+        return ret_code;
+
+    int m_tmp = coo->m;
+    int nnz_mtx_report = coo->nnz_mtx_report;
+    int isSymmetric_tmp = coo->isSymmetric;
+    int *csrRowIdx_tmp = coo->rowIdx;
+    int *csrColIdx_tmp = coo->colIdx;
+
+    memset(csrRowPtr, 0, (m_tmp+1) * sizeof(int));
+
+    #pragma omp parallel for
+    for (int i = 0; i < nnz_mtx_report; i++)
     {
-        for (int i = 0; i < nnz_mtx_report; i++)
+        #pragma omp atomic
+        csrRowPtr[csrRowIdx_tmp[i]]++;
+        if (isSymmetric_tmp && csrRowIdx_tmp[i] != csrColIdx_tmp[i])
         {
-            if (csrRowIdx_tmp[i] != csrColIdx_tmp[i])
-                csrRowPtr_counter[csrColIdx_tmp[i]]++;
+            #pragma omp atomic
+            csrRowPtr[csrColIdx_tmp[i]]++;
         }
     }
 
-    // exclusive scan for csrRowPtr_counter
+    // exclusive scan for csrRowPtr
     int old_val, new_val;
 
-    old_val = csrRowPtr_counter[0];
-    csrRowPtr_counter[0] = 0;
+    old_val = csrRowPtr[0];
+    csrRowPtr[0] = 0;
     for (int i = 1; i <= m_tmp; i++)
     {
-        new_val = csrRowPtr_counter[i];
-        csrRowPtr_counter[i] = old_val + csrRowPtr_counter[i-1];
+        new_val = csrRowPtr[i];
+        csrRowPtr[i] = old_val + csrRowPtr[i-1];
         old_val = new_val;
     }
 
-    nnz_tmp = csrRowPtr_counter[m_tmp];
-    memcpy(csrRowPtr, csrRowPtr_counter, (m_tmp+1) * sizeof(int));
-    memset(csrRowPtr_counter, 0, (m_tmp+1) * sizeof(int));
+    int nnz_tmp = csrRowPtr[m_tmp];
+    int *csrRowPtr_counter = (int *)malloc((m_tmp+1) * sizeof(int));
+    uint64_t *keys = (uint64_t *)malloc((size_t)nnz_tmp * sizeof(uint64_t));
+    memcpy(csrRowPtr_counter, csrRowPtr, (m_tmp+1) * sizeof(int));
+
+    // scatter (line, column) keys to the rows
+    #pragma omp parallel for
+    for (int i = 0; i < nnz_mtx_report; i++)
+    {
+        int offset;
+
+        #pragma omp atomic capture
+        offset = csrRowPtr_counter[csrRowIdx_tmp[i]]++;
+        keys[offset] = ((uint64_t)i << 32) | (uint32_t)csrColIdx_tmp[i];
+
+        if (isSymmetric_tmp && csrRowIdx_tmp[i] != csrColIdx_tmp[i])
+        {
+            #pragma omp atomic capture
+            offset = csrRowPtr_counter[csrColIdx_tmp[i]]++;
+            keys[offset] = ((uint64_t)i << 32) | (uint32_t)csrRowIdx_tmp[i];
+        }
+    }
 
-    if (isSymmetric_tmp)
+    // put every row back into file order
+    #pragma omp parallel for schedule(dynamic, 1024)
+    for (int r = 0; r < m_tmp; r++)
     {
-        for (int i = 0; i < nnz_mtx_report; i++)
+        int begin = csrRowPtr[r], end = csrRowPtr[r+1];
+
+        if (end - begin > 32)
+            qsort(&keys[begin], end - begin, sizeof(uint64_t), mmio_key_compare);
+        else
         {
-            if (csrRowIdx_tmp[i] != csrColIdx_tmp[i])
+            for (int j = begin + 1; j < end; j++)
             {
-                int offset = csrRowPtr[csrRowIdx_tmp[i]] + csrRowPtr_counter[csrRowIdx_tmp[i]];
-                csrColIdx[offset] = csrColIdx_tmp[i];
-                csrVal[offset] = csrVal_tmp[i];
-                csrRowPtr_counter[csrRowIdx_tmp[i]]++;
-
-                offset = csrRowPtr[csrColIdx_tmp[i]] + csrRowPtr_counter[csrColIdx_tmp[i]];
-                csrColIdx[offset] = csrRowIdx_tmp[i];
-                csrVal[offset] = csrVal_tmp[i];
-                csrRowPtr_counter[csrColIdx_tmp[i]]++;
-            }
-            else
-            {
-                int offset = csrRowPtr[csrRowIdx_tmp[i]] + csrRowPtr_counter[csrRowIdx_tmp[i]];
-                csrColIdx[offset] = csrColIdx_tmp[i];
-                csrVal[offset] = csrVal_tmp[i];
-                csrRowPtr_counter[csrRowIdx_tmp[i]]++;
+                uint64_t key = keys[j];
+                int k = j - 1;
+                while (k >= begin && keys[k] > key)
+                {
+                    keys[k+1] = keys[k];
+                    k--;
+                }
+                keys[k+1] = key;
             }
         }
-    }
-    else
-    {
-        for (int i = 0; i < nnz_mtx_report; i++)
+
+        for (int j = begin; j < end; j++)
         {
-            int offset = csrRowPtr[csrRowIdx_tmp[i]] + csrRowPtr_counter[csrRowIdx_tmp[i]];
-            csrColIdx[offset] = csrColIdx_tmp[i];
-            csrVal[offset] = csrVal_tmp[i];
-            csrRowPtr_counter[csrRowIdx_tmp[i]]++;
+            csrColIdx[j] = (int)(uint32_t)keys[j];
+            if (csrVal != NULL)
+                csrVal[j] = coo->val[keys[j] >> 32];
         }
     }
 
     // free tmp space
-    free(csrColIdx_tmp);
-    free(csrVal_tmp);
-    free(csrRowIdx_tmp);
+    free(keys);
     free(csrRowPtr_counter);
+    mmio_coo_free(coo);
 
     return 0;
 }
@@ -1,6 +1,9 @@
 #ifndef _TRANS_
 #define _TRANS_
 
+#include <stdlib.h>
+#include <string.h>
+
 void exclusive_scan(int *input, int length)
 {
     if(length == 0 || length == 1)
@@ -18,6 +21,37 @@ void exclusive_scan(int *input, int length)
     }
 }
 
+// sort the (row, val) pairs of one column by row
+void transposition_sort_column(int *rowIdx, float *val, int len)
+{
+    for (int i = 1; i < len; i++)
+    {
+        int row = rowIdx[i];
+        float v = val != NULL ? val[i] : 0;
+        int j = i - 1;
+        while (j >= 0 && rowIdx[j] > row)
+        {
+            rowIdx[j+1] = rowIdx[j];
+            if (val != NULL)
+                val[j+1] = val[j];
+            j--;
+        }
+        rowIdx[j+1] = row;
+        if (val != NULL)
+            val[j+1] = v;
+    }
+}
+
+int transposition_compare(const void *a, const void *b)
+{
+    int x = *(const int *)a, y = *(const int *)b;
+    return (x > y) - (x < y);
+}
+
+// csrVal and cscVal may be NULL when only the pattern is needed.
+// The entries are scattered to the columns in parallel and every column is
+// sorted by row afterwards, which gives the same order as a serial row by
+// row transposition.
 void matrix_transposition(const int         m,
                           const int         n,
                           const int         nnz,
@@ -30,8 +64,10 @@ void matrix_transposition(const int         m,
 {
     // histogram in column pointer
     memset (cscColPtr, 0, sizeof(int) * (n+1));
+    #pragma omp parallel for
     for (int i = 0; i < nnz; i++)
     {
+        #pragma omp atomic
         cscColPtr[csrColIdx[i]]++;
     }
 
@@ -42,18 +78,34 @@ void matrix_transposition(const int         m,
     memcpy (cscColIncr, cscColPtr, sizeof(int) * (n+1));
 
     // insert nnz to csc
+    #pragma omp parallel for schedule(dynamic, 1024)
     for (int row = 0; row < m; row++)
     {
         for (int j = csrRowPtr[row]; j < csrRowPtr[row+1]; j++)
         {
             int col = csrColIdx[j];
+            int pos;
+
+            #pragma omp atomic capture
+            pos = cscColIncr[col]++;
 
-            cscRowIdx[cscColIncr[col]] = row;
-            cscVal[cscColIncr[col]] = csrVal[j];
-            cscColIncr[col]++;
+            cscRowIdx[pos] = row;
+            if (cscVal != NULL)
+                cscVal[pos] = csrVal[j];
         }
     }
 
+    // restore the row order inside the columns
+    #pragma omp parallel for schedule(dynamic, 1024)
+    for (int col = 0; col < n; col++)
+    {
+        int len = cscColPtr[col+1] - cscColPtr[col];
+        if (len > 64 && cscVal == NULL)
+            qsort(&cscRowIdx[cscColPtr[col]], len, sizeof(int), transposition_compare);
+        else
+            transposition_sort_column(&cscRowIdx[cscColPtr[col]], cscVal != NULL ? &cscVal[cscColPtr[col]] : NULL, len);
+    }
+
     free (cscColIncr);
 }
 
@@ -4,6 +4,7 @@
 #include <stdio.h>
 #include "struct.h"
 #include "memory.h"
+#include "../hunyuangraph_metrics.h"
 
 /*************************************************************************/
 /*! This function initializes a graph_t data structure */
@@ -535,21 +536,14 @@ bool exam_correct_gp(Hunyuan_int_t *result, Hunyuan_int_t nvtxs, Hunyuan_int_t n
 	}
 }
 
+//	in parallel, see hunyuangraph_metrics.h
 Hunyuan_int_t compute_edgecut(Hunyuan_int_t *result, Hunyuan_int_t nvtxs, Hunyuan_int_t *xadj, Hunyuan_int_t *adjncy, Hunyuan_int_t *adjwgt)
 {
-	Hunyuan_int_t edgecut = 0;
-	for(Hunyuan_int_t i = 0;i < nvtxs;i++)
-	{
-		Hunyuan_int_t partition = result[i];
-		for(Hunyuan_int_t j = xadj[i];j < xadj[i+1];j++)
-		{
-			Hunyuan_int_t k = adjncy[j];
-			if(partition != result[k])
-				edgecut += adjwgt[j];
-		}
-	}
-
-	return edgecut / 2;
+#if IDXTYPEWIDTH == 32
+	return hunyuangraph_metrics_edgecut32(nvtxs, xadj, adjncy, adjwgt, result);
+#else
+	return hunyuangraph_metrics_edgecut64(nvtxs, xadj, adjncy, adjwgt, result);
+#endif
 }
 
 Hunyuan_int_t compute_adjwgtsum(graph_t *graph)
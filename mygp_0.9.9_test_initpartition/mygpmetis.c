@@ -179,10 +179,7 @@ Hunyuan_int_t main(Hunyuan_int_t argc, char **argv)
 	check_free(graph->tvwgt, sizeof(Hunyuan_real_t), "main: graph->tvwgt");
 	check_free(graph, sizeof(graph_t), "main: graph");
 
-	free(xadj);
-	free(vwgt);
-	free(adjncy);
-	free(adjwgt);
+	FreeReadGraph(xadj, vwgt, adjncy, adjwgt);
 
 	// PrintTime(control);
 	// PrintMemory();
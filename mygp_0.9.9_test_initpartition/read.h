@@ -9,6 +9,10 @@
 #include "common.h"
 #include "memory.h"
 #include "graph.h"
+#include "../hunyuangraph_csrcache.h"
+
+/* Binary csr cache that the arrays returned by ReadGraph point into */
+hunyuangraph_csrcache_t readgraph_cache;
 
 /*************************************************************************
 * This function checks if a file exists
@@ -89,6 +93,42 @@ void check_fclose(FILE *fp)
 	fclose(fp);
 }
 
+/*************************************************************************/
+/*! This function maps the arrays of a graph from its binary csr cache
+    \returns 1 if a valid cache was found */
+/*************************************************************************/
+Hunyuan_int_t ReadGraph_csrcache(char *filename, graph_t *graph, Hunyuan_int_t **txadj, Hunyuan_int_t **tvwgt, Hunyuan_int_t **tadjncy, Hunyuan_int_t **tadjwgt)
+{
+	if (!hunyuangraph_csrcache_open(filename, sizeof(Hunyuan_int_t), &readgraph_cache))
+		return 0;
+
+	graph->nvtxs  = readgraph_cache.header->nvtxs;
+	graph->nedges = readgraph_cache.header->nedges;
+	*txadj   = (Hunyuan_int_t *)readgraph_cache.xadj;
+	*tadjncy = (Hunyuan_int_t *)readgraph_cache.adjncy;
+	*tvwgt   = (Hunyuan_int_t *)readgraph_cache.vwgt;
+	*tadjwgt = (Hunyuan_int_t *)readgraph_cache.adjwgt;
+
+	return 1;
+}
+
+/*************************************************************************/
+/*! This function releases the arrays returned by ReadGraph */
+/*************************************************************************/
+void FreeReadGraph(Hunyuan_int_t *xadj, Hunyuan_int_t *vwgt, Hunyuan_int_t *adjncy, Hunyuan_int_t *adjwgt)
+{
+	if (readgraph_cache.base != NULL && (char *)xadj == (char *)readgraph_cache.xadj)
+	{
+		hunyuangraph_csrcache_close(&readgraph_cache);
+		return ;
+	}
+
+	free(xadj);
+	free(vwgt);
+	free(adjncy);
+	free(adjwgt);
+}
+
 /*************************************************************************/
 /*! This function reads in a sparse graph */
 /*************************************************************************/
@@ -117,6 +157,17 @@ graph_t *ReadGraph(char *filename, Hunyuan_int_t **txadj, Hunyuan_int_t **tvwgt,
 	
     graph = CreateGraph();
 
+#ifndef NO_CSR_CACHE
+	if (ReadGraph_csrcache(filename, graph, txadj, tvwgt, tadjncy, tadjwgt))
+	{
+		if (graph->tvwgt == NULL) 
+			graph->tvwgt = (Hunyuan_int_t *)check_malloc(sizeof(Hunyuan_int_t) * 1, "SetupGraph_tvwgt: tvwgt");
+		graph->tvwgt[0]    = sum_int(graph->nvtxs, *tvwgt, 1);
+
+		return graph;
+	}
+#endif
+
     fpin = check_fopen(filename, "r", "ReadGRaph: Graph");
 	
     /* Skip comment lines until you get to the first valid line */
@@ -326,6 +377,11 @@ graph_t *ReadGraph(char *filename, Hunyuan_int_t **txadj, Hunyuan_int_t **tvwgt,
 	graph->tvwgt[0]    = sum_int(graph->nvtxs, vwgt, 1);
 
 	check_free(line, sizeof(char) * lnlen, "ReadGraph: line");
+
+#ifndef NO_CSR_CACHE
+	if (!hunyuangraph_csrcache_write(filename, sizeof(Hunyuan_int_t), graph->nvtxs, graph->nedges, fmt, xadj, adjncy, vwgt, adjwgt))
+		printf("Failed to write the csr cache of %s\n", filename);
+#endif
 	
 	return graph;
 }
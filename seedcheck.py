@@ -0,0 +1,70 @@
+"""Reproducibility check of the seeded CPU backend.
+
+Runs the CPU backend of hunyuangraph (HUNYUANGRAPH_BACKEND=cpu) --reps times
+per graph, nparts, matching engine and seed, with the same HUNYUANGRAPH_SEED
+and --threads OpenMP threads, and exits with 1 if two runs of a cell give
+different edgecuts. A run makes several partitionings; all of them are
+compared. The parallel engine of HUNYUANGRAPH_CPU_MATCH=parallel claims its
+partners in schedule order and is not expected to be reproducible.
+
+    python3 seedcheck.py --binary ./hunyuangraph_cpu --graphs graphs/delaunay_n20.graph --nparts 2 8 64 --threads 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from bench import ROOT, TOOLS, parse_output
+
+
+def edgecuts(binary, graph, nparts, threads, match, seed, timeout):
+    """Edgecuts of the partitionings of one run, None if it failed."""
+    env = dict(os.environ)
+    env.update(HUNYUANGRAPH_BACKEND='cpu', HUNYUANGRAPH_CPU_MATCH=match, HUNYUANGRAPH_SEED=str(seed), OMP_NUM_THREADS=str(threads))
+    command = [binary] + TOOLS['hunyuangraph'][1](graph, nparts)
+    try:
+        process = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        return None
+    if process.returncode != 0:
+        return None
+    runs, _ = parse_output(process.stdout.decode('utf-8', 'replace'))
+    return [run['edgecut'] for run in runs if 'edgecut' in run] or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the CPU backend gives the same edgecuts for the same seed')
+    parser.add_argument('--binary', default=TOOLS['hunyuangraph'][0], help='hunyuangraph binary (default: the one built in the repository)')
+    parser.add_argument('--graphs', nargs='+', required=True, help='graph files')
+    parser.add_argument('--nparts', type=int, nargs='+', default=[2, 8])
+    parser.add_argument('--threads', type=int, default=4, help='OpenMP threads, more than one (default: 4)')
+    parser.add_argument('--match', nargs='+', choices=['serial', 'deterministic'], default=['serial', 'deterministic'],
+                        help='matching engines (default: serial deterministic)')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1], help='HUNYUANGRAPH_SEED values (default: 1)')
+    parser.add_argument('--reps', type=int, default=3, help='runs per cell (default: 3)')
+    parser.add_argument('--timeout', type=float, default=0, help='seconds before a run is killed (default: none)')
+    args = parser.parse_args()
+
+    if not os.access(args.binary, os.X_OK):
+        print('%s is not built' % args.binary)
+        sys.exit(1)
+    if args.threads < 2 or args.reps < 2:
+        print('--threads and --reps must be at least 2')
+        sys.exit(1)
+
+    failed = 0
+    for graph in args.graphs:
+        for nparts in args.nparts:
+            for match in args.match:
+                for seed in args.seeds:
+                    cuts = [edgecuts(args.binary, graph, nparts, args.threads, match, seed, args.timeout) for _ in range(args.reps)]
+                    ok = cuts[0] is not None and all(cut == cuts[0] for cut in cuts)
+                    failed += not ok
+                    print('%-4s %s k=%d match=%s seed=%d threads=%d: %s' % ('ok' if ok else 'FAIL', os.path.basename(graph), nparts, match,
+                                                                             seed, args.threads, ' | '.join(map(str, cuts))))
+    print('%d cells not reproducible' % failed)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()